@@ -0,0 +1,80 @@
+"""Compare two benchmark reports (cf. benchmark.run_benchmark) to catch regressions
+
+A stage regresses if one of its throughputs is lower than in the reference report, or if its peak memory is higher,
+by more than the tolerance.
+
+Usage:
+    python -m benchmark.compare reference_report.json new_report.json --tolerance 0.1
+"""
+
+import argparse
+import json
+import logging
+import sys
+from typing import Dict, List
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("reference", help="Path to the reference report")
+    parser.add_argument("new", help="Path to the report to compare with the reference")
+    parser.add_argument("--tolerance", "-t", type=float, default=0.1, help="Relative tolerance (default: 10%%)")
+
+    return parser.parse_args(argv)
+
+
+def compare_reports(reference: Dict, new: Dict, tolerance: float = 0.1) -> List[str]:
+    """Compare the stages that are in both reports
+
+    Args:
+        reference (Dict): reference report
+        new (Dict): report to compare with the reference
+        tolerance (float, optional): relative tolerance on throughputs and peak memory. Defaults to 0.1.
+
+    Returns:
+        List[str]: description of the regressions (empty if there is no regression)
+    """
+    if reference["params"] != new["params"]:
+        logging.warning("Reports have been generated with different parameters, they may not be comparable")
+
+    regressions = []
+    for stage, new_metrics in new["stages"].items():
+        if stage not in reference["stages"]:
+            continue
+        reference_metrics = reference["stages"][stage]
+        for key, new_value in new_metrics["throughput"].items():
+            reference_value = reference_metrics["throughput"].get(key)
+            if not reference_value:
+                continue
+            ratio = new_value / reference_value
+            logging.info(f"{stage}: {key} {reference_value:.0f} -> {new_value:.0f} ({ratio - 1:+.1%})")
+            if ratio < 1 - tolerance:
+                regressions.append(f"{stage}: {key} decreased by {1 - ratio:.1%}")
+
+        ratio = new_metrics["peak_rss_mb"] / reference_metrics["peak_rss_mb"]
+        logging.info(
+            f"{stage}: peak RSS {reference_metrics['peak_rss_mb']:.0f}MB -> {new_metrics['peak_rss_mb']:.0f}MB "
+            f"({ratio - 1:+.1%})"
+        )
+        if ratio > 1 + tolerance:
+            regressions.append(f"{stage}: peak RSS increased by {ratio - 1:.1%}")
+
+    return regressions
+
+
+def main(args) -> int:
+    with open(args.reference, "r") as f:
+        reference = json.load(f)
+    with open(args.new, "r") as f:
+        new = json.load(f)
+
+    regressions = compare_reports(reference, new, args.tolerance)
+    for regression in regressions:
+        logging.error(f"Regression: {regression}")
+
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    sys.exit(main(parse_args()))
@@ -0,0 +1,273 @@
+"""Benchmark all the stages of the pipeline on a grid of synthetic tiles
+
+The tiles (and the lines / polygons used by the vector stages) are generated from a seed in the output folder, then
+each stage is run in a fresh process so that its peak memory can be measured independently of the other stages.
+Throughputs (points/s, pixels/s, lines/s) and peak RSS are saved to a json report, that can be compared to the
+report of another version with `python -m benchmark.compare`.
+
+Usage:
+    python -m benchmark.run_benchmark -o tmp/benchmark --nb_tiles 3 3 --density 10
+"""
+
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict
+
+import pdal
+
+from benchmark import synthetic_data
+from benchmark.stages import (
+    LINES_FILENAME,
+    MASK_FILENAME,
+    POLYGONS_FILENAME,
+    STAGES,
+    TILES_DIRNAME,
+    VECTORS_DIRNAME,
+)
+from las_digital_models.version import __version__
+
+DATASET_FILENAME = "dataset.json"
+
+# Parameters that define the generated data (if they change, the data is generated again)
+DATASET_PARAMS = [
+    "nb_tiles",
+    "origin",
+    "tile_width",
+    "tile_coord_scale",
+    "density",
+    "class_mix",
+    "nb_lines",
+    "nb_polygons",
+    "nb_mask_polygons",
+    "seed",
+    "spatial_ref",
+]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output_dir", "-o", required=True, help="Folder for the generated data and the outputs")
+    parser.add_argument("--report", "-r", help="Path to the json report (default: {output_dir}/report.json)")
+    parser.add_argument("--nb_tiles", "-n", nargs=2, type=int, default=[3, 3], help="Number of tiles along x and y")
+    parser.add_argument("--tile_width", type=int, default=250, help="Width of the tiles in meters")
+    parser.add_argument("--tile_coord_scale", type=int, default=10, help="Scale of the coordinates in filenames")
+    parser.add_argument("--origin", nargs=2, type=float, default=[770000, 6278000], help="Upper-left corner")
+    parser.add_argument("--density", "-d", type=float, default=10, help="Number of points per square meter")
+    parser.add_argument(
+        "--class_mix",
+        default=",".join(f"{c}:{share}" for c, share in synthetic_data.DEFAULT_CLASS_MIX.items()),
+        help='Share of each class in the points, as "class:share,class:share"',
+    )
+    parser.add_argument("--buffer_width", type=int, default=25, help="Width of the buffer in meters")
+    parser.add_argument("--pixel_size", type=float, default=0.5, help="Pixel size of the rasters in meters")
+    parser.add_argument("--nb_lines", type=int, default=10000, help="Number of lines for the vector stages")
+    parser.add_argument("--nb_polygons", type=int, default=500, help="Number of polygons to clip the lines")
+    parser.add_argument("--nb_mask_polygons", type=int, default=50, help="Number of polygons of the no-data mask")
+    parser.add_argument("--seed", type=int, default=0, help="Seed used to generate the data")
+    parser.add_argument("--spatial_ref", default="EPSG:2154", help="Spatial reference of the generated data")
+    parser.add_argument(
+        "--stages",
+        nargs="+",
+        choices=list(STAGES),
+        default=list(STAGES),
+        help="Stages to run (a stage uses the outputs of the previous ones, that must exist in output_dir)",
+    )
+    parser.add_argument("--repeat", type=int, default=1, help="Number of runs of each stage (the median is kept)")
+
+    return parser.parse_args(argv)
+
+
+def get_params(args) -> Dict:
+    return {
+        "nb_tiles": args.nb_tiles,
+        "origin": args.origin,
+        "tile_width": args.tile_width,
+        "tile_coord_scale": args.tile_coord_scale,
+        "density": args.density,
+        "class_mix": synthetic_data.parse_class_mix(args.class_mix),
+        "nb_lines": args.nb_lines,
+        "nb_polygons": args.nb_polygons,
+        "nb_mask_polygons": args.nb_mask_polygons,
+        "seed": args.seed,
+        "spatial_ref": args.spatial_ref,
+        "buffer_width": args.buffer_width,
+        "pixel_size": args.pixel_size,
+    }
+
+
+def generate_dataset(workspace: str, params: Dict) -> Dict[str, int]:
+    """Generate the synthetic tiles and vectors in workspace (unless they have already been generated with the same
+    parameters)
+
+    Args:
+        workspace (str): output folder of the benchmark
+        params (Dict): parameters of the benchmark
+
+    Returns:
+        Dict[str, int]: number of points of each tile
+    """
+    dataset_params = json.loads(json.dumps({key: params[key] for key in DATASET_PARAMS}))
+    dataset_path = os.path.join(workspace, DATASET_FILENAME)
+    if os.path.isfile(dataset_path):
+        with open(dataset_path, "r") as f:
+            dataset = json.load(f)
+        if dataset["params"] == dataset_params:
+            logging.info(f"Reuse the data generated in {workspace}")
+            return dataset["tiles"]
+
+    logging.info(f"Generate {params['nb_tiles'][0]}x{params['nb_tiles'][1]} tiles in {workspace}")
+    tiles = synthetic_data.generate_tiles(
+        os.path.join(workspace, TILES_DIRNAME),
+        *params["nb_tiles"],
+        origin=params["origin"],
+        tile_width=params["tile_width"],
+        tile_coord_scale=params["tile_coord_scale"],
+        density=params["density"],
+        class_mix=params["class_mix"],
+        seed=params["seed"],
+        spatial_ref=params["spatial_ref"],
+    )
+
+    xmin, ymax = params["origin"]
+    bounds = (
+        xmin,
+        ymax - params["nb_tiles"][1] * params["tile_width"],
+        xmin + params["nb_tiles"][0] * params["tile_width"],
+        ymax,
+    )
+    os.makedirs(os.path.join(workspace, VECTORS_DIRNAME), exist_ok=True)
+    synthetic_data.generate_lines(bounds, params["nb_lines"], params["seed"], params["spatial_ref"]).to_file(
+        os.path.join(workspace, VECTORS_DIRNAME, LINES_FILENAME)
+    )
+    synthetic_data.generate_polygons(bounds, params["nb_polygons"], params["seed"], params["spatial_ref"]).to_file(
+        os.path.join(workspace, VECTORS_DIRNAME, POLYGONS_FILENAME)
+    )
+    synthetic_data.generate_polygons(
+        bounds, params["nb_mask_polygons"], params["seed"] + 1, params["spatial_ref"]
+    ).to_file(os.path.join(workspace, VECTORS_DIRNAME, MASK_FILENAME))
+
+    with open(dataset_path, "w") as f:
+        json.dump({"params": dataset_params, "tiles": tiles}, f, indent=2)
+
+    return tiles
+
+
+def get_peak_rss_mb() -> float:
+    """Peak resident memory of the current process and of its (terminated) children, in MB"""
+    peak_rss = max(
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    )
+    # ru_maxrss is in bytes on macOS, in kilobytes elsewhere
+    return peak_rss / (1024 * 1024) if sys.platform == "darwin" else peak_rss / 1024
+
+
+def measure_stage(stage: str, workspace: str, tiles: Dict[str, int], params: Dict) -> Dict:
+    """Run a stage and measure its duration and peak memory (to be called in a fresh process)"""
+    start = time.perf_counter()
+    counts = STAGES[stage](workspace, tiles, params)
+    elapsed = time.perf_counter() - start
+
+    return {"elapsed_s": elapsed, "peak_rss_mb": get_peak_rss_mb(), "counts": counts}
+
+
+def run_stage(stage: str, workspace: str, tiles: Dict[str, int], params: Dict, repeat: int = 1) -> Dict:
+    """Run a stage `repeat` times, each time in a new process, and compute its throughputs from the median duration
+
+    Args:
+        stage (str): name of the stage (cf. benchmark.stages.STAGES)
+        workspace (str): output folder of the benchmark
+        tiles (Dict[str, int]): number of points of each tile
+        params (Dict): parameters of the benchmark
+        repeat (int, optional): number of runs. Defaults to 1.
+
+    Returns:
+        Dict: metrics of the stage
+    """
+    runs = []
+    for _ in range(repeat):
+        with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context("spawn")) as executor:
+            runs.append(executor.submit(measure_stage, stage, workspace, tiles, params).result())
+
+    elapsed = statistics.median(run["elapsed_s"] for run in runs)
+    counts = runs[0]["counts"]
+
+    return {
+        "elapsed_s": elapsed,
+        "runs_elapsed_s": [run["elapsed_s"] for run in runs],
+        "counts": counts,
+        "throughput": {f"{item}_per_s": count / elapsed for item, count in counts.items()},
+        "peak_rss_mb": max(run["peak_rss_mb"] for run in runs),
+    }
+
+
+def get_git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def get_environment() -> Dict:
+    return {
+        "version": __version__,
+        "git_commit": get_git_commit(),
+        "python": platform.python_version(),
+        "pdal_python": getattr(pdal, "__version__", None),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def main(args):
+    params = get_params(args)
+    workspace = args.output_dir
+    os.makedirs(workspace, exist_ok=True)
+    report_path = args.report or os.path.join(workspace, "report.json")
+
+    start = time.perf_counter()
+    tiles = generate_dataset(workspace, params)
+    generation_time = time.perf_counter() - start
+
+    report = {
+        "environment": get_environment(),
+        "params": params,
+        "dataset": {"nb_tiles": len(tiles), "nb_points": sum(tiles.values()), "generation_s": generation_time},
+        "stages": {},
+    }
+    for stage in STAGES:
+        if stage not in args.stages:
+            continue
+        logging.info(f"Run stage {stage}")
+        report["stages"][stage] = run_stage(stage, workspace, tiles, params, args.repeat)
+        throughputs = ", ".join(f"{value:.0f} {key}" for key, value in report["stages"][stage]["throughput"].items())
+        logging.info(
+            f"{stage}: {report['stages'][stage]['elapsed_s']:.2f}s ({throughputs}), "
+            f"peak RSS {report['stages'][stage]['peak_rss_mb']:.0f}MB"
+        )
+
+    with open(report_path, "w") as f:
+        json.dump(report, f, indent=2)
+    logging.info(f"Report saved to {report_path}")
+
+    return report
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    main(parse_args())
@@ -0,0 +1,184 @@
+"""Pipeline stages measured by the benchmark
+
+Each stage reads the outputs of the previous ones in the benchmark workspace, and returns the number of items it
+processed (points, pixels or lines), that are used to compute its throughput.
+"""
+
+import logging
+import os
+from typing import Callable, Dict, List
+
+import geopandas as gpd
+import numpy as np
+import rasterio
+from pdaltools.las_add_buffer import create_las_with_buffer
+
+from las_digital_models.commons import commons
+from las_digital_models.extract_stat_from_raster.rasters.extract_z_min_from_raster_by_polylines import (
+    extract_polylines_min_z_from_dsm,
+)
+from las_digital_models.extract_stat_from_raster.rasters.vrt import create_vrt
+from las_digital_models.extract_stat_from_raster.vectors.clip_geometry import (
+    clip_lines_by_polygons,
+)
+from las_digital_models.tasks.dhm_generation import calculate_dhm
+from las_digital_models.tasks.las_interpolation import interpolate
+from las_digital_models.tasks.postprocessing import mask_with_no_data_shapefile
+
+TILES_DIRNAME = "tiles"
+BUFFER_DIRNAME = "buffer"
+VECTORS_DIRNAME = "vectors"
+LINES_FILENAME = "lines.gpkg"
+POLYGONS_FILENAME = "polygons.gpkg"
+MASK_FILENAME = "no_data_mask.shp"
+# Suffix of the folders of the rasters interpolated with the scipy backend
+SCIPY_SUFFIX = "_scipy"
+
+NO_DATA_VALUE = -9999
+
+# Classes used for each product (as in configs/filter/dtm.yaml and configs/filter/dsm.yaml)
+PRODUCTS_CLASSES = {"DTM": [2, 9, 66], "DSM": [2, 3, 4, 5, 6, 9, 17]}
+
+
+def get_raster_filename(tile_filename: str, pixel_size: float) -> str:
+    return f"{os.path.splitext(tile_filename)[0]}{commons.give_name_resolution_raster(pixel_size)}.tif"
+
+
+def get_raster_paths(workspace: str, dirname: str, tiles: List[str], pixel_size: float) -> List[str]:
+    return [os.path.join(workspace, dirname, get_raster_filename(tile, pixel_size)) for tile in tiles]
+
+
+def count_pixels(raster_paths: List[str]) -> int:
+    nb_pixels = 0
+    for raster_path in raster_paths:
+        with rasterio.open(raster_path) as src:
+            nb_pixels += src.width * src.height
+
+    return nb_pixels
+
+
+def run_buffer(workspace: str, tiles: Dict[str, int], params: Dict) -> Dict[str, int]:
+    """Add a buffer to each tile (pdaltools.las_add_buffer.create_las_with_buffer)"""
+    os.makedirs(os.path.join(workspace, BUFFER_DIRNAME), exist_ok=True)
+    for tile in tiles:
+        create_las_with_buffer(
+            input_dir=os.path.join(workspace, TILES_DIRNAME),
+            tile_filename=os.path.join(workspace, TILES_DIRNAME, tile),
+            output_filename=os.path.join(workspace, BUFFER_DIRNAME, tile),
+            buffer_width=params["buffer_width"],
+            spatial_ref=params["spatial_ref"],
+            tile_width=params["tile_width"],
+            tile_coord_scale=params["tile_coord_scale"],
+        )
+
+    return {"points": sum(tiles.values())}
+
+
+def interpolate_tiles(workspace: str, tiles: Dict[str, int], params: Dict, backend: str, suffix: str) -> List[str]:
+    """Interpolate the DTM and the DSM of each buffered tile with an interpolation backend, in the {product}{suffix}
+    folders of the workspace"""
+    output_rasters = []
+    for product, classes in PRODUCTS_CLASSES.items():
+        os.makedirs(os.path.join(workspace, f"{product}{suffix}"), exist_ok=True)
+        for tile in tiles:
+            output_raster = os.path.join(
+                workspace, f"{product}{suffix}", get_raster_filename(tile, params["pixel_size"])
+            )
+            interpolate(
+                input_file=os.path.join(workspace, BUFFER_DIRNAME, tile),
+                output_file=output_raster,
+                pixel_size=params["pixel_size"],
+                tile_width=params["tile_width"],
+                tile_coord_scale=params["tile_coord_scale"],
+                spatial_ref=params["spatial_ref"],
+                no_data_value=NO_DATA_VALUE,
+                filter_dimension="Classification",
+                filter_values=classes,
+                backend=backend,
+            )
+            output_rasters.append(output_raster)
+
+    return output_rasters
+
+
+def run_interpolation(workspace: str, tiles: Dict[str, int], params: Dict) -> Dict[str, int]:
+    """Interpolate the DTM and the DSM of each buffered tile"""
+    output_rasters = interpolate_tiles(workspace, tiles, params, "pdal", "")
+
+    return {"points": len(PRODUCTS_CLASSES) * sum(tiles.values()), "pixels": count_pixels(output_rasters)}
+
+
+def run_interpolation_scipy(workspace: str, tiles: Dict[str, int], params: Dict) -> Dict[str, int]:
+    """Interpolate the DTM and the DSM of each buffered tile with the scipy backend, and log the share of pixels
+    that differ from the rasters of the pdal backend (interpolation stage), if they exist"""
+    output_rasters = interpolate_tiles(workspace, tiles, params, "scipy", SCIPY_SUFFIX)
+    nb_pixels = count_pixels(output_rasters)
+
+    pdal_rasters = [
+        os.path.join(os.path.dirname(output_raster)[: -len(SCIPY_SUFFIX)], os.path.basename(output_raster))
+        for output_raster in output_rasters
+    ]
+    if all(os.path.isfile(pdal_raster) for pdal_raster in pdal_rasters):
+        nb_different_pixels = 0
+        for output_raster, pdal_raster in zip(output_rasters, pdal_rasters):
+            with rasterio.open(output_raster) as src, rasterio.open(pdal_raster) as expected:
+                nb_different_pixels += np.count_nonzero(np.abs(src.read(1) - expected.read(1)) > 1e-3)
+        logging.info(f"scipy backend: {nb_different_pixels}/{nb_pixels} pixels differ from the pdal backend by > 1 mm")
+
+    return {"points": len(PRODUCTS_CLASSES) * sum(tiles.values()), "pixels": nb_pixels}
+
+
+def run_dhm(workspace: str, tiles: Dict[str, int], params: Dict) -> Dict[str, int]:
+    """Compute the DHM of each tile from its DSM and DTM"""
+    os.makedirs(os.path.join(workspace, "DHM"), exist_ok=True)
+    dsm_paths, dtm_paths, dhm_paths = (
+        get_raster_paths(workspace, dirname, list(tiles), params["pixel_size"]) for dirname in ("DSM", "DTM", "DHM")
+    )
+    for dsm_path, dtm_path, dhm_path in zip(dsm_paths, dtm_paths, dhm_paths):
+        calculate_dhm(dsm_path, dtm_path, dhm_path, no_data_value=NO_DATA_VALUE)
+
+    return {"pixels": count_pixels(dhm_paths)}
+
+
+def run_mask(workspace: str, tiles: Dict[str, int], params: Dict) -> Dict[str, int]:
+    """Burn the no-data polygons into each DSM"""
+    os.makedirs(os.path.join(workspace, "DSM_masked"), exist_ok=True)
+    dsm_paths, masked_paths = (
+        get_raster_paths(workspace, dirname, list(tiles), params["pixel_size"]) for dirname in ("DSM", "DSM_masked")
+    )
+    shapefile = os.path.join(workspace, VECTORS_DIRNAME, MASK_FILENAME)
+    for dsm_path, masked_path in zip(dsm_paths, masked_paths):
+        mask_with_no_data_shapefile(shapefile, dsm_path, masked_path, NO_DATA_VALUE)
+
+    return {"pixels": count_pixels(masked_paths)}
+
+
+def run_extract_z(workspace: str, tiles: Dict[str, int], params: Dict) -> Dict[str, int]:
+    """Extract the minimum Z of the DSM along each line"""
+    vrt_path = os.path.join(workspace, "DSM.vrt")
+    create_vrt(get_raster_paths(workspace, "DSM", list(tiles), params["pixel_size"]), vrt_path)
+    lines_gdf = gpd.read_file(os.path.join(workspace, VECTORS_DIRNAME, LINES_FILENAME))
+    extract_polylines_min_z_from_dsm(lines_gdf, vrt_path, no_data_value=NO_DATA_VALUE)
+
+    return {"lines": len(lines_gdf)}
+
+
+def run_clip(workspace: str, tiles: Dict[str, int], params: Dict) -> Dict[str, int]:
+    """Clip the lines by the polygons"""
+    lines_gdf = gpd.read_file(os.path.join(workspace, VECTORS_DIRNAME, LINES_FILENAME))
+    polygons_gdf = gpd.read_file(os.path.join(workspace, VECTORS_DIRNAME, POLYGONS_FILENAME))
+    clip_lines_by_polygons(lines_gdf, polygons_gdf)
+
+    return {"lines": len(lines_gdf)}
+
+
+# Stages in the order in which they must be run (each stage uses the outputs of the previous ones)
+STAGES: Dict[str, Callable[[str, Dict[str, int], Dict], Dict[str, int]]] = {
+    "buffer": run_buffer,
+    "interpolation": run_interpolation,
+    "interpolation_scipy": run_interpolation_scipy,
+    "dhm": run_dhm,
+    "mask": run_mask,
+    "extract_z": run_extract_z,
+    "clip": run_clip,
+}
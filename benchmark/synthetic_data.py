@@ -0,0 +1,176 @@
+"""Generate synthetic classified point cloud tiles (and vector data) for the benchmarks
+
+Tiles are laid out on a regular grid and named with the `{prefix1}_{prefix2}_{coordx}_{coordy}_{suffix}` convention
+expected by `pdaltools.las_info.parse_filename` (coordx = xmin / tile_coord_scale, coordy = ymax / tile_coord_scale).
+Everything is generated from a seed, so that the same parameters always give the same data.
+"""
+
+import os
+from typing import Dict, List, Tuple
+
+import geopandas as gpd
+import numpy as np
+import pdal
+from shapely.geometry import LineString, box
+
+# Default share of each class in the generated points
+DEFAULT_CLASS_MIX = {1: 0.05, 2: 0.5, 3: 0.05, 4: 0.05, 5: 0.2, 6: 0.13, 9: 0.02}
+
+POINT_DTYPE = np.dtype(
+    [
+        ("X", np.float64),
+        ("Y", np.float64),
+        ("Z", np.float64),
+        ("Intensity", np.uint16),
+        ("ReturnNumber", np.uint8),
+        ("NumberOfReturns", np.uint8),
+        ("Classification", np.uint8),
+    ]
+)
+
+
+def parse_class_mix(class_mix: str) -> Dict[int, float]:
+    """Parse a class mix given as "class:share,class:share" (eg. "2:0.6,5:0.3,6:0.1"). Shares are normalized."""
+    mix = {}
+    for item in class_mix.split(","):
+        classification, share = item.split(":")
+        mix[int(classification)] = float(share)
+    total = sum(mix.values())
+    if total <= 0:
+        raise ValueError(f"Class mix has no positive share: {class_mix}")
+
+    return {classification: share / total for classification, share in mix.items()}
+
+
+def get_terrain_height(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """Smooth synthetic terrain (continuous across tiles)"""
+    return 100 + 15 * np.sin(x / 170.0) + 10 * np.cos(y / 230.0) + 3 * np.sin((x + y) / 37.0)
+
+
+def generate_tile_points(
+    xmin: float, ymin: float, tile_width: float, density: float, class_mix: Dict[int, float], seed: int
+) -> np.ndarray:
+    """Generate the points of a tile, with a height above the terrain that depends on their class
+    (ground and water on the terrain, vegetation up to 20m, buildings as 10m high blocks)
+
+    Args:
+        xmin (float): x of the lower-left corner of the tile
+        ymin (float): y of the lower-left corner of the tile
+        tile_width (float): width of the tile in meters
+        density (float): number of points per square meter
+        class_mix (Dict[int, float]): share of the points for each class
+        seed (int): seed of the random generator
+
+    Returns:
+        np.ndarray: points as a structured array that can be written by pdal
+    """
+    rng = np.random.default_rng(seed)
+    nb_points = int(round(density * tile_width * tile_width))
+    points = np.zeros(nb_points, dtype=POINT_DTYPE)
+    points["X"] = np.round(xmin + rng.uniform(0, tile_width, nb_points), 2)
+    points["Y"] = np.round(ymin + rng.uniform(0, tile_width, nb_points), 2)
+    points["Classification"] = rng.choice(list(class_mix.keys()), size=nb_points, p=list(class_mix.values()))
+    points["ReturnNumber"] = 1
+    points["NumberOfReturns"] = 1
+    points["Intensity"] = rng.integers(0, 1000, nb_points)
+
+    height = np.zeros(nb_points)
+    classification = points["Classification"]
+    vegetation = np.isin(classification, [3, 4, 5])
+    height[vegetation] = rng.uniform(0.2, 20, np.count_nonzero(vegetation))
+    buildings = classification == 6
+    height[buildings] = 10
+    unclassified = classification == 1
+    height[unclassified] = rng.uniform(0, 30, np.count_nonzero(unclassified))
+
+    vegetation_returns = rng.integers(1, 4, np.count_nonzero(vegetation))
+    points["NumberOfReturns"][vegetation] = vegetation_returns
+    points["ReturnNumber"][vegetation] = rng.integers(1, vegetation_returns + 1)
+
+    points["Z"] = np.round(get_terrain_height(points["X"], points["Y"]) + height, 2)
+
+    return points
+
+
+def get_tile_filename(
+    xmin: float, ymax: float, tile_coord_scale: int, prefix: str = "synthetic_tile", suffix: str = "LA93_IGN69.laz"
+) -> str:
+    """Get the name of a tile, as {prefix}_{coordx}_{coordy}_{suffix} (prefix is made of 2 parts)"""
+    return f"{prefix}_{int(xmin // tile_coord_scale):04d}_{int(ymax // tile_coord_scale):04d}_{suffix}"
+
+
+def generate_tiles(
+    output_dir: str,
+    nb_tiles_x: int,
+    nb_tiles_y: int,
+    origin: Tuple[float, float] = (770000, 6278000),
+    tile_width: int = 250,
+    tile_coord_scale: int = 10,
+    density: float = 10,
+    class_mix: Dict[int, float] = None,
+    seed: int = 0,
+    spatial_ref: str = "EPSG:2154",
+) -> Dict[str, int]:
+    """Generate a grid of synthetic tiles
+
+    Args:
+        output_dir (str): folder where to save the tiles
+        nb_tiles_x (int): number of tiles along x
+        nb_tiles_y (int): number of tiles along y
+        origin (Tuple[float, float], optional): upper-left corner of the grid. Defaults to (770000, 6278000).
+        tile_width (int, optional): width of the tiles in meters. Defaults to 250.
+        tile_coord_scale (int, optional): scale of the coordinates in the filenames. Defaults to 10.
+        density (float, optional): number of points per square meter. Defaults to 10.
+        class_mix (Dict[int, float], optional): share of the points for each class. Defaults to DEFAULT_CLASS_MIX.
+        seed (int, optional): seed of the random generator. Defaults to 0.
+        spatial_ref (str, optional): spatial reference of the tiles. Defaults to "EPSG:2154".
+
+    Returns:
+        Dict[str, int]: number of points of each generated tile (by filename)
+    """
+    class_mix = class_mix or DEFAULT_CLASS_MIX
+    os.makedirs(output_dir, exist_ok=True)
+    nb_points = {}
+    for ix in range(nb_tiles_x):
+        for iy in range(nb_tiles_y):
+            xmin = origin[0] + ix * tile_width
+            ymax = origin[1] - iy * tile_width
+            filename = get_tile_filename(xmin, ymax, tile_coord_scale)
+            points = generate_tile_points(
+                xmin, ymax - tile_width, tile_width, density, class_mix, seed=seed * 1000003 + ix * 1009 + iy
+            )
+            pipeline = pdal.Writer.las(
+                filename=os.path.join(output_dir, filename), a_srs=spatial_ref, minor_version=4, dataformat_id=6
+            ).pipeline(points)
+            pipeline.execute()
+            nb_points[filename] = len(points)
+
+    return nb_points
+
+
+def generate_lines(
+    bounds: Tuple[float, float, float, float], nb_lines: int, seed: int = 0, crs: str = "EPSG:2154"
+) -> gpd.GeoDataFrame:
+    """Generate random short lines (like bridge constraint lines) in a bounding box (xmin, ymin, xmax, ymax)"""
+    rng = np.random.default_rng(seed)
+    xmin, ymin, xmax, ymax = bounds
+    starts = np.column_stack([rng.uniform(xmin, xmax, nb_lines), rng.uniform(ymin, ymax, nb_lines)])
+    lengths = rng.uniform(5, 60, nb_lines)
+    angles = rng.uniform(0, np.pi, nb_lines)
+    ends = starts + np.column_stack([lengths * np.cos(angles), lengths * np.sin(angles)])
+    lines: List[LineString] = [LineString([start, end]) for start, end in zip(starts, ends)]
+
+    return gpd.GeoDataFrame({"id": np.arange(nb_lines)}, geometry=lines, crs=crs)
+
+
+def generate_polygons(
+    bounds: Tuple[float, float, float, float], nb_polygons: int, seed: int = 0, crs: str = "EPSG:2154"
+) -> gpd.GeoDataFrame:
+    """Generate random rectangles (like bridge decks or no-data areas) in a bounding box (xmin, ymin, xmax, ymax)"""
+    rng = np.random.default_rng(seed)
+    xmin, ymin, xmax, ymax = bounds
+    corners = np.column_stack([rng.uniform(xmin, xmax, nb_polygons), rng.uniform(ymin, ymax, nb_polygons)])
+    sizes = rng.uniform(10, 50, (nb_polygons, 2))
+    polygons = [box(x, y, x + width, y + height) for (x, y), (width, height) in zip(corners, sizes)]
+
+    return gpd.GeoDataFrame({"name": [f"polygon_{i}" for i in range(nb_polygons)]}, geometry=polygons, crs=crs)
@@ -2,16 +2,16 @@
 The script assumes that the neighbor tiles are located in the same folder as
 the queried tile
 
+This is a thin hydra wrapper around las_digital_models.api.add_buffer_to_tile.
 """
 
 import logging
-import os
 
 import hydra
 from omegaconf import DictConfig
-from pdaltools.las_add_buffer import create_las_with_buffer
 
-from las_digital_models.commons import commons
+from las_digital_models import api
+from las_digital_models.commons import commons, metrics
 
 log = commons.get_logger(__name__)
 
@@ -22,27 +22,8 @@ def run_add_buffer_one_tile(config: DictConfig):
     The script assumes that the neighbor tiles are located in the same folder as
     the queried tile
     """
-
-    if config.io.forced_intermediate_ext is None:
-        input_file = os.path.join(config.io.input_dir, config.io.input_filename)
-        output_file = os.path.join(config.io.output_dir, config.io.input_filename)
-    else:
-        _, input_basename = os.path.split(config.io.input_filename)
-        tilename, _ = os.path.splitext(input_basename)
-        input_file = os.path.join(config.io.input_dir, f"{tilename}.{config.io.forced_intermediate_ext}")
-        output_file = os.path.join(config.io.output_dir, f"{tilename}.{config.io.forced_intermediate_ext}")
-
-    os.makedirs(config.io.output_dir, exist_ok=True)
-
-    create_las_with_buffer(
-        input_dir=config.io.input_dir,
-        tile_filename=input_file,
-        output_filename=output_file,
-        buffer_width=config.buffer.size,
-        spatial_ref=config.io.spatial_reference,
-        tile_width=config.tile_geometry.tile_width,
-        tile_coord_scale=config.tile_geometry.tile_coord_scale,
-    )
+    metrics.configure_metrics_from_config(config)
+    api.add_buffer_to_tile(api.Config.from_dict(config))
 
 
 def main():
@@ -0,0 +1,527 @@
+"""Python API of the single-tile entry points, without hydra
+
+The configuration is a tree of dataclasses that mirrors the config groups of configs/* (eg. Config.io mirrors
+configs/io/default.yaml). The heavy geospatial stacks (pdal, GDAL, rasterio, geopandas, laspy) are imported only
+when a function that needs them is called, so that importing this module (or one of the hydra scripts that wrap it:
+ip_one_tile, dhm_one_tile, add_buffer_one_tile, extract_z_virtual_lines_from_raster) is fast.
+
+Example:
+    from las_digital_models.api import Config, FilterConfig, IoConfig, TileGeometryConfig, interpolate_tile
+
+    config = Config(
+        io=IoConfig(input_dir="/data/las", input_filename="tile_0770_6277.laz", output_dir="/data/dtm"),
+        tile_geometry=TileGeometryConfig(pixel_size=0.5),
+        filter=FilterConfig(dimension="Classification", keep_values=[2, 66]),
+    )
+    interpolate_tile(config)
+"""
+
+import dataclasses
+import os
+from collections.abc import Mapping, Sequence
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Union
+
+from las_digital_models.commons import commons, metrics
+
+if TYPE_CHECKING:
+    from las_digital_models.commons.raster import Raster
+
+log = commons.get_logger(__name__)
+
+
+def _to_builtin(value: Any) -> Any:
+    """Convert (nested) mappings and sequences (eg. omegaconf DictConfig and ListConfig) to dicts and lists"""
+    if isinstance(value, Mapping):
+        return {key: _to_builtin(item) for key, item in value.items()}
+    if isinstance(value, Sequence) and not isinstance(value, str):
+        return [_to_builtin(item) for item in value]
+
+    return value
+
+
+class _ConfigGroup:
+    """Base class of the dataclasses of the config groups"""
+
+    @classmethod
+    def from_dict(cls, values: Mapping):
+        """Create a config group from a mapping (eg. the corresponding subtree of a hydra config)
+
+        Raises:
+            ValueError: if the mapping contains keys that are not fields of the config group
+        """
+        fields = {field.name: field for field in dataclasses.fields(cls)}
+        unknown = set(values) - set(fields)
+        if unknown:
+            raise ValueError(f"Unknown keys for {cls.__name__}: {sorted(unknown)}")
+
+        kwargs = {}
+        for key, value in values.items():
+            factory = fields[key].default_factory
+            # Nested config groups (eg. extract_stat.cache)
+            if isinstance(factory, type) and issubclass(factory, _ConfigGroup) and value is not None:
+                kwargs[key] = factory.from_dict(value)
+            else:
+                kwargs[key] = _to_builtin(value)
+
+        return cls(**kwargs)
+
+
+@dataclasses.dataclass
+class TileGeometryConfig(_ConfigGroup):
+    """cf. configs/tile_geometry/default.yaml"""
+
+    tile_coord_scale: int = 1000
+    tile_width: int = 1000
+    pixel_size: Union[float, List[float]] = 1
+    no_data_value: int = -9999
+
+
+@dataclasses.dataclass
+class IoConfig(_ConfigGroup):
+    """cf. configs/io/default.yaml"""
+
+    input_dir: Optional[str] = None
+    input_filename: Optional[str] = None
+    no_data_mask_shapefile: Optional[str] = None
+    forced_intermediate_ext: Optional[str] = None
+    spatial_reference: str = "EPSG:2154"
+    output_dir: Optional[str] = None
+
+
+@dataclasses.dataclass
+class FilterConfig(_ConfigGroup):
+    """cf. configs/filter/dtm.yaml"""
+
+    dimension: str = "Classification"
+    keep_values: List[int] = dataclasses.field(default_factory=lambda: [2, 9, 66])
+
+
+@dataclasses.dataclass
+class BufferConfig(_ConfigGroup):
+    """cf. configs/buffer/default.yaml"""
+
+    size: float = 100
+
+
+@dataclasses.dataclass
+class DhmConfig(_ConfigGroup):
+    """cf. configs/dhm/default.yaml"""
+
+    input_dsm_dir: Optional[str] = None
+    input_dtm_dir: Optional[str] = None
+    block_size: int = 512
+    nb_threads: int = 4
+
+
+@dataclasses.dataclass
+class OutputProfileConfig(_ConfigGroup):
+    """cf. configs/output_profile/default.yaml"""
+
+    driver: str = "GTiff"
+    compress: Optional[str] = None
+    predictor: bool = True
+    level: Optional[int] = None
+    max_z_error: float = 0.0
+    block_size: Optional[int] = None
+    overviews: bool = False
+    overview_resampling: str = "average"
+
+
+@dataclasses.dataclass
+class SubTilesConfig(_ConfigGroup):
+    """cf. configs/sub_tiles/default.yaml"""
+
+    enabled: bool = False
+    block_size: float = 250
+    margin: float = 20
+    chunk_size: int = 1_000_000
+
+
+@dataclasses.dataclass
+class InterpolationConfig(_ConfigGroup):
+    """cf. configs/interpolation/default.yaml"""
+
+    backend: str = "pdal"
+
+
+@dataclasses.dataclass
+class MetricsConfig(_ConfigGroup):
+    """cf. configs/metrics/default.yaml"""
+
+    output_dir: Optional[str] = None
+
+
+@dataclasses.dataclass
+class ExtractStatCacheConfig(_ConfigGroup):
+    """cf. configs/extract_stat/default.yaml (cache)"""
+
+    enabled: bool = False
+    path: Optional[str] = None
+    max_size_mb: float = 1024
+    hash_rasters: bool = False
+
+
+@dataclasses.dataclass
+class ExtractStatConfig(_ConfigGroup):
+    """cf. configs/extract_stat/default.yaml"""
+
+    input_raster_dir: Optional[str] = None
+    input_geometry_dir: Optional[str] = None
+    input_geometry_filename: Optional[str] = None
+    input_clip_geometry_dir: Optional[str] = None
+    input_clip_geometry_filename: Optional[str] = None
+    spatial_reference: str = "EPSG:2154"
+    output_dir: Optional[str] = None
+    output_geometry_filename: Optional[str] = None
+    output_vrt_filename: Optional[str] = None
+    block_size: int = 512
+    nb_workers: int = 1
+    chunk_size: int = 100000
+    stats: List[str] = dataclasses.field(default_factory=list)
+    z_statistic: Optional[str] = "min"
+    profile_step: Optional[float] = None
+    output_format: Optional[str] = None
+    cache: ExtractStatCacheConfig = dataclasses.field(default_factory=ExtractStatCacheConfig)
+
+
+@dataclasses.dataclass
+class Config:
+    """Configuration of the single-tile entry points (cf. configs/config.yaml)"""
+
+    tile_geometry: TileGeometryConfig = dataclasses.field(default_factory=TileGeometryConfig)
+    io: IoConfig = dataclasses.field(default_factory=IoConfig)
+    filter: FilterConfig = dataclasses.field(default_factory=FilterConfig)
+    buffer: BufferConfig = dataclasses.field(default_factory=BufferConfig)
+    dhm: DhmConfig = dataclasses.field(default_factory=DhmConfig)
+    output_profile: OutputProfileConfig = dataclasses.field(default_factory=OutputProfileConfig)
+    sub_tiles: SubTilesConfig = dataclasses.field(default_factory=SubTilesConfig)
+    interpolation: InterpolationConfig = dataclasses.field(default_factory=InterpolationConfig)
+    metrics: MetricsConfig = dataclasses.field(default_factory=MetricsConfig)
+    extract_stat: ExtractStatConfig = dataclasses.field(default_factory=ExtractStatConfig)
+
+    @classmethod
+    def from_dict(cls, config: Mapping) -> "Config":
+        """Create a config from a mapping with the structure of the hydra config (eg. the DictConfig of a hydra
+        script). Missing groups get their default values, and the keys that are not config groups of the single-tile
+        entry points (eg. batch, work_dir) are ignored.
+
+        Raises:
+            ValueError: if a config group contains unknown keys
+        """
+        return cls(
+            **{
+                field.name: field.default_factory.from_dict(config[field.name])
+                for field in dataclasses.fields(cls)
+                if config.get(field.name) is not None
+            }
+        )
+
+    def to_dict(self) -> Dict:
+        """Config as a dictionary, for the *_from_config functions of the tasks modules"""
+        return dataclasses.asdict(self)
+
+
+def get_raster_filename(tilename: str, pixel_size: float) -> str:
+    """Filename of the raster of a tile for a pixel size (eg. {tilename}_50CM.tif)"""
+    return f"{tilename}{commons.give_name_resolution_raster(pixel_size)}.tif"
+
+
+def get_interpolation_input_file(config: Config) -> str:
+    """Path to the las/laz file to interpolate: config.io.input_filename in config.io.input_dir (config.io.output_dir
+    if input_dir is not set), with the extension config.io.forced_intermediate_ext if it is set"""
+    input_dir = config.io.output_dir if config.io.input_dir is None else config.io.input_dir
+
+    # input file (already filtered and potentially with a buffer)
+    if config.io.forced_intermediate_ext is None:
+        return os.path.join(input_dir, config.io.input_filename)
+
+    tilename, _ = os.path.splitext(config.io.input_filename)
+    return os.path.join(input_dir, f"{tilename}.{config.io.forced_intermediate_ext}")
+
+
+def interpolate_tile(config: Config) -> List[str]:
+    """Interpolate the tile config.io.input_filename of config.io.input_dir (config.io.output_dir if input_dir is not
+    set) to one raster per pixel size in config.io.output_dir (cf. ip_one_tile)
+
+    Args:
+        config (Config): configuration (tile_geometry, io, filter, output_profile, sub_tiles and interpolation)
+
+    Returns:
+        List[str]: paths to the output rasters (one per pixel size)
+    """
+    from las_digital_models.tasks.las_interpolation import interpolate_from_config
+
+    os.makedirs(config.io.output_dir, exist_ok=True)
+    tilename, _ = os.path.splitext(config.io.input_filename)
+    input_file = get_interpolation_input_file(config)
+
+    # for export (one raster per pixel size, all interpolated from the same triangulation)
+    geotiff_paths = [
+        os.path.join(config.io.output_dir, get_raster_filename(tilename, pixel_size))
+        for pixel_size in commons.get_pixel_sizes(config.tile_geometry.pixel_size)
+    ]
+
+    # process interpolation (the no-data mask, if any, is applied before writing the raster)
+    interpolate_from_config(input_file, geotiff_paths, config.to_dict())
+
+    return geotiff_paths
+
+
+def interpolate_tile_to_rasters(config: Config) -> List["Raster"]:
+    """Interpolate the tile config.io.input_filename (cf. interpolate_tile) to rasters in memory, without writing
+    them (config.output_profile is not used)
+
+    Args:
+        config (Config): configuration (tile_geometry, io, filter, sub_tiles and interpolation)
+
+    Returns:
+        List[Raster]: one raster per pixel size (values, transform and spatial reference, cf. commons.raster)
+    """
+    from las_digital_models.tasks.las_interpolation import (
+        interpolate_to_rasters_from_config,
+    )
+
+    return interpolate_to_rasters_from_config(get_interpolation_input_file(config), config.to_dict())
+
+
+def add_buffer_to_tile(config: Config) -> str:
+    """Add a buffer of config.buffer.size meters around the tile config.io.input_filename from its neighbors, that
+    are supposed to be in the same folder (config.io.input_dir), and write it to config.io.output_dir
+    (cf. add_buffer_one_tile)
+
+    Args:
+        config (Config): configuration (tile_geometry, io and buffer)
+
+    Returns:
+        str: path to the output las/laz file
+    """
+    from pdaltools.las_add_buffer import create_las_with_buffer
+
+    if config.io.forced_intermediate_ext is None:
+        input_file = os.path.join(config.io.input_dir, config.io.input_filename)
+        output_file = os.path.join(config.io.output_dir, config.io.input_filename)
+    else:
+        _, input_basename = os.path.split(config.io.input_filename)
+        tilename, _ = os.path.splitext(input_basename)
+        input_file = os.path.join(config.io.input_dir, f"{tilename}.{config.io.forced_intermediate_ext}")
+        output_file = os.path.join(config.io.output_dir, f"{tilename}.{config.io.forced_intermediate_ext}")
+
+    os.makedirs(config.io.output_dir, exist_ok=True)
+
+    with metrics.span("buffer", tile=input_file) as buffer_span:
+        create_las_with_buffer(
+            input_dir=config.io.input_dir,
+            tile_filename=input_file,
+            output_filename=output_file,
+            buffer_width=config.buffer.size,
+            spatial_ref=config.io.spatial_reference,
+            tile_width=config.tile_geometry.tile_width,
+            tile_coord_scale=config.tile_geometry.tile_coord_scale,
+        )
+        buffer_span.add(bytes_written=metrics.get_file_size(output_file))
+
+    return output_file
+
+
+def compute_dhm_tile(config: Config) -> List[str]:
+    """Compute the DHM (DSM - DTM) of the tile config.io.input_filename from the rasters of config.dhm.input_dsm_dir
+    and config.dhm.input_dtm_dir, for each pixel size, in config.io.output_dir (cf. dhm_one_tile)
+
+    Args:
+        config (Config): configuration (tile_geometry, io, dhm and output_profile)
+
+    Returns:
+        List[str]: paths to the output rasters (one per pixel size)
+    """
+    from las_digital_models.commons.raster_output import get_output_profile_from_config
+    from las_digital_models.tasks.dhm_generation import calculate_dhm
+
+    os.makedirs(config.io.output_dir, exist_ok=True)
+    tilename, _ = os.path.splitext(config.io.input_filename)
+    output_profile = get_output_profile_from_config(config.to_dict())
+
+    # one DHM per pixel size
+    geotiff_outputs = []
+    for pixel_size in commons.get_pixel_sizes(config.tile_geometry.pixel_size):
+        geotiff_filename = get_raster_filename(tilename, pixel_size)
+        geotiff_output = os.path.join(config.io.output_dir, geotiff_filename)
+        calculate_dhm(
+            os.path.join(config.dhm.input_dsm_dir, geotiff_filename),
+            os.path.join(config.dhm.input_dtm_dir, geotiff_filename),
+            geotiff_output,
+            no_data_value=config.tile_geometry.no_data_value,
+            block_size=config.dhm.block_size,
+            nb_threads=config.dhm.nb_threads,
+            output_profile=output_profile,
+        )
+        geotiff_outputs.append(geotiff_output)
+
+    return geotiff_outputs
+
+
+def _join_path(directory: Optional[str], filename: Optional[str]) -> Optional[str]:
+    """Join a folder and a filename (None if one of them is not set)"""
+    return os.path.join(directory, filename) if directory and filename else None
+
+
+def extract_z_virtual_lines(config: Config) -> str:
+    """Extract the minimum Z value along the 2d lines of a geometry file from the rasters of a folder, and clip the
+    lines by polygons (eg. bridges) (cf. extract_z_virtual_lines_from_raster)
+
+    Only the features in the extent of the rasters are read, and the lines are processed by chunks of
+    extract_stat.chunk_size lines (cf. vectors.vector_io).
+
+    Args:
+        config (Config): configuration (extract_stat and tile_geometry)
+
+    Returns:
+        str: path to the output geometry file (GeoJSON, FlatGeobuf or GeoParquet)
+
+    Raises:
+        ValueError: if an input is missing, if output_dir is not set or if no line is on the rasters
+    """
+    import pandas as pd
+
+    from las_digital_models.extract_stat_from_raster.rasters.extract_stats_from_raster_by_polylines import (
+        extract_polylines_stats_from_dsm,
+    )
+    from las_digital_models.extract_stat_from_raster.rasters.extract_z_min_from_raster_by_polylines import (
+        clip_lines_by_raster,
+        extract_polylines_min_z_from_dsm,
+    )
+    from las_digital_models.extract_stat_from_raster.rasters.lines_cache import (
+        LinesMinZCache,
+        RasterIndex,
+    )
+    from las_digital_models.extract_stat_from_raster.rasters.vrt import create_vrt
+    from las_digital_models.extract_stat_from_raster.vectors.clip_geometry import (
+        clip_lines_by_polygons,
+    )
+    from las_digital_models.extract_stat_from_raster.vectors.vector_io import (
+        get_file_bbox,
+        get_raster_bounds,
+        read_vector,
+        read_vector_chunks,
+        write_vector,
+    )
+
+    extract_stat = config.extract_stat
+
+    # Check input files
+    raster_dir = extract_stat.input_raster_dir
+    if not raster_dir or not os.path.isdir(raster_dir):
+        raise ValueError(f"config.extract_stat.input_raster_dir ({raster_dir}) not found")
+
+    input_geometry = _join_path(extract_stat.input_geometry_dir, extract_stat.input_geometry_filename)
+    if not input_geometry or not os.path.isfile(input_geometry):
+        raise ValueError(f"Input geometry file not found: {input_geometry}")
+
+    dir_list_raster = [os.path.join(raster_dir, f) for f in os.listdir(raster_dir) if f.lower().endswith(".tif")]
+    if not dir_list_raster:
+        raise ValueError(f"No raster (.tif) files found in {raster_dir}")
+
+    input_clip_geometry = _join_path(extract_stat.input_clip_geometry_dir, extract_stat.input_clip_geometry_filename)
+
+    # Check output folder
+    output_dir = extract_stat.output_dir
+    if output_dir is None:
+        raise ValueError(
+            """config.extract_stat.output_dir is empty, please provide an output directory in the configuration"""
+        )
+    os.makedirs(output_dir, exist_ok=True)
+
+    # Parameters
+    spatial_ref = extract_stat.spatial_reference
+    output_geometry = os.path.join(output_dir, extract_stat.output_geometry_filename)
+    output_vrt = os.path.join(output_dir, extract_stat.output_vrt_filename)
+
+    # Create  vrt
+    create_vrt(dir_list_raster, output_vrt)
+
+    # Read only the features near the rasters (bbox filter pushed down to GDAL)
+    raster_bounds, raster_crs = get_raster_bounds(output_vrt, spatial_ref)
+    polygons_gdf = read_vector(input_clip_geometry, get_file_bbox(input_clip_geometry, raster_bounds, raster_crs))
+    if polygons_gdf.crs is None:
+        polygons_gdf = polygons_gdf.set_crs(spatial_ref)
+
+    # Persistent cache of the minimums (only new lines, or lines on updated rasters, are computed)
+    # Other statistics and profiles are computed by the generic extractor (without cache)
+    only_min_z = not extract_stat.stats and extract_stat.z_statistic == "min" and extract_stat.profile_step is None
+    cache, raster_index = None, None
+    if extract_stat.cache.enabled and not only_min_z:
+        log.warning("extract_stat.cache is only used to extract the min Z of the lines (without stats or profile)")
+    elif extract_stat.cache.enabled:
+        cache_path = extract_stat.cache.path or os.path.join(output_dir, ".cache", "lines_min_z.sqlite")
+        cache = LinesMinZCache(cache_path, max_size_mb=extract_stat.cache.max_size_mb)
+        raster_index = RasterIndex(dir_list_raster, use_hash=extract_stat.cache.hash_rasters)
+
+    # Stream the lines by chunks through the extraction and the clip
+    output_chunks = []
+    nb_lines_min_z = 0
+    lines_chunks = read_vector_chunks(
+        input_geometry, get_file_bbox(input_geometry, raster_bounds, raster_crs), extract_stat.chunk_size
+    )
+    try:
+        for geom_gdf in lines_chunks:
+            if geom_gdf.crs is None:
+                geom_gdf = geom_gdf.set_crs(spatial_ref)
+
+            # Convert geometries to LineString (no more MultiLineString)
+            mask = geom_gdf.geometry.geom_type.isin(["LineString", "MultiLineString"])
+            lines_gdf = geom_gdf.loc[mask].explode(index_parts=False).reset_index(drop=True)
+
+            # Keep lines inside raster (VRT created)
+            lines_gdf_clip = clip_lines_by_raster(lines_gdf, output_vrt, spatial_ref)
+
+            # Extract Z value from lines and clean the result
+            with metrics.span("extract_z_min") as extract_span:
+                if only_min_z:
+                    lines_gdf_min_z = extract_polylines_min_z_from_dsm(
+                        lines_gdf_clip,
+                        output_vrt,
+                        no_data_value=config.tile_geometry.no_data_value,
+                        block_size=extract_stat.block_size,
+                        nb_workers=extract_stat.nb_workers,
+                        cache=cache,
+                        raster_index=raster_index,
+                    )
+                else:
+                    lines_gdf_min_z = extract_polylines_stats_from_dsm(
+                        lines_gdf_clip,
+                        output_vrt,
+                        stats=extract_stat.stats,
+                        z_statistic=extract_stat.z_statistic,
+                        profile_step=extract_stat.profile_step,
+                        no_data_value=config.tile_geometry.no_data_value,
+                        block_size=extract_stat.block_size,
+                        nb_workers=extract_stat.nb_workers,
+                    )
+                lines_gdf_min_z = lines_gdf_min_z.drop(
+                    columns=[c for c in ["index", "FID"] if c in lines_gdf.columns], errors="ignore"
+                ).reset_index(drop=True)
+                extract_span.add(input_lines=len(lines_gdf_clip))
+
+            if lines_gdf_min_z.empty:
+                continue
+            nb_lines_min_z += len(lines_gdf_min_z)
+
+            # Clip lines by bridges
+            with metrics.span("clip_lines_by_polygons") as clip_span:
+                geoms_gdf_min_z_clip = clip_lines_by_polygons(lines_gdf_min_z, polygons_gdf)
+                clip_span.add(input_lines=len(lines_gdf_min_z), output_lines=len(geoms_gdf_min_z_clip))
+
+            # Convert geometries to LineString (no more MultiLineString)
+            mask = geoms_gdf_min_z_clip.geometry.geom_type.isin(["LineString", "MultiLineString"])
+            output_chunks.append(geoms_gdf_min_z_clip.loc[mask].explode(index_parts=False))
+    finally:
+        if cache is not None:
+            cache.close()
+
+    # Check lines are not empty
+    if nb_lines_min_z == 0:
+        raise ValueError("All geometries returned None. Abort.")
+
+    lines_gdf_min_z_clip = pd.concat(output_chunks, ignore_index=True)
+    write_vector(lines_gdf_min_z_clip, output_geometry, extract_stat.output_format)
+
+    return output_geometry
@@ -0,0 +1,149 @@
+"""Manifests of the batch pipeline, used to skip the tiles whose outputs are already up to date.
+
+For each stage (buffer, interpolation, DHM) and each tile, a record of everything the outputs depend on is saved
+in {output_dir}/.manifest/{stage}/{tile}.json once the tile has been processed:
+- the input files (size and modification time, or content hash), including the neighbor tiles used for the buffer
+- the config subtrees used by the stage
+- the version of the package
+
+On a new run, a tile is skipped if its record did not change and all its outputs exist.
+"""
+
+import json
+import os
+from collections import defaultdict
+from typing import Dict, Iterable, List
+
+from omegaconf import DictConfig, OmegaConf
+from pdaltools.las_info import parse_filename
+
+from las_digital_models.commons.commons import get_file_signature
+from las_digital_models.version import __version__
+
+MANIFEST_DIRNAME = ".manifest"
+
+
+def get_config_subtrees(config: DictConfig, keys: Iterable[str]) -> Dict:
+    """Get the (resolved) values of some keys of a config, eg. "buffer" or "io.spatial_reference"
+
+    Args:
+        config (DictConfig): hydra config
+        keys (Iterable[str]): dotted keys of the subtrees to get
+
+    Returns:
+        Dict: value of each key (None for missing keys)
+    """
+    subtrees = {}
+    for key in keys:
+        value = OmegaConf.select(config, key)
+        if isinstance(value, DictConfig) or OmegaConf.is_list(value):
+            value = OmegaConf.to_container(value, resolve=True)
+        subtrees[key] = value
+
+    return subtrees
+
+
+def get_neighbor_tiles(tiles: List[str], tile_width: int = 1000, tile_coord_scale: int = 1000) -> Dict[str, List[str]]:
+    """Get the neighbor tiles (among a list of tiles) of each tile, with the same matching rules as in
+    `pdaltools.las_merge.create_list` (which is used to build the buffers)
+
+    Args:
+        tiles (List[str]): tile filenames (basename only)
+        tile_width (int, optional): width of tiles in meters. Defaults to 1000.
+        tile_coord_scale (int, optional): scale used in the filename to describe coordinates in meters.
+        Defaults to 1000.
+
+    Returns:
+        Dict[str, List[str]]: neighbor tiles of each tile (without the tile itself)
+    """
+    tiles_by_suffix = defaultdict(list)
+    for tile in tiles:
+        _, coord_x, coord_y, suffix = parse_filename(tile)
+        tiles_by_suffix[f"_{coord_x:04d}_{coord_y:04d}_{suffix}"].append(tile)
+
+    offset = int(tile_width / tile_coord_scale)
+    neighbors = {}
+    for tile in tiles:
+        _, coord_x, coord_y, suffix = parse_filename(tile)
+        neighbors[tile] = []
+        for dx in (-offset, 0, offset):
+            for dy in (-offset, 0, offset):
+                if dx == 0 and dy == 0:
+                    continue
+                matches = tiles_by_suffix.get(f"_{(coord_x + dx):04d}_{(coord_y + dy):04d}_{suffix}")
+                if matches:
+                    # in case of multiple matches, select the most recent year (as in pdaltools)
+                    neighbors[tile].append(sorted(matches, reverse=True)[0])
+
+    return neighbors
+
+
+class Manifest:
+    """Records of the inputs of one stage of the batch pipeline, one json file per tile"""
+
+    def __init__(self, output_dir: str, stage: str, use_hash: bool = False):
+        """
+        Args:
+            output_dir (str): output folder of the pipeline
+            stage (str): name of the stage (eg. "buffer", "interpolation", "DHM")
+            use_hash (bool, optional): identify input files by the hash of their content instead of their
+            modification time. Defaults to False.
+        """
+        self.manifest_dir = os.path.join(output_dir, MANIFEST_DIRNAME, stage)
+        self.use_hash = use_hash
+        self._signatures = {}
+        os.makedirs(self.manifest_dir, exist_ok=True)
+
+    def get_record(self, input_files: List[str], config: DictConfig, config_keys: Iterable[str]) -> Dict:
+        """Build the record of the inputs of a tile
+
+        Args:
+            input_files (List[str]): paths to the input files of the tile
+            config (DictConfig): hydra config
+            config_keys (Iterable[str]): dotted keys of the config subtrees used by the stage
+
+        Returns:
+            Dict: record of the inputs of the tile
+        """
+        inputs = {}
+        for filename in sorted(input_files):
+            if filename not in self._signatures:
+                self._signatures[filename] = get_file_signature(filename, self.use_hash)
+            inputs[filename] = self._signatures[filename]
+
+        return {
+            "version": __version__,
+            "inputs": inputs,
+            "config": get_config_subtrees(config, config_keys),
+        }
+
+    def _get_path(self, tile_filename: str) -> str:
+        return os.path.join(self.manifest_dir, f"{os.path.basename(tile_filename)}.json")
+
+    def is_up_to_date(self, tile_filename: str, record: Dict, output_files: List[str]) -> bool:
+        """Check if the outputs of a tile exist and have been generated from the same inputs as in record"""
+        if not all(os.path.isfile(f) for f in output_files):
+            return False
+        try:
+            with open(self._get_path(tile_filename), "r") as f:
+                saved_record = json.load(f)
+        except (OSError, ValueError):
+            return False
+
+        # Compare the json representations, as tuples and lists are equivalent there
+        return saved_record == json.loads(json.dumps(record))
+
+    def write(self, tile_filename: str, record: Dict):
+        """Save the record of a tile (atomically, so that an interrupted run never leaves a partial record)"""
+        path = self._get_path(tile_filename)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(record, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, path)
+
+    def remove(self, tile_filename: str):
+        """Remove the record of a tile (before processing it again)"""
+        try:
+            os.remove(self._get_path(tile_filename))
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,853 @@
+"""Run the whole DXM pipeline (buffer, DTM, DSM, DHM) on all the tiles of a folder from a single python process.
+
+The hydra config is composed once, and the tiles are processed by a pool of warm worker processes that call the
+processing functions directly (instead of starting a new interpreter for each tile and each step).
+"""
+
+import contextlib
+import functools
+import glob
+import logging
+import math
+import os
+import resource
+import tempfile
+import time
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    BrokenExecutor,
+    Executor,
+    ProcessPoolExecutor,
+    wait,
+)
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import laspy
+import numpy as np
+from omegaconf import DictConfig, OmegaConf
+from pdaltools.las_add_buffer import create_las_with_buffer
+from pdaltools.las_info import parse_filename
+
+from las_digital_models.batch.manifest import Manifest, get_neighbor_tiles
+from las_digital_models.batch.prefetch import Prefetcher
+from las_digital_models.batch.preflight import (
+    can_admit,
+    run_preflight,
+    sort_largest_first,
+)
+from las_digital_models.batch.work_queue import (
+    QUEUE_DIRNAME,
+    get_default_worker_id,
+    get_pipeline_tasks,
+    open_work_queue,
+)
+from las_digital_models.commons import commons, metrics
+from las_digital_models.commons.raster_output import get_output_profile_from_config
+from las_digital_models.commons.raster_writer import AsyncRasterWriter
+from las_digital_models.tasks.dhm_generation import calculate_dhm
+from las_digital_models.tasks.las_buffer import (
+    read_las_with_buffer,
+    write_las_with_buffer,
+)
+from las_digital_models.tasks.las_interpolation import (
+    get_backend_from_config,
+    get_filter_dimensions,
+    get_no_data_mask_from_config,
+    get_srs_wkt,
+    interpolate_points,
+    read_las,
+    read_las_with_laspy,
+)
+from las_digital_models.tasks.spatial_index import SpatialIndex, is_copc
+from las_digital_models.tasks.strip_cache import StripCache
+from las_digital_models.tasks.sub_tiles import get_sub_tiling_from_config
+
+log = commons.get_logger(__name__)
+
+# Strip cache of the current worker process (cf. init_worker)
+_strip_cache = None
+
+BUFFER_DIRNAME = "las_with_buffer"
+SPATIAL_INDEX_DIRNAME = ".copc"
+DHM_DIRNAME = "DHM"
+SCHEDULING_ORDERS = ("morton", "largest_first")
+# Readers of the tiles read in advance (cf. read_tile_points)
+PREFETCH_READERS = ("pdal", "laspy")
+
+# Config subtrees that the outputs of each stage depend on (recorded in the manifests, cf. batch.incremental)
+INDEX_CONFIG_KEYS = ["io.spatial_reference"]
+BUFFER_CONFIG_KEYS = [
+    "buffer",
+    "tile_geometry.tile_width",
+    "tile_geometry.tile_coord_scale",
+    "io.spatial_reference",
+    "io.forced_intermediate_ext",
+]
+INTERPOLATION_CONFIG_KEYS = [
+    "buffer",
+    "tile_geometry",
+    "io.spatial_reference",
+    "io.forced_intermediate_ext",
+    "io.no_data_mask_shapefile",
+    "batch.products",
+    "batch.write_buffered_las",
+    "output_profile",
+    "sub_tiles",
+    "interpolation",
+]
+DHM_CONFIG_KEYS = ["tile_geometry.no_data_value", "tile_geometry.pixel_size", "output_profile"]
+
+
+def list_input_tiles(input_dir: str) -> List[str]:
+    """List the las/laz filenames (basename only) contained in a folder"""
+    return sorted(
+        f
+        for f in os.listdir(input_dir)
+        if os.path.isfile(os.path.join(input_dir, f)) and f.lower().endswith((".las", ".laz"))
+    )
+
+
+def get_nb_workers(jobs: int, cpu_limit: int) -> int:
+    """Get the number of worker processes to use
+
+    Args:
+        jobs (int): requested number of jobs (0: use as many as possible)
+        cpu_limit (int): maximum number of cores to use (-1 or 0: no limit)
+
+    Returns:
+        int: number of worker processes
+    """
+    nb_workers = jobs if jobs > 0 else len(os.sched_getaffinity(0))
+    if cpu_limit > 0:
+        nb_workers = min(nb_workers, cpu_limit)
+
+    return nb_workers
+
+
+def init_worker(memory_limit_mb: int = None, strip_cache_config: Dict = None, metrics_dir: str = None):
+    """Initialize a worker process of the pool (logging, metrics, optional memory limit and strip cache)"""
+    global _strip_cache
+
+    logging.basicConfig(level=logging.INFO)
+    metrics.configure_metrics(metrics_dir)
+    if memory_limit_mb:
+        limit = int(memory_limit_mb) * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+    if strip_cache_config:
+        _strip_cache = StripCache(**strip_cache_config)
+
+
+def morton_code(x: int, y: int) -> int:
+    """Get the Morton code (Z-order curve index) of positive integer coordinates"""
+    code = 0
+    for bit in range(max(x.bit_length(), y.bit_length())):
+        code |= ((x >> bit) & 1) << (2 * bit) | ((y >> bit) & 1) << (2 * bit + 1)
+
+    return code
+
+
+def sort_tiles_in_morton_order(tiles: List[str]) -> List[str]:
+    """Sort tiles in the Morton order of the coordinates in their filenames, so that neighbor tiles are processed
+    close in time (and their cached border strips are reused before they are evicted)
+    """
+    coords = {tile: parse_filename(tile)[1:3] for tile in tiles}
+    xmin = min(x for x, _ in coords.values())
+    ymin = min(y for _, y in coords.values())
+
+    return sorted(tiles, key=lambda tile: morton_code(coords[tile][0] - xmin, coords[tile][1] - ymin))
+
+
+def get_intermediate_filename(tile_filename: str, forced_intermediate_ext: str = None) -> str:
+    """Get the filename of the buffered las for a tile (cf. io.forced_intermediate_ext)"""
+    if forced_intermediate_ext is None:
+        return tile_filename
+
+    tilename, _ = os.path.splitext(os.path.basename(tile_filename))
+
+    return f"{tilename}.{forced_intermediate_ext}"
+
+
+def get_raster_filename(tile_filename: str, pixel_size: float) -> str:
+    """Get the filename of the raster generated for a tile (same naming as in ip_one_tile)"""
+    tilename, _ = os.path.splitext(tile_filename)
+    _size = commons.give_name_resolution_raster(pixel_size)
+
+    return f"{tilename}{_size}.tif"
+
+
+def get_raster_filenames(tile_filename: str, config: DictConfig) -> List[str]:
+    """Get the filenames of the rasters generated for a tile, one per pixel size (cf. tile_geometry.pixel_size)"""
+    return [
+        get_raster_filename(tile_filename, pixel_size)
+        for pixel_size in commons.get_pixel_sizes(config.tile_geometry.pixel_size)
+    ]
+
+
+def get_buffered_las_path(tile_filename: str, config: DictConfig) -> str:
+    """Get the path of the buffered las written for a tile by the buffer step"""
+    buffered_filename = get_intermediate_filename(tile_filename, config.io.forced_intermediate_ext)
+
+    return os.path.join(config.io.output_dir, BUFFER_DIRNAME, buffered_filename)
+
+
+def get_raster_paths(tile_filename: str, config: DictConfig, dirnames: List[str]) -> List[str]:
+    """Get the paths of the rasters of a tile (one per pixel size) in some output folders (eg. one folder per
+    product)"""
+    raster_filenames = get_raster_filenames(tile_filename, config)
+
+    return [
+        os.path.join(config.io.output_dir, dirname, raster_filename)
+        for dirname in dirnames
+        for raster_filename in raster_filenames
+    ]
+
+
+def get_spatial_index_from_config(config: DictConfig) -> Optional[SpatialIndex]:
+    """Get the COPC copies of the input tiles (cf. config.batch.spatial_index), None if they are not used"""
+    if not config.batch.spatial_index.enabled:
+        return None
+
+    return SpatialIndex(config.batch.spatial_index.dir or os.path.join(config.io.output_dir, SPATIAL_INDEX_DIRNAME))
+
+
+def run_index_on_tile(tile_filename: str, config: DictConfig):
+    """Convert a tile of config.io.input_dir to a COPC copy (cf. tasks.spatial_index), so that its neighbors can read
+    only the points in their buffer"""
+    spatial_index = get_spatial_index_from_config(config)
+    spatial_index.build(os.path.join(config.io.input_dir, tile_filename), config.io.spatial_reference)
+
+
+def run_buffer_on_tile(tile_filename: str, config: DictConfig):
+    """Add a buffer from its neighbors to a tile of config.io.input_dir (the spatially indexed neighbors are read only
+    in the buffer, cf. config.batch.spatial_index)"""
+    buffered_filename = get_intermediate_filename(tile_filename, config.io.forced_intermediate_ext)
+    output_filename = os.path.join(config.io.output_dir, BUFFER_DIRNAME, buffered_filename)
+    spatial_index = get_spatial_index_from_config(config)
+    kwargs = dict(
+        input_dir=config.io.input_dir,
+        tile_filename=os.path.join(config.io.input_dir, buffered_filename),
+        output_filename=output_filename,
+        buffer_width=config.buffer.size,
+        spatial_ref=config.io.spatial_reference,
+        tile_width=config.tile_geometry.tile_width,
+        tile_coord_scale=config.tile_geometry.tile_coord_scale,
+    )
+    with metrics.span("buffer", tile=tile_filename) as buffer_span:
+        if spatial_index is not None or is_copc(tile_filename):
+            write_las_with_buffer(**kwargs, spatial_index=spatial_index)
+        else:
+            create_las_with_buffer(**kwargs)
+        buffer_span.add(bytes_written=metrics.get_file_size(output_filename))
+
+
+def read_tile_points(tile_filename: str, config: DictConfig, reader: str = "pdal") -> Tuple[np.ndarray, str]:
+    """Read the points of a tile and its buffer, with their spatial reference (as WKT)
+
+    If config.batch.write_buffered_las is true, the points are read from the buffered las written by the buffer
+    step. Otherwise, the tile and the buffer from its neighbors are read directly into memory (using the strip
+    cache of the worker if any).
+
+    With the "laspy" reader, the files that are decompressed entirely are read with laspy, with only the dimensions
+    of the filters of the products, and their LAZ chunks are decompressed on several threads by lazrs (cf.
+    las_buffer.read_las_with_buffer).
+    """
+    dimensions = get_filter_dimensions(config.batch.products.values()) if reader == "laspy" else None
+    buffered_filename = get_intermediate_filename(tile_filename, config.io.forced_intermediate_ext)
+    if config.batch.write_buffered_las:
+        buffered_las = os.path.join(config.io.output_dir, BUFFER_DIRNAME, buffered_filename)
+        if dimensions is None:
+            return read_las(buffered_las, config.io.spatial_reference)
+        points = read_las_with_laspy(buffered_las, dimensions, laz_backend=laspy.LazBackend.LazrsParallel)
+        return points, get_srs_wkt(config.io.spatial_reference)
+
+    return read_las_with_buffer(
+        input_dir=config.io.input_dir,
+        tile_filename=os.path.join(config.io.input_dir, buffered_filename),
+        buffer_width=config.buffer.size,
+        spatial_ref=config.io.spatial_reference,
+        tile_width=config.tile_geometry.tile_width,
+        tile_coord_scale=config.tile_geometry.tile_coord_scale,
+        strip_cache=_strip_cache,
+        spatial_index=get_spatial_index_from_config(config),
+        dimensions=dimensions,
+    )
+
+
+def interpolate_tile_points(
+    points: np.ndarray,
+    srs_wkt: str,
+    tile_filename: str,
+    config: DictConfig,
+    raster_writer: Optional[AsyncRasterWriter] = None,
+):
+    """Generate the rasters of all the products (eg. DTM and DSM) of a tile from its points (at each pixel size,
+    from a single triangulation per product), in config.io.output_dir/{product}"""
+    raster_filenames = get_raster_filenames(tile_filename, config)
+    output_files = {
+        product: tuple(os.path.join(config.io.output_dir, product, filename) for filename in raster_filenames)
+        for product in config.batch.products
+    }
+    interpolate_points(
+        points,
+        srs_wkt,
+        tile_filename,
+        {output_files[product]: config.batch.products[product] for product in output_files},
+        config.tile_geometry.pixel_size,
+        config.tile_geometry.tile_width,
+        config.tile_geometry.tile_coord_scale,
+        config.tile_geometry.no_data_value,
+        no_data_mask=get_no_data_mask_from_config(config),
+        output_profile=get_output_profile_from_config(config),
+        sub_tiling=get_sub_tiling_from_config(config),
+        backend=get_backend_from_config(config),
+        raster_writer=raster_writer,
+    )
+
+
+def run_interpolation_on_tile(tile_filename: str, config: DictConfig):
+    """Generate the rasters of all the products (eg. DTM and DSM) for a tile from a single read of its points (cf.
+    read_tile_points and interpolate_tile_points)
+
+    Returns:
+        Dict[str, int]: strip cache statistics for this tile (empty if there is no strip cache)
+    """
+    with metrics.span("interpolation", tile=tile_filename):
+        cache_stats_before = _strip_cache.stats() if _strip_cache is not None else {}
+        points, srs_wkt = read_tile_points(tile_filename, config)
+        interpolate_tile_points(points, srs_wkt, tile_filename, config)
+
+    if _strip_cache is None:
+        return {}
+
+    # Return the strip cache statistics for this tile only
+    return {key: value - cache_stats_before[key] for key, value in _strip_cache.stats().items()}
+
+
+def run_interpolation_on_tiles(tile_filenames: List[str], config: DictConfig):
+    """Generate the rasters of all the products for a chunk of tiles (cf. run_interpolation_on_tile), overlapping the
+    I/O with the computation (cf. config.batch.prefetch): the points of the next tiles are read in the background
+    (cf. batch.prefetch.Prefetcher) while the current tile is triangulated, and the rasters are written in the
+    background (cf. commons.raster_writer.AsyncRasterWriter). All the rasters are written when the function returns.
+
+    Returns:
+        Dict[str, int]: strip cache statistics for this chunk (empty if there is no strip cache)
+    """
+    prefetch = config.batch.prefetch
+    cache_stats_before = _strip_cache.stats() if _strip_cache is not None else {}
+    # The reads in advance run on other threads: their spans are attached to the span of the chunk
+    with metrics.span("interpolation_chunk", tiles=len(tile_filenames)) as chunk_span, Prefetcher(
+        functools.partial(read_tile_points, config=config, reader=prefetch.reader),
+        prefetch.depth,
+        prefetch.memory_mb,
+        prefetch.nb_threads,
+        parent_span=chunk_span,
+    ) as prefetcher, AsyncRasterWriter(prefetch.max_pending_writes) as raster_writer:
+        prefetcher.prefetch(tile_filenames)
+        for tile_filename in tile_filenames:
+            with metrics.span("interpolation", tile=tile_filename):
+                points, srs_wkt = prefetcher.get(tile_filename)
+                interpolate_tile_points(points, srs_wkt, tile_filename, config, raster_writer=raster_writer)
+                del points
+
+    if _strip_cache is None:
+        return {}
+
+    return {key: value - cache_stats_before[key] for key, value in _strip_cache.stats().items()}
+
+
+def run_dhm_on_tile(tile_filename: str, config: DictConfig):
+    """Generate the DHM of a tile from its DSM and DTM (at each pixel size)"""
+    output_profile = get_output_profile_from_config(config)
+    with metrics.span("DHM", tile=tile_filename):
+        for raster_filename in get_raster_filenames(tile_filename, config):
+            calculate_dhm(
+                os.path.join(config.io.output_dir, "DSM", raster_filename),
+                os.path.join(config.io.output_dir, "DTM", raster_filename),
+                os.path.join(config.io.output_dir, DHM_DIRNAME, raster_filename),
+                no_data_value=config.tile_geometry.no_data_value,
+                block_size=config.dhm.block_size,
+                nb_threads=config.dhm.nb_threads,
+                output_profile=output_profile,
+            )
+
+
+class Stage(NamedTuple):
+    """Stage of the pipeline: function run on each tile, and inputs, outputs and config subtrees of a tile (recorded
+    in the manifests, cf. batch.incremental)"""
+
+    function: Callable
+    get_input_files: Callable[[str], List[str]]
+    get_output_files: Callable[[str], List[str]]
+    config_keys: List[str]
+
+
+def get_stages(tiles: List[str], config: DictConfig) -> Dict[str, Stage]:
+    """Get the stages of the pipeline ("index", "buffer", "interpolation" and "DHM") for a list of tiles"""
+    products = list(config.batch.products.keys())
+    spatial_index = get_spatial_index_from_config(config)
+    neighbors = get_neighbor_tiles(tiles, config.tile_geometry.tile_width, config.tile_geometry.tile_coord_scale)
+    mask_files = get_shapefile_files(config.io.no_data_mask_shapefile)
+
+    def get_tile_and_neighbors_paths(tile):
+        return [os.path.join(config.io.input_dir, f) for f in [tile] + neighbors[tile]]
+
+    def get_interpolation_inputs(tile):
+        if config.batch.write_buffered_las:
+            return [get_buffered_las_path(tile, config)] + mask_files
+        return get_tile_and_neighbors_paths(tile) + mask_files
+
+    return {
+        "index": Stage(
+            run_index_on_tile,
+            lambda tile: [os.path.join(config.io.input_dir, tile)],
+            lambda tile: [] if is_copc(tile) else [spatial_index.get_path(tile)],
+            INDEX_CONFIG_KEYS,
+        ),
+        "buffer": Stage(
+            run_buffer_on_tile,
+            get_tile_and_neighbors_paths,
+            lambda tile: [get_buffered_las_path(tile, config)],
+            BUFFER_CONFIG_KEYS,
+        ),
+        "interpolation": Stage(
+            run_interpolation_on_tile,
+            get_interpolation_inputs,
+            lambda tile: get_raster_paths(tile, config, products),
+            INTERPOLATION_CONFIG_KEYS,
+        ),
+        "DHM": Stage(
+            run_dhm_on_tile,
+            lambda tile: get_raster_paths(tile, config, ["DSM", "DTM"]),
+            lambda tile: get_raster_paths(tile, config, [DHM_DIRNAME]),
+            DHM_CONFIG_KEYS,
+        ),
+    }
+
+
+def is_indexing_enabled(config: DictConfig) -> bool:
+    """True if the input tiles are converted to COPC copies before the buffer (cf. config.batch.spatial_index)"""
+    return config.batch.spatial_index.enabled and config.batch.spatial_index.build
+
+
+def get_strip_cache_config(config: DictConfig, stack: contextlib.ExitStack) -> Optional[Dict]:
+    """Get the strip cache parameters of the workers from config.batch.strip_cache (None if there is no strip cache).
+    If no cache folder is set, a temporary folder is created, removed when the stack is closed.
+    The strip cache is not used when the input tiles are indexed (neighbors are then read only in the buffer).
+    """
+    if not config.batch.strip_cache.enabled or config.batch.write_buffered_las or is_indexing_enabled(config):
+        return None
+    cache_dir = config.batch.strip_cache.cache_dir
+    if cache_dir is None:
+        cache_dir = stack.enter_context(tempfile.TemporaryDirectory(prefix="strip_cache_"))
+
+    return {
+        "memory_size_mb": config.batch.strip_cache.memory_size_mb,
+        "cache_dir": cache_dir,
+        "disk_size_mb": config.batch.strip_cache.disk_size_mb,
+    }
+
+
+def run_pipeline(config: DictConfig):
+    """Run buffer, interpolation (for each product in config.batch.products) and DHM generation
+    on all the las/laz files in config.io.input_dir
+
+    Outputs are saved in config.io.output_dir:
+    - las_with_buffer/: buffered las (only if config.batch.write_buffered_las is true, otherwise the buffered
+    points are kept in memory)
+    - {product}/: one folder per interpolated product (eg. DTM, DSM)
+    - DHM/: DHM (only if both DSM and DTM are in the products)
+    - .manifest/: records of the inputs of each stage for each tile (only if config.batch.incremental is true,
+    tiles whose outputs are up to date are skipped)
+    - .copc/: COPC copies of the input tiles, built by a first "index" stage (only if config.batch.spatial_index is
+    enabled, cf. tasks.spatial_index), so that the buffers are read without decompressing the whole neighbor tiles
+
+    If config.batch.prefetch is enabled, the interpolation tiles are sent to the workers by chunks, and each worker
+    reads the next tiles of its chunk and writes the rasters in the background (cf. run_interpolation_on_tiles).
+
+    Tiles are dispatched in the Morton order of their coordinates (config.batch.scheduling.order "morton", default).
+    If config.batch.scheduling.order is "largest_first" or if a memory budget is set, a preflight reads the headers
+    of all the tiles to estimate their memory (cf. batch.preflight): with "largest_first", tiles are dispatched
+    largest first, and with a memory budget, a tile is started only when its estimated memory fits in
+    config.batch.scheduling.memory_budget_mb.
+
+    Each stage of each tile is measured in a span (cf. commons.metrics), written to config.metrics.output_dir if set.
+
+    Args:
+        config (DictConfig): hydra config (cf. configs/batch/default.yaml for the batch parameters)
+
+    Raises:
+        ValueError: if no las/laz file is found in config.io.input_dir, if config.batch.scheduling.order is not
+        "morton" or "largest_first", or if config.batch.prefetch.reader is not "pdal" or "laspy"
+    """
+    tiles = list_input_tiles(config.io.input_dir)
+    if not tiles:
+        raise ValueError(f"No las/laz file found in {config.io.input_dir}")
+    tiles = sort_tiles_in_morton_order(tiles)
+
+    estimates = None
+    scheduling = config.batch.scheduling
+    if scheduling.order not in SCHEDULING_ORDERS:
+        raise ValueError(f"Unknown scheduling order {scheduling.order}, expected one of {SCHEDULING_ORDERS}")
+    if config.batch.prefetch.reader not in PREFETCH_READERS:
+        raise ValueError(f"Unknown prefetch reader {config.batch.prefetch.reader}, expected one of {PREFETCH_READERS}")
+    if scheduling.order == "largest_first" or scheduling.memory_budget_mb:
+        estimates = run_preflight(tiles, config)
+        if scheduling.order == "largest_first":
+            tiles = sort_largest_first(tiles, estimates)
+
+    products = list(config.batch.products.keys())
+    run_dhm = "DSM" in products and "DTM" in products
+    output_dirs = products + ([DHM_DIRNAME] if run_dhm else [])
+    nb_workers = get_nb_workers(config.batch.jobs, config.batch.cpu_limit)
+    metrics_dir = OmegaConf.select(config, "metrics.output_dir")
+    metrics.configure_metrics(metrics_dir)
+    log.info(f"Generate {', '.join(output_dirs)} on {len(tiles)} tiles with {nb_workers} workers")
+
+    if config.batch.write_buffered_las:
+        output_dirs.append(BUFFER_DIRNAME)
+    for dirname in output_dirs:
+        os.makedirs(os.path.join(config.io.output_dir, dirname), exist_ok=True)
+
+    with contextlib.ExitStack() as stack:
+        strip_cache_config = get_strip_cache_config(config, stack)
+        executor = stack.enter_context(
+            ProcessPoolExecutor(
+                max_workers=nb_workers,
+                initializer=init_worker,
+                initargs=(config.batch.memory_limit_mb, strip_cache_config, metrics_dir),
+            )
+        )
+        stages = get_stages(tiles, config)
+
+        summary = {}
+        if is_indexing_enabled(config):
+            log.info("Build the spatial index of the tiles")
+            _, summary["index"] = run_stage(
+                executor,
+                stages["index"].function,
+                tiles,
+                config,
+                "index",
+                stages["index"].get_input_files,
+                stages["index"].get_output_files,
+                stages["index"].config_keys,
+                estimates,
+                nb_workers,
+            )
+
+        if config.batch.write_buffered_las:
+            log.info("Add buffer")
+            _, summary["buffer"] = run_stage(
+                executor,
+                stages["buffer"].function,
+                tiles,
+                config,
+                "buffer",
+                stages["buffer"].get_input_files,
+                stages["buffer"].get_output_files,
+                stages["buffer"].config_keys,
+                estimates,
+                nb_workers,
+            )
+
+        log.info(f"Run {', '.join(products)} generation")
+        interpolation_function = stages["interpolation"].function
+        chunk_size = None
+        if config.batch.prefetch.enabled:
+            # Chunks of tiles read in advance by the workers, with at least one chunk per worker
+            interpolation_function = run_interpolation_on_tiles
+            chunk_size = max(1, min(config.batch.prefetch.chunk_size, math.ceil(len(tiles) / nb_workers)))
+        tiles_cache_stats, summary["interpolation"] = run_stage(
+            executor,
+            interpolation_function,
+            tiles,
+            config,
+            "interpolation",
+            stages["interpolation"].get_input_files,
+            stages["interpolation"].get_output_files,
+            stages["interpolation"].config_keys,
+            estimates,
+            nb_workers,
+            chunk_size=chunk_size,
+            chunk_memory_mb=config.batch.prefetch.memory_mb,
+        )
+        if strip_cache_config:
+            log_strip_cache_stats(tiles_cache_stats)
+
+        if run_dhm:
+            log.info("Run DHM generation")
+            _, summary["DHM"] = run_stage(
+                executor,
+                stages["DHM"].function,
+                tiles,
+                config,
+                "DHM",
+                stages["DHM"].get_input_files,
+                stages["DHM"].get_output_files,
+                stages["DHM"].config_keys,
+            )
+
+    for stage, (nb_rebuilt, nb_skipped) in summary.items():
+        log.info(f"Summary: {stage}: {nb_rebuilt} tiles rebuilt, {nb_skipped} tiles skipped (up to date)")
+
+
+def get_shapefile_files(shapefile: str) -> List[str]:
+    """Get all the files of a shapefile (.shp, .shx, .dbf, .prj...), or an empty list if shapefile is None"""
+    if not shapefile:
+        return []
+    stem, _ = os.path.splitext(shapefile)
+
+    return sorted(glob.glob(f"{glob.escape(stem)}.*"))
+
+
+def run_stage(
+    executor: Executor,
+    function: Callable,
+    tiles: List[str],
+    config: DictConfig,
+    stage: str,
+    get_input_files: Callable[[str], List[str]],
+    get_output_files: Callable[[str], List[str]],
+    config_keys: Iterable[str],
+    estimates: Optional[Dict[str, float]] = None,
+    max_running: Optional[int] = None,
+    chunk_size: Optional[int] = None,
+    chunk_memory_mb: float = 0,
+):
+    """Run one stage of the pipeline on the tiles, with the pool of workers
+
+    If config.batch.incremental is true, the tiles whose outputs are up to date (cf. batch.manifest) are skipped,
+    and the manifest of each processed tile is updated as soon as it is done (so that an interrupted run can be
+    resumed).
+
+    Tiles are dispatched in the order of the list. If their estimated memory is given, a tile is submitted only when
+    there are less than max_running tiles running and its estimate fits in config.batch.scheduling.memory_budget_mb
+    with the running tiles (cf. preflight.can_admit). Tiles are admitted in order: a tile that does not fit waits
+    for running tiles to complete, and the next tiles wait for it.
+
+    If chunk_size is set, the tiles are sent to the workers by chunks of consecutive tiles (eg. so that a worker
+    reads the next tiles of its chunk while it processes the current one, cf. run_interpolation_on_tiles). A chunk
+    is dispatched as a single tile, whose estimate is the largest estimate of its tiles plus chunk_memory_mb, and the
+    manifests of its tiles are updated when the whole chunk is done.
+
+    Args:
+        executor (Executor): pool of workers
+        function (Callable): function to run on each tile, as function(tile_filename, config)
+        tiles (List[str]): tile filenames
+        config (DictConfig): hydra config
+        stage (str): name of the stage (used for the manifest and the logs)
+        get_input_files (Callable[[str], List[str]]): function that returns the input files of a tile
+        get_output_files (Callable[[str], List[str]]): function that returns the output files of a tile
+        config_keys (Iterable[str]): config subtrees used by the stage
+        estimates (Optional[Dict[str, float]], optional): estimated memory of each tile in MB (None: all the tiles
+        are submitted at once). Defaults to None.
+        max_running (Optional[int], optional): maximum number of tiles (or chunks) submitted at once, when estimates
+        are given (None: no limit). Defaults to None.
+        chunk_size (Optional[int], optional): number of tiles of each chunk, function is then run on each chunk as
+        function(tile_filenames, config) (None: function is run on each tile). Defaults to None.
+        chunk_memory_mb (float, optional): memory needed by a chunk in addition to its largest tile, when estimates
+        are given (eg. tiles read in advance). Defaults to 0.
+
+    Returns:
+        Tuple[List, Tuple[int, int]]: results of the processed tiles or chunks (in completion order), and the number
+        of rebuilt and skipped tiles
+    """
+    manifest = None
+    todo = tiles
+    if config.batch.incremental:
+        manifest = Manifest(config.io.output_dir, stage, use_hash=config.batch.hash_inputs)
+        records = {tile: manifest.get_record(get_input_files(tile), config, config_keys) for tile in tiles}
+        todo = [tile for tile in tiles if not manifest.is_up_to_date(tile, records[tile], get_output_files(tile))]
+        for tile in todo:
+            manifest.remove(tile)
+        log.info(f"{stage}: {len(todo)} tiles to process, {len(tiles) - len(todo)} tiles are up to date")
+
+    pending = split_in_chunks(todo, chunk_size) if chunk_size else [[tile] for tile in todo]
+    chunk_estimates = None
+    if estimates is not None:
+        extra_mb = chunk_memory_mb if chunk_size else 0
+        chunk_estimates = {tuple(chunk): max(estimates[tile] for tile in chunk) + extra_mb for chunk in pending}
+    memory_budget_mb = config.batch.scheduling.memory_budget_mb if estimates is not None else None
+    max_running = max_running if estimates is not None and max_running else len(pending)
+    futures = {}
+    results = []
+    while pending or futures:
+        while (
+            pending
+            and len(futures) < max_running
+            and (
+                chunk_estimates is None
+                or can_admit(
+                    chunk_estimates[tuple(pending[0])],
+                    [chunk_estimates[tuple(chunk)] for chunk in futures.values()],
+                    memory_budget_mb,
+                )
+            )
+        ):
+            chunk = pending.pop(0)
+            futures[executor.submit(function, chunk if chunk_size else chunk[0], config)] = chunk
+
+        done, _ = wait(futures, return_when=FIRST_COMPLETED)
+        for future in done:
+            chunk = futures.pop(future)
+            results.append(future.result())
+            if manifest is not None:
+                for tile in chunk:
+                    manifest.write(tile, records[tile])
+
+    return results, (len(todo), len(tiles) - len(todo))
+
+
+def split_in_chunks(tiles: List[str], chunk_size: int) -> List[List[str]]:
+    """Split a list of tiles into chunks of consecutive tiles (the last chunk may be smaller)"""
+    chunks = []
+    for start in range(0, len(tiles), chunk_size):
+        end = start + chunk_size
+        chunks.append(tiles[start:end])
+
+    return chunks
+
+
+def log_strip_cache_stats(tiles_cache_stats: List[Dict[str, int]]):
+    """Log the strip cache statistics (hit rate and bytes of input files that were not read again) of a run"""
+    hits = sum(stats["hits"] for stats in tiles_cache_stats)
+    misses = sum(stats["misses"] for stats in tiles_cache_stats)
+    bytes_saved = sum(stats["bytes_saved"] for stats in tiles_cache_stats)
+    hit_rate = 100 * hits / (hits + misses) if hits + misses else 0
+    log.info(
+        f"Strip cache: {hits} hits, {misses} misses (hit rate: {hit_rate:.1f}%), "
+        f"{bytes_saved / 1024 / 1024:.1f} MB of input files not read again"
+    )
+
+
+def get_queue_path(config: DictConfig) -> str:
+    """Get the path of the work queue of a run: a folder (files backend) or a SQLite database (sqlite backend) in
+    config.batch.queue.dir, or in {io.output_dir}/.queue by default"""
+    queue_dir = config.batch.queue.dir or os.path.join(config.io.output_dir, QUEUE_DIRNAME)
+    if config.batch.queue.backend == "sqlite":
+        return os.path.join(queue_dir, "queue.sqlite")
+
+    return queue_dir
+
+
+def run_queue_worker(config: DictConfig) -> Dict:
+    """Process the tasks (stage of a tile) of a run from a shared work queue (cf. batch.work_queue), so that several
+    workers, started on one or several hosts with the same config, process the tiles of the same run.
+
+    Each worker adds the tasks of all the tiles of config.io.input_dir to the queue (tasks that are already in the
+    queue are kept), then claims the tasks one by one (at most batch.jobs at once), runs them with its pool of
+    processes, and renews their leases until they are done. It stops when no task is left (all the tasks are done,
+    or failed batch.queue.max_attempts times). Tasks whose outputs are up to date are marked as done without being
+    run (cf. config.batch.incremental). Tiles are claimed in the Morton order of their coordinates (there is no
+    preflight: batch.scheduling is not used).
+
+    Args:
+        config (DictConfig): hydra config (cf. configs/batch/default.yaml for the batch parameters)
+
+    Raises:
+        ValueError: if no las/laz file is found in config.io.input_dir
+        RuntimeError: if some tasks failed
+
+    Returns:
+        Dict: progress of the run at the end (cf. work_queue.compute_progress)
+    """
+    tiles = list_input_tiles(config.io.input_dir)
+    if not tiles:
+        raise ValueError(f"No las/laz file found in {config.io.input_dir}")
+    tiles = sort_tiles_in_morton_order(tiles)
+
+    queue_config = config.batch.queue
+    products = list(config.batch.products.keys())
+    run_dhm = "DSM" in products and "DTM" in products
+    worker_id = queue_config.worker_id or get_default_worker_id()
+    nb_workers = get_nb_workers(config.batch.jobs, config.batch.cpu_limit)
+    metrics_dir = OmegaConf.select(config, "metrics.output_dir")
+    metrics.configure_metrics(metrics_dir)
+
+    output_dirs = (
+        products + ([DHM_DIRNAME] if run_dhm else []) + ([BUFFER_DIRNAME] if config.batch.write_buffered_las else [])
+    )
+    for dirname in output_dirs:
+        os.makedirs(os.path.join(config.io.output_dir, dirname), exist_ok=True)
+
+    queue = open_work_queue(
+        queue_config.backend, get_queue_path(config), queue_config.lease_s, queue_config.max_attempts
+    )
+    log.info(f"Worker {worker_id}: process the tasks of {get_queue_path(config)} with {nb_workers} processes")
+
+    with contextlib.ExitStack() as stack:
+        stack.callback(queue.close)
+        neighbors = None
+        if is_indexing_enabled(config):
+            neighbors = get_neighbor_tiles(
+                tiles, config.tile_geometry.tile_width, config.tile_geometry.tile_coord_scale
+            )
+        queue.add_tasks(*get_pipeline_tasks(tiles, config.batch.write_buffered_las, run_dhm, neighbors))
+        strip_cache_config = get_strip_cache_config(config, stack)
+        executor = stack.enter_context(
+            ProcessPoolExecutor(
+                max_workers=nb_workers,
+                initializer=init_worker,
+                initargs=(config.batch.memory_limit_mb, strip_cache_config, metrics_dir),
+            )
+        )
+        stages = get_stages(tiles, config)
+        manifests = {name: Manifest(config.io.output_dir, name, use_hash=config.batch.hash_inputs) for name in stages}
+        # future -> (task, start time, manifest record)
+        running = {}
+        last_renewal = time.time()
+        while True:
+            while len(running) < nb_workers:
+                task = queue.claim(worker_id)
+                if task is None:
+                    break
+                name, tile = task
+                stage = stages[name]
+                record = None
+                if config.batch.incremental:
+                    manifest = manifests[name]
+                    record = manifest.get_record(stage.get_input_files(tile), config, stage.config_keys)
+                    if manifest.is_up_to_date(tile, record, stage.get_output_files(tile)):
+                        log.info(f"{name}: {tile} is up to date")
+                        queue.complete(task, worker_id, time.time())
+                        continue
+                    manifest.remove(tile)
+                running[executor.submit(stage.function, tile, config)] = (task, time.time(), record)
+
+            if not running:
+                if queue.is_finished():
+                    break
+                # Wait for other workers to complete the dependencies of the remaining tasks
+                time.sleep(queue_config.poll_interval_s)
+                continue
+
+            done, _ = wait(running, timeout=queue_config.poll_interval_s, return_when=FIRST_COMPLETED)
+            for future in done:
+                task, start, record = running.pop(future)
+                try:
+                    future.result()
+                except Exception as e:
+                    log.error(f"{task[0]}: {task[1]} failed: {e!r}")
+                    queue.fail(task, worker_id, repr(e))
+                    if isinstance(e, BrokenExecutor):
+                        raise
+                    continue
+                if record is not None:
+                    manifests[task[0]].write(task[1], record)
+                queue.complete(task, worker_id, start)
+
+            if time.time() - last_renewal > queue_config.lease_s / 3:
+                for task, _, _ in running.values():
+                    if not queue.renew(task, worker_id):
+                        log.warning(f"{task[0]}: the lease on {task[1]} expired, it may be processed twice")
+                last_renewal = time.time()
+
+        progress = queue.get_progress()
+    for name, counts in progress["stages"].items():
+        log.info(f"Summary: {name}: {counts['done']} tasks done, {counts['failed']} tasks failed")
+    nb_failed = sum(counts["failed"] for counts in progress["stages"].values())
+    if nb_failed:
+        raise RuntimeError(f"{nb_failed} tasks failed (cf. python -m las_digital_models.queue_status)")
+
+    return progress
@@ -0,0 +1,137 @@
+"""Prefetch of the tiles processed by a worker of the batch pipeline: the points of the next tiles are read and
+decompressed on a background thread pool while the current tile is triangulated (the rasters are written in the
+background as well, cf. commons.raster_writer).
+
+pdal and laspy/lazrs spend most of the read in C++/Rust code that releases the GIL, so that the reads actually run in
+parallel with the triangulation. With the "laspy" reader of the batch config (batch.prefetch.reader), the LAZ chunks
+of a tile are also decompressed on several threads by lazrs (cf. orchestrator.read_tile_points). The number of tiles
+read in advance is bounded by a depth and by a memory budget.
+"""
+
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+from las_digital_models.commons import metrics
+
+
+def get_nbytes(result: Any) -> int:
+    """Get the memory of the numpy arrays in a result (eg. the points and their spatial reference)"""
+    if isinstance(result, np.ndarray):
+        return result.nbytes
+    if isinstance(result, (tuple, list)):
+        return sum(get_nbytes(item) for item in result)
+
+    return 0
+
+
+class Prefetcher:
+    """Read tiles in advance, in the order in which they are processed"""
+
+    def __init__(
+        self,
+        read_function: Callable[[str], Any],
+        depth: int = 2,
+        memory_mb: float = 2048,
+        nb_threads: int = 1,
+        parent_span: Optional[metrics.Span] = None,
+    ):
+        """
+        Args:
+            read_function (Callable[[str], Any]): function that reads a tile (eg. returns its points)
+            depth (int, optional): maximum number of tiles read in advance (0: no prefetch, tiles are read when they
+            are requested). Defaults to 2.
+            memory_mb (float, optional): memory budget of the tiles read in advance (numpy arrays of their results).
+            The next tile is read in advance only if it fits in the budget with the tiles already read in advance,
+            the size of the tiles being read being the size of the last read tile (a single tile is read in advance
+            until the size of a tile is known). Defaults to 2048.
+            nb_threads (int, optional): number of threads that read the tiles. Defaults to 1.
+            parent_span (Optional[metrics.Span], optional): span of the thread that requests the tiles, that
+            contains the "prefetch" spans of the reads in advance (the reading threads have no open span).
+            Defaults to None.
+        """
+        self.read_function = read_function
+        self.depth = depth
+        self.memory = memory_mb * 1024 * 1024
+        self.parent_span = parent_span
+        self._executor = ThreadPoolExecutor(max_workers=max(nb_threads, 1), thread_name_prefix="prefetch")
+        self._queue: List[str] = []
+        self._futures: Dict[str, Future] = {}
+        self._last_nbytes: Optional[int] = None
+        self._closed = False
+        # The reads in advance are started from the reading threads as well, when a read is done
+        self._lock = threading.RLock()
+
+    def __enter__(self) -> "Prefetcher":
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        """Cancel the reads that did not start, and wait for the running ones"""
+        with self._lock:
+            self._closed = True
+            for future in self._futures.values():
+                future.cancel()
+            self._futures.clear()
+            self._queue.clear()
+        self._executor.shutdown(wait=True)
+
+    def _get_prefetched_nbytes(self) -> int:
+        nbytes = 0
+        for future in self._futures.values():
+            if not future.done():
+                nbytes += self._last_nbytes
+            elif not future.cancelled() and future.exception() is None:
+                nbytes += get_nbytes(future.result())
+
+        return nbytes
+
+    def _read(self, tile: str) -> Any:
+        result = self.read_function(tile)
+        with self._lock:
+            self._last_nbytes = get_nbytes(result)
+
+        return result
+
+    def _read_in_advance(self, tile: str) -> Any:
+        with metrics.span("prefetch", tile=tile, parent=self.parent_span):
+            return self._read(tile)
+
+    def _fill(self):
+        with self._lock:
+            while not self._closed and self._queue and len(self._futures) < self.depth:
+                if self._futures and (
+                    self._last_nbytes is None or self._get_prefetched_nbytes() + self._last_nbytes > self.memory
+                ):
+                    return
+                tile = self._queue.pop(0)
+                future = self._executor.submit(self._read_in_advance, tile)
+                self._futures[tile] = future
+                future.add_done_callback(lambda _: self._fill())
+
+    def prefetch(self, tiles: List[str]):
+        """Add tiles to read in advance, in the order in which they will be requested"""
+        with self._lock:
+            self._queue += [tile for tile in tiles if tile not in self._futures and tile not in self._queue]
+        self._fill()
+
+    def get(self, tile: str) -> Any:
+        """Get the result of the read of a tile (waits for its read in advance, or reads it now if it was not read in
+        advance), and read the next tiles in advance
+
+        Raises:
+            Exception: any error raised by the read of the tile
+        """
+        with self._lock:
+            future = self._futures.pop(tile, None)
+            if tile in self._queue:
+                self._queue.remove(tile)
+        self._fill()
+        if future is None:
+            return self._read(tile)
+
+        return future.result()
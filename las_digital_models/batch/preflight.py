@@ -0,0 +1,142 @@
+"""Preflight of the batch pipeline: read the headers of all the input tiles (number of points, bounds, without
+decompressing the points) to estimate the memory needed to process each tile, so that tiles can be dispatched
+largest first and only when their estimated memory fits in the memory budget (cf. configs/batch/default.yaml,
+batch.scheduling).
+"""
+
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Tuple
+
+import laspy
+from omegaconf import DictConfig
+
+from las_digital_models.commons import commons
+
+log = commons.get_logger(__name__)
+
+# Number of threads used to read the headers (the files can be on a network filesystem)
+NB_HEADER_THREADS = 16
+# Memory of each pixel of the rasters of a tile (float64 raster of pdal + float32 raster that is written)
+BYTES_PER_PIXEL = 12
+
+
+class TileHeader:
+    """Information read from the header of a las/laz tile"""
+
+    def __init__(self, filename: str, nb_points: int, bounds: Tuple[float, float, float, float]):
+        """
+        Args:
+            filename (str): filename of the tile
+            nb_points (int): number of points of the tile
+            bounds (Tuple[float, float, float, float]): xmin, ymin, xmax, ymax of the points
+        """
+        self.filename = filename
+        self.nb_points = nb_points
+        self.bounds = bounds
+
+    @property
+    def density(self) -> float:
+        """Number of points per square meter (0 if the bounds are empty)"""
+        xmin, ymin, xmax, ymax = self.bounds
+        area = (xmax - xmin) * (ymax - ymin)
+
+        return self.nb_points / area if area > 0 else 0.0
+
+
+def read_tile_header(filename: str) -> TileHeader:
+    """Read the number of points and the bounds of a las/laz file from its header only"""
+    with laspy.open(filename) as f:
+        header = f.header
+        return TileHeader(
+            os.path.basename(filename),
+            header.point_count,
+            (header.mins[0], header.mins[1], header.maxs[0], header.maxs[1]),
+        )
+
+
+def read_tile_headers(input_dir: str, tiles: List[str]) -> Dict[str, TileHeader]:
+    """Read the headers of the tiles of a folder (in a thread pool)"""
+    with ThreadPoolExecutor(NB_HEADER_THREADS) as executor:
+        headers = executor.map(read_tile_header, [os.path.join(input_dir, tile) for tile in tiles])
+
+        return dict(zip(tiles, headers))
+
+
+def estimate_memory_mb(header: TileHeader, config: DictConfig) -> float:
+    """Estimate the peak memory needed to process a tile (buffer and interpolation) in a worker
+
+    The estimate is linear in the number of points of the tile and of its buffer (which is inferred from the tile
+    area) and in the number of pixels of its rasters, with the coefficients of config.batch.scheduling.
+
+    Args:
+        header (TileHeader): header of the tile
+        config (DictConfig): hydra config
+
+    Returns:
+        float: estimated memory in MB
+    """
+    scheduling = config.batch.scheduling
+    tile_width = config.tile_geometry.tile_width
+    buffer_ratio = ((tile_width + 2 * config.buffer.size) / tile_width) ** 2
+    nb_pixels = sum(
+        int(tile_width / pixel_size) ** 2 for pixel_size in commons.get_pixel_sizes(config.tile_geometry.pixel_size)
+    )
+    bytes_needed = header.nb_points * buffer_ratio * scheduling.bytes_per_point + nb_pixels * BYTES_PER_PIXEL
+
+    return scheduling.base_memory_mb + bytes_needed / 1024 / 1024
+
+
+def run_preflight(tiles: List[str], config: DictConfig) -> Dict[str, float]:
+    """Read the headers of the tiles of config.io.input_dir and estimate the memory needed by each tile
+
+    Args:
+        tiles (List[str]): tile filenames
+        config (DictConfig): hydra config
+
+    Returns:
+        Dict[str, float]: estimated memory (in MB) of each tile
+    """
+    headers = read_tile_headers(config.io.input_dir, tiles)
+    estimates = {tile: estimate_memory_mb(header, config) for tile, header in headers.items()}
+
+    nb_points = [header.nb_points for header in headers.values()]
+    largest = max(tiles, key=lambda tile: estimates[tile])
+    log.info(
+        f"Preflight: {sum(nb_points)} points in {len(tiles)} tiles ({min(nb_points)} to {max(nb_points)} points "
+        f"per tile), largest tile {largest} ({headers[largest].nb_points} points, "
+        f"{headers[largest].density:.1f} pts/m², ~{estimates[largest]:.0f} MB)"
+    )
+    budget = config.batch.scheduling.memory_budget_mb
+    if budget and estimates[largest] > budget:
+        logging.warning(
+            f"The estimated memory of {largest} ({estimates[largest]:.0f} MB) is larger than the memory budget "
+            f"({budget} MB): it will be processed alone"
+        )
+
+    return estimates
+
+
+def sort_largest_first(tiles: List[str], estimates: Dict[str, float]) -> List[str]:
+    """Sort tiles by decreasing estimated memory (tiles with the same estimate keep their order)"""
+    return sorted(tiles, key=lambda tile: -estimates[tile])
+
+
+def can_admit(estimate: float, running_estimates: List[float], memory_budget_mb: float) -> bool:
+    """Check if a tile can be started while other tiles are running: its estimated memory must fit in the memory
+    budget with the tiles that are running (a tile is always admitted if nothing is running, even if its estimate
+    is larger than the budget)
+
+    Args:
+        estimate (float): estimated memory of the tile (in MB)
+        running_estimates (List[float]): estimated memory of the running tiles (in MB)
+        memory_budget_mb (float): memory budget (in MB), None or 0 for no limit
+
+    Returns:
+        bool: True if the tile can be started
+    """
+    if not memory_budget_mb or not running_estimates:
+        return True
+
+    return sum(running_estimates) + estimate <= memory_budget_mb
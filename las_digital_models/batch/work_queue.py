@@ -0,0 +1,519 @@
+"""Work queues of the batch pipeline, so that several workers (on one or several hosts) can share the tiles of a run.
+
+A task is a (stage, tile) pair, eg. ("interpolation", "tile_0770_6278.laz"). A worker claims a task by taking a lease
+on it, renews the lease while it runs the task, and marks it as done (or failed) at the end. The lease of a worker
+that crashed expires after lease_s seconds, and the task can be claimed again by another worker. A task can be
+claimed only when the tasks it depends on are done (eg. the DHM of a tile after its DSM and DTM).
+
+Two backends:
+- FileWorkQueue: one lease file per running task, created atomically (O_EXCL) in a folder of a shared filesystem
+(NFS, Lustre...), so that any number of workers on any number of hosts can drain the same run
+- SQLiteWorkQueue: a single SQLite database, for workers of the same host (SQLite locks are not reliable on network
+filesystems)
+
+Tasks are processed at least once: in the rare case where a lease expires while its worker is still running (eg. a
+worker frozen for longer than lease_s), a task can be run twice. The outputs of the pipeline do not depend on it.
+"""
+
+import json
+import os
+import socket
+import sqlite3
+import time
+import uuid
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# (stage, tile)
+Task = Tuple[str, str]
+
+QUEUE_DIRNAME = ".queue"
+TASKS_FILENAME = "tasks.json"
+# Window used to compute the throughput of the run (in seconds)
+THROUGHPUT_WINDOW_S = 600
+
+
+def get_default_worker_id() -> str:
+    """Get a worker id that is unique among the hosts of a run: {hostname}-{pid}"""
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+def get_pipeline_tasks(
+    tiles: List[str],
+    write_buffered_las: bool,
+    run_dhm: bool,
+    neighbors: Optional[Dict[str, List[str]]] = None,
+) -> Tuple[List[Task], Dict[Task, List[Task]]]:
+    """Get the tasks of the pipeline for a list of tiles, and their dependencies: the buffer (or the interpolation) of
+    a tile after the spatial index of the tile and of its neighbors (if there is an index stage), the interpolation of
+    a tile after its buffer (if the buffered las is written), and its DHM after its interpolation (DSM and DTM)
+
+    Args:
+        tiles (List[str]): tile filenames, in the order in which they should be processed
+        write_buffered_las (bool): add a buffer stage (cf. batch.write_buffered_las)
+        run_dhm (bool): add a DHM stage
+        neighbors (Optional[Dict[str, List[str]]], optional): neighbors of each tile (cf.
+        manifest.get_neighbor_tiles), to add an index stage (cf. batch.spatial_index). Defaults to None.
+
+    Returns:
+        Tuple[List[Task], Dict[Task, List[Task]]]: tasks (stage by stage) and dependencies of each task
+    """
+    stages = (["buffer"] if write_buffered_las else []) + ["interpolation"] + (["DHM"] if run_dhm else [])
+    dependencies = {
+        (stage, tile): [(previous_stage, tile)] for previous_stage, stage in zip(stages, stages[1:]) for tile in tiles
+    }
+    if neighbors is not None:
+        dependencies.update(
+            {(stages[0], tile): [("index", other) for other in [tile] + neighbors[tile]] for tile in tiles}
+        )
+        stages.insert(0, "index")
+    tasks = [(stage, tile) for stage in stages for tile in tiles]
+
+    return tasks, dependencies
+
+
+def _write_json_atomic(path: str, content: Dict):
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(content, f)
+    os.replace(tmp_path, path)
+
+
+def _read_json(path: str) -> Optional[Dict]:
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        # missing, or being replaced
+        return None
+
+
+def compute_progress(
+    tasks: List[Task], statuses: Dict[Task, str], finished: List[Tuple[str, float, float]], now: float
+) -> Dict:
+    """Summarize the progress of a run
+
+    Args:
+        tasks (List[Task]): all the tasks of the run
+        statuses (Dict[Task, str]): status of the tasks that are not pending (running, done or failed)
+        finished (List[Tuple[str, float, float]]): worker, start and end time of each done task
+        now (float): current time
+
+    Returns:
+        Dict: number of tasks by status for each stage ("stages"), number of done tasks by worker ("workers"),
+        number of tasks done per minute in the last THROUGHPUT_WINDOW_S seconds ("tasks_per_minute"), and estimated
+        remaining time in seconds ("eta_s", None if unknown)
+    """
+    stages = {}
+    for task in tasks:
+        counts = stages.setdefault(task[0], {"pending": 0, "running": 0, "done": 0, "failed": 0})
+        counts[statuses.get(task, "pending")] += 1
+
+    workers = {}
+    for worker, _, _ in finished:
+        workers[worker] = workers.get(worker, 0) + 1
+
+    window_start = max([now - THROUGHPUT_WINDOW_S] + [min((start for _, start, _ in finished), default=now)])
+    nb_recent = sum(end >= window_start for _, _, end in finished)
+    tasks_per_minute = 60 * nb_recent / (now - window_start) if now > window_start else 0.0
+    nb_remaining = sum(counts["pending"] + counts["running"] for counts in stages.values())
+
+    return {
+        "stages": stages,
+        "workers": workers,
+        "tasks_per_minute": tasks_per_minute,
+        "eta_s": 60 * nb_remaining / tasks_per_minute if tasks_per_minute else None,
+    }
+
+
+class WorkQueue:
+    """Base class of the work queues (cf. the docstring of the module)"""
+
+    def __init__(self, lease_s: float = 300, max_attempts: int = 3):
+        """
+        Args:
+            lease_s (float, optional): duration of the leases, in seconds. Defaults to 300.
+            max_attempts (int, optional): number of failures after which a task is not claimed anymore (its
+            dependent tasks are never run). Defaults to 3.
+        """
+        self.lease_s = lease_s
+        self.max_attempts = max_attempts
+
+    def add_tasks(self, tasks: List[Task], dependencies: Dict[Task, List[Task]]):
+        """Add tasks to the queue (tasks that are already in the queue keep their status)
+
+        Args:
+            tasks (List[Task]): tasks, in the order in which they should be claimed
+            dependencies (Dict[Task, List[Task]]): tasks that must be done before each task
+        """
+        raise NotImplementedError
+
+    def claim(self, worker_id: str) -> Optional[Task]:
+        """Take a lease on the first pending task whose dependencies are done (None if there is none for now)"""
+        raise NotImplementedError
+
+    def renew(self, task: Task, worker_id: str) -> bool:
+        """Extend the lease of a task. Returns False if the worker does not own the lease anymore"""
+        raise NotImplementedError
+
+    def complete(self, task: Task, worker_id: str, start: float):
+        """Mark a task as done, and release its lease"""
+        raise NotImplementedError
+
+    def fail(self, task: Task, worker_id: str, error: str):
+        """Record a failure of a task, and release its lease (the task can be claimed again until max_attempts
+        failures)"""
+        raise NotImplementedError
+
+    def get_progress(self) -> Dict:
+        """Progress of the run (cf. compute_progress)"""
+        raise NotImplementedError
+
+    def is_finished(self) -> bool:
+        """True if no task is pending or running (all the tasks are done or failed, or blocked by a failed task)"""
+        raise NotImplementedError
+
+    def close(self):
+        """Release the resources of the queue (the tasks stay in the queue)"""
+
+
+class FileWorkQueue(WorkQueue):
+    """Work queue in a folder of a shared filesystem:
+    - tasks.json: list of the tasks and of their dependencies
+    - {stage}/{tile}.lease: lease of a running task (worker, token, expiration time)
+    - {stage}/{tile}.done: record of a done task (worker, start and end time)
+    - {stage}/{tile}.failed: failures of a task
+    """
+
+    def __init__(self, queue_dir: str, lease_s: float = 300, max_attempts: int = 3):
+        """
+        Args:
+            queue_dir (str): folder of the queue, shared by all the workers
+        """
+        super().__init__(lease_s, max_attempts)
+        self.queue_dir = queue_dir
+        self.tasks: List[Task] = []
+        self.dependencies: Dict[Task, List[Task]] = {}
+        # Done tasks never change state, they are not checked again
+        self._done = set()
+        # Token of the leases owned by this queue object
+        self._tokens: Dict[Task, str] = {}
+        os.makedirs(queue_dir, exist_ok=True)
+
+    def _get_path(self, task: Task, suffix: str) -> str:
+        stage, tile = task
+        return os.path.join(self.queue_dir, stage, f"{os.path.basename(tile)}.{suffix}")
+
+    def add_tasks(self, tasks: List[Task], dependencies: Dict[Task, List[Task]]):
+        for stage in {stage for stage, _ in tasks}:
+            os.makedirs(os.path.join(self.queue_dir, stage), exist_ok=True)
+        known = set(self.tasks)
+        self.tasks += [task for task in tasks if task not in known]
+        self.dependencies.update({task: list(deps) for task, deps in dependencies.items()})
+        # All the workers of a run write the same list (used by get_progress to count pending tasks)
+        _write_json_atomic(
+            os.path.join(self.queue_dir, TASKS_FILENAME),
+            {
+                "tasks": self.tasks,
+                "dependencies": [
+                    [list(task), [list(dep) for dep in deps]] for task, deps in self.dependencies.items()
+                ],
+            },
+        )
+
+    @classmethod
+    def open(cls, queue_dir: str, **kwargs) -> "FileWorkQueue":
+        """Open an existing queue (eg. to get its progress from another process)"""
+        queue = cls(queue_dir, **kwargs)
+        content = _read_json(os.path.join(queue_dir, TASKS_FILENAME)) or {"tasks": [], "dependencies": []}
+        queue.tasks = [tuple(task) for task in content["tasks"]]
+        queue.dependencies = {tuple(task): [tuple(dep) for dep in deps] for task, deps in content["dependencies"]}
+
+        return queue
+
+    def _is_done(self, task: Task) -> bool:
+        if task not in self._done and os.path.exists(self._get_path(task, "done")):
+            self._done.add(task)
+
+        return task in self._done
+
+    def _get_nb_failures(self, task: Task) -> int:
+        failures = _read_json(self._get_path(task, "failed"))
+        return len(failures["errors"]) if failures else 0
+
+    def _create_lease(self, task: Task, worker_id: str) -> bool:
+        token = uuid.uuid4().hex
+        try:
+            fd = os.open(self._get_path(task, "lease"), os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            return False
+        with os.fdopen(fd, "w") as f:
+            json.dump({"worker": worker_id, "token": token, "expires": time.time() + self.lease_s}, f)
+        self._tokens[task] = token
+
+        return True
+
+    def _break_expired_lease(self, task: Task) -> bool:
+        """Remove the lease of a task if it expired. Returns True if the lease does not exist anymore"""
+        lease_path = self._get_path(task, "lease")
+        lease = _read_json(lease_path)
+        if lease is None:
+            # Removed, or being written (then its expiration time is in the future)
+            return not os.path.exists(lease_path)
+        if lease["expires"] > time.time():
+            return False
+
+        # Rename is atomic: only one worker moves the expired lease away
+        expired_path = f"{lease_path}.{uuid.uuid4().hex}.expired"
+        try:
+            os.rename(lease_path, expired_path)
+        except FileNotFoundError:
+            return False
+        moved = _read_json(expired_path)
+        if moved is not None and moved["token"] != lease["token"]:
+            # Another worker replaced the expired lease in the meantime: put its lease back
+            try:
+                os.link(expired_path, lease_path)
+            except FileExistsError:
+                pass
+            os.remove(expired_path)
+            return False
+        os.remove(expired_path)
+
+        return True
+
+    def claim(self, worker_id: str) -> Optional[Task]:
+        for task in self.tasks:
+            if self._is_done(task) or self._get_nb_failures(task) >= self.max_attempts:
+                continue
+            if not all(self._is_done(dep) for dep in self.dependencies.get(task, [])):
+                continue
+            if not self._create_lease(task, worker_id):
+                if not (self._break_expired_lease(task) and self._create_lease(task, worker_id)):
+                    continue
+            # The task may have been completed by another worker between the check and the lease
+            if self._is_done(task):
+                self._release(task)
+                continue
+
+            return task
+
+        return None
+
+    def _owns(self, task: Task) -> bool:
+        lease = _read_json(self._get_path(task, "lease"))
+        return lease is not None and lease["token"] == self._tokens.get(task)
+
+    def renew(self, task: Task, worker_id: str) -> bool:
+        if not self._owns(task):
+            return False
+        _write_json_atomic(
+            self._get_path(task, "lease"),
+            {"worker": worker_id, "token": self._tokens[task], "expires": time.time() + self.lease_s},
+        )
+
+        return True
+
+    def _release(self, task: Task):
+        if self._owns(task):
+            try:
+                os.remove(self._get_path(task, "lease"))
+            except FileNotFoundError:
+                pass
+        self._tokens.pop(task, None)
+
+    def complete(self, task: Task, worker_id: str, start: float):
+        _write_json_atomic(self._get_path(task, "done"), {"worker": worker_id, "start": start, "end": time.time()})
+        self._done.add(task)
+        self._release(task)
+
+    def fail(self, task: Task, worker_id: str, error: str):
+        failures = _read_json(self._get_path(task, "failed")) or {"errors": []}
+        failures["errors"].append({"worker": worker_id, "time": time.time(), "error": error})
+        _write_json_atomic(self._get_path(task, "failed"), failures)
+        self._release(task)
+
+    def _get_statuses(self) -> Tuple[Dict[Task, str], List[Tuple[str, float, float]]]:
+        statuses = {}
+        finished = []
+        now = time.time()
+        for task in self.tasks:
+            done = _read_json(self._get_path(task, "done"))
+            if done is not None:
+                statuses[task] = "done"
+                finished.append((done["worker"], done["start"], done["end"]))
+                continue
+            lease = _read_json(self._get_path(task, "lease"))
+            if lease is not None and lease["expires"] > now:
+                statuses[task] = "running"
+            elif self._get_nb_failures(task) >= self.max_attempts:
+                statuses[task] = "failed"
+
+        return statuses, finished
+
+    def get_progress(self) -> Dict:
+        statuses, finished = self._get_statuses()
+        return compute_progress(self.tasks, statuses, finished, time.time())
+
+    def is_finished(self) -> bool:
+        statuses, _ = self._get_statuses()
+        return _is_finished(self.tasks, self.dependencies, statuses)
+
+
+def _is_finished(tasks: Iterable[Task], dependencies: Dict[Task, List[Task]], statuses: Dict[Task, str]) -> bool:
+    """True if each task is done or failed, or depends (directly or not) on a failed task"""
+    blocked = set()
+    for task in tasks:  # tasks are sorted so that dependencies come first
+        status = statuses.get(task, "pending")
+        if status == "failed" or any(dep in blocked for dep in dependencies.get(task, [])):
+            blocked.add(task)
+        elif status != "done":
+            return False
+
+    return True
+
+
+class SQLiteWorkQueue(WorkQueue):
+    """Work queue in a SQLite database, for the workers of a single host"""
+
+    def __init__(self, db_path: str, lease_s: float = 300, max_attempts: int = 3):
+        """
+        Args:
+            db_path (str): path to the SQLite database (created if it does not exist)
+        """
+        super().__init__(lease_s, max_attempts)
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self.connection = sqlite3.connect(db_path, timeout=60, isolation_level=None, check_same_thread=False)
+        self.connection.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS tasks (
+                stage TEXT, tile TEXT, position INTEGER, status TEXT DEFAULT 'pending', worker TEXT,
+                expires REAL, failures INTEGER DEFAULT 0, error TEXT, start REAL, end REAL,
+                PRIMARY KEY (stage, tile)
+            );
+            CREATE TABLE IF NOT EXISTS dependencies (
+                stage TEXT, tile TEXT, dep_stage TEXT, dep_tile TEXT,
+                PRIMARY KEY (stage, tile, dep_stage, dep_tile)
+            );
+            """
+        )
+
+    def close(self):
+        self.connection.close()
+
+    def add_tasks(self, tasks: List[Task], dependencies: Dict[Task, List[Task]]):
+        with self.connection:
+            self.connection.execute("BEGIN IMMEDIATE")
+            position = self.connection.execute("SELECT COALESCE(MAX(position), -1) + 1 FROM tasks").fetchone()[0]
+            self.connection.executemany(
+                "INSERT OR IGNORE INTO tasks (stage, tile, position) VALUES (?, ?, ?)",
+                [(stage, tile, position + i) for i, (stage, tile) in enumerate(tasks)],
+            )
+            self.connection.executemany(
+                "INSERT OR IGNORE INTO dependencies VALUES (?, ?, ?, ?)",
+                [(*task, *dep) for task, deps in dependencies.items() for dep in deps],
+            )
+
+    def claim(self, worker_id: str) -> Optional[Task]:
+        now = time.time()
+        with self.connection:
+            self.connection.execute("BEGIN IMMEDIATE")
+            row = self.connection.execute(
+                """
+                SELECT stage, tile FROM tasks t
+                WHERE (status = 'pending' OR (status = 'running' AND expires < ?))
+                AND NOT EXISTS (
+                    SELECT 1 FROM dependencies d JOIN tasks dt ON dt.stage = d.dep_stage AND dt.tile = d.dep_tile
+                    WHERE d.stage = t.stage AND d.tile = t.tile AND dt.status != 'done'
+                )
+                ORDER BY position LIMIT 1
+                """,
+                (now,),
+            ).fetchone()
+            if row is None:
+                return None
+            self.connection.execute(
+                "UPDATE tasks SET status = 'running', worker = ?, expires = ? WHERE stage = ? AND tile = ?",
+                (worker_id, now + self.lease_s, *row),
+            )
+
+        return tuple(row)
+
+    def renew(self, task: Task, worker_id: str) -> bool:
+        with self.connection:
+            cursor = self.connection.execute(
+                "UPDATE tasks SET expires = ? WHERE stage = ? AND tile = ? AND status = 'running' AND worker = ?",
+                (time.time() + self.lease_s, *task, worker_id),
+            )
+
+        return cursor.rowcount == 1
+
+    def complete(self, task: Task, worker_id: str, start: float):
+        with self.connection:
+            self.connection.execute(
+                "UPDATE tasks SET status = 'done', worker = ?, start = ?, end = ? WHERE stage = ? AND tile = ?",
+                (worker_id, start, time.time(), *task),
+            )
+
+    def fail(self, task: Task, worker_id: str, error: str):
+        with self.connection:
+            self.connection.execute(
+                """
+                UPDATE tasks SET failures = failures + 1, error = ?, worker = ?,
+                status = CASE WHEN failures + 1 >= ? THEN 'failed' ELSE 'pending' END
+                WHERE stage = ? AND tile = ? AND status = 'running'
+                """,
+                (error, worker_id, self.max_attempts, *task),
+            )
+
+    def _get_statuses(self) -> Tuple[List[Task], Dict[Task, str], List[Tuple[str, float, float]]]:
+        now = time.time()
+        rows = self.connection.execute(
+            "SELECT stage, tile, status, expires, worker, start, end FROM tasks ORDER BY position"
+        ).fetchall()
+        tasks = [(stage, tile) for stage, tile, *_ in rows]
+        statuses = {}
+        finished = []
+        for stage, tile, status, expires, worker, start, end in rows:
+            if status == "running" and expires < now:
+                status = "pending"  # expired lease
+            statuses[(stage, tile)] = status
+            if status == "done":
+                finished.append((worker, start, end))
+
+        return tasks, statuses, finished
+
+    def get_progress(self) -> Dict:
+        tasks, statuses, finished = self._get_statuses()
+        return compute_progress(tasks, statuses, finished, time.time())
+
+    def is_finished(self) -> bool:
+        tasks, statuses, _ = self._get_statuses()
+        dependencies = {}
+        for stage, tile, dep_stage, dep_tile in self.connection.execute("SELECT * FROM dependencies"):
+            dependencies.setdefault((stage, tile), []).append((dep_stage, dep_tile))
+
+        return _is_finished(tasks, dependencies, statuses)
+
+
+def open_work_queue(backend: str, path: str, lease_s: float = 300, max_attempts: int = 3) -> WorkQueue:
+    """Open a work queue
+
+    Args:
+        backend (str): "files" (FileWorkQueue) or "sqlite" (SQLiteWorkQueue)
+        path (str): folder of the queue (files), or path to the database (sqlite)
+        lease_s (float, optional): duration of the leases, in seconds. Defaults to 300.
+        max_attempts (int, optional): number of failures after which a task is given up. Defaults to 3.
+
+    Raises:
+        ValueError: if the backend is unknown
+
+    Returns:
+        WorkQueue: work queue
+    """
+    if backend == "files":
+        return FileWorkQueue.open(path, lease_s=lease_s, max_attempts=max_attempts)
+    if backend == "sqlite":
+        return SQLiteWorkQueue(path, lease_s=lease_s, max_attempts=max_attempts)
+
+    raise ValueError(f"Unknown work queue backend {backend}, expected 'files' or 'sqlite'")
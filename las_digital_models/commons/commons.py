@@ -2,48 +2,48 @@
 # maintener : MDupays
 # version : v.1 06/12/2022
 # COMMONS
+import functools
+import hashlib
 import logging
 import os
 import sys
-import time
-from typing import Callable
+from typing import Callable, Dict, List
+
+from las_digital_models.commons import metrics
 
 
 def get_logger(name):
-    log = logging.getLogger(__name__)
+    """Get a logger that writes INFO messages to stdout (the stdout handler is added only once per logger)"""
+    log = logging.getLogger(name)
     log.setLevel(logging.INFO)
-    streamHandler = logging.StreamHandler(sys.stdout)
-    streamHandler.setLevel(logging.INFO)
-    log.addHandler(streamHandler)
+    if not any(getattr(handler, "stream", None) is sys.stdout for handler in log.handlers):
+        streamHandler = logging.StreamHandler(sys.stdout)
+        streamHandler.setLevel(logging.INFO)
+        log.addHandler(streamHandler)
 
     return log
 
 
 def eval_time(function: Callable):
-    """decorator to log the duration of the decorated method"""
+    """decorator to measure the decorated method in a span (cf. metrics.span), that logs its duration"""
 
+    @functools.wraps(function)
     def timed(*args, **kwargs):
-        time_start = time.time()
-        result = function(*args, **kwargs)
-        time_elapsed = round(time.time() - time_start, 2)
-
-        logging.info(f"Processing time of {function.__name__}: {time_elapsed}s")
-        return result
+        with metrics.span(function.__name__):
+            return function(*args, **kwargs)
 
     return timed
 
 
 def eval_time_with_pid(function: Callable):
-    """decorator to log the duration of the decorated method"""
+    """decorator to measure the decorated method in a span (cf. metrics.span), that logs its duration and the PID
+    of the process"""
 
+    @functools.wraps(function)
     def timed(*args, **kwargs):
-        logging.info(f"Starting {function.__name__} with PID {os.getpid()}.")
-        time_start = time.time()
-        result = function(*args, **kwargs)
-        time_elapsed = round(time.time() - time_start, 2)
-        logging.info(f"{function.__name__} with PID {os.getpid()} finished.")
-        logging.info(f"Processing time of {function.__name__}: {time_elapsed}s")
-        return result
+        logging.debug(f"Starting {function.__name__} with PID {os.getpid()}.")
+        with metrics.span(function.__name__):
+            return function(*args, **kwargs)
 
     return timed
 
@@ -70,3 +70,42 @@ def give_name_resolution_raster(size):
         )
 
     return _size
+
+
+def get_pixel_sizes(pixel_size) -> List[float]:
+    """
+    Get the list of pixel sizes from tile_geometry.pixel_size, that is either a single pixel size or a list of pixel
+    sizes (to generate rasters at several resolutions)
+
+    Args:
+        pixel_size (float | List[float]): pixel size(s) in meters
+
+    Return:
+        List[float]: pixel sizes
+    """
+    if isinstance(pixel_size, (int, float)):
+        return [pixel_size]
+
+    return list(pixel_size)
+
+
+def get_file_signature(filename: str, use_hash: bool = False) -> Dict:
+    """Get the signature of a file: its size and modification time, or its size and the sha256 of its content
+
+    Args:
+        filename (str): path to the file
+        use_hash (bool, optional): use a hash of the content instead of the modification time. Defaults to False.
+
+    Returns:
+        Dict: signature of the file
+    """
+    stat = os.stat(filename)
+    if not use_hash:
+        return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+    sha256 = hashlib.sha256()
+    with open(filename, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            sha256.update(chunk)
+
+    return {"size": stat.st_size, "sha256": sha256.hexdigest()}
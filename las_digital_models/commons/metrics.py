@@ -0,0 +1,255 @@
+"""Structured metrics of the pipeline: nested spans per tile and stage.
+
+Each span records its wall time, CPU time, the peak RSS of the process while it is open (cf. RssSampler) and counters
+of the work it did
+(eg. input_points, kept_points, output_pixels, bytes_read, bytes_written). Spans opened inside another span (in the
+same thread, or with an explicit parent from another thread) are its children, and belong to the same tile.
+
+Spans are always logged (INFO for the root spans and the top spans of each tile, DEBUG for the nested ones). When a
+metrics folder is configured (cf. configure_metrics and configs/metrics/default.yaml), they are also written as json
+lines, in one file per process: {output_dir}/spans_{hostname}_{pid}.jsonl. Use
+`python -m las_digital_models.metrics_report` to aggregate them (slowest tiles, time spent in each stage, Prometheus
+textfile).
+"""
+
+import contextlib
+import json
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from typing import Dict, Iterator, Optional, Set
+
+import psutil
+
+# Recorder of the current process (None: spans are only logged)
+_recorder = None
+# Stack of the open spans of each thread
+_local = threading.local()
+# Interval between two measures of the resident memory of the process, for the peak RSS of the open spans
+RSS_SAMPLING_INTERVAL_S = 0.05
+
+
+def get_rss_mb() -> float:
+    """Current resident memory of the current process, in MB"""
+    return psutil.Process().memory_info().rss / (1024 * 1024)
+
+
+def get_file_size(filename: str) -> int:
+    """Size of a file in bytes (0 if it does not exist, eg. for GDAL virtual files)"""
+    try:
+        return os.path.getsize(filename)
+    except OSError:
+        return 0
+
+
+class Span:
+    """Measure of one step of the pipeline (cf. span)"""
+
+    def __init__(self, name: str, tile: Optional[str] = None, parent: Optional["Span"] = None, **attributes):
+        """
+        Args:
+            name (str): name of the step (eg. "interpolation", "read", "delaunay_faceraster")
+            tile (Optional[str], optional): tile processed by the step (ignored if the parent span has a tile).
+            Defaults to None.
+            parent (Optional[Span], optional): span that contains this span. Defaults to None.
+            attributes: other json-serializable properties of the span (eg. output="tile_50CM.tif")
+        """
+        self.name = name
+        if parent is not None and parent.tile:
+            # Nested spans belong to the tile of their root span (even if they process another file of the tile)
+            self.tile = parent.tile
+        else:
+            self.tile = os.path.basename(tile) if tile else None
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent.span_id if parent is not None else None
+        self.attributes = attributes
+        self.counters: Dict[str, float] = {}
+        self.pid = os.getpid()
+        self.start = time.time()
+        self.wall_s = None
+        self.cpu_s = None
+        self.peak_rss_mb = None
+        self.error = None
+
+    def add(self, **counters: float):
+        """Add values to counters of the span (eg. span.add(input_points=len(points)))"""
+        for key, value in counters.items():
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def to_dict(self) -> Dict:
+        return {
+            "name": self.name,
+            "tile": self.tile,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "pid": self.pid,
+            "start": self.start,
+            "wall_s": self.wall_s,
+            "cpu_s": self.cpu_s,
+            "peak_rss_mb": self.peak_rss_mb,
+            "counters": self.counters,
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+class RssSampler:
+    """Measure of the peak resident memory of the open spans of the process
+
+    The resident memory of the process is measured when a span is opened and closed, and every interval_s seconds by a
+    background thread while spans are open (the peaks of memory shorter than the interval may be missed). Unlike the
+    peak RSS of the lifetime of the process (getrusage), it is the peak of each span, even in a worker process that
+    processed larger tiles before.
+    """
+
+    def __init__(self, interval_s: float = RSS_SAMPLING_INTERVAL_S):
+        """
+        Args:
+            interval_s (float, optional): interval between two measures. Defaults to RSS_SAMPLING_INTERVAL_S.
+        """
+        self.interval_s = interval_s
+        self._reset()
+        # Processes forked while spans are open (eg. pool workers) start with no open span and no thread
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        self._spans: Set[Span] = set()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval_s)
+            self.sample()
+
+    def sample(self):
+        """Measure the resident memory of the process, and update the peak RSS of the open spans"""
+        with self._lock:
+            if not self._spans:
+                return
+            rss_mb = get_rss_mb()
+            for span in self._spans:
+                span.peak_rss_mb = max(span.peak_rss_mb, rss_mb)
+
+    def start(self, span: Span):
+        """Measure the peak RSS of a span until stop is called"""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="rss_sampler", daemon=True)
+                self._thread.start()
+            span.peak_rss_mb = get_rss_mb()
+            self._spans.add(span)
+
+    def stop(self, span: Span):
+        """Measure the resident memory a last time, and stop measuring the peak RSS of a span"""
+        self.sample()
+        with self._lock:
+            self._spans.discard(span)
+
+
+_rss_sampler = RssSampler()
+
+
+class MetricsRecorder:
+    """Writer of the spans of a process as json lines"""
+
+    def __init__(self, output_dir: str):
+        """
+        Args:
+            output_dir (str): folder where to write the spans
+        """
+        self.output_dir = output_dir
+        self._file = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _get_file(self):
+        # Processes forked after the recorder has been created write to their own file
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            os.makedirs(self.output_dir, exist_ok=True)
+            filename = f"spans_{socket.gethostname()}_{self._pid}.jsonl"
+            self._file = open(os.path.join(self.output_dir, filename), "a", buffering=1)
+
+        return self._file
+
+    def record(self, span: Span):
+        """Write a span (as one json line)"""
+        with self._lock:
+            self._get_file().write(json.dumps(span.to_dict()) + "\n")
+
+
+def configure_metrics(output_dir: Optional[str]):
+    """Set the folder where the spans of the current process (and of the processes forked from it) are written
+
+    Args:
+        output_dir (Optional[str]): folder for the spans (None: spans are only logged)
+    """
+    global _recorder
+    _recorder = MetricsRecorder(output_dir) if output_dir else None
+
+
+def configure_metrics_from_config(config: Dict):
+    """Set the folder of the spans from config["metrics"]["output_dir"] (cf. configs/metrics/default.yaml)"""
+    metrics_config = config.get("metrics") or {}
+    configure_metrics(metrics_config.get("output_dir"))
+
+
+def get_current_span() -> Optional[Span]:
+    """Innermost open span of the current thread (None if there is no open span)"""
+    stack = getattr(_local, "stack", None)
+    return stack[-1] if stack else None
+
+
+@contextlib.contextmanager
+def span(name: str, tile: Optional[str] = None, parent: Optional[Span] = None, **attributes) -> Iterator[Span]:
+    """Open a span around a step of the pipeline
+
+    Usage:
+        with metrics.span("read", tile=input_file) as read_span:
+            points = ...
+            read_span.add(input_points=len(points), bytes_read=metrics.get_file_size(input_file))
+
+    Args:
+        name (str): name of the step
+        tile (Optional[str], optional): tile processed by the step (ignored in nested spans, that belong to the tile
+        of their parent). Defaults to None.
+        parent (Optional[Span], optional): span that contains this span, eg. a span of another thread for the steps
+        run on a background thread (None: innermost open span of the current thread). Defaults to None.
+        attributes: other json-serializable properties of the span
+
+    Yields:
+        Span: the span, to add counters to it
+    """
+    if not hasattr(_local, "stack"):
+        _local.stack = []
+    if parent is None:
+        parent = get_current_span()
+    current = Span(name, tile, parent, **attributes)
+    _local.stack.append(current)
+    _rss_sampler.start(current)
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    try:
+        yield current
+    except BaseException as e:
+        current.error = repr(e)
+        raise
+    finally:
+        current.wall_s = time.perf_counter() - wall_start
+        current.cpu_s = time.process_time() - cpu_start
+        _rss_sampler.stop(current)
+        _local.stack.pop()
+
+        counters = "".join(f", {key}={value:g}" for key, value in current.counters.items())
+        logging.log(
+            logging.INFO if parent is None or (current.tile and not parent.tile) else logging.DEBUG,
+            f"{name}{f' ({current.tile})' if current.tile else ''} with PID {current.pid}: "
+            f"{current.wall_s:.2f}s wall, {current.cpu_s:.2f}s CPU, peak RSS {current.peak_rss_mb:.0f}MB{counters}",
+        )
+        if _recorder is not None:
+            _recorder.record(current)
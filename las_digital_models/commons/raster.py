@@ -0,0 +1,100 @@
+"""Single-band rasters in memory (values, geotransform and spatial reference), so that the products of a tile
+(DTM, DSM, DHM) can be computed, masked and combined without intermediate files, and written only at the end (or
+never, eg. for services that only need the values).
+"""
+
+from typing import Optional, Tuple
+
+import numpy as np
+import rasterio
+from affine import Affine
+from rasterio.crs import CRS
+from rasterio.transform import array_bounds
+
+from las_digital_models.commons.raster_output import RasterOutputProfile
+
+
+class Raster:
+    """Single-band north-up float32 raster in memory"""
+
+    def __init__(self, data: np.ndarray, transform: Affine, srs_wkt: Optional[str] = None, no_data_value: int = -9999):
+        """
+        Args:
+            data (np.ndarray): raster values, shape (height, width), north-up (converted to float32)
+            transform (Affine): transform of the raster (upper-left corner of the upper-left pixel)
+            srs_wkt (Optional[str], optional): WKT of the spatial reference of the raster. Defaults to None.
+            no_data_value (int, optional): no data value of the raster. Defaults to -9999.
+
+        Raises:
+            ValueError: if data is not a 2d array
+        """
+        if data.ndim != 2:
+            raise ValueError(f"Raster values must be a 2d array, got shape {data.shape}")
+        self.data = data.astype(np.float32, copy=False)
+        self.transform = transform
+        self.srs_wkt = srs_wkt
+        self.no_data_value = no_data_value
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        """Shape of the raster (height, width)"""
+        return self.data.shape
+
+    @property
+    def pixel_size(self) -> float:
+        """Pixel size of the raster (pixels are supposed to be squares)"""
+        return self.transform.a
+
+    @property
+    def bounds(self) -> Tuple[float, float, float, float]:
+        """xmin, ymin, xmax, ymax of the raster"""
+        west, south, east, north = array_bounds(self.shape[0], self.shape[1], self.transform)
+
+        return (west, south, east, north)
+
+    def is_aligned(self, other: "Raster") -> bool:
+        """True if the other raster has the same grid (shape and transform)"""
+        return self.shape == other.shape and self.transform == other.transform
+
+    def write(self, output_file: str, output_profile: Optional[RasterOutputProfile] = None):
+        """Write the raster to a float32 GeoTIFF (same format as the rasters written by pdal, unless an output profile
+        is given). output_file can be in GDAL's in-memory filesystem (eg. /vsimem/tile.tif) to get an encoded raster
+        without writing to disk.
+
+        Args:
+            output_file (str): path to the output raster
+            output_profile (Optional[RasterOutputProfile], optional): format of the output raster (default: plain
+            GeoTIFF, cf. commons.raster_output). Defaults to None.
+        """
+        profile = {
+            "driver": "GTiff",
+            "width": self.shape[1],
+            "height": self.shape[0],
+            "count": 1,
+            "dtype": "float32",
+            "crs": CRS.from_wkt(self.srs_wkt) if self.srs_wkt else None,
+            "transform": self.transform,
+            "nodata": self.no_data_value,
+        }
+        output_profile = output_profile or RasterOutputProfile()
+        with output_profile.open_rasterio(output_file, **profile) as dst:
+            dst.write(self.data, 1)
+
+    @classmethod
+    def read(cls, input_file: str, no_data_value: int = -9999) -> "Raster":
+        """Read the first band of a raster file
+
+        Args:
+            input_file (str): path to the raster (can be in GDAL's in-memory filesystem)
+            no_data_value (int, optional): no data value, if the raster has none. Defaults to -9999.
+
+        Returns:
+            Raster: raster values, transform and spatial reference
+        """
+        with rasterio.open(input_file) as src:
+            return cls(
+                src.read(1, out_dtype="float32"),
+                src.transform,
+                src.crs.to_wkt() if src.crs else None,
+                src.nodata if src.nodata is not None else no_data_value,
+            )
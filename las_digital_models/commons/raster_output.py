@@ -0,0 +1,166 @@
+"""Output profile of the rasters written by the package (interpolation, DHM, no-data mask): plain GeoTIFF, tiled and
+compressed GeoTIFF, or cloud optimized GeoTIFF (COG), with optional internal overviews built in the same write
+(cf. configs/output_profile/default.yaml).
+"""
+
+import contextlib
+import math
+import uuid
+from typing import Dict, Iterator, List, Optional
+
+import rasterio
+import rasterio.shutil
+from rasterio.enums import Resampling
+
+DRIVERS = ("GTiff", "COG")
+# Codecs that can use the floating-point predictor
+PREDICTOR_CODECS = ("DEFLATE", "ZSTD", "LZW", "LZMA")
+# Lossy codecs, whose maximum error is set with max_z_error
+LERC_CODECS = ("LERC", "LERC_DEFLATE", "LERC_ZSTD")
+# Keys of a rasterio profile that describe the layout/compression of a GeoTIFF (replaced by the output profile)
+LAYOUT_KEYS = ("tiled", "blockxsize", "blockysize", "compress", "predictor", "zlevel", "zstd_level", "max_z_error")
+# Minimum size of the overviews when the rasters are not tiled
+DEFAULT_OVERVIEW_MIN_SIZE = 256
+
+
+class RasterOutputProfile:
+    """Format and creation options of the output rasters"""
+
+    def __init__(
+        self,
+        driver: str = "GTiff",
+        compress: Optional[str] = None,
+        predictor: bool = True,
+        level: Optional[int] = None,
+        max_z_error: float = 0.0,
+        block_size: Optional[int] = None,
+        overviews: bool = False,
+        overview_resampling: str = "average",
+    ):
+        """
+        Args:
+            driver (str, optional): "GTiff" or "COG" (cloud optimized GeoTIFF, always tiled). Defaults to "GTiff".
+            compress (Optional[str], optional): compression codec (eg. DEFLATE, ZSTD, LERC_ZSTD), None for no
+            compression. Defaults to None.
+            predictor (bool, optional): use the floating-point predictor (with DEFLATE, ZSTD, LZW and LZMA).
+            Defaults to True.
+            level (Optional[int], optional): compression level (None: default level of the codec). Defaults to None.
+            max_z_error (float, optional): maximum error of the LERC codecs, in the unit of the pixel values (0:
+            lossless). Defaults to 0.0.
+            block_size (Optional[int], optional): size of the internal tiles (None: striped GTiff, default block
+            size of the COG driver). Defaults to None.
+            overviews (bool, optional): build internal overviews, until they are smaller than a tile.
+            Defaults to False.
+            overview_resampling (str, optional): resampling method of the overviews. Defaults to "average".
+
+        Raises:
+            ValueError: if the driver is not GTiff or COG
+        """
+        if driver not in DRIVERS:
+            raise ValueError(f"Unsupported raster driver {driver}, expected one of {DRIVERS}")
+        self.driver = driver
+        self.compress = compress.upper() if compress else None
+        self.predictor = predictor
+        self.level = level
+        self.max_z_error = max_z_error
+        self.block_size = block_size
+        self.overviews = overviews
+        self.overview_resampling = overview_resampling
+
+    def is_default(self) -> bool:
+        """True if rasters are written as plain GeoTIFFs (striped, uncompressed, without overviews)"""
+        return self.driver == "GTiff" and not self.compress and not self.block_size and not self.overviews
+
+    def get_creation_options(self) -> Dict[str, str]:
+        """Get the GDAL creation options of the driver (except for the overviews of GTiff, that are copied from the
+        source dataset, cf. open_rasterio)"""
+        if self.is_default():
+            return {}
+
+        options = {"BIGTIFF": "IF_SAFER"}
+        if self.driver == "COG":
+            if self.block_size:
+                options["BLOCKSIZE"] = str(self.block_size)
+            options["OVERVIEWS"] = "AUTO" if self.overviews else "NONE"
+            if self.overviews:
+                options["RESAMPLING"] = self.overview_resampling.upper()
+        elif self.block_size:
+            options.update(TILED="YES", BLOCKXSIZE=str(self.block_size), BLOCKYSIZE=str(self.block_size))
+
+        if self.compress:
+            options["COMPRESS"] = self.compress
+            if self.predictor and self.compress in PREDICTOR_CODECS:
+                options["PREDICTOR"] = "FLOATING_POINT" if self.driver == "COG" else "3"
+            if self.compress in LERC_CODECS:
+                options["MAX_Z_ERROR"] = str(self.max_z_error)
+            if self.level is not None:
+                options[self._get_level_option()] = str(self.level)
+
+        return options
+
+    def _get_level_option(self) -> str:
+        if self.driver == "COG":
+            return "LEVEL"
+        if self.compress.endswith("ZSTD"):
+            return "ZSTD_LEVEL"
+        if self.compress == "LZMA":
+            return "LZMA_PRESET"
+        return "ZLEVEL"
+
+    def get_overview_factors(self, width: int, height: int) -> List[int]:
+        """Get the decimation factors of the overviews of a GTiff: powers of 2, until the overview is smaller than a
+        tile (same rule as the COG driver)"""
+        min_size = self.block_size or DEFAULT_OVERVIEW_MIN_SIZE
+        factors = []
+        size = max(width, height)
+        while size > min_size:
+            factors.append(2 ** (len(factors) + 1))
+            size = math.ceil(size / 2)
+
+        return factors
+
+    @contextlib.contextmanager
+    def open_rasterio(self, output_file: str, **profile) -> Iterator[rasterio.io.DatasetWriter]:
+        """Open the output raster for writing with rasterio, with this profile
+
+        Plain and tiled/compressed GeoTIFFs are written directly. COGs and GeoTIFFs with overviews are written in
+        GDAL's in-memory filesystem, then copied to output_file with their overviews when the dataset is closed.
+
+        Args:
+            output_file (str): path to the output raster
+            profile: rasterio profile of the raster (its layout and compression are replaced by this profile)
+
+        Yields:
+            rasterio.io.DatasetWriter: dataset to write
+        """
+        if self.is_default():
+            with rasterio.open(output_file, "w", **profile) as dst:
+                yield dst
+            return
+
+        profile = {key: value for key, value in profile.items() if key.lower() not in LAYOUT_KEYS}
+        profile["driver"] = "GTiff"
+        options = self.get_creation_options()
+        if self.driver == "GTiff" and not self.overviews:
+            with rasterio.open(output_file, "w", **profile, **options) as dst:
+                yield dst
+            return
+
+        tmp_file = f"/vsimem/{uuid.uuid4().hex}.tif"
+        try:
+            with rasterio.open(tmp_file, "w", **profile) as dst:
+                yield dst
+                if self.driver == "GTiff":
+                    factors = self.get_overview_factors(dst.width, dst.height)
+                    if factors:
+                        dst.build_overviews(factors, Resampling[self.overview_resampling])
+                        options["COPY_SRC_OVERVIEWS"] = "YES"
+            rasterio.shutil.copy(tmp_file, str(output_file), driver=self.driver, **options)
+        finally:
+            if rasterio.shutil.exists(tmp_file):
+                rasterio.shutil.delete(tmp_file)
+
+
+def get_output_profile_from_config(config: Dict) -> RasterOutputProfile:
+    """Get the output profile defined in config["output_profile"] (plain GeoTIFF if it is not set)"""
+    return RasterOutputProfile(**(config.get("output_profile") or {}))
@@ -0,0 +1,70 @@
+"""Asynchronous writes of rasters: the rasters of a tile are encoded and written on a background thread while the
+next rasters (or the next tile) are computed. GDAL releases the GIL while it encodes and writes a raster, so that the
+writes actually run in parallel with the triangulation and the rasterization.
+"""
+
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import List, Optional
+
+from las_digital_models.commons import metrics
+from las_digital_models.commons.raster import Raster
+from las_digital_models.commons.raster_output import RasterOutputProfile
+
+
+class AsyncRasterWriter:
+    """Write rasters on a pool of background threads. The number of rasters waiting to be written is bounded, so that
+    a slow disk does not accumulate rasters in memory."""
+
+    def __init__(self, max_pending: int = 4, nb_threads: int = 1):
+        """
+        Args:
+            max_pending (int, optional): maximum number of rasters waiting to be written (write blocks until a raster
+            is written when it is reached). Defaults to 4.
+            nb_threads (int, optional): number of threads that write the rasters. Defaults to 1.
+        """
+        self._executor = ThreadPoolExecutor(max_workers=max(nb_threads, 1), thread_name_prefix="raster_writer")
+        self._slots = threading.Semaphore(max(max_pending, 1))
+        self._futures: List[Future] = []
+
+    def __enter__(self) -> "AsyncRasterWriter":
+        return self
+
+    def __exit__(self, exc_type, *args):
+        try:
+            if exc_type is None:
+                self.flush()
+        finally:
+            self._executor.shutdown(wait=True)
+
+    def _write(
+        self, raster: Raster, output_file: str, output_profile: Optional[RasterOutputProfile], tile: Optional[str]
+    ):
+        try:
+            with metrics.span("write", tile=tile, output=os.path.basename(output_file)) as write_span:
+                raster.write(output_file, output_profile)
+                write_span.add(bytes_written=metrics.get_file_size(output_file))
+        finally:
+            self._slots.release()
+
+    def write(self, raster: Raster, output_file: str, output_profile: Optional[RasterOutputProfile] = None):
+        """Write a raster in the background (cf. Raster.write). The raster must not be modified afterwards.
+
+        The write is measured in a "write" span of the tile of the current span (spans are not nested across
+        threads). Errors are raised by flush.
+        """
+        current_span = metrics.get_current_span()
+        tile = current_span.tile if current_span is not None else None
+        self._slots.acquire()
+        self._futures.append(self._executor.submit(self._write, raster, output_file, output_profile, tile))
+
+    def flush(self):
+        """Wait for all the rasters to be written
+
+        Raises:
+            Exception: the first error raised by a write
+        """
+        futures, self._futures = self._futures, []
+        for future in futures:
+            future.result()
@@ -0,0 +1,103 @@
+import logging
+from typing import Optional, Sequence
+
+import geopandas as gpd
+import numpy as np
+from shapely.geometry import LineString
+
+from las_digital_models.extract_stat_from_raster.rasters.lines_zonal_stats import (
+    check_statistics,
+    compute_lines_stats,
+)
+
+
+def extract_polylines_stats_from_dsm(
+    lines_gdf: gpd.GeoDataFrame,
+    dsm_rasterpath: str,
+    stats: Sequence[str] = (),
+    z_statistic: Optional[str] = "min",
+    profile_step: Optional[float] = None,
+    no_data_value: int = 9999,
+    prefix: str = "z_",
+    block_size: int = 512,
+    nb_workers: int = 1,
+) -> gpd.GeoDataFrame:
+    """
+    Extracts statistics of a DSM raster along each LineString of a GeoDataFrame, all computed from a single read of
+    each block of the raster (cf. lines_zonal_stats.compute_lines_stats).
+
+    The statistics are written as attributes, and/or as the Z of the vertices of the lines:
+    - with profile_step: the lines are replaced by their profile, sampled every profile_step along the line (samples
+    without valid pixel are dropped)
+    - else with z_statistic: the vertices of the lines get the value of this statistic as Z (as in
+    extract_z_min_from_raster_by_polylines.extract_polylines_min_z_from_dsm for z_statistic="min")
+    - else: the geometries are not modified
+
+    Lines with no valid pixel (and profiles with less than 2 valid samples) are removed.
+
+    Args:
+        lines_gdf (gpd.GeoDataFrame): GeoDataFrame with 2D lines.
+        dsm_rasterpath (str): Path to the DSM raster (.vrt).
+        stats (Sequence[str]): statistics written as attributes `{prefix}{stat}` (eg. z_max), cf.
+        lines_zonal_stats.compute_lines_stats (default to none)
+        z_statistic (str, optional): statistic used as Z of the vertices, None to keep 2D lines (default to "min")
+        profile_step (float, optional): distance between the vertices of the profiles (default to None: no profile)
+        no_data_value (int): no data value (default to 9999)
+        prefix (str): prefix of the attributes (default to "z_")
+        block_size (int): size (in pixels) of the raster blocks used to group the lines (default to 512)
+        nb_workers (int): number of processes used to compute the statistics (default to 1)
+
+    Returns:
+        GeoDataFrame: lines with the statistics as attributes and/or as Z.
+
+    Raises:
+        ValueError: if a statistic is unknown
+    """
+    computed_stats = list(dict.fromkeys([*stats, "count", *([z_statistic] if z_statistic else [])]))
+    check_statistics(computed_stats)
+
+    is_linestring = np.array([isinstance(geom, LineString) for geom in lines_gdf.geometry], dtype=bool)
+    for geom in lines_gdf.geometry[~is_linestring]:
+        logging.warning(f"Geometry {geom} is not a LineString (ignored).")
+    lines_gdf = lines_gdf[is_linestring].copy()
+
+    results = compute_lines_stats(
+        list(lines_gdf.geometry),
+        dsm_rasterpath,
+        no_data_value,
+        computed_stats,
+        profile_step=profile_step,
+        block_size=block_size,
+        nb_workers=nb_workers,
+    )
+
+    geometries = []
+    keep = []
+    for geom, result in zip(lines_gdf.geometry, results):
+        if result["count"] == 0:
+            logging.warning(f"No valid value found for geometry {geom} (ignored).")
+            geometries.append(None)
+            keep.append(False)
+            continue
+
+        if profile_step is not None:
+            profile = result["profile"]
+            profile = profile[~np.isnan(profile[:, 2])]
+            if len(profile) < 2:
+                logging.warning(f"Less than 2 valid samples in the profile of geometry {geom} (ignored).")
+                geometries.append(None)
+                keep.append(False)
+                continue
+            geom = LineString(np.column_stack([profile[:, :2], np.round(profile[:, 2], 2)]))
+        elif z_statistic:
+            z = round(result[z_statistic], 2)
+            geom = LineString([(x, y, z) for x, y in geom.coords])
+
+        geometries.append(geom)
+        keep.append(True)
+
+    for stat in stats:
+        lines_gdf[f"{prefix}{stat}"] = [result[stat] for result in results]
+    lines_gdf[lines_gdf.geometry.name] = gpd.GeoSeries(geometries, index=lines_gdf.index, crs=lines_gdf.crs)
+
+    return lines_gdf[np.array(keep, dtype=bool)]
@@ -1,10 +1,19 @@
 import logging
+from typing import Optional
 
 import geopandas as gpd
 import rasterio
-from rasterstats import zonal_stats
 from shapely.geometry import LineString, box
 
+from las_digital_models.extract_stat_from_raster.rasters.lines_cache import (
+    LinesMinZCache,
+    RasterIndex,
+    compute_lines_min_with_cache,
+)
+from las_digital_models.extract_stat_from_raster.rasters.lines_zonal_stats import (
+    compute_lines_min,
+)
+
 
 def clip_lines_by_raster(input_lines: gpd.GeoDataFrame, input_raster: str, crs: str = None) -> gpd.GeoDataFrame:
     """
@@ -34,27 +43,62 @@ def clip_lines_by_raster(input_lines: gpd.GeoDataFrame, input_raster: str, crs:
 
 
 def extract_polylines_min_z_from_dsm(
-    lines_gdf: gpd.GeoDataFrame, dsm_rasterpath: str, no_data_value: int = 9999
+    lines_gdf: gpd.GeoDataFrame,
+    dsm_rasterpath: str,
+    no_data_value: int = 9999,
+    block_size: int = 512,
+    nb_workers: int = 1,
+    cache: Optional[LinesMinZCache] = None,
+    raster_index: Optional[RasterIndex] = None,
 ) -> gpd.GeoDataFrame:
     """
     Extracts the minimum Z value from a DSM raster for each polyline (LineString or MultiLineString)
     in the input shapefile, keeping the original geometry.
 
+    The minimum is computed on all the pixels touched by the line (same results as rasterstats.zonal_stats with
+    all_touched=True), by batches of lines that are close to each other (cf. lines_zonal_stats.compute_lines_min).
+
     Args:
         lines_gdf (str): GeoDataFrame with 2D lines.
         dsm_rasterpath (str): Path to the DSM raster (.vrt).
         no_data_value (int): no data value (default to -9999)
+        block_size (int): size (in pixels) of the raster blocks used to group the lines (default to 512)
+        nb_workers (int): number of processes used to compute the minimums (default to 1)
+        cache (LinesMinZCache, optional): persistent cache of the minimums: only the lines that are not in the
+        cache are computed (cf. lines_cache). Requires raster_index (default to None: no cache)
+        raster_index (RasterIndex, optional): raster tiles of dsm_rasterpath, used to invalidate the cached lines
+        when a raster changes (default to None)
 
     Returns:
         GeoDataFrame: A GeoDataFrame with generated 3D Lines.
-    """
 
-    def get_z_min_on_linestring(geom, dsm_rasterpath):
-        if isinstance(geom, LineString):
-            stats = zonal_stats(
-                vectors=[geom], raster=dsm_rasterpath, stats=["min"], all_touched=True, nodata=no_data_value
-            )
-            min_z = stats[0]["min"]
+    Raises:
+        ValueError: if a cache is given without raster_index
+    """
+    if cache is not None and raster_index is None:
+        raise ValueError("A raster index is required to use the lines min Z cache")
+
+    is_linestring = [isinstance(geom, LineString) for geom in lines_gdf["geometry"]]
+    linestrings = [geom for geom, keep in zip(lines_gdf["geometry"], is_linestring) if keep]
+    if cache is not None:
+        min_z_values, _ = compute_lines_min_with_cache(
+            linestrings,
+            dsm_rasterpath,
+            no_data_value,
+            cache,
+            raster_index,
+            block_size=block_size,
+            nb_workers=nb_workers,
+        )
+    else:
+        min_z_values = compute_lines_min(
+            linestrings, dsm_rasterpath, no_data_value, block_size=block_size, nb_workers=nb_workers
+        )
+    min_z_values = iter(min_z_values)
+
+    def get_z_min_on_linestring(geom, keep):
+        if keep:
+            min_z = next(min_z_values)
 
             if min_z is None or int(min_z) == no_data_value:
                 logging.warning(f"No valid Zmin found for geometry {geom} (ignored).")
@@ -68,7 +112,9 @@ def extract_polylines_min_z_from_dsm(
             return None
 
     # Apply this function "get_z_min in linestring"
-    lines_gdf["geometry"] = lines_gdf["geometry"].apply(lambda geom: get_z_min_on_linestring(geom, dsm_rasterpath))
+    lines_gdf["geometry"] = [
+        get_z_min_on_linestring(geom, keep) for geom, keep in zip(lines_gdf["geometry"], is_linestring)
+    ]
 
     def is_invalid(geom):
         if geom is None:
@@ -0,0 +1,223 @@
+"""Persistent cache of the minimum Z along lines, so that a new run of the extraction only computes the lines that
+are new or changed, or that cross a raster that changed since the previous run.
+
+The cache is a SQLite database, with one row per line. Its key is a hash of:
+- the geometry of the line (WKB, in the spatial reference of the extraction)
+- the signature (path, size and modification time or content hash) of each raster tile that can be touched by the
+line (cf. commons.get_file_signature)
+- the no data value and the version of the package
+
+When the database is larger than its maximum size, the least recently used lines are evicted.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import rasterio
+from shapely import STRtree, box
+
+from las_digital_models.commons import commons, metrics
+from las_digital_models.extract_stat_from_raster.rasters.lines_zonal_stats import (
+    compute_lines_min,
+)
+from las_digital_models.version import __version__
+
+log = commons.get_logger(__name__)
+
+# Share of the lines that are evicted at once when the database is too large
+EVICTION_RATIO = 0.1
+# Number of keys per query (SQLite limits the number of parameters of a query)
+QUERY_BATCH_SIZE = 500
+
+
+class RasterIndex:
+    """Bounds and signatures of the raster tiles of a folder, to find the tiles that a line can touch"""
+
+    def __init__(self, raster_files: Sequence[str], use_hash: bool = False):
+        """
+        Args:
+            raster_files (Sequence[str]): paths to the raster tiles (eg. the tiles of the VRT of the extraction)
+            use_hash (bool, optional): identify the rasters by a hash of their content instead of their modification
+            time. Defaults to False.
+        """
+        self.raster_files = sorted(raster_files)
+        boxes = []
+        pixel_sizes = []
+        for raster_file in self.raster_files:
+            with rasterio.open(raster_file) as src:
+                boxes.append(box(*src.bounds))
+                pixel_sizes.append(max(abs(src.transform.a), abs(src.transform.e)))
+        self.tree = STRtree(boxes)
+        # Lines can touch the pixels of their window, which can extend by one pixel beyond their bounds
+        self.margin = max(pixel_sizes, default=0)
+        self.signatures = [
+            json.dumps([raster_file, commons.get_file_signature(raster_file, use_hash)], sort_keys=True)
+            for raster_file in self.raster_files
+        ]
+
+    def get_raster_signatures(self, geometries: Sequence) -> List[List[str]]:
+        """Get the signatures of the rasters that can be touched by each geometry (sorted by path)"""
+        if not geometries:
+            return []
+        indices = self.tree.query([geometry.buffer(self.margin).envelope for geometry in geometries], "intersects")
+        signatures = [[] for _ in geometries]
+        # raster_files are sorted, so sorting the raster indices sorts the signatures by path
+        for geometry_index, raster_index in sorted(zip(indices[0].tolist(), indices[1].tolist())):
+            signatures[geometry_index].append(self.signatures[raster_index])
+
+        return signatures
+
+
+class LinesMinZCache:
+    """SQLite cache of the minimum Z of lines, with least recently used eviction"""
+
+    def __init__(self, path: str, max_size_mb: float = 1024):
+        """
+        Args:
+            path (str): path to the SQLite database (created if it does not exist)
+            max_size_mb (float, optional): maximum size of the database in MB. Defaults to 1024.
+        """
+        self.path = path
+        self.max_size_mb = max_size_mb
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.connection = sqlite3.connect(path)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS lines_min_z (key TEXT PRIMARY KEY, min_z REAL, last_used REAL NOT NULL)"
+        )
+        self.connection.execute("CREATE INDEX IF NOT EXISTS lines_min_z_last_used ON lines_min_z (last_used)")
+        self.connection.commit()
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @staticmethod
+    def get_key(geometry, raster_signatures: Sequence[str], nodata: float) -> str:
+        """Get the key of a line (cf. the docstring of the module)"""
+        sha256 = hashlib.sha256(geometry.wkb)
+        sha256.update(json.dumps([list(raster_signatures), float(nodata), __version__]).encode())
+
+        return sha256.hexdigest()
+
+    def get(self, keys: Sequence[str]) -> Dict[str, Optional[float]]:
+        """Get the cached minimums of some keys (keys that are not in the cache are missing from the result), and
+        mark them as used"""
+        found = {}
+        for start in range(0, len(keys), QUERY_BATCH_SIZE):
+            batch = list(keys[slice(start, start + QUERY_BATCH_SIZE)])
+            placeholders = ",".join("?" * len(batch))
+            rows = self.connection.execute(
+                f"SELECT key, min_z FROM lines_min_z WHERE key IN ({placeholders})", batch
+            ).fetchall()
+            found.update(rows)
+            self.connection.execute(
+                f"UPDATE lines_min_z SET last_used = ? WHERE key IN ({placeholders})", [time.time(), *batch]
+            )
+        self.connection.commit()
+
+        return found
+
+    def put(self, values: Dict[str, Optional[float]]):
+        """Add minimums to the cache (None for lines without valid pixel), then evict lines if it is too large"""
+        now = time.time()
+        self.connection.executemany(
+            "INSERT OR REPLACE INTO lines_min_z (key, min_z, last_used) VALUES (?, ?, ?)",
+            [(key, value, now) for key, value in values.items()],
+        )
+        self.connection.commit()
+        self.evict()
+
+    def get_size_mb(self) -> float:
+        """Size of the data of the database in MB (without the free pages, that are reused by new lines)"""
+        page_size = self.connection.execute("PRAGMA page_size").fetchone()[0]
+        page_count = self.connection.execute("PRAGMA page_count").fetchone()[0]
+        freelist_count = self.connection.execute("PRAGMA freelist_count").fetchone()[0]
+
+        return (page_count - freelist_count) * page_size / 1024 / 1024
+
+    def __len__(self) -> int:
+        return self.connection.execute("SELECT COUNT(*) FROM lines_min_z").fetchone()[0]
+
+    def evict(self) -> int:
+        """Remove the least recently used lines until the database is smaller than max_size_mb
+
+        Returns:
+            int: number of evicted lines
+        """
+        nb_evicted = 0
+        while self.get_size_mb() > self.max_size_mb:
+            nb_lines = len(self)
+            if nb_lines == 0:
+                break
+            nb_to_evict = max(1, int(nb_lines * EVICTION_RATIO))
+            self.connection.execute(
+                "DELETE FROM lines_min_z WHERE key IN " "(SELECT key FROM lines_min_z ORDER BY last_used LIMIT ?)",
+                (nb_to_evict,),
+            )
+            self.connection.commit()
+            nb_evicted += nb_to_evict
+        if nb_evicted:
+            log.info(f"Evicted {nb_evicted} lines from the cache {self.path}")
+
+        return nb_evicted
+
+
+def compute_lines_min_with_cache(
+    geometries: Sequence,
+    raster_path: str,
+    nodata: float,
+    cache: LinesMinZCache,
+    raster_index: RasterIndex,
+    block_size: int = 512,
+    nb_workers: int = 1,
+) -> Tuple[List[Optional[float]], int]:
+    """Compute the minimum value of a raster along each geometry (cf. lines_zonal_stats.compute_lines_min), only for
+    the geometries that are not in the cache
+
+    The number of cache hits and misses is logged, and added to the current span (cf. commons.metrics).
+
+    Args:
+        geometries (Sequence): shapely geometries (eg. LineStrings)
+        raster_path (str): path to the raster (eg. the .vrt of the raster tiles)
+        nodata (float): no data value
+        cache (LinesMinZCache): cache of the minimums
+        raster_index (RasterIndex): raster tiles of raster_path, used to identify the rasters touched by each line
+        block_size (int, optional): size (in pixels) of the blocks used to group the geometries. Defaults to 512.
+        nb_workers (int, optional): number of processes used to compute the blocks. Defaults to 1.
+
+    Returns:
+        Tuple[List[Optional[float]], int]: minimum value for each geometry (None if there is no valid pixel), and
+        number of cache hits
+    """
+    keys = [
+        cache.get_key(geometry, signatures, nodata)
+        for geometry, signatures in zip(geometries, raster_index.get_raster_signatures(geometries))
+    ]
+    cached = cache.get(keys)
+    missing = [index for index, key in enumerate(keys) if key not in cached]
+
+    computed = compute_lines_min(
+        [geometries[index] for index in missing], raster_path, nodata, block_size=block_size, nb_workers=nb_workers
+    )
+    cache.put({keys[index]: value for index, value in zip(missing, computed)})
+
+    minimums = [cached.get(key) for key in keys]
+    for index, value in zip(missing, computed):
+        minimums[index] = value
+
+    nb_hits = len(geometries) - len(missing)
+    log.info(f"Lines min Z cache: {nb_hits} hits, {len(missing)} misses ({cache.path})")
+    span = metrics.get_current_span()
+    if span is not None:
+        span.add(cache_hits=nb_hits, cache_misses=len(missing))
+
+    return minimums, nb_hits
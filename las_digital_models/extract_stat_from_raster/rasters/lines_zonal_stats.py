@@ -0,0 +1,612 @@
+"""Compute the minimum (or other statistics) of the raster values along many lines at once.
+
+This gives the same results as calling `rasterstats.zonal_stats(..., stats=["min"], all_touched=True)` once per
+line, but the lines are grouped by blocks of the raster so that each block window is read only once, and all the
+lines of a window are rasterized together (labelled burn) before reducing the minimum of each label with numpy.
+compute_lines_stats computes several statistics (and samples a profile along each line) from the same single read.
+"""
+
+import math
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+import rasterio
+import shapely
+from affine import Affine
+from rasterio.enums import MaskFlags
+from rasterio.features import rasterize
+from rasterio.windows import Window
+from shapely import get_coordinates
+
+# (row_start, row_stop), (col_start, col_stop)
+PixelWindow = Tuple[Tuple[int, int], Tuple[int, int]]
+
+# Statistics of compute_lines_stats (in addition to percentile_<q>)
+STATISTICS = ["min", "max", "mean", "median", "sum", "count", "std", "range"]
+
+# Raster opened in the current worker process (cf. _init_worker)
+_dataset = None
+
+
+def get_geometry_window(bounds: Tuple[float, float, float, float], transform: Affine) -> PixelWindow:
+    """Get the window of pixels that covers a bounding box, computed exactly as in rasterstats (`bounds_window`)
+
+    Args:
+        bounds (Tuple[float, float, float, float]): bounding box as (west, south, east, north)
+        transform (Affine): transform of the raster
+
+    Returns:
+        PixelWindow: window as ((row_start, row_stop), (col_start, col_stop)), that can extend beyond the raster
+    """
+    west, south, east, north = bounds
+    row_start = int(math.floor((north - transform.f) / transform.e))
+    col_start = int(math.floor((west - transform.c) / transform.a))
+    row_stop = int(math.ceil((south - transform.f) / transform.e))
+    col_stop = int(math.ceil((east - transform.c) / transform.a))
+
+    return (row_start, row_stop), (col_start, col_stop)
+
+
+def group_windows_by_block(windows: Sequence[PixelWindow], block_size: int) -> List[List[int]]:
+    """Group windows by the block of the raster (square of block_size pixels) that contains their upper-left corner
+
+    Args:
+        windows (Sequence[PixelWindow]): pixel windows
+        block_size (int): size of the blocks in pixels
+
+    Returns:
+        List[List[int]]: indices of the windows in each (non-empty) block
+    """
+    groups = {}
+    for index, ((row_start, _), (col_start, _)) in enumerate(windows):
+        groups.setdefault((row_start // block_size, col_start // block_size), []).append(index)
+
+    return [groups[key] for key in sorted(groups)]
+
+
+def split_in_layers(windows: Sequence[PixelWindow]) -> List[List[int]]:
+    """Split windows into layers of windows that do not overlap, so that each layer can be rasterized at once
+    without any pixel being shared by two geometries.
+
+    Each window goes to the first layer where it does not overlap any window. Only the bounds of the windows are
+    compared, so that the memory does not depend on the size of the windows nor on the number of layers.
+
+    Args:
+        windows (Sequence[PixelWindow]): pixel windows
+
+    Returns:
+        List[List[int]]: indices of the windows in each layer
+    """
+    # (row_start, row_stop, col_start, col_stop) of each window
+    bounds = np.array([[*rows, *cols] for rows, cols in windows], dtype=np.int64).reshape(-1, 4)
+    window_layers = np.zeros(len(windows), dtype=np.int64)
+    layers = []
+    for index, (row_start, row_stop, col_start, col_stop) in enumerate(bounds):
+        previous = bounds[:index]
+        overlaps = (
+            (previous[:, 0] < row_stop)
+            & (row_start < previous[:, 1])
+            & (previous[:, 2] < col_stop)
+            & (col_start < previous[:, 3])
+        )
+        used_layers = np.zeros(len(layers) + 1, dtype=bool)
+        used_layers[window_layers[:index][overlaps]] = True
+        layer = int(np.argmin(used_layers))
+        if layer == len(layers):
+            layers.append([])
+        layers[layer].append(index)
+        window_layers[index] = layer
+
+    return layers
+
+
+def get_window_transform(transform: Affine, window: PixelWindow) -> Affine:
+    """Get the transform of a window, computed exactly as in rasterstats (`Raster.read`)"""
+    (row_start, row_stop), (col_start, col_stop) = window
+    west, _ = transform * (col_start, row_stop)
+    _, north = transform * (col_stop, row_start)
+
+    return Affine(transform.a, transform.b, west, transform.d, transform.e, north)
+
+
+def has_vertex_on_pixel_edge(geometry, transform: Affine, tolerance: float = 1e-6) -> bool:
+    """Check if a vertex of a geometry lies on the edge of a pixel.
+
+    For such geometries, the pixels touched by the geometry depend on floating point rounding in GDAL, that
+    depends on the origin of the window in which they are rasterized.
+
+    Args:
+        geometry: shapely geometry
+        transform (Affine): transform of the raster
+        tolerance (float, optional): tolerance in pixels. Defaults to 1e-6.
+
+    Returns:
+        bool: True if at least one vertex is on the edge of a pixel
+    """
+    coordinates = get_coordinates(geometry)
+    cols = (coordinates[:, 0] - transform.c) / transform.a
+    rows = (coordinates[:, 1] - transform.f) / transform.e
+
+    return bool(np.any(np.abs(cols - np.round(cols)) < tolerance) or np.any(np.abs(rows - np.round(rows)) < tolerance))
+
+
+def compute_min_by_label(labels: np.ndarray, values: np.ndarray) -> Dict[int, float]:
+    """Compute the minimum value of each label
+
+    Args:
+        labels (np.ndarray): 1d array of labels
+        values (np.ndarray): 1d array of values (same size as labels)
+
+    Returns:
+        Dict[int, float]: minimum value for each label found in labels
+    """
+    if labels.size == 0:
+        return {}
+
+    order = np.argsort(labels, kind="stable")
+    sorted_labels = labels[order]
+    unique_labels, starts = np.unique(sorted_labels, return_index=True)
+    minimums = np.minimum.reduceat(values[order], starts)
+
+    return {int(label): float(minimum) for label, minimum in zip(unique_labels, minimums)}
+
+
+def read_window(dataset, window: PixelWindow, nodata: float) -> np.ndarray:
+    """Read the valid values of the first band of a raster in a (possibly boundless) window
+
+    Invalid values (nodata, nan and pixels masked by a dataset mask such as the alpha band of a VRT) are
+    returned as masked, with the same rules as in rasterstats.
+
+    Args:
+        dataset: rasterio dataset
+        window (PixelWindow): window to read
+        nodata (float): no data value
+
+    Returns:
+        np.ndarray: masked array of the values in the window
+    """
+    masked = all(MaskFlags.per_dataset in flags for flags in dataset.mask_flag_enums)
+    data = dataset.read(1, window=Window.from_slices(*window, boundless=True), boundless=True, masked=masked)
+    invalid = np.ma.getmaskarray(data) | (np.ma.getdata(data) == nodata)
+    if np.issubdtype(data.dtype, np.floating):
+        invalid |= np.isnan(np.ma.getdata(data))
+
+    return np.ma.MaskedArray(np.ma.getdata(data), mask=invalid)
+
+
+def iter_lines_pixels_in_window(
+    dataset,
+    geometries: Sequence,
+    windows: Sequence[PixelWindow],
+    data: np.ma.MaskedArray,
+    origin: Tuple[int, int],
+) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    """Find the valid pixels touched by each geometry, for geometries that are close to each other: the geometries
+    are rasterized by layers of non-overlapping geometries, each layer in the window that covers its geometries.
+
+    Args:
+        dataset: rasterio dataset
+        geometries (Sequence): shapely geometries
+        windows (Sequence[PixelWindow]): window of each geometry (cf. get_geometry_window)
+        data (np.ma.MaskedArray): values of the window that covers all the windows (cf. read_window)
+        origin (Tuple[int, int]): (row, col) of the upper-left pixel of data
+
+    Yields:
+        Tuple[np.ndarray, np.ndarray]: index of the geometry and value of each valid touched pixel, by batches
+    """
+    row_start, col_start = origin
+
+    # Geometries that have a vertex on the edge of a pixel are rasterized one by one in their own window (as in
+    # rasterstats) to get exactly the same touched pixels, the other ones are rasterized by layers
+    batched = []
+    for index, geometry in enumerate(geometries):
+        if has_vertex_on_pixel_edge(geometry, dataset.transform):
+            (window_row_start, window_row_stop), (window_col_start, window_col_stop) = windows[index]
+            rows = slice(window_row_start - row_start, window_row_stop - row_start)
+            cols = slice(window_col_start - col_start, window_col_stop - col_start)
+            window_data = data[rows, cols]
+            if window_data.size == 0:
+                continue
+            burned = rasterize(
+                [(geometry, 1)],
+                out_shape=window_data.shape,
+                transform=get_window_transform(dataset.transform, windows[index]),
+                fill=0,
+                dtype="uint8",
+                all_touched=True,
+            ).astype(bool)
+            values = window_data.data[burned & ~window_data.mask]
+            yield np.full(values.size, index), values
+        else:
+            batched.append(index)
+
+    for layer in split_in_layers([windows[index] for index in batched]):
+        layer = np.array([batched[index] for index in layer])
+        (layer_row_start, layer_row_stop), (layer_col_start, layer_col_stop) = get_union_window(
+            [windows[index] for index in layer]
+        )
+        if layer_row_stop <= layer_row_start or layer_col_stop <= layer_col_start:
+            continue
+        # Labels are 1-based indices of the geometries in the layer (0 is the background)
+        burned = rasterize(
+            [(geometries[index], label) for label, index in enumerate(layer, start=1)],
+            out_shape=(layer_row_stop - layer_row_start, layer_col_stop - layer_col_start),
+            transform=dataset.transform * Affine.translation(layer_col_start, layer_row_start),
+            fill=0,
+            dtype="int32",
+            all_touched=True,
+        )
+        # Only keep the pixels that are inside the window of their geometry (as rasterstats reads this window only)
+        indices, values = [], []
+        for label, index in enumerate(layer, start=1):
+            (window_row_start, window_row_stop), (window_col_start, window_col_stop) = windows[index]
+            layer_rows = slice(window_row_start - layer_row_start, window_row_stop - layer_row_start)
+            layer_cols = slice(window_col_start - layer_col_start, window_col_stop - layer_col_start)
+            rows = slice(window_row_start - row_start, window_row_stop - row_start)
+            cols = slice(window_col_start - col_start, window_col_stop - col_start)
+            window_burned = burned[layer_rows, layer_cols]
+            window_data = data[rows, cols]
+            window_values = window_data.data[(window_burned == label) & ~window_data.mask]
+            indices.append(np.full(window_values.size, index))
+            values.append(window_values)
+
+        yield np.concatenate(indices), np.concatenate(values)
+
+
+def get_union_window(windows: Sequence[PixelWindow]) -> PixelWindow:
+    """Get the window that covers all the windows"""
+    row_start = min(window[0][0] for window in windows)
+    row_stop = max(window[0][1] for window in windows)
+    col_start = min(window[1][0] for window in windows)
+    col_stop = max(window[1][1] for window in windows)
+
+    return (row_start, row_stop), (col_start, col_stop)
+
+
+def compute_lines_min_in_window(
+    dataset, geometries: Sequence, windows: Sequence[PixelWindow], nodata: float
+) -> List[Optional[float]]:
+    """Compute the minimum raster value along each geometry, for geometries that are close to each other:
+    the window that covers all of them is read once, then the geometries are rasterized by layers of
+    non-overlapping geometries.
+
+    Args:
+        dataset: rasterio dataset
+        geometries (Sequence): shapely geometries
+        windows (Sequence[PixelWindow]): window of each geometry (cf. get_geometry_window)
+        nodata (float): no data value
+
+    Returns:
+        List[Optional[float]]: minimum value for each geometry (None if there is no valid pixel)
+    """
+    (row_start, row_stop), (col_start, col_stop) = get_union_window(windows)
+    if row_stop <= row_start or col_stop <= col_start:
+        return [None] * len(geometries)
+
+    data = read_window(dataset, ((row_start, row_stop), (col_start, col_stop)), nodata)
+
+    minimums = [None] * len(geometries)
+    for indices, values in iter_lines_pixels_in_window(dataset, geometries, windows, data, (row_start, col_start)):
+        for index, minimum in compute_min_by_label(indices, values).items():
+            minimums[index] = minimum
+
+    return minimums
+
+
+def compute_stats_by_label(labels: np.ndarray, values: np.ndarray, stats: Sequence[str]) -> Dict[int, Dict]:
+    """Compute statistics of the values of each label, vectorized over all the labels
+
+    Percentiles are interpolated linearly between the closest values, as in np.percentile (and rasterstats).
+
+    Args:
+        labels (np.ndarray): 1d array of labels
+        values (np.ndarray): 1d array of values (same size as labels)
+        stats (Sequence[str]): statistics to compute (cf. check_statistics)
+
+    Returns:
+        Dict[int, Dict]: statistics for each label found in labels
+    """
+    if labels.size == 0:
+        return {}
+
+    order = np.lexsort((values, labels))
+    sorted_values = values[order].astype(np.float64)
+    unique_labels, starts, counts = np.unique(labels[order], return_index=True, return_counts=True)
+    lasts = starts + counts - 1
+
+    results = {}
+    sums = np.add.reduceat(sorted_values, starts)
+    means = sums / counts
+    for stat in stats:
+        if stat == "min":
+            results[stat] = sorted_values[starts]
+        elif stat == "max":
+            results[stat] = sorted_values[lasts]
+        elif stat == "range":
+            results[stat] = sorted_values[lasts] - sorted_values[starts]
+        elif stat == "count":
+            results[stat] = counts
+        elif stat == "sum":
+            results[stat] = sums
+        elif stat == "mean":
+            results[stat] = means
+        elif stat == "std":
+            deviations = sorted_values - np.repeat(means, counts)
+            results[stat] = np.sqrt(np.add.reduceat(deviations**2, starts) / counts)
+        else:
+            q = 50 if stat == "median" else get_percentile(stat)
+            positions = starts + q / 100 * (counts - 1)
+            lower = np.floor(positions).astype(int)
+            upper = np.minimum(lower + 1, lasts)
+            weights = positions - lower
+            # same interpolation as np.percentile (lerp from the closest value, for symmetric rounding)
+            diffs = sorted_values[upper] - sorted_values[lower]
+            results[stat] = np.where(
+                weights >= 0.5, sorted_values[upper] - diffs * (1 - weights), sorted_values[lower] + diffs * weights
+            )
+
+    return {
+        int(label): {stat: (int if stat == "count" else float)(results[stat][i]) for stat in stats}
+        for i, label in enumerate(unique_labels)
+    }
+
+
+def get_percentile(stat: str) -> float:
+    """Get the percentile of a statistic named percentile_<q> (eg. percentile_90), as in rasterstats
+
+    Raises:
+        ValueError: if stat is not a percentile between 0 and 100
+    """
+    prefix = "percentile_"
+    try:
+        q = float(stat.removeprefix(prefix)) if stat.startswith(prefix) else None
+    except ValueError:
+        q = None
+    if q is None or not 0 <= q <= 100:
+        raise ValueError(f"Unknown statistic {stat}, expected one of {STATISTICS} or percentile_<q> (0 <= q <= 100)")
+
+    return q
+
+
+def check_statistics(stats: Sequence[str]):
+    """Check that all the statistics are known (cf. STATISTICS and get_percentile)
+
+    Raises:
+        ValueError: if a statistic is unknown
+    """
+    for stat in stats:
+        if stat not in STATISTICS:
+            get_percentile(stat)
+
+
+def sample_profiles(geometries: Sequence, data: np.ma.MaskedArray, transform: Affine, step: float) -> List[np.ndarray]:
+    """Sample the raster values along each line every `step` (in the units of the raster), vectorized over all the
+    lines: points are interpolated along the lines at distances 0, step, 2 * step, ... and at the end of the line, and
+    get the value of the pixel that contains them
+
+    Args:
+        geometries (Sequence): shapely (Multi)LineStrings
+        data (np.ma.MaskedArray): values of a window that contains all the geometries (cf. read_window)
+        transform (Affine): transform of the window
+        step (float): distance between two samples
+
+    Returns:
+        List[np.ndarray]: (x, y, z) of the samples of each geometry, shape (nb_samples, 3), z is nan where there is
+        no valid pixel
+    """
+    if len(geometries) == 0:
+        return []
+
+    geometries = np.asarray(geometries, dtype=object)
+    lengths = shapely.length(geometries)
+    nb_samples = np.ceil(lengths / step).astype(int) + 1
+    starts = np.cumsum(nb_samples) - nb_samples
+    distances = np.minimum(
+        (np.arange(nb_samples.sum()) - np.repeat(starts, nb_samples)) * step, np.repeat(lengths, nb_samples)
+    )
+    coordinates = get_coordinates(shapely.line_interpolate_point(np.repeat(geometries, nb_samples), distances))
+
+    cols = np.floor((coordinates[:, 0] - transform.c) / transform.a).astype(int)
+    rows = np.floor((coordinates[:, 1] - transform.f) / transform.e).astype(int)
+    inside = (rows >= 0) & (rows < data.shape[0]) & (cols >= 0) & (cols < data.shape[1])
+    z = np.full(len(coordinates), np.nan)
+    valid = inside.copy()
+    valid[inside] = ~np.ma.getmaskarray(data)[rows[inside], cols[inside]]
+    z[valid] = data.data[rows[valid], cols[valid]]
+
+    return np.split(np.column_stack([coordinates, z]), starts[1:])
+
+
+def compute_lines_stats_in_window(
+    dataset,
+    geometries: Sequence,
+    windows: Sequence[PixelWindow],
+    nodata: float,
+    stats: Sequence[str],
+    profile_step: Optional[float] = None,
+) -> List[Dict]:
+    """Compute statistics of the raster values along each geometry (and sample their profiles), for geometries that
+    are close to each other, from a single read of the window that covers all of them (cf.
+    compute_lines_min_in_window)
+
+    Args:
+        dataset: rasterio dataset
+        geometries (Sequence): shapely geometries
+        windows (Sequence[PixelWindow]): window of each geometry (cf. get_geometry_window)
+        nodata (float): no data value
+        stats (Sequence[str]): statistics to compute (cf. check_statistics)
+        profile_step (Optional[float], optional): distance between the samples of the profiles (no profile if
+        None). Defaults to None.
+
+    Returns:
+        List[Dict]: statistics of each geometry (None if there is no valid pixel, 0 for the count), and its profile
+        (key "profile", cf. sample_profiles) if profile_step is set
+    """
+    results = [{stat: 0 if stat == "count" else None for stat in stats} for _ in geometries]
+    (row_start, row_stop), (col_start, col_stop) = get_union_window(windows)
+    if profile_step is not None:
+        # Points on the south or east edge of the bounds of a line are in the next row or column
+        row_stop, col_stop = max(row_stop, row_start) + 1, max(col_stop, col_start) + 1
+    if row_stop <= row_start or col_stop <= col_start:
+        return results
+
+    data = read_window(dataset, ((row_start, row_stop), (col_start, col_stop)), nodata)
+
+    for indices, values in iter_lines_pixels_in_window(dataset, geometries, windows, data, (row_start, col_start)):
+        for index, geometry_stats in compute_stats_by_label(indices, values, stats).items():
+            results[index] = geometry_stats
+
+    if profile_step is not None:
+        transform = dataset.transform * Affine.translation(col_start, row_start)
+        for result, profile in zip(results, sample_profiles(geometries, data, transform, profile_step)):
+            result["profile"] = profile
+
+    return results
+
+
+def _init_worker(raster_path: str):
+    """Open the raster once in each worker process"""
+    global _dataset
+    _dataset = rasterio.open(raster_path)
+
+
+def _compute_in_window_worker(
+    compute_in_window: Callable, geometries: Sequence, windows: Sequence[PixelWindow], kwargs
+):
+    return compute_in_window(_dataset, geometries, windows, **kwargs)
+
+
+def compute_by_blocks(
+    compute_in_window: Callable,
+    geometries: Sequence,
+    raster_path: str,
+    default,
+    block_size: int = 512,
+    nb_workers: int = 1,
+    **kwargs,
+) -> List:
+    """Group the geometries by blocks of the raster, and compute a result for each geometry with one call of
+    compute_in_window per block (in nb_workers processes)
+
+    Args:
+        compute_in_window (Callable): function (dataset, geometries, windows, **kwargs) -> result of each geometry
+        (eg. compute_lines_min_in_window)
+        geometries (Sequence): shapely geometries
+        raster_path (str): path to the raster
+        default: result of the geometries that are not computed (only used if there is no geometry in a block)
+        block_size (int, optional): size (in pixels) of the blocks used to group the geometries. Defaults to 512.
+        nb_workers (int, optional): number of processes used to compute the blocks. Defaults to 1.
+
+    Returns:
+        List: result for each geometry
+    """
+    if len(geometries) == 0:
+        return []
+
+    with rasterio.open(raster_path) as dataset:
+        transform = dataset.transform
+        windows = [get_geometry_window(geometry.bounds, transform) for geometry in geometries]
+        groups = group_windows_by_block(windows, block_size)
+
+        results = [default] * len(geometries)
+        if nb_workers > 1:
+            with ProcessPoolExecutor(nb_workers, initializer=_init_worker, initargs=(raster_path,)) as executor:
+                groups_results = executor.map(
+                    _compute_in_window_worker,
+                    [compute_in_window] * len(groups),
+                    [[geometries[index] for index in group] for group in groups],
+                    [[windows[index] for index in group] for group in groups],
+                    [kwargs] * len(groups),
+                )
+                for group, group_results in zip(groups, groups_results):
+                    for index, result in zip(group, group_results):
+                        results[index] = result
+        else:
+            for group in groups:
+                group_results = compute_in_window(
+                    dataset, [geometries[index] for index in group], [windows[index] for index in group], **kwargs
+                )
+                for index, result in zip(group, group_results):
+                    results[index] = result
+
+    return results
+
+
+def compute_lines_min(
+    geometries: Sequence, raster_path: str, nodata: float, block_size: int = 512, nb_workers: int = 1
+) -> List[Optional[float]]:
+    """Compute the minimum value of the first band of a raster along each geometry (all touched pixels are used)
+
+    Results are identical to `rasterstats.zonal_stats([geometry], raster_path, stats=["min"], all_touched=True,
+    nodata=nodata)[0]["min"]` for each geometry.
+
+    Args:
+        geometries (Sequence): shapely geometries (eg. LineStrings)
+        raster_path (str): path to the raster (eg. a .vrt)
+        nodata (float): no data value (overrides the one of the raster, as in rasterstats)
+        block_size (int, optional): size (in pixels) of the blocks used to group the geometries. Defaults to 512.
+        nb_workers (int, optional): number of processes used to compute the blocks. Defaults to 1.
+
+    Returns:
+        List[Optional[float]]: minimum value for each geometry (None if there is no valid pixel)
+    """
+    return compute_by_blocks(
+        compute_lines_min_in_window,
+        geometries,
+        raster_path,
+        None,
+        block_size=block_size,
+        nb_workers=nb_workers,
+        nodata=nodata,
+    )
+
+
+def compute_lines_stats(
+    geometries: Sequence,
+    raster_path: str,
+    nodata: float,
+    stats: Sequence[str],
+    profile_step: Optional[float] = None,
+    block_size: int = 512,
+    nb_workers: int = 1,
+) -> List[Dict]:
+    """Compute several statistics of the first band of a raster along each geometry (all touched pixels are used),
+    and optionally sample a profile along each line, from a single read of each block of the raster
+
+    The statistics are the same as `rasterstats.zonal_stats([geometry], raster_path, stats=stats, all_touched=True,
+    nodata=nodata)[0]` for each geometry.
+
+    Args:
+        geometries (Sequence): shapely geometries (eg. LineStrings)
+        raster_path (str): path to the raster (eg. a .vrt)
+        nodata (float): no data value (overrides the one of the raster, as in rasterstats)
+        stats (Sequence[str]): statistics to compute: min, max, mean, median, sum, count, std, range or
+        percentile_<q> (eg. percentile_90)
+        profile_step (Optional[float], optional): distance between the samples of the profiles (no profile if None,
+        cf. sample_profiles). Defaults to None.
+        block_size (int, optional): size (in pixels) of the blocks used to group the geometries. Defaults to 512.
+        nb_workers (int, optional): number of processes used to compute the blocks. Defaults to 1.
+
+    Returns:
+        List[Dict]: statistics of each geometry (None if there is no valid pixel, 0 for the count), and its profile
+        (key "profile") if profile_step is set
+
+    Raises:
+        ValueError: if a statistic is unknown or if profile_step is not positive
+    """
+    check_statistics(stats)
+    if profile_step is not None and profile_step <= 0:
+        raise ValueError(f"profile_step must be positive, got {profile_step}")
+
+    return compute_by_blocks(
+        compute_lines_stats_in_window,
+        geometries,
+        raster_path,
+        None,
+        block_size=block_size,
+        nb_workers=nb_workers,
+        nodata=nodata,
+        stats=list(stats),
+        profile_step=profile_step,
+    )
@@ -0,0 +1,26 @@
+"""Virtual mosaic (VRT) of the raster tiles from which the statistics along the lines are extracted"""
+
+
+def create_vrt(dir_list_raster: list, output_vrt: str):
+    """Create vrt from raster files in a directory.
+
+    Args:
+        dir_list_raster (List): ist of input raster files.
+        output_vrt (str): Path to the output VRT file.
+
+    Raises:
+        ValueError: If the VRT doesn't create
+    """
+    # gdal is imported only when a VRT is created, so that importing the scripts stays fast (cf. api)
+    from osgeo import gdal
+
+    gdal.UseExceptions()
+
+    # Build and save VRT file
+    vrt_options = gdal.BuildVRTOptions(resampleAlg="cubic", addAlpha=True)
+    my_vrt = gdal.BuildVRT(output_vrt, dir_list_raster, options=vrt_options)
+
+    if my_vrt is None:
+        raise ValueError(f"gdal.BuildVRT returned None for {output_vrt}")
+
+    my_vrt = None  # necessary to close the VRT file properly
@@ -1,19 +1,114 @@
+from typing import List
+
 import geopandas as gpd
+import numpy as np
+import pandas as pd
+import shapely
+
+LINE_GEOM_TYPES = ["LineString", "MultiLineString", "LinearRing"]
+POLYGON_GEOM_TYPES = ["Polygon", "MultiPolygon"]
+
+
+def extract_geom_types(gdf: gpd.GeoDataFrame, geom_types: List[str]) -> gpd.GeoDataFrame:
+    """Keep only the parts of GeometryCollections that have one of geom_types, then drop the geometries of other
+    types (same rules as the `keep_geom_type` option of gpd.overlay)
+
+    Args:
+        gdf (gpd.GeoDataFrame): geometries to filter
+        geom_types (List[str]): geometry types to keep
+
+    Returns:
+        gpd.GeoDataFrame: filtered geometries
+    """
+    geometries = np.asarray(gdf.geometry.array).copy()
+    for index in np.flatnonzero(shapely.get_type_id(geometries) == shapely.GeometryType.GEOMETRYCOLLECTION):
+        parts = [part for part in shapely.get_parts(geometries[index]) if part.geom_type in geom_types]
+        geometries[index] = shapely.union_all(parts) if parts else None
+
+    gdf = gdf.copy()
+    gdf[gdf.geometry.name] = gpd.GeoSeries(geometries, index=gdf.index, crs=gdf.crs)
+
+    return gdf.loc[gdf.geom_type.isin(geom_types)]
+
+
+def make_valid_polygons(polygons_gdf: gpd.GeoDataFrame) -> gpd.GeoDataFrame:
+    """Fix invalid polygons and keep only their polygonal parts (as done in gpd.overlay)"""
+    if not polygons_gdf.geom_type.isin(POLYGON_GEOM_TYPES).all():
+        return polygons_gdf
+
+    invalid = ~polygons_gdf.geometry.is_valid
+    if not invalid.any():
+        return polygons_gdf
+
+    polygons_gdf = polygons_gdf.copy()
+    polygons_gdf.loc[invalid, polygons_gdf.geometry.name] = polygons_gdf.geometry[invalid].make_valid()
+
+    return extract_geom_types(polygons_gdf, POLYGON_GEOM_TYPES)
 
 
 def clip_lines_by_polygons(
     input_lines_gdf: gpd.GeoDataFrame,
     input_polygons_gdf: gpd.GeoDataFrame,
+    chunk_size: int = 100000,
 ) -> gpd.GeoDataFrame:
     """Clip virtual lines by polygons (bridge deck)
 
+    The output (columns and geometries) is the same as `gpd.overlay(input_lines_gdf, input_polygons_gdf,
+    how="intersection")`, but the polygons are indexed only once in a STRtree, and only the candidate pairs of
+    (line, polygon) are intersected, by chunks of lines so that memory use does not depend on the number of lines.
+
     Args:
         input_lines_gdf (gpd.GeoDataFrame): virtual lines merged
         input_polygons_gdf (gpd.GeoDataFrame): Polygons (bridge deck)
+        chunk_size (int, optional): number of lines to process at once. Defaults to 100000.
 
     Returns:
         gpd.GeoDataFrame : all virtual lines clipped
     """
-    lines_clip_gdf = gpd.overlay(input_lines_gdf, input_polygons_gdf, how="intersection")
+    if (
+        input_lines_gdf.empty
+        or not input_lines_gdf.geom_type.isin(LINE_GEOM_TYPES).all()
+        or not input_polygons_gdf.geom_type.isin(POLYGON_GEOM_TYPES).all()
+    ):
+        # Not only lines and polygons: use the generic overlay
+        return gpd.overlay(input_lines_gdf, input_polygons_gdf, how="intersection")
+
+    polygons_gdf = make_valid_polygons(input_polygons_gdf).reset_index(drop=True)
+    lines_gdf = input_lines_gdf.reset_index(drop=True)
+    polygons = np.asarray(polygons_gdf.geometry.array)
+    tree = shapely.STRtree(polygons)
+
+    # Attributes of the output, with the same names as in gpd.overlay (suffixes for the columns in both inputs)
+    lines_attributes = lines_gdf.drop(columns=lines_gdf.geometry.name)
+    polygons_attributes = polygons_gdf.drop(columns=polygons_gdf.geometry.name)
+    common_columns = set(lines_attributes.columns) & set(polygons_attributes.columns)
+    lines_attributes = lines_attributes.rename(columns={c: f"{c}_1" for c in common_columns})
+    polygons_attributes = polygons_attributes.rename(columns={c: f"{c}_2" for c in common_columns})
+
+    chunks = []
+    has_candidates = False
+    for start in range(0, len(lines_gdf), chunk_size):
+        chunk_slice = slice(start, start + chunk_size)
+        lines = np.asarray(lines_gdf.geometry.array[chunk_slice])
+        lines_index, polygons_index = tree.query(lines, predicate="intersects")
+        has_candidates = has_candidates or lines_index.size > 0
+        order = np.lexsort((polygons_index, lines_index))
+        lines_index, polygons_index = lines_index[order], polygons_index[order]
+
+        intersections = shapely.intersection(lines[lines_index], polygons[polygons_index])
+        chunk = pd.concat(
+            [
+                lines_attributes.iloc[lines_index + start].reset_index(drop=True),
+                polygons_attributes.iloc[polygons_index].reset_index(drop=True),
+            ],
+            axis=1,
+        )
+        chunk = gpd.GeoDataFrame(chunk, geometry=gpd.GeoSeries(intersections), crs=lines_gdf.crs)
+        chunks.append(extract_geom_types(chunk, LINE_GEOM_TYPES))
+
+    result = pd.concat(chunks, ignore_index=True)
+    if not has_candidates and result.geometry.name != lines_gdf.geometry.name:
+        # gpd.overlay keeps the name of the geometry column of the lines when there is no intersection at all
+        result = result.rename_geometry(lines_gdf.geometry.name)
 
-    return lines_clip_gdf
+    return result
@@ -0,0 +1,110 @@
+"""Read and write the geometry files of the extraction with pyogrio: the extent of the rasters is pushed down to
+GDAL as a bbox filter (only the features that are near the rasters are read, using the spatial index of the file if
+it has one), and the lines are streamed by chunks of a fixed number of features.
+"""
+
+import os
+from typing import Iterator, Optional, Tuple
+
+import geopandas as gpd
+import pyogrio
+import rasterio
+from rasterio.warp import transform_bounds
+
+Bounds = Tuple[float, float, float, float]
+
+# Output formats, by extension of the output file (GeoJSON for other extensions)
+OUTPUT_FORMATS = {
+    ".geojson": "GeoJSON",
+    ".json": "GeoJSON",
+    ".fgb": "FlatGeobuf",
+    ".parquet": "GeoParquet",
+    ".geoparquet": "GeoParquet",
+}
+
+
+def get_raster_bounds(raster_path: str, crs: Optional[str] = None) -> Tuple[Bounds, str]:
+    """Get the bounds of a raster (eg. the VRT of the raster tiles)
+
+    Args:
+        raster_path (str): path to the raster
+        crs (Optional[str], optional): spatial reference of the raster, overrides the one of the file (as in
+        extract_z_min_from_raster_by_polylines.clip_lines_by_raster). Defaults to None.
+
+    Returns:
+        Tuple[Bounds, str]: bounds (xmin, ymin, xmax, ymax) and spatial reference of the raster
+    """
+    with rasterio.open(raster_path) as src:
+        return tuple(src.bounds), crs or (src.crs.to_string() if src.crs else None)
+
+
+def get_file_bbox(input_file: str, bounds: Bounds, bounds_crs: Optional[str]) -> Bounds:
+    """Convert bounds to the spatial reference of a geometry file, to filter its features"""
+    file_crs = pyogrio.read_info(input_file)["crs"]
+    if file_crs is None or bounds_crs is None:
+        return bounds
+
+    return transform_bounds(bounds_crs, file_crs, *bounds, densify_pts=21)
+
+
+def _to_geodataframe(gdf: gpd.GeoDataFrame) -> gpd.GeoDataFrame:
+    # Same geometry column name as gpd.read_file
+    if gdf.geometry.name != "geometry":
+        gdf = gdf.rename_geometry("geometry")
+
+    return gdf
+
+
+def read_vector(input_file: str, bbox: Optional[Bounds] = None) -> gpd.GeoDataFrame:
+    """Read the features of a geometry file that intersect a bbox (in the spatial reference of the file)"""
+    return _to_geodataframe(pyogrio.read_dataframe(input_file, bbox=bbox))
+
+
+def read_vector_chunks(
+    input_file: str, bbox: Optional[Bounds] = None, chunk_size: int = 100000
+) -> Iterator[gpd.GeoDataFrame]:
+    """Stream the features of a geometry file that intersect a bbox, by chunks of chunk_size features
+
+    Args:
+        input_file (str): path to the geometry file (any format that can be read by GDAL)
+        bbox (Optional[Bounds], optional): bbox filter, in the spatial reference of the file. Defaults to None.
+        chunk_size (int, optional): maximum number of features per chunk. Defaults to 100000.
+
+    Yields:
+        gpd.GeoDataFrame: chunks of features (at least one feature per chunk)
+    """
+    with pyogrio.open_arrow(input_file, bbox=bbox, batch_size=chunk_size, use_pyarrow=True) as (meta, reader):
+        for batch in reader:
+            if batch.num_rows == 0:
+                continue
+            chunk = gpd.GeoDataFrame.from_arrow(batch)
+            if meta["crs"] is not None:
+                chunk = chunk.set_crs(meta["crs"], allow_override=True)
+            yield _to_geodataframe(chunk)
+
+
+def get_output_format(output_file: str, output_format: Optional[str] = None) -> str:
+    """Get the format of an output geometry file: output_format if it is set, else from the extension of the file
+
+    Raises:
+        ValueError: if output_format is not GeoJSON, FlatGeobuf or GeoParquet
+    """
+    if output_format is None:
+        return OUTPUT_FORMATS.get(os.path.splitext(output_file)[1].lower(), "GeoJSON")
+    if output_format not in set(OUTPUT_FORMATS.values()):
+        raise ValueError(
+            f"Unknown output format {output_format}, expected one of {sorted(set(OUTPUT_FORMATS.values()))}"
+        )
+
+    return output_format
+
+
+def write_vector(gdf: gpd.GeoDataFrame, output_file: str, output_format: Optional[str] = None):
+    """Write geometries to a GeoJSON, FlatGeobuf or GeoParquet file (cf. get_output_format). FlatGeobuf files are
+    written with a spatial index (the features are sorted along a Hilbert curve), so that they can be read by bbox.
+    """
+    output_format = get_output_format(output_file, output_format)
+    if output_format == "GeoParquet":
+        gdf.to_parquet(output_file)
+    else:
+        pyogrio.write_dataframe(gdf, output_file, driver=output_format)
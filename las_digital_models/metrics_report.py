@@ -0,0 +1,181 @@
+"""Aggregate the spans recorded by the pipeline (cf. commons.metrics and configs/metrics/default.yaml):
+time spent in each step, slowest tiles, and optional export as a Prometheus textfile or as json.
+
+Usage:
+    python -m las_digital_models.metrics_report {metrics.output_dir} --top 10 --prometheus metrics.prom
+"""
+
+import argparse
+import glob
+import json
+import os
+from collections import defaultdict
+from typing import Dict, List
+
+PROMETHEUS_PREFIX = "las_digital_models"
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("inputs", nargs="+", help="Folders of spans (*.jsonl), or span files")
+    parser.add_argument("--top", "-n", type=int, default=10, help="Number of slowest tiles to report")
+    parser.add_argument("--prometheus", "-p", help="Write the time spent in each step to this Prometheus textfile")
+    parser.add_argument("--json", "-j", help="Write the report to this json file")
+
+    return parser.parse_args(argv)
+
+
+def read_spans(inputs: List[str]) -> List[Dict]:
+    """Read the spans of json lines files (or of all the *.jsonl files of folders)"""
+    filenames = []
+    for path in inputs:
+        filenames += sorted(glob.glob(os.path.join(path, "*.jsonl"))) if os.path.isdir(path) else [path]
+
+    spans = []
+    for filename in filenames:
+        with open(filename, "r") as f:
+            spans += [json.loads(line) for line in f if line.strip()]
+
+    return spans
+
+
+def summarize_steps(spans: List[Dict]) -> Dict[str, Dict]:
+    """Aggregate the spans by name (step of the pipeline)
+
+    Args:
+        spans (List[Dict]): spans, as written by commons.metrics
+
+    Returns:
+        Dict[str, Dict]: for each step: number of spans, number of errors, total wall and CPU times, maximum peak
+        RSS and total of each counter (sorted by decreasing wall time)
+    """
+    steps = defaultdict(lambda: {"count": 0, "errors": 0, "wall_s": 0.0, "cpu_s": 0.0, "peak_rss_mb": 0.0})
+    counters = defaultdict(lambda: defaultdict(float))
+    for span in spans:
+        step = steps[span["name"]]
+        step["count"] += 1
+        step["errors"] += span.get("error") is not None
+        step["wall_s"] += span["wall_s"]
+        step["cpu_s"] += span["cpu_s"]
+        step["peak_rss_mb"] = max(step["peak_rss_mb"], span["peak_rss_mb"])
+        for key, value in span.get("counters", {}).items():
+            counters[span["name"]][key] += value
+
+    for name, step in steps.items():
+        step["counters"] = dict(counters[name])
+
+    return dict(sorted(steps.items(), key=lambda item: item[1]["wall_s"], reverse=True))
+
+
+def get_slowest_tiles(spans: List[Dict], top: int = 10) -> List[Dict]:
+    """Get the tiles that took the longest time (sum of the wall times of their top spans, eg. one per stage)
+
+    The top spans of a tile are its root spans, and the spans of the tile whose parent has no tile (eg. the spans of
+    the tiles of a chunk processed by a worker, or the reads in advance of the prefetch).
+
+    Args:
+        spans (List[Dict]): spans, as written by commons.metrics
+        top (int, optional): number of tiles to return. Defaults to 10.
+
+    Returns:
+        List[Dict]: for each tile (slowest first): total wall time, wall time of each stage (top spans) and of
+        each nested step
+    """
+    tiles = defaultdict(lambda: {"wall_s": 0.0, "stages": defaultdict(float), "steps": defaultdict(float)})
+    spans_tiles = {span["span_id"]: span.get("tile") for span in spans}
+    for span in spans:
+        if not span.get("tile"):
+            continue
+        tile = tiles[span["tile"]]
+        if not spans_tiles.get(span["parent_id"]):
+            tile["wall_s"] += span["wall_s"]
+            tile["stages"][span["name"]] += span["wall_s"]
+        else:
+            tile["steps"][span["name"]] += span["wall_s"]
+
+    slowest = sorted(tiles.items(), key=lambda item: item[1]["wall_s"], reverse=True)[:top]
+
+    return [
+        {"tile": name, "wall_s": tile["wall_s"], "stages": dict(tile["stages"]), "steps": dict(tile["steps"])}
+        for name, tile in slowest
+    ]
+
+
+def to_prometheus(steps: Dict[str, Dict]) -> str:
+    """Format the aggregated steps (cf. summarize_steps) as a Prometheus textfile (for the node exporter)"""
+    metrics = {
+        "step_seconds_total": ("counter", "Wall time spent in each step", lambda step: step["wall_s"]),
+        "step_cpu_seconds_total": ("counter", "CPU time spent in each step", lambda step: step["cpu_s"]),
+        "step_spans_total": ("counter", "Number of spans of each step", lambda step: step["count"]),
+        "step_errors_total": ("counter", "Number of spans of each step that failed", lambda step: step["errors"]),
+        "step_peak_rss_bytes": (
+            "gauge",
+            "Maximum peak RSS of the processes at the end of each step",
+            lambda step: step["peak_rss_mb"] * 1024 * 1024,
+        ),
+    }
+    lines = []
+    for metric, (metric_type, description, get_value) in metrics.items():
+        lines += [
+            f"# HELP {PROMETHEUS_PREFIX}_{metric} {description}",
+            f"# TYPE {PROMETHEUS_PREFIX}_{metric} {metric_type}",
+        ]
+        lines += [f'{PROMETHEUS_PREFIX}_{metric}{{step="{name}"}} {get_value(step):g}' for name, step in steps.items()]
+
+    counter_names = sorted({key for step in steps.values() for key in step["counters"]})
+    for counter in counter_names:
+        metric = f"{PROMETHEUS_PREFIX}_step_{counter}_total"
+        lines += [f"# HELP {metric} Total {counter} of each step", f"# TYPE {metric} counter"]
+        lines += [
+            f'{metric}{{step="{name}"}} {step["counters"][counter]:g}'
+            for name, step in steps.items()
+            if counter in step["counters"]
+        ]
+
+    return "\n".join(lines) + "\n"
+
+
+def format_report(steps: Dict[str, Dict], slowest_tiles: List[Dict]) -> str:
+    """Format the aggregated steps and the slowest tiles as text"""
+    lines = ["Time spent in each step:"]
+    for name, step in steps.items():
+        counters = "".join(f", {key}={value:g}" for key, value in step["counters"].items())
+        lines.append(
+            f"  {name}: {step['wall_s']:.2f}s wall, {step['cpu_s']:.2f}s CPU in {step['count']} spans "
+            f"({step['errors']} errors), peak RSS {step['peak_rss_mb']:.0f}MB{counters}"
+        )
+
+    lines.append("Slowest tiles:")
+    for tile in slowest_tiles:
+        stages = ", ".join(f"{name} {wall_s:.2f}s" for name, wall_s in tile["stages"].items())
+        steps_detail = ", ".join(
+            f"{name} {wall_s:.2f}s" for name, wall_s in sorted(tile["steps"].items(), key=lambda item: -item[1])
+        )
+        lines.append(f"  {tile['tile']}: {tile['wall_s']:.2f}s ({stages}) [{steps_detail}]")
+
+    return "\n".join(lines)
+
+
+def write_atomically(filename: str, content: str):
+    """Write a file through a temporary file, so that readers (eg. the node exporter) never see a partial file"""
+    tmp_filename = f"{filename}.{os.getpid()}.tmp"
+    with open(tmp_filename, "w") as f:
+        f.write(content)
+    os.replace(tmp_filename, filename)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    spans = read_spans(args.inputs)
+    steps = summarize_steps(spans)
+    slowest_tiles = get_slowest_tiles(spans, args.top)
+
+    print(format_report(steps, slowest_tiles))
+    if args.prometheus:
+        write_atomically(args.prometheus, to_prometheus(steps))
+    if args.json:
+        write_atomically(args.json, json.dumps({"steps": steps, "slowest_tiles": slowest_tiles}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Show the progress of a run that uses a work queue (cf. batch.queue in configs/batch/default.yaml): number of tasks
+by status for each stage, tasks done by each worker, throughput and estimated remaining time. It can be run at any
+time while the workers are running, from any host that sees the queue.
+
+Usage:
+    python -m las_digital_models.queue_status {io.output_dir}/.queue --watch 60
+    python -m las_digital_models.queue_status {io.output_dir}/.queue/queue.sqlite --json
+"""
+
+import argparse
+import json
+import os
+import time
+from typing import Dict
+
+from las_digital_models.batch.work_queue import open_work_queue
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("queue", help="Folder of the queue (files backend) or SQLite database (sqlite backend)")
+    parser.add_argument("--json", "-j", action="store_true", help="Print the progress as json")
+    parser.add_argument("--watch", "-w", type=float, help="Print the progress again every WATCH seconds")
+
+    return parser.parse_args(argv)
+
+
+def format_progress(progress: Dict) -> str:
+    """Format the progress of a run (cf. work_queue.compute_progress) as text"""
+    lines = ["Tasks by stage:"]
+    for name, counts in progress["stages"].items():
+        total = sum(counts.values())
+        percent = 100 * counts["done"] / total if total else 0
+        lines.append(
+            f"  {name}: {counts['done']}/{total} done ({percent:.1f}%), {counts['running']} running, "
+            f"{counts['pending']} pending, {counts['failed']} failed"
+        )
+
+    lines.append("Tasks done by worker:")
+    for worker, nb_done in sorted(progress["workers"].items()):
+        lines.append(f"  {worker}: {nb_done}")
+
+    eta = f"{progress['eta_s'] / 60:.1f} min" if progress["eta_s"] is not None else "unknown"
+    lines.append(f"Throughput: {progress['tasks_per_minute']:.2f} tasks/min, remaining time: {eta}")
+
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    backend = "files" if os.path.isdir(args.queue) else "sqlite"
+    if backend == "sqlite" and not os.path.isfile(args.queue):
+        raise FileNotFoundError(f"No work queue found at {args.queue}")
+    queue = open_work_queue(backend, args.queue)
+    try:
+        while True:
+            progress = queue.get_progress()
+            print(json.dumps(progress, indent=2) if args.json else format_progress(progress), flush=True)
+            if not args.watch:
+                break
+            time.sleep(args.watch)
+    finally:
+        queue.close()
+
+
+if __name__ == "__main__":
+    main()
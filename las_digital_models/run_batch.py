@@ -0,0 +1,36 @@
+"""Run the whole DXM pipeline (buffer, DTM, DSM, DHM) on all the las/laz files of a folder
+in a single python process (hydra config is composed only once)
+"""
+
+import logging
+
+import hydra
+from omegaconf import DictConfig
+
+from las_digital_models.batch.orchestrator import run_pipeline, run_queue_worker
+from las_digital_models.commons import commons
+
+log = commons.get_logger(__name__)
+
+
+@hydra.main(config_path="../configs/", config_name="config.yaml", version_base="1.2")
+def run_batch(config: DictConfig):
+    """Run the whole pipeline on config.io.input_dir using hydra config
+    config parameters are explained in the default.yaml files
+
+    If config.batch.queue.enabled is true, the tiles are processed from a work queue shared with the other workers of
+    the run (cf. batch.work_queue): start the same command on each host.
+    """
+    if config.batch.queue.enabled:
+        run_queue_worker(config)
+    else:
+        run_pipeline(config)
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    run_batch()
+
+
+if __name__ == "__main__":
+    main()
@@ -2,33 +2,158 @@
 # maintener : MDupays
 # version : v.0.1.0 02/02/2023
 # Calculate DHM
-from osgeo import gdal
-from osgeo_utils import gdal_calc
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Union
 
-gdal.UseExceptions()
+import numpy as np
+import rasterio
+from rasterio.windows import Window
 
+from las_digital_models.commons import metrics
+from las_digital_models.commons.raster import Raster
+from las_digital_models.commons.raster_output import RasterOutputProfile
 
-def calculate_dhm(input_image_dsm: str, input_image_dtm: str, output_image: str, no_data_value: int = -9999):
+
+def compute_dhm(dsm: np.ndarray, dtm: np.ndarray, no_data_value: int = -9999) -> np.ndarray:
+    """Compute DHM = DSM - DTM where both DSM and DTM have valid values, no_data_value elsewhere.
+    The computation is done in place in the dsm array.
+
+    Args:
+        dsm (np.ndarray): DSM values (float32, overwritten with the DHM values)
+        dtm (np.ndarray): DTM values (same shape as dsm)
+        no_data_value (int): no data value (default to -9999)
+
+    Returns:
+        np.ndarray: DHM values (same array as dsm)
+    """
+    invalid = dsm == no_data_value
+    invalid |= dtm == no_data_value
+    np.subtract(dsm, dtm, out=dsm)
+    dsm[invalid] = no_data_value
+
+    return dsm
+
+
+def calculate_dhm_from_arrays(dsm: np.ndarray, dtm: np.ndarray, no_data_value: int = -9999) -> np.ndarray:
+    """Calculate DHM from DSM and DTM arrays that are already in memory (DHM = DSM - DTM)
+
+    Args:
+        dsm (np.ndarray): DSM values
+        dtm (np.ndarray): DTM values (same shape as dsm)
+        no_data_value (int): no data value (default to -9999)
+
+    Raises:
+        ValueError: if DSM and DTM do not have the same shape
+
+    Returns:
+        np.ndarray: DHM values (float32)
+    """
+    if dsm.shape != dtm.shape:
+        raise ValueError(f"DSM and DTM must have the same shape, got {dsm.shape} and {dtm.shape}")
+
+    return compute_dhm(dsm.astype(np.float32, copy=True), dtm, no_data_value)
+
+
+def calculate_dhm_raster(dsm: Raster, dtm: Raster, no_data_value: int = -9999) -> Raster:
+    """Calculate DHM from DSM and DTM rasters in memory (DHM = DSM - DTM), eg. returned by
+    las_interpolation.interpolate_products_to_rasters
+
+    Args:
+        dsm (Raster): DSM
+        dtm (Raster): DTM (same grid as the DSM)
+        no_data_value (int): no data value (default to -9999)
+
+    Raises:
+        ValueError: if DSM and DTM are not aligned (different size or transform)
+
+    Returns:
+        Raster: DHM, with the transform and spatial reference of the DSM
+    """
+    if not dsm.is_aligned(dtm):
+        raise ValueError(
+            f"DSM and DTM are not aligned: ({dsm.shape}, {dsm.transform}) and ({dtm.shape}, {dtm.transform})"
+        )
+
+    return Raster(
+        calculate_dhm_from_arrays(dsm.data, dtm.data, no_data_value), dsm.transform, dsm.srs_wkt, no_data_value
+    )
+
+
+def calculate_dhm(
+    input_image_dsm: Union[str, Raster],
+    input_image_dtm: Union[str, Raster],
+    output_image: str,
+    no_data_value: int = -9999,
+    block_size: int = 512,
+    nb_threads: int = 4,
+    output_profile: Optional[RasterOutputProfile] = None,
+):
     """Calculate DHM from DSM and DTM (DHM = DSM - DTM)
 
+    DSM and DTM are read and DHM is written by blocks of rows, so that memory is bounded by the block size
+    (and not by the size of the rasters). Blocks are processed in a thread pool. COGs and GeoTIFFs with overviews
+    are written in memory, then copied to output_image with their overviews (cf. output_profile).
+
+    DSM and DTM can also be rasters in memory (cf. commons.raster.Raster): the DHM is then computed at once (cf.
+    calculate_dhm_raster), the other input being read entirely if it is a file.
+
+    The computation is measured in a "calculate_dhm" span (cf. commons.metrics).
+
     Args:
-        input_file_dsm (str): path to DSM file
-        input_file_dtm (str): path to DTM file
+        input_file_dsm (Union[str, Raster]): path to DSM file, or DSM in memory
+        input_file_dtm (Union[str, Raster]): path to DTM file, or DTM in memory
         output_image (str) : path to output DHM file
         no_data_value (int): no data value (default to -9999)
+        block_size (int): number of rows of the blocks that are processed at once (default to 512)
+        nb_threads (int): number of threads used to process the blocks (default to 4)
+        output_profile (Optional[RasterOutputProfile]): format of the output DHM (default to None: same layout as
+        the DSM, cf. commons.raster_output)
 
+    Raises:
+        ValueError: if DSM and DTM are not aligned (different size or geotransform)
     """
-    # Calculate A - B where A and B have valid values, else return a no_data value
-    gdal_calc.Calc(
-        f"(A - B) * (A != {no_data_value}) * (B != {no_data_value})"
-        + f" + ({no_data_value}) * (1 - (A != {no_data_value}) * (B != {no_data_value}))",
-        outfile=output_image,
-        A=input_image_dsm,
-        A_band=1,
-        B=input_image_dtm,
-        B_band=1,
-        type="Float32",
-        quiet=True,
-        NoDataValue=no_data_value,
-        overwrite=True,
-    )
+    if isinstance(input_image_dsm, Raster) or isinstance(input_image_dtm, Raster):
+        with metrics.span("calculate_dhm", tile=output_image) as dhm_span:
+            dsm = input_image_dsm if isinstance(input_image_dsm, Raster) else Raster.read(input_image_dsm)
+            dtm = input_image_dtm if isinstance(input_image_dtm, Raster) else Raster.read(input_image_dtm)
+            dhm = calculate_dhm_raster(dsm, dtm, no_data_value)
+            dhm.write(output_image, output_profile)
+            dhm_span.add(output_pixels=dhm.data.size, bytes_written=metrics.get_file_size(output_image))
+        return
+
+    with metrics.span("calculate_dhm", tile=output_image) as dhm_span:
+        with rasterio.open(input_image_dsm) as dsm_src, rasterio.open(input_image_dtm) as dtm_src:
+            if dsm_src.shape != dtm_src.shape or dsm_src.transform != dtm_src.transform:
+                raise ValueError(
+                    f"DSM and DTM are not aligned: {input_image_dsm} ({dsm_src.shape}, {dsm_src.transform}) "
+                    f"and {input_image_dtm} ({dtm_src.shape}, {dtm_src.transform})"
+                )
+
+            profile = dsm_src.profile
+            profile.update(driver="GTiff", count=1, dtype="float32", nodata=no_data_value)
+            height, width = dsm_src.shape
+            windows = [Window(0, row, width, min(block_size, height - row)) for row in range(0, height, block_size)]
+
+            # rasterio datasets cannot be read/written concurrently
+            read_lock = threading.Lock()
+            write_lock = threading.Lock()
+
+            output_profile = output_profile or RasterOutputProfile()
+            with output_profile.open_rasterio(output_image, **profile) as dst:
+
+                def process(window):
+                    with read_lock:
+                        dsm = dsm_src.read(1, window=window, out_dtype="float32")
+                        dtm = dtm_src.read(1, window=window, out_dtype="float32")
+                    dhm = compute_dhm(dsm, dtm, no_data_value)
+                    with write_lock:
+                        dst.write(dhm, 1, window=window)
+
+                with ThreadPoolExecutor(max_workers=nb_threads) as executor:
+                    list(executor.map(process, windows))
+        dhm_span.add(
+            output_pixels=height * width,
+            bytes_read=metrics.get_file_size(input_image_dsm) + metrics.get_file_size(input_image_dtm),
+            bytes_written=metrics.get_file_size(output_image),
+        )
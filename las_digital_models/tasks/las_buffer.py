@@ -0,0 +1,210 @@
+import logging
+from typing import List, Optional, Sequence, Tuple
+
+import laspy
+import numpy as np
+import pdal
+from numpy.lib import recfunctions as rfn
+from pdaltools.las_info import (
+    get_buffered_bounds_from_filename,
+    get_writer_parameters_from_reader_metadata,
+    parse_filename,
+)
+from pdaltools.las_merge import create_list
+
+from las_digital_models.commons import metrics
+from las_digital_models.tasks.las_interpolation import get_srs_wkt, read_las_with_laspy
+from las_digital_models.tasks.spatial_index import (
+    SpatialIndex,
+    get_indexed_file,
+    get_las_reader,
+)
+from las_digital_models.tasks.strip_cache import StripCache, crop_points, extract_strips
+
+
+def merge_point_arrays(arrays: List[np.ndarray]) -> np.ndarray:
+    """Concatenate point arrays read by pdal. If the arrays do not have the same dimensions, only the dimensions
+    that are common to all arrays are kept.
+
+    Args:
+        arrays (List[np.ndarray]): point arrays to merge
+
+    Returns:
+        np.ndarray: merged points
+    """
+    if all(a.dtype == arrays[0].dtype for a in arrays[1:]):
+        return np.concatenate(arrays)
+
+    common_dimensions = [name for name in arrays[0].dtype.names if all(name in a.dtype.names for a in arrays[1:])]
+    logging.debug(f"Point arrays have different dimensions, keep only: {common_dimensions}")
+
+    return np.concatenate([rfn.repack_fields(a[common_dimensions]) for a in arrays])
+
+
+def read_las_with_buffer(
+    input_dir: str,
+    tile_filename: str,
+    buffer_width: int = 100,
+    spatial_ref: str = "EPSG:2154",
+    tile_width: int = 1000,
+    tile_coord_scale: int = 1000,
+    strip_cache: StripCache = None,
+    spatial_index: SpatialIndex = None,
+    dimensions: Optional[Sequence[str]] = None,
+) -> Tuple[np.ndarray, str]:
+    """Read a tile and a buffer from its neighbors (usually 100m) into memory, without writing an intermediate
+    las file (in-memory equivalent of `pdaltools.las_add_buffer.create_las_with_buffer`)
+
+    Each file is read and cropped to the buffered bounds of the tile, then the crops are merged.
+
+    If a strip cache is provided, the parts of each file that are read that fall in the buffers of its neighbors are
+    stored in the cache, and neighbor files are read only if their strip is not in the cache yet.
+
+    Neighbor files that are spatially indexed (COPC files, or tiles with a COPC copy in spatial_index, cf.
+    tasks.spatial_index) are read only in the buffered bounds of the tile, without decompressing them entirely (the
+    strip cache is not used for them).
+
+    If dimensions are given, the files that are decompressed entirely are read with laspy instead of pdal, with only
+    the X, Y, Z coordinates and these dimensions (eg. the dimensions of the filters of the products): their LAZ chunks
+    are decompressed on several threads by lazrs (LazBackend.LazrsParallel), only for the fields of these dimensions
+    (cf. las_interpolation.read_las_with_laspy).
+
+    The read is measured in a "read_with_buffer" span (cf. commons.metrics), with the number of bytes of the files
+    that were actually read (ie. not found in the strip cache) and the number of points of the tile with its buffer.
+
+    Args:
+        input_dir (str): directory of pointclouds (where you look for neighbors)
+        tile_filename (str): full path to the queried LIDAR tile
+        buffer_width (int, optional): width of the border to add to the tile (in meters). Defaults to 100.
+        spatial_ref (str, optional): Spatial reference to use to override the one from input las.
+        Defaults to "EPSG:2154".
+        tile_width (int, optional): width of tiles in meters. Defaults to 1000.
+        tile_coord_scale (int, optional): scale used in the filename to describe coordinates in meters.
+        Defaults to 1000.
+        strip_cache (StripCache, optional): cache for the border strips of the tiles. Defaults to None.
+        spatial_index (SpatialIndex, optional): COPC copies of the tiles. Defaults to None.
+        dimensions (Optional[Sequence[str]], optional): dimensions to read with laspy, in addition to X, Y and Z
+        (None: the files are read with pdal, with all their dimensions). Defaults to None.
+
+    Raises:
+        ValueError: if there is no point in the buffered bounds of the tile
+
+    Returns:
+        Tuple[np.ndarray, str]: points of the tile with its buffer, and WKT of their spatial reference
+    """
+    bounds = get_buffered_bounds_from_filename(
+        tile_filename, buffer_width=buffer_width, tile_width=tile_width, tile_coord_scale=tile_coord_scale
+    )
+    _, coord_x, coord_y, _ = parse_filename(tile_filename)
+    files_to_merge = create_list(input_dir, tile_filename, tile_width, tile_coord_scale)
+
+    with metrics.span("read_with_buffer", tile=tile_filename) as read_span:
+        crops = []
+        srs_wkt = None
+        for f in files_to_merge:
+            pipeline = None
+            crop = None
+            # The whole tile is read in any case, only its neighbors are read by bounds
+            neighbor_bounds = bounds if f != tile_filename else None
+            is_indexed = neighbor_bounds is not None and get_indexed_file(f, spatial_index) is not None
+            if strip_cache is not None and neighbor_bounds is not None and not is_indexed:
+                crop = strip_cache.get(StripCache.get_key(f, (coord_x, coord_y), buffer_width, tile_width), f)
+
+            if crop is None and (is_indexed or (strip_cache is None and dimensions is None)):
+                # Read only the buffered bounds of the indexed neighbors, crop the other files
+                pipeline = get_las_reader(f, spatial_ref, neighbor_bounds, spatial_index)
+                pipeline |= pdal.Filter.crop(bounds=str(bounds))
+                pipeline.execute()
+                crop = pipeline.arrays[0]
+                if is_indexed:
+                    read_span.add(indexed_reads=1)
+                else:
+                    read_span.add(bytes_read=metrics.get_file_size(f))
+            elif crop is None:
+                if dimensions is None:
+                    pipeline = pdal.Reader.las(filename=f, override_srs=spatial_ref, nosrs=True).pipeline()
+                    pipeline.execute()
+                    points = pipeline.arrays[0]
+                else:
+                    points = read_las_with_laspy(f, dimensions, laz_backend=laspy.LazBackend.LazrsParallel)
+                    if srs_wkt is None:
+                        srs_wkt = get_srs_wkt(spatial_ref)
+                read_span.add(input_points=len(points), bytes_read=metrics.get_file_size(f))
+                crop = crop_points(points, bounds)
+                if strip_cache is not None:
+                    for target_coords, strip in extract_strips(
+                        points, f, buffer_width, tile_width, tile_coord_scale
+                    ).items():
+                        strip_cache.put(StripCache.get_key(f, target_coords, buffer_width, tile_width), strip)
+                del points
+
+            if len(crop) == 0:
+                logging.warning(f"File {f} ignored in merge/crop: No points in crop bounding box")
+            else:
+                crops.append(crop)
+            if pipeline is not None and (srs_wkt is None or f == tile_filename):
+                srs_wkt = pipeline.srswkt2
+            del pipeline
+        read_span.add(kept_points=sum(len(crop) for crop in crops))
+
+    if not crops:
+        raise ValueError(f"No point found in the buffered bounds of {tile_filename}: stop processing")
+
+    return merge_point_arrays(crops), srs_wkt
+
+
+def write_las_with_buffer(
+    input_dir: str,
+    tile_filename: str,
+    output_filename: str,
+    buffer_width: int = 100,
+    spatial_ref: str = "EPSG:2154",
+    tile_width: int = 1000,
+    tile_coord_scale: int = 1000,
+    spatial_index: SpatialIndex = None,
+):
+    """Write a tile with a buffer from its neighbors (as `pdaltools.las_add_buffer.create_las_with_buffer`), reading
+    only the buffered bounds of the neighbors that are spatially indexed (cf. read_las_with_buffer). The las header
+    parameters (version, point format, scales and offsets) are the ones of the tile.
+
+    Args:
+        input_dir (str): directory of pointclouds (where you look for neighbors)
+        tile_filename (str): full path to the queried LIDAR tile
+        output_filename (str): full path to the saved buffered tile
+        buffer_width (int, optional): width of the border to add to the tile (in meters). Defaults to 100.
+        spatial_ref (str, optional): Spatial reference to use to override the one from input las.
+        Defaults to "EPSG:2154".
+        tile_width (int, optional): width of tiles in meters. Defaults to 1000.
+        tile_coord_scale (int, optional): scale used in the filename to describe coordinates in meters.
+        Defaults to 1000.
+        spatial_index (SpatialIndex, optional): COPC copies of the tiles. Defaults to None.
+
+    Raises:
+        ValueError: if there is no point in the buffered bounds of the tile
+    """
+    bounds = get_buffered_bounds_from_filename(
+        tile_filename, buffer_width=buffer_width, tile_width=tile_width, tile_coord_scale=tile_coord_scale
+    )
+    files_to_merge = create_list(input_dir, tile_filename, tile_width, tile_coord_scale)
+
+    crops = []
+    metadata = None
+    for f in files_to_merge:
+        # The tile is read with the las reader (its metadata gives the parameters of the writer)
+        pipeline = get_las_reader(f, spatial_ref, bounds if f != tile_filename else None, spatial_index).pipeline()
+        pipeline |= pdal.Filter.crop(bounds=str(bounds))
+        pipeline.execute()
+        if len(pipeline.arrays[0]) == 0:
+            logging.warning(f"File {f} ignored in merge/crop: No points in crop bounding box")
+        else:
+            crops.append(pipeline.arrays[0])
+        if f == tile_filename:
+            metadata = pipeline.metadata
+        del pipeline
+
+    if not crops:
+        raise ValueError(f"No point found in the buffered bounds of {tile_filename}: stop processing")
+
+    params = get_writer_parameters_from_reader_metadata(metadata, a_srs=spatial_ref)
+    pipeline = pdal.Writer(filename=output_filename, forward="all", **params).pipeline(merge_point_arrays(crops))
+    pipeline.execute()
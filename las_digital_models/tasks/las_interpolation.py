@@ -1,32 +1,104 @@
-from typing import List
+import os
+import re
+import tempfile
+import uuid
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
 
+import laspy
+import numpy as np
 import pdal
+from affine import Affine
 from osgeo import gdal
 from pdaltools.las_info import parse_filename
+from rasterio.crs import CRS
 
-from las_digital_models.commons import commons
+from las_digital_models.commons import commons, metrics
+from las_digital_models.commons.raster import Raster
+from las_digital_models.commons.raster_output import (
+    RasterOutputProfile,
+    get_output_profile_from_config,
+)
+from las_digital_models.commons.raster_writer import AsyncRasterWriter
+from las_digital_models.tasks.postprocessing import (
+    NoDataMask,
+    get_no_data_mask,
+    mask_raster,
+)
+from las_digital_models.tasks.sub_tiles import (
+    SubTile,
+    SubTiling,
+    get_sub_tiling_from_config,
+)
+from las_digital_models.tasks.tin_raster import (
+    get_grid_transform,
+    get_tile_grid,
+    rasterize_tin,
+    triangulate,
+)
 
 gdal.UseExceptions()
 
+# Interpolation backends:
+# - pdal: points read and triangulated with pdal (readers.las, filters.delaunay, filters.faceraster)
+# - scipy: points read with laspy, triangulated with scipy (Qhull) and rasterized with numpy (tin_raster)
+BACKENDS = ("pdal", "scipy")
+# laspy names of the pdal dimensions that are not the snake_case of their pdal name
+LASPY_DIMENSIONS = {"ScanChannel": "scanner_channel", "Infrared": "nir", "ClassFlags": "classification_flags"}
+# Fields of LAZ 1.4 files (point formats 6 to 10) that contain each laspy dimension, that can be decompressed
+# separately (the other dimensions are extra bytes)
+DECOMPRESSION_FIELDS = {
+    "return_number": laspy.DecompressionSelection.XY_RETURNS_CHANNEL,
+    "number_of_returns": laspy.DecompressionSelection.XY_RETURNS_CHANNEL,
+    "scanner_channel": laspy.DecompressionSelection.XY_RETURNS_CHANNEL,
+    "classification": laspy.DecompressionSelection.CLASSIFICATION,
+    "synthetic": laspy.DecompressionSelection.FLAGS,
+    "key_point": laspy.DecompressionSelection.FLAGS,
+    "withheld": laspy.DecompressionSelection.FLAGS,
+    "overlap": laspy.DecompressionSelection.FLAGS,
+    "classification_flags": laspy.DecompressionSelection.FLAGS,
+    "scan_direction_flag": laspy.DecompressionSelection.FLAGS,
+    "edge_of_flight_line": laspy.DecompressionSelection.FLAGS,
+    "intensity": laspy.DecompressionSelection.INTENSITY,
+    "scan_angle": laspy.DecompressionSelection.SCAN_ANGLE,
+    "user_data": laspy.DecompressionSelection.USER_DATA,
+    "point_source_id": laspy.DecompressionSelection.POINT_SOURCE_ID,
+    "gps_time": laspy.DecompressionSelection.GPS_TIME,
+    "red": laspy.DecompressionSelection.RGB,
+    "green": laspy.DecompressionSelection.RGB,
+    "blue": laspy.DecompressionSelection.RGB,
+    "nir": laspy.DecompressionSelection.NIR,
+}
 
-def interpolate_from_config(input_file: str, output_raster: str, config: dict):
+
+def interpolate_from_config(input_file: str, output_raster: Union[str, Sequence[str]], config: dict):
     """API using a config dictionary for the `interpolate` method defined in this file
     Generate a Z (height) raster file from a LAS point cloud file by interpolating the Z value for each pixel center.
 
 
     Args:
         input_file (str): path to the las/laz file to interpolate
-        output_file (str): path to the output raster
+        output_raster (Union[str, Sequence[str]]): path to the output raster (or one path per pixel size if
+        "pixel_size" is a list)
         config (dict): ProduitDeriveLidar config dictionary containing
         {
             "tile_geometry": {
                 "tile_coord_scale": #int, scale of the tiles coordinates in the las filename
                 "tile_width": #int, width of the tile in meters (used to infer the lower-left corner)
-                "pixel_size": #float, pixel size of the output raster in meters (pixels are supposed to be squares)
+                "pixel_size": #float or list of floats, pixel size(s) of the output raster(s) in meters (pixels are
+                supposed to be squares)
                 "no_data_value": #int, no data value for the output raster
             },
             "io": {
                 "spatial_reference": #str, spatial reference to use when reading las file
+                "no_data_mask_shapefile": #str, optional shapefile of the areas to set to no-data
+            },
+            "interpolation": { # optional
+                "backend": #str, "pdal" (default) or "scipy" (cf. BACKENDS)
+            },
+            "sub_tiles": { # optional, cf. configs/sub_tiles/default.yaml
+                "enabled": #bool, triangulate the tile by sub-tiles to bound the memory
+                "block_size": #float, width of the sub-tiles in meters
+                "margin": #float, width of the margin of points read around each sub-tile in meters
             },
             "filter": {
                 "dimension": #str, dimension alogn which to filter
@@ -45,20 +117,384 @@ def interpolate_from_config(input_file: str, output_raster: str, config: dict):
         config["tile_geometry"]["no_data_value"],
         config["filter"]["dimension"],
         config["filter"]["keep_values"],
+        no_data_mask=get_no_data_mask_from_config(config),
+        output_profile=get_output_profile_from_config(config),
+        sub_tiling=get_sub_tiling_from_config(config),
+        backend=get_backend_from_config(config),
     )
 
 
-@commons.eval_time_with_pid
-def interpolate(
-    input_file: str,
+def get_no_data_mask_from_config(config: dict) -> Optional[NoDataMask]:
+    """Get the no-data mask defined in config["io"]["no_data_mask_shapefile"] (None if there is no mask)"""
+    shapefile = config["io"].get("no_data_mask_shapefile")
+
+    return get_no_data_mask(shapefile) if shapefile else None
+
+
+def get_backend_from_config(config: dict) -> str:
+    """Get the interpolation backend defined in config["interpolation"]["backend"] ("pdal" if it is not set)"""
+    return (config.get("interpolation") or {}).get("backend", "pdal")
+
+
+def check_backend(backend: str):
+    """Raise a ValueError if backend is not one of BACKENDS"""
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown interpolation backend {backend}, expected one of {BACKENDS}")
+
+
+def get_output_rasters(
+    output_file: Union[str, Sequence[str]], pixel_size: Union[float, Sequence[float]]
+) -> List[Tuple[float, str]]:
+    """Pair each pixel size with the path of its output raster
+
+    Args:
+        output_file (Union[str, Sequence[str]]): path to the output raster, or one path per pixel size
+        pixel_size (Union[float, Sequence[float]]): pixel size, or list of pixel sizes
+
+    Raises:
+        ValueError: if the number of output rasters is not the number of pixel sizes
+
+    Returns:
+        List[Tuple[float, str]]: (pixel size, output raster) pairs
+    """
+    pixel_sizes = commons.get_pixel_sizes(pixel_size)
+    output_files = [output_file] if isinstance(output_file, (str, os.PathLike)) else list(output_file)
+    if len(output_files) != len(pixel_sizes):
+        raise ValueError(f"Expected one output raster per pixel size ({pixel_sizes}), got {output_files}")
+
+    return list(zip(pixel_sizes, output_files))
+
+
+def save_raster(
+    raster: Raster,
     output_file: str,
+    output_profile: Optional[RasterOutputProfile] = None,
+    raster_writer: Optional[AsyncRasterWriter] = None,
+    tile: Optional[str] = None,
+):
+    """Write a raster computed in memory: in a "write" span (of the tile, if there is no current span), or in the
+    background if a raster writer is given (cf. commons.raster_writer)"""
+    if raster_writer is not None:
+        raster_writer.write(raster, output_file, output_profile)
+        return
+
+    with metrics.span("write", tile=tile, output=os.path.basename(output_file)) as write_span:
+        raster.write(output_file, output_profile)
+        write_span.add(bytes_written=metrics.get_file_size(output_file))
+
+
+def get_faceraster_filter(origin: Tuple[float, float], tile_width: int, pixel_size: float) -> pdal.Filter:
+    """Get the faceraster filter that interpolates a triangulation on the grid of a tile (pixel centers are on
+    multiples of pixel_size, starting from the upper-left corner of the tile, cf. tin_raster.get_tile_grid)"""
+    lower_left, nb_pixels = get_tile_grid(origin, tile_width, pixel_size)
+
+    return pdal.Filter.faceraster(
+        resolution=str(pixel_size),
+        origin_x=str(lower_left[0]),
+        origin_y=str(lower_left[1]),
+        width=str(nb_pixels[0]),
+        height=str(nb_pixels[1]),
+    )
+
+
+def rasterize_with_faceraster(
+    points: np.ndarray,
+    origin: Tuple[float, float],
+    tile_width: int,
     pixel_size: float,
+    no_data_value: int,
+    srs_wkt: Optional[str] = None,
+) -> Raster:
+    """Triangulate points with pdal's filters.delaunay and interpolate the triangulation on the grid of the tile
+    with filters.faceraster into a raster in memory, measured in a "delaunay_faceraster" span.
+
+    pdal writes the raster in GDAL's in-memory filesystem (/vsimem), from where it is read and deleted.
+
+    Args:
+        points (np.ndarray): points to triangulate (with X, Y and Z fields)
+        origin (Tuple[float, float]): upper-left corner of the tile
+        tile_width (int): width of the tile in meters
+        pixel_size (float): pixel size in meters
+        no_data_value (int): no data value for the pixels that are in no triangle
+        srs_wkt (Optional[str], optional): WKT of the spatial reference of the raster (points that come from numpy
+        arrays have no spatial reference in pdal). Defaults to None.
+
+    Returns:
+        Raster: interpolated raster
+    """
+    tmp_file = f"/vsimem/{uuid.uuid4().hex}.tif"
+    pipeline = pdal.Filter.delaunay().pipeline(points)
+    pipeline |= get_faceraster_filter(origin, tile_width, pixel_size)
+    pipeline |= pdal.Writer.raster(gdaldriver="GTiff", nodata=no_data_value, data_type="float32", filename=tmp_file)
+    try:
+        with metrics.span("delaunay_faceraster", pixel_size=pixel_size) as faceraster_span:
+            pipeline.execute()
+            dataset = gdal.Open(tmp_file)
+            data = dataset.GetRasterBand(1).ReadAsArray()
+            transform = Affine.from_gdal(*dataset.GetGeoTransform())
+            dataset = None  # close gdal dataset
+            faceraster_span.add(output_pixels=data.size)
+    finally:
+        if gdal.VSIStatL(tmp_file) is not None:
+            gdal.Unlink(tmp_file)
+
+    return Raster(data, transform, srs_wkt, no_data_value)
+
+
+def rasterize_triangles(
+    points: np.ndarray,
+    triangles: np.ndarray,
+    origin: Tuple[float, float],
+    tile_width: int,
+    pixel_size: float,
+    no_data_value: int,
+    srs_wkt: Optional[str] = None,
+) -> Raster:
+    """Interpolate a triangulation on the grid of the tile (cf. tin_raster.rasterize_tin) into a raster in memory,
+    measured in a "faceraster" span
+
+    Args:
+        points (np.ndarray): vertices of the triangulation (with X, Y and Z fields)
+        triangles (np.ndarray): indices of the 3 vertices of each triangle, shape (nb_triangles, 3)
+        origin (Tuple[float, float]): upper-left corner of the tile
+        tile_width (int): width of the tile in meters
+        pixel_size (float): pixel size in meters
+        no_data_value (int): no data value for the pixels that are in no triangle
+        srs_wkt (Optional[str], optional): WKT of the spatial reference of the raster. Defaults to None.
+
+    Returns:
+        Raster: interpolated raster
+    """
+    lower_left, nb_pixels = get_tile_grid(origin, tile_width, pixel_size)
+    with metrics.span("faceraster", pixel_size=pixel_size) as faceraster_span:
+        data = rasterize_tin(
+            points["X"], points["Y"], points["Z"], triangles, lower_left, pixel_size, nb_pixels, no_data_value
+        )
+        faceraster_span.add(output_pixels=data.size)
+
+    return Raster(data, get_grid_transform(lower_left, pixel_size, nb_pixels[1]), srs_wkt, no_data_value)
+
+
+def remove_duplicate_xy(points: np.ndarray) -> np.ndarray:
+    """Keep a single point for each X, Y position: the highest one (eg. the first return of a pulse), whatever the
+    order of the points. The points are returned sorted by X then Y.
+
+    A Delaunay triangulation keeps an arbitrary point among the points that have the same X and Y, that depends on the
+    order of the points: the duplicates are removed before triangulating a sub-tile, so that two sub-tiles whose
+    margins overlap keep the same point (cf. rasterize_sub_tile_rasters).
+    """
+    order = np.lexsort((-points["Z"], points["Y"], points["X"]))
+    x = points["X"][order]
+    y = points["Y"][order]
+    keep = np.ones(len(order), dtype=bool)
+    keep[1:] = (x[1:] != x[:-1]) | (y[1:] != y[:-1])
+
+    return points[order[keep]]
+
+
+def triangulate_points(points: np.ndarray, backend: str = "pdal") -> Tuple[np.ndarray, np.ndarray]:
+    """Delaunay triangulation of points in memory, with pdal's filters.delaunay or with scipy (cf. BACKENDS)
+
+    Args:
+        points (np.ndarray): points to triangulate (with X, Y and Z fields)
+        backend (str, optional): interpolation backend. Defaults to "pdal".
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: vertices of the triangulation, and indices of the 3 vertices of each triangle
+        (shape (nb_triangles, 3))
+    """
+    if backend == "scipy":
+        return points, triangulate(points["X"], points["Y"])
+
+    pipeline = pdal.Filter.delaunay().pipeline(points)
+    pipeline.execute()
+    mesh = pipeline.meshes[0]
+
+    return pipeline.arrays[0], np.column_stack([mesh["A"], mesh["B"], mesh["C"]])
+
+
+def iter_sub_tile_points(points: np.ndarray, sub_tiles: List[SubTile]) -> Iterator[Tuple[SubTile, np.ndarray]]:
+    """Select the points of each sub-tile (core and margin) among points that are already in memory"""
+    for sub_tile in sub_tiles:
+        yield sub_tile, points[sub_tile.contains(points["X"], points["Y"])]
+
+
+def read_sub_tile_points(
+    chunks: Iterable[np.ndarray], sub_tiles: List[SubTile], tmp_dir: str
+) -> Iterator[Tuple[SubTile, np.ndarray]]:
+    """Read the points of each sub-tile (core and margin) from a stream of chunks of points (eg. a streamed pdal
+    pipeline, or iter_las_chunks), without loading all the points at once.
+
+    The points of each sub-tile are appended to a file of tmp_dir while the chunks are read: the points of a chunk
+    are written to the file of each sub-tile that they are in, which is opened only during this write, so that the
+    number of open files does not depend on the number of sub-tiles. These files are then read one at a time, so that
+    only the points of one sub-tile are in memory.
+
+    Args:
+        chunks (Iterable[np.ndarray]): chunks of points
+        sub_tiles (List[SubTile]): sub-tiles of the tile
+        tmp_dir (str): folder where the points of the sub-tiles are stored while the chunks are read
+
+    Yields:
+        Iterator[Tuple[SubTile, np.ndarray]]: each sub-tile and its points
+    """
+    sub_tile_files = [os.path.join(tmp_dir, f"sub_tile_{sub_tile.col}_{sub_tile.row}.bin") for sub_tile in sub_tiles]
+    dtype = None
+    with metrics.span("read") as read_span:
+        nb_points = 0
+        for array in chunks:
+            dtype = array.dtype
+            nb_points += len(array)
+            if not len(array):
+                continue
+            x, y = array["X"], array["Y"]
+            chunk_xmin, chunk_ymin, chunk_xmax, chunk_ymax = x.min(), y.min(), x.max(), y.max()
+            for sub_tile, sub_tile_file in zip(sub_tiles, sub_tile_files):
+                xmin, ymin, xmax, ymax = sub_tile.bounds
+                if xmin > chunk_xmax or xmax < chunk_xmin or ymin > chunk_ymax or ymax < chunk_ymin:
+                    continue
+                sub_tile_points = array[sub_tile.contains(x, y)]
+                if len(sub_tile_points):
+                    with open(sub_tile_file, "ab") as f:
+                        sub_tile_points.tofile(f)
+        read_span.add(input_points=nb_points)
+
+    for sub_tile, sub_tile_file in zip(sub_tiles, sub_tile_files):
+        if os.path.exists(sub_tile_file):
+            points = np.fromfile(sub_tile_file, dtype=dtype)
+            os.remove(sub_tile_file)
+        else:
+            points = np.empty(0, dtype=dtype)
+        yield sub_tile, points
+
+
+def rasterize_sub_tile_rasters(
+    sub_tile_points: Iterable[Tuple[SubTile, np.ndarray]],
+    sub_tiling: SubTiling,
+    pixel_sizes: Sequence[float],
+    origin: Tuple[float, float],
+    tile_width: int,
+    no_data_value: int,
+    srs_wkt: Optional[str] = None,
+    backend: str = "pdal",
+) -> List[Raster]:
+    """Interpolate the rasters of a tile in memory by triangulating its sub-tiles one at a time (cf. tasks.sub_tiles):
+    each sub-tile is triangulated with the points of its core and its margin, and only the pixels of its core are
+    interpolated (cf. tin_raster.rasterize_tin) in the rasters of the tile. The points of each sub-tile that have the
+    same X and Y are reduced to the highest one before the triangulation (cf. remove_duplicate_xy), so that the
+    sub-tiles do not depend on the order in which their points are read.
+
+    Each sub-tile is measured in a "sub_tile" span, with nested "delaunay" and "faceraster" spans.
+
+    Args:
+        sub_tile_points (Iterable[Tuple[SubTile, np.ndarray]]): each sub-tile of the tile and its points (cf.
+        iter_sub_tile_points and read_sub_tile_points)
+        sub_tiling (SubTiling): sub-tiling of the tile
+        pixel_sizes (Sequence[float]): pixel sizes of the rasters
+        origin (Tuple[float, float]): upper-left corner of the tile
+        tile_width (int): width of the tile in meters
+        no_data_value (int): no data value for the pixels that are in no triangle
+        srs_wkt (Optional[str], optional): WKT of the spatial reference of the rasters. Defaults to None.
+        backend (str, optional): interpolation backend used to triangulate the sub-tiles (cf. BACKENDS).
+        Defaults to "pdal".
+
+    Returns:
+        List[Raster]: one raster per pixel size
+    """
+    grids = [get_tile_grid(origin, tile_width, pixel_size) for pixel_size in pixel_sizes]
+    rasters = [
+        Raster(
+            np.full((nb_pixels[1], nb_pixels[0]), no_data_value, dtype=np.float32),
+            get_grid_transform(lower_left, pixel_size, nb_pixels[1]),
+            srs_wkt,
+            no_data_value,
+        )
+        for pixel_size, (lower_left, nb_pixels) in zip(pixel_sizes, grids)
+    ]
+
+    for sub_tile, points in sub_tile_points:
+        with metrics.span("sub_tile", col=sub_tile.col, row=sub_tile.row, input_points=len(points)):
+            if len(points) < 3:
+                continue  # no triangle: the pixels of the sub-tile stay no-data
+            with metrics.span("delaunay"):
+                points, triangles = triangulate_points(remove_duplicate_xy(points), backend)
+
+            for pixel_size, (lower_left, nb_pixels), raster in zip(pixel_sizes, grids, rasters):
+                window, sub_tile_lower_left, sub_tile_pixels = sub_tiling.get_sub_tile_grid(
+                    sub_tile, lower_left, nb_pixels, pixel_size
+                )
+                with metrics.span("faceraster", pixel_size=pixel_size) as faceraster_span:
+                    raster.data[window] = rasterize_tin(
+                        points["X"],
+                        points["Y"],
+                        points["Z"],
+                        triangles,
+                        sub_tile_lower_left,
+                        pixel_size,
+                        sub_tile_pixels,
+                        no_data_value,
+                    )
+                    faceraster_span.add(output_pixels=sub_tile_pixels[0] * sub_tile_pixels[1])
+            del points, triangles
+
+    return rasters
+
+
+def interpolate_products_from_config(
+    input_file: str, output_rasters: Dict[str, Union[str, Sequence[str]]], config: dict
+):
+    """API using a config dictionary for the `interpolate_products` method defined in this file
+    Generate one Z (height) raster file per product from a single read of a LAS point cloud file.
+
+    Args:
+        input_file (str): path to the las/laz file to interpolate
+        output_rasters (Dict[str, Union[str, Sequence[str]]]): path to the output raster for each product name (or
+        one path per pixel size if "pixel_size" is a list)
+        config (dict): ProduitDeriveLidar config dictionary containing the same "tile_geometry", "io",
+        "interpolation" and "sub_tiles" keys as for `interpolate_from_config`, and
+        {
+            "batch": {
+                "products": {
+                    #str, product name: {
+                        "dimension": #str, dimension along which to filter
+                        "keep_values": #list of ints, values of the filter dimension for the points to use
+                    }
+                }
+            }
+        }
+    """
+    interpolate_products(
+        input_file,
+        {
+            output if isinstance(output, str) else tuple(output): config["batch"]["products"][product]
+            for product, output in output_rasters.items()
+        },
+        config["tile_geometry"]["pixel_size"],
+        config["tile_geometry"]["tile_width"],
+        config["tile_geometry"]["tile_coord_scale"],
+        config["io"]["spatial_reference"],
+        config["tile_geometry"]["no_data_value"],
+        no_data_mask=get_no_data_mask_from_config(config),
+        output_profile=get_output_profile_from_config(config),
+        sub_tiling=get_sub_tiling_from_config(config),
+        backend=get_backend_from_config(config),
+    )
+
+
+def interpolate(
+    input_file: str,
+    output_file: Union[str, Sequence[str]],
+    pixel_size: Union[float, Sequence[float]],
     tile_width: int,
     tile_coord_scale: int,
     spatial_ref: str,
     no_data_value: int,
     filter_dimension: str,
     filter_values: List[int],
+    no_data_mask: Optional[NoDataMask] = None,
+    output_profile: Optional[RasterOutputProfile] = None,
+    sub_tiling: Optional[SubTiling] = None,
+    backend: str = "pdal",
 ):
     """Generate a Z (height) raster file from a LAS point cloud file by interpolating the Z value at the center of
     each pixel.
@@ -69,13 +505,22 @@ def interpolate(
     - filter the points to use in the interplation (using one dimension name and a list of values)
     (eg. Classification=2(ground) for a digital terrain model)
     - triangulate the point cloud using Delaunay
-    - interpolate the height values at the center of the pixels using Faceraster
+    - interpolate the height values at the center of the pixels using Faceraster (at several pixel sizes, from the
+    same triangulation, with the same values as pdal's faceraster, cf. tin_raster.rasterize_tin)
+    - set the pixels inside the no-data mask (if any) to no-data
     - write the result in a raster file.
 
+    The rasters are computed by `interpolate_to_rasters` (cf. its spans), then each raster is written in a "write"
+    span. With a sub-tiling, only the points of each sub-tile (and its margin) are in memory at once.
+
+    With the "scipy" backend, the points are read with laspy and filtered with numpy, and triangulated with scipy
+    instead of pdal.
+
     Args:
         input_file (str): path to the las/laz file to interpolate
-        output_file (str): path to the output raster
-        pixel_size (float): pixel size of the output raster in meters (pixels are supposed to be squares)
+        output_file (Union[str, Sequence[str]]): path to the output raster (or one path per pixel size)
+        pixel_size (Union[float, Sequence[float]]): pixel size of the output raster in meters (pixels are supposed
+        to be squares), or list of pixel sizes to generate one raster per resolution
         tile_width (int): width of the tile in meters (used to infer the lower-left corner)
         tile_coord_scale (int): scale of the tiles coordinates in the las filename
         spatial_ref (str): spatial reference to use when reading las file
@@ -83,29 +528,554 @@ def interpolate(
         filter_dimension (str): Name of the dimension along which to filter input points
         (keep empty to disable input filter)
         filter_values (List[int]): Values to keep for input points along filter_dimension
-    """
+        no_data_mask (Optional[NoDataMask], optional): areas to set to no-data in the output raster.
+        Defaults to None.
+        output_profile (Optional[RasterOutputProfile], optional): format of the output raster (default: plain
+        GeoTIFF, cf. commons.raster_output). Defaults to None.
+        sub_tiling (Optional[SubTiling], optional): split of the tile into sub-tiles that are triangulated one at
+        a time, to bound the memory on very dense tiles (None: triangulate the whole tile). Defaults to None.
+        backend (str, optional): interpolation backend, "pdal" or "scipy" (cf. BACKENDS). Defaults to "pdal".
 
-    _, coordX, coordY, _ = parse_filename(input_file)
+    Raises:
+        ValueError: if the backend is unknown
+    """
+    output_rasters = get_output_rasters(output_file, pixel_size)
+    rasters = interpolate_to_rasters(
+        input_file,
+        pixel_size,
+        tile_width,
+        tile_coord_scale,
+        spatial_ref,
+        no_data_value,
+        filter_dimension,
+        filter_values,
+        no_data_mask=no_data_mask,
+        sub_tiling=sub_tiling,
+        backend=backend,
+    )
+    for raster, (_, output) in zip(rasters, output_rasters):
+        save_raster(raster, output, output_profile, tile=input_file)
 
-    # Compute origin/number of pixels
-    origin = [float(coordX) * tile_coord_scale, float(coordY) * tile_coord_scale]
-    nb_pixels = [int(tile_width / pixel_size), int(tile_width / pixel_size)]
 
-    # Read with pdal
-    pipeline = pdal.Reader.las(filename=input_file, override_srs=spatial_ref, nosrs=True)
+def filter_points(points: np.ndarray, filter_dimension: str, filter_values: Sequence[int]) -> np.ndarray:
+    """Keep the points whose value along filter_dimension is in filter_values (all the points if filter_dimension
+    or filter_values is empty)"""
     if filter_dimension and filter_values:
-        pipeline |= pdal.Filter.range(limits=",".join(f"{filter_dimension}[{v}:{v}]" for v in filter_values))
+        return points[np.isin(points[filter_dimension], list(filter_values))]
 
-    # Add interpolation method to the pdal pipeline
-    pipeline |= pdal.Filter.delaunay()
+    return points
 
-    pipeline |= pdal.Filter.faceraster(
-        resolution=str(pixel_size),
-        origin_x=str(origin[0] - pixel_size / 2),  # lower left corner
-        origin_y=str(origin[1] + pixel_size / 2 - tile_width),  # lower left corner
-        width=str(nb_pixels[0]),
-        height=str(nb_pixels[1]),
+
+def get_laspy_dimension(dimension: str, laspy_dimensions: Sequence[str]) -> str:
+    """Get the laspy name of a dimension from its pdal name (eg. ReturnNumber -> return_number). Dimensions whose
+    name is the same in laspy (eg. extra bytes) are kept as is."""
+    if dimension in laspy_dimensions:
+        return dimension
+
+    return LASPY_DIMENSIONS.get(dimension) or re.sub(r"(?<!^)(?=[A-Z])", "_", dimension).lower()
+
+
+def laspy_points_to_array(points: laspy.ScaleAwarePointRecord, dimensions: Sequence[str]) -> np.ndarray:
+    """Convert points read by laspy into a numpy structured array with the dimension names of pdal: scaled X, Y and
+    Z coordinates, and the given dimensions (eg. Classification)"""
+    laspy_dimensions = list(points.point_format.dimension_names)
+    columns = {"X": np.asarray(points.x), "Y": np.asarray(points.y), "Z": np.asarray(points.z)}
+    for dimension in dimensions:
+        if dimension not in columns:
+            columns[dimension] = np.asarray(points[get_laspy_dimension(dimension, laspy_dimensions)])
+
+    array = np.empty(len(points), dtype=[(name, column.dtype) for name, column in columns.items()])
+    for name, column in columns.items():
+        array[name] = column
+
+    return array
+
+
+def get_decompression_selection(dimensions: Sequence[str]) -> laspy.DecompressionSelection:
+    """Get the fields of a LAZ 1.4 file to decompress to read the X, Y, Z coordinates and the given dimensions (with
+    their pdal names): the other fields are skipped, which roughly halves the decompression time when only the
+    classification is read (laspy ignores the selection for other las versions and point formats)"""
+    selection = laspy.DecompressionSelection.base().decompress_z()
+    for dimension in dimensions:
+        laspy_dimension = get_laspy_dimension(dimension, ())
+        selection |= DECOMPRESSION_FIELDS.get(laspy_dimension, laspy.DecompressionSelection.ALL_EXTRA_BYTES)
+
+    return selection
+
+
+def read_las_with_laspy(
+    input_file: str, dimensions: Sequence[str] = (), laz_backend: Optional[laspy.LazBackend] = None
+) -> np.ndarray:
+    """Read a las/laz file with laspy into a numpy structured array with the X, Y, Z coordinates and the given
+    dimensions (with their pdal names, cf. laspy_points_to_array), measured in a "read" span
+
+    LAZ files are decompressed only for the fields of the dimensions that are read (cf. get_decompression_selection),
+    with laz_backend (None: laspy's default backend, eg. LazBackend.LazrsParallel to decompress the chunks of the
+    file on several threads)."""
+    with metrics.span("read", tile=input_file) as read_span:
+        las = laspy.read(
+            input_file,
+            laz_backend=laz_backend or laspy.LazBackend.detect_available(),
+            decompression_selection=get_decompression_selection(dimensions),
+        )
+        points = laspy_points_to_array(las.points, dimensions)
+        read_span.add(input_points=len(points), bytes_read=metrics.get_file_size(input_file))
+
+    return points
+
+
+def iter_las_chunks(input_file: str, dimensions: Sequence[str], chunk_size: int) -> Iterator[np.ndarray]:
+    """Read a las/laz file with laspy by chunks of points (cf. read_las_with_laspy)"""
+    with laspy.open(input_file, decompression_selection=get_decompression_selection(dimensions)) as f:
+        for chunk in f.chunk_iterator(chunk_size):
+            yield laspy_points_to_array(chunk, dimensions)
+
+
+def read_las(input_file: str, spatial_ref: str) -> Tuple[np.ndarray, str]:
+    """Read (and decompress) a las/laz file into a numpy structured array (measured in a "read" span)
+
+    Args:
+        input_file (str): path to the las/laz file to read
+        spatial_ref (str): spatial reference to use when reading las file
+
+    Returns:
+        Tuple[np.ndarray, str]: points of the las file, and WKT of its spatial reference
+    """
+    with metrics.span("read", tile=input_file) as read_span:
+        pipeline = pdal.Reader.las(filename=input_file, override_srs=spatial_ref, nosrs=True).pipeline()
+        pipeline.execute()
+        read_span.add(input_points=len(pipeline.arrays[0]), bytes_read=metrics.get_file_size(input_file))
+
+    return pipeline.arrays[0], pipeline.srswkt2
+
+
+def get_filter_dimensions(product_filters: Iterable[Dict]) -> List[str]:
+    """Get the dimensions used by the filter presets of products ("dimension" and "keep_values"), ie. the only
+    dimensions to read with laspy to interpolate these products"""
+    return sorted(
+        {product["dimension"] for product in product_filters if product["dimension"] and product["keep_values"]}
     )
-    pipeline |= pdal.Writer.raster(gdaldriver="GTiff", nodata=no_data_value, data_type="float32", filename=output_file)
 
-    pipeline.execute()
+
+def get_srs_wkt(spatial_ref: str) -> str:
+    """Get the WKT of a spatial reference (eg. "EPSG:2154"), for the points read with laspy (the spatial reference
+    of the las files is overridden, as in the pdal readers)"""
+    return CRS.from_user_input(spatial_ref).to_wkt()
+
+
+def read_product_points(
+    input_file: str, spatial_ref: str, product_filters: Iterable[Dict], backend: str = "pdal"
+) -> Tuple[np.ndarray, str]:
+    """Read the points of a las/laz file once for several products: with pdal (cf. read_las), or with laspy for the
+    "scipy" backend (only the dimensions used by the filters of the products are read, cf. read_las_with_laspy)
+
+    Args:
+        input_file (str): path to the las/laz file to read
+        spatial_ref (str): spatial reference to use when reading las file
+        product_filters (Iterable[Dict]): filter preset of each product ("dimension" and "keep_values")
+        backend (str, optional): interpolation backend (cf. BACKENDS). Defaults to "pdal".
+
+    Returns:
+        Tuple[np.ndarray, str]: points of the las file, and WKT of its spatial reference
+    """
+    if backend == "scipy":
+        return read_las_with_laspy(input_file, get_filter_dimensions(product_filters)), get_srs_wkt(spatial_ref)
+
+    return read_las(input_file, spatial_ref)
+
+
+def interpolate_products(
+    input_file: str,
+    products: Dict[Union[str, Tuple[str, ...]], Dict],
+    pixel_size: Union[float, Sequence[float]],
+    tile_width: int,
+    tile_coord_scale: int,
+    spatial_ref: str,
+    no_data_value: int,
+    no_data_mask: Optional[NoDataMask] = None,
+    output_profile: Optional[RasterOutputProfile] = None,
+    sub_tiling: Optional[SubTiling] = None,
+    backend: str = "pdal",
+):
+    """Generate several Z (height) raster files (eg. DTM and DSM) from a LAS point cloud file that is read and
+    decompressed only once.
+
+    The point cloud is read once, then for each product:
+    - filter the points to use in the interpolation (using the filter preset of the product, as in
+    configs/filter/*.yaml)
+    - triangulate the point cloud using Delaunay
+    - interpolate the height values at the center of the pixels (at each pixel size, from the same triangulation)
+    - set the pixels inside the no-data mask (if any) to no-data
+    - write the result in a raster file.
+
+    Results are the same as calling `interpolate` once per product. The rasters are computed by
+    `interpolate_products_to_rasters`, then each raster is written in a "write" span.
+
+    Args:
+        input_file (str): path to the las/laz file to interpolate
+        products (Dict[Union[str, Tuple[str, ...]], Dict]): filter preset for each output raster path (or tuple of
+        paths, one per pixel size), as a dictionary containing "dimension" (name of the dimension along which to
+        filter input points, keep empty to disable input filter) and "keep_values" (values to keep for input points
+        along this dimension)
+        pixel_size (Union[float, Sequence[float]]): pixel size of the output rasters in meters (pixels are supposed
+        to be squares), or list of pixel sizes to generate one raster per resolution
+        tile_width (int): width of the tile in meters (used to infer the lower-left corner)
+        tile_coord_scale (int): scale of the tiles coordinates in the las filename
+        spatial_ref (str): spatial reference to use when reading las file
+        no_data_value (int): no data value for the output rasters
+        no_data_mask (Optional[NoDataMask], optional): areas to set to no-data in the output rasters.
+        Defaults to None.
+        output_profile (Optional[RasterOutputProfile], optional): format of the output rasters (default: plain
+        GeoTIFF, cf. commons.raster_output). Defaults to None.
+        sub_tiling (Optional[SubTiling], optional): split of the tile into sub-tiles that are triangulated one at
+        a time (cf. `interpolate_points`). Defaults to None.
+        backend (str, optional): interpolation backend, "pdal" or "scipy" (the point cloud is then read with laspy,
+        cf. BACKENDS). Defaults to "pdal".
+    """
+    product_rasters = interpolate_products_to_rasters(
+        input_file,
+        products,
+        pixel_size,
+        tile_width,
+        tile_coord_scale,
+        spatial_ref,
+        no_data_value,
+        no_data_mask=no_data_mask,
+        sub_tiling=sub_tiling,
+        backend=backend,
+    )
+    for output_file, rasters in product_rasters.items():
+        for raster, (_, output) in zip(rasters, get_output_rasters(output_file, pixel_size)):
+            save_raster(raster, output, output_profile, tile=input_file)
+
+
+def interpolate_points(
+    points: np.ndarray,
+    srs_wkt: str,
+    tile_filename: str,
+    products: Dict[Union[str, Tuple[str, ...]], Dict],
+    pixel_size: Union[float, Sequence[float]],
+    tile_width: int,
+    tile_coord_scale: int,
+    no_data_value: int,
+    no_data_mask: Optional[NoDataMask] = None,
+    output_profile: Optional[RasterOutputProfile] = None,
+    sub_tiling: Optional[SubTiling] = None,
+    backend: str = "pdal",
+    raster_writer: Optional[AsyncRasterWriter] = None,
+):
+    """Generate one Z (height) raster file per product from points that are already in memory (eg. a tile and
+    the buffer from its neighbors, cf. `las_buffer.read_las_with_buffer`)
+
+    The rasters of each product are computed by `interpolate_points_to_rasters` (cf. its spans), then written in a
+    "write" span (or in the background with a raster writer).
+
+    With a sub-tiling, each product is triangulated one sub-tile at a time (cf. rasterize_sub_tile_rasters): the
+    points are already in memory, but the memory of the triangulation is bounded by the number of points of a sub-tile.
+
+    Args:
+        points (np.ndarray): points to interpolate (as read by pdal)
+        srs_wkt (str): WKT of the spatial reference of the points
+        tile_filename (str): filename of the tile (used to infer the tile origin)
+        products (Dict[Union[str, Tuple[str, ...]], Dict]): filter preset for each output raster path (or tuple of
+        paths, one per pixel size) (cf. `interpolate_products`)
+        pixel_size (Union[float, Sequence[float]]): pixel size of the output rasters in meters (pixels are supposed
+        to be squares), or list of pixel sizes
+        tile_width (int): width of the tile in meters (used to infer the lower-left corner)
+        tile_coord_scale (int): scale of the tiles coordinates in the las filename
+        no_data_value (int): no data value for the output rasters
+        no_data_mask (Optional[NoDataMask], optional): areas to set to no-data in the output rasters.
+        Defaults to None.
+        output_profile (Optional[RasterOutputProfile], optional): format of the output rasters (default: plain
+        GeoTIFF, cf. commons.raster_output). Defaults to None.
+        sub_tiling (Optional[SubTiling], optional): split of the tile into sub-tiles that are triangulated one at
+        a time, to bound the memory on very dense tiles (None: triangulate the whole tile). Defaults to None.
+        backend (str, optional): interpolation backend used to triangulate the points, "pdal" or "scipy" (cf.
+        BACKENDS). Defaults to "pdal".
+        raster_writer (Optional[AsyncRasterWriter], optional): writer of the rasters in the background, so that the
+        next product is computed while the rasters are written (cf. commons.raster_writer, the rasters are then
+        written only when the writer is flushed). Defaults to None.
+    """
+    for output_file, product_filter in products.items():
+        output_rasters = get_output_rasters(output_file, pixel_size)
+        rasters = interpolate_points_to_rasters(
+            points,
+            srs_wkt,
+            tile_filename,
+            product_filter,
+            pixel_size,
+            tile_width,
+            tile_coord_scale,
+            no_data_value,
+            no_data_mask=no_data_mask,
+            sub_tiling=sub_tiling,
+            backend=backend,
+        )
+        for raster, (_, output) in zip(rasters, output_rasters):
+            save_raster(raster, output, output_profile, raster_writer, tile=tile_filename)
+
+
+def interpolate_to_rasters_from_config(input_file: str, config: dict) -> List[Raster]:
+    """API using a config dictionary for the `interpolate_to_rasters` method defined in this file (same config as
+    `interpolate_from_config`, without output_profile)
+
+    Args:
+        input_file (str): path to the las/laz file to interpolate
+        config (dict): ProduitDeriveLidar config dictionary (cf. `interpolate_from_config`)
+
+    Returns:
+        List[Raster]: one raster per pixel size
+    """
+    return interpolate_to_rasters(
+        input_file,
+        config["tile_geometry"]["pixel_size"],
+        config["tile_geometry"]["tile_width"],
+        config["tile_geometry"]["tile_coord_scale"],
+        config["io"]["spatial_reference"],
+        config["tile_geometry"]["no_data_value"],
+        config["filter"]["dimension"],
+        config["filter"]["keep_values"],
+        no_data_mask=get_no_data_mask_from_config(config),
+        sub_tiling=get_sub_tiling_from_config(config),
+        backend=get_backend_from_config(config),
+    )
+
+
+def interpolate_to_rasters(
+    input_file: str,
+    pixel_size: Union[float, Sequence[float]],
+    tile_width: int,
+    tile_coord_scale: int,
+    spatial_ref: str,
+    no_data_value: int,
+    filter_dimension: str,
+    filter_values: List[int],
+    no_data_mask: Optional[NoDataMask] = None,
+    sub_tiling: Optional[SubTiling] = None,
+    backend: str = "pdal",
+) -> List[Raster]:
+    """Interpolate the rasters of a LAS point cloud file in memory (values, transform and spatial reference), cf.
+    `interpolate` that writes them (cf. commons.raster.Raster, that can still be written, eg. to /vsimem/)
+
+    The whole tile is read at once and interpolated as in `interpolate_products_to_rasters`. With a sub-tiling, the
+    points are streamed by chunks (from a pdal pipeline, or from laspy with the "scipy" backend) and only the points
+    of one sub-tile (and its margin) are in memory at once (cf. read_sub_tile_points and rasterize_sub_tile_rasters):
+    the interpolation is then measured in an "interpolate" span, with nested "read" and "sub_tile" spans.
+
+    Args:
+        input_file (str): path to the las/laz file to interpolate
+        pixel_size (Union[float, Sequence[float]]): pixel size of the raster in meters, or list of pixel sizes
+        tile_width (int): width of the tile in meters (used to infer the lower-left corner)
+        tile_coord_scale (int): scale of the tiles coordinates in the las filename
+        spatial_ref (str): spatial reference to use when reading las file
+        no_data_value (int): no data value for the rasters
+        filter_dimension (str): Name of the dimension along which to filter input points
+        (keep empty to disable input filter)
+        filter_values (List[int]): Values to keep for input points along filter_dimension
+        no_data_mask (Optional[NoDataMask], optional): areas to set to no-data in the rasters. Defaults to None.
+        sub_tiling (Optional[SubTiling], optional): split of the tile into sub-tiles that are triangulated one at
+        a time, to bound the memory on very dense tiles (None: triangulate the whole tile). Defaults to None.
+        backend (str, optional): interpolation backend, "pdal" or "scipy" (cf. BACKENDS). Defaults to "pdal".
+
+    Raises:
+        ValueError: if the backend is unknown
+
+    Returns:
+        List[Raster]: one raster per pixel size
+    """
+    if sub_tiling is None:
+        product_filter = {"dimension": filter_dimension, "keep_values": filter_values}
+        return interpolate_products_to_rasters(
+            input_file,
+            {"raster": product_filter},
+            pixel_size,
+            tile_width,
+            tile_coord_scale,
+            spatial_ref,
+            no_data_value,
+            no_data_mask=no_data_mask,
+            backend=backend,
+        )["raster"]
+
+    check_backend(backend)
+    sub_tiling.check_pixel_sizes(pixel_size)
+    _, coordX, coordY, _ = parse_filename(input_file)
+
+    # Compute origin (upper-left corner of the tile)
+    origin = (float(coordX) * tile_coord_scale, float(coordY) * tile_coord_scale)
+
+    with metrics.span("interpolate", tile=input_file) as interpolate_span:
+        if backend == "scipy":
+            dimensions = [filter_dimension] if filter_dimension and filter_values else []
+            chunks = (
+                filter_points(chunk, filter_dimension, filter_values)
+                for chunk in iter_las_chunks(input_file, dimensions, sub_tiling.chunk_size)
+            )
+        else:
+            # A pipeline, even without filter: a single stage cannot be streamed by chunks
+            pipeline = pdal.Reader.las(filename=input_file, override_srs=spatial_ref, nosrs=True).pipeline()
+            if filter_dimension and filter_values:
+                pipeline |= pdal.Filter.range(limits=",".join(f"{filter_dimension}[{v}:{v}]" for v in filter_values))
+            chunks = pipeline.iterator(chunk_size=sub_tiling.chunk_size)
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            rasters = rasterize_sub_tile_rasters(
+                read_sub_tile_points(chunks, sub_tiling.get_sub_tiles(origin, tile_width), tmp_dir),
+                sub_tiling,
+                commons.get_pixel_sizes(pixel_size),
+                origin,
+                tile_width,
+                no_data_value,
+                srs_wkt=get_srs_wkt(spatial_ref),
+                backend=backend,
+            )
+
+        if no_data_mask is not None:
+            for raster in rasters:
+                mask_raster(raster, no_data_mask)
+        interpolate_span.add(
+            bytes_read=metrics.get_file_size(input_file), output_pixels=sum(raster.data.size for raster in rasters)
+        )
+
+    return rasters
+
+
+def interpolate_products_to_rasters(
+    input_file: str,
+    products: Dict[str, Dict],
+    pixel_size: Union[float, Sequence[float]],
+    tile_width: int,
+    tile_coord_scale: int,
+    spatial_ref: str,
+    no_data_value: int,
+    no_data_mask: Optional[NoDataMask] = None,
+    sub_tiling: Optional[SubTiling] = None,
+    backend: str = "pdal",
+) -> Dict[str, List[Raster]]:
+    """Same as `interpolate_products`, but the rasters of the products (eg. DTM and DSM) are returned in memory
+    instead of being written, eg. to compute the DHM without intermediate files (cf.
+    dhm_generation.calculate_dhm_raster)
+
+    Args:
+        input_file (str): path to the las/laz file to interpolate
+        products (Dict[str, Dict]): filter preset for each product name (cf. `interpolate_products`)
+        pixel_size (Union[float, Sequence[float]]): pixel size of the rasters in meters, or list of pixel sizes
+        tile_width (int): width of the tile in meters (used to infer the lower-left corner)
+        tile_coord_scale (int): scale of the tiles coordinates in the las filename
+        spatial_ref (str): spatial reference to use when reading las file
+        no_data_value (int): no data value for the rasters
+        no_data_mask (Optional[NoDataMask], optional): areas to set to no-data in the rasters. Defaults to None.
+        sub_tiling (Optional[SubTiling], optional): split of the tile into sub-tiles that are triangulated one at
+        a time (cf. `interpolate_points_to_rasters`). Defaults to None.
+        backend (str, optional): interpolation backend, "pdal" or "scipy" (cf. BACKENDS). Defaults to "pdal".
+
+    Returns:
+        Dict[str, List[Raster]]: rasters of each product (one per pixel size)
+    """
+    check_backend(backend)
+    with metrics.span("interpolation", tile=input_file):
+        points, srs_wkt = read_product_points(input_file, spatial_ref, products.values(), backend)
+
+        return {
+            product: interpolate_points_to_rasters(
+                points,
+                srs_wkt,
+                input_file,
+                product_filter,
+                pixel_size,
+                tile_width,
+                tile_coord_scale,
+                no_data_value,
+                no_data_mask=no_data_mask,
+                sub_tiling=sub_tiling,
+                backend=backend,
+            )
+            for product, product_filter in products.items()
+        }
+
+
+def interpolate_points_to_rasters(
+    points: np.ndarray,
+    srs_wkt: str,
+    tile_filename: str,
+    product_filter: Dict,
+    pixel_size: Union[float, Sequence[float]],
+    tile_width: int,
+    tile_coord_scale: int,
+    no_data_value: int,
+    no_data_mask: Optional[NoDataMask] = None,
+    sub_tiling: Optional[SubTiling] = None,
+    backend: str = "pdal",
+) -> List[Raster]:
+    """Interpolate the rasters of one product in memory from points that are already in memory (cf.
+    `interpolate_points`, that writes them).
+
+    The points are triangulated once (with pdal or scipy, or one sub-tile at a time with a sub-tiling). With the
+    pdal backend and a single pixel size, the whole tile is triangulated and rasterized by pdal (filters.delaunay
+    and filters.faceraster, cf. rasterize_with_faceraster). Otherwise, the triangulation is interpolated at each pixel
+    size with numpy (cf. tin_raster.rasterize_tin, same values as pdal's faceraster). The product is measured in an
+    "interpolate" span, with nested "filter" and "delaunay_faceraster" spans, or "filter", "delaunay" and
+    "faceraster" spans.
+
+    Args:
+        points (np.ndarray): points to interpolate (as read by pdal)
+        srs_wkt (str): WKT of the spatial reference of the points
+        tile_filename (str): filename of the tile (used to infer the tile origin)
+        product_filter (Dict): filter preset of the product ("dimension" and "keep_values", cf.
+        `interpolate_products`)
+        pixel_size (Union[float, Sequence[float]]): pixel size of the rasters in meters, or list of pixel sizes
+        tile_width (int): width of the tile in meters (used to infer the lower-left corner)
+        tile_coord_scale (int): scale of the tiles coordinates in the las filename
+        no_data_value (int): no data value for the rasters
+        no_data_mask (Optional[NoDataMask], optional): areas to set to no-data in the rasters. Defaults to None.
+        sub_tiling (Optional[SubTiling], optional): split of the tile into sub-tiles that are triangulated one at
+        a time, to bound the memory on very dense tiles (None: triangulate the whole tile). Defaults to None.
+        backend (str, optional): interpolation backend used to triangulate the points, "pdal" or "scipy" (cf.
+        BACKENDS). Defaults to "pdal".
+
+    Returns:
+        List[Raster]: one raster per pixel size
+    """
+    check_backend(backend)
+    _, coordX, coordY, _ = parse_filename(tile_filename)
+
+    # Compute origin (upper-left corner of the tile)
+    origin = (float(coordX) * tile_coord_scale, float(coordY) * tile_coord_scale)
+    pixel_sizes = commons.get_pixel_sizes(pixel_size)
+
+    with metrics.span("interpolate", tile=tile_filename) as product_span:
+        with metrics.span("filter") as filter_span:
+            product_points = filter_points(points, product_filter["dimension"], product_filter["keep_values"])
+            filter_span.add(input_points=len(points), kept_points=len(product_points))
+
+        if sub_tiling is not None:
+            sub_tiling.check_pixel_sizes(pixel_size)
+            rasters = rasterize_sub_tile_rasters(
+                iter_sub_tile_points(product_points, sub_tiling.get_sub_tiles(origin, tile_width)),
+                sub_tiling,
+                pixel_sizes,
+                origin,
+                tile_width,
+                no_data_value,
+                srs_wkt=srs_wkt,
+                backend=backend,
+            )
+        elif backend == "pdal" and len(pixel_sizes) == 1:
+            rasters = [
+                rasterize_with_faceraster(product_points, origin, tile_width, pixel_sizes[0], no_data_value, srs_wkt)
+            ]
+        else:
+            with metrics.span("delaunay"):
+                vertices, triangles = triangulate_points(product_points, backend)
+            rasters = [
+                rasterize_triangles(vertices, triangles, origin, tile_width, size, no_data_value, srs_wkt)
+                for size in pixel_sizes
+            ]
+            del vertices, triangles
+
+        if no_data_mask is not None:
+            for raster in rasters:
+                mask_raster(raster, no_data_mask)
+        product_span.add(output_pixels=sum(raster.data.size for raster in rasters))
+
+    return rasters
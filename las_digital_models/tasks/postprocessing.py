@@ -1,19 +1,173 @@
+import logging
+import shutil
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
 import fiona
+import numpy as np
 import rasterio
-import rasterio.mask
+from affine import Affine
+from rasterio.features import geometry_mask
+from rasterio.transform import array_bounds
+from shapely.geometry import box, shape
+from shapely.strtree import STRtree
+
+from las_digital_models.commons import metrics
+from las_digital_models.commons.raster import Raster
+from las_digital_models.commons.raster_output import RasterOutputProfile
+
+# No-data masks already loaded in the current process, indexed by shapefile path
+_no_data_masks: Dict[str, "NoDataMask"] = {}
+
+
+class NoDataMask:
+    """Polygons of a no-data mask shapefile, loaded once and indexed with a STRtree so that each tile only
+    rasterizes the polygons that intersect it.
+
+    Rasterized masks are kept in a small LRU cache indexed by the raster grid (transform + shape), so that
+    all the products of a tile that share the same grid (eg. DTM, DSM and DHM) rasterize the mask only once.
+    """
+
+    def __init__(self, shapefile: str, cache_size: int = 8):
+        """
+        Args:
+            shapefile (str): path to the shapefile containing the no-data polygons
+            cache_size (int, optional): Number of rasterized masks to keep in memory. Defaults to 8.
+        """
+        self.shapefile = shapefile
+        self.cache_size = cache_size
+        with fiona.open(shapefile, "r") as fhandle:
+            self.geometries = [shape(feature["geometry"]) for feature in fhandle if feature["geometry"]]
+        self.tree = STRtree(self.geometries)
+        self._rasterized = OrderedDict()
+        logging.debug(f"Loaded {len(self.geometries)} no-data polygons from {shapefile}")
+
+    def query(self, bounds: Tuple[float, float, float, float]) -> List:
+        """Get the polygons that intersect a bounding box
+
+        Args:
+            bounds (Tuple[float, float, float, float]): bounding box as (minx, miny, maxx, maxy)
+
+        Returns:
+            List: shapely geometries that intersect the bounding box
+        """
+        indices = self.tree.query(box(*bounds), predicate="intersects")
+
+        return [self.geometries[i] for i in sorted(indices)]
+
+    def rasterize(self, transform: Affine, out_shape: Tuple[int, int]) -> Optional[np.ndarray]:
+        """Rasterize the mask on a raster grid, with the same semantics as rasterio.mask.mask(..., all_touched=True,
+        invert=True): every pixel touched by a polygon is masked.
+
+        Args:
+            transform (Affine): transform of the raster grid
+            out_shape (Tuple[int, int]): shape of the raster grid (height, width)
+
+        Returns:
+            Optional[np.ndarray]: boolean array (True for pixels to mask), or None if no polygon intersects the grid
+        """
+        key = (tuple(transform), tuple(out_shape))
+        if key in self._rasterized:
+            self._rasterized.move_to_end(key)
+            return self._rasterized[key]
+
+        height, width = out_shape
+        bounds = array_bounds(height, width, transform)
+        geometries = self.query(bounds)
+        if geometries:
+            mask = geometry_mask(geometries, out_shape=out_shape, transform=transform, all_touched=True, invert=True)
+            if not mask.any():
+                mask = None
+        else:
+            mask = None
+
+        self._rasterized[key] = mask
+        if len(self._rasterized) > self.cache_size:
+            self._rasterized.popitem(last=False)
+
+        return mask
+
+
+def get_no_data_mask(shapefile: str) -> NoDataMask:
+    """Get the NoDataMask of a shapefile, loading it only once per process"""
+    if shapefile not in _no_data_masks:
+        _no_data_masks[shapefile] = NoDataMask(shapefile)
+
+    return _no_data_masks[shapefile]
+
+
+def apply_no_data_mask(data: np.ndarray, transform: Affine, no_data_mask: NoDataMask, no_data: float) -> bool:
+    """Burn no-data value (in place) in the pixels of an array that are touched by the polygons of a no-data mask
+
+    Args:
+        data (np.ndarray): raster values, as a 2d array or a 3d array with bands first
+        transform (Affine): transform of the raster grid
+        no_data_mask (NoDataMask): no-data mask to apply
+        no_data (float): value to burn in the masked pixels
+
+    Returns:
+        bool: True if some pixels have been masked
+    """
+    mask = no_data_mask.rasterize(transform, data.shape[-2:])
+    if mask is None:
+        return False
+
+    data[..., mask] = no_data
+
+    return True
+
+
+def mask_raster(raster: Raster, no_data_mask: NoDataMask) -> bool:
+    """Burn the no-data value of a raster in memory (in place) in the pixels that are touched by the polygons of a
+    no-data mask (cf. apply_no_data_mask)
+
+    Returns:
+        bool: True if some pixels have been masked
+    """
+    return apply_no_data_mask(raster.data, raster.transform, no_data_mask, raster.no_data_value)
+
+
+def mask_with_no_data_shapefile(
+    shapefile: str,
+    input_raster: str,
+    output_raster: str,
+    no_data: int,
+    output_profile: Optional[RasterOutputProfile] = None,
+):
+    """Burn no-data value inside polygons from shapefile (overwrites input raster)
 
+    The value burnt in the masked pixels is the no-data value of the input raster. If the input raster has no no-data
+    value, the no_data argument is burnt and declared as the no-data value of the output raster (up to v2.1.1, 0 was
+    burnt in this case and the output raster had no no-data value).
 
-def mask_with_no_data_shapefile(shapefile: str, input_raster: str, output_raster: str, no_data: int):
-    """Burn no-data value inside polygons from shapefile (overwrites input raster)"""
-    # # Create raster
-    # out = gdal.Rasterize(raster_file, shapefile, allTouched=True, burnValues=no_data)
-    # print(out)
-    with fiona.open(shapefile, "r") as fhandle:
-        shapes = [feature["geometry"] for feature in fhandle]
+    The shapefile is loaded and indexed only once per process (see get_no_data_mask). If no polygon touches the
+    raster and there is no output profile, the input raster is copied as is. The masking is measured in a
+    "no_data_mask" span (cf. commons.metrics).
 
-    with rasterio.open(input_raster) as src:
-        out_image, _ = rasterio.mask.mask(src, shapes, crop=False, all_touched=True, invert=True)
-        out_meta = src.meta
+    Args:
+        shapefile (str): path to the shapefile of the areas to set to no-data
+        input_raster (str): path to the input raster
+        output_raster (str): path to the output raster
+        no_data (int): no data value burnt and declared in the output raster if the input raster has none
+        output_profile (Optional[RasterOutputProfile], optional): format of the output raster (default: plain
+        GeoTIFF, cf. commons.raster_output). Defaults to None.
+    """
+    output_profile = output_profile or RasterOutputProfile()
+    with metrics.span("no_data_mask", tile=input_raster) as mask_span:
+        with rasterio.open(input_raster) as src:
+            out_image = src.read()
+            out_meta = src.meta
+            # The burnt value is declared as the no-data value of the output raster
+            out_meta["nodata"] = src.nodata if src.nodata is not None else no_data
+            is_masked = apply_no_data_mask(out_image, src.transform, get_no_data_mask(shapefile), out_meta["nodata"])
+        mask_span.add(
+            output_pixels=out_meta["width"] * out_meta["height"], bytes_read=metrics.get_file_size(input_raster)
+        )
 
-    with rasterio.open(output_raster, "w", **out_meta) as dest:
-        dest.write(out_image)
+        if not is_masked and output_profile.is_default():
+            if input_raster != output_raster:
+                shutil.copyfile(input_raster, output_raster)
+        else:
+            with output_profile.open_rasterio(output_raster, **out_meta) as dest:
+                dest.write(out_image)
+        mask_span.add(bytes_written=metrics.get_file_size(output_raster))
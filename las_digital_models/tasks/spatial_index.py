@@ -0,0 +1,109 @@
+"""Spatially indexed inputs: read only the points of a tile that are in a bounding box (eg. the buffer strip of a
+neighbor tile), instead of decompressing the whole tile.
+
+Tiles are indexed as COPC files (Cloud Optimized Point Cloud: a LAZ 1.4 file whose points are organized in an octree
+of independently compressed chunks), which pdal reads by bounding box (readers.copc with the bounds option). Input
+tiles that are already COPC files (*.copc.laz) are read by bounding box directly. Other tiles can be converted once
+to COPC copies in an index folder (cf. SpatialIndex.build), which are then used instead of the tiles.
+"""
+
+import logging
+import os
+from typing import List, Optional, Tuple
+
+import pdal
+
+from las_digital_models.commons import metrics
+
+COPC_SUFFIX = ".copc.laz"
+
+
+def is_copc(filename: str) -> bool:
+    """True if a file is a COPC file (from its extension)"""
+    return filename.lower().endswith(COPC_SUFFIX)
+
+
+class SpatialIndex:
+    """COPC copies of las/laz tiles in an index folder ({index_dir}/{tilename}.copc.laz)"""
+
+    def __init__(self, index_dir: str):
+        """
+        Args:
+            index_dir (str): folder of the COPC copies (shared by all the workers)
+        """
+        self.index_dir = index_dir
+
+    def get_path(self, filename: str) -> str:
+        """Get the path of the COPC copy of a tile"""
+        tilename, _ = os.path.splitext(os.path.basename(filename))
+
+        return os.path.join(self.index_dir, f"{tilename}{COPC_SUFFIX}")
+
+    def get_indexed_file(self, filename: str) -> Optional[str]:
+        """Get the COPC file to read instead of a tile: the tile itself if it is a COPC file, else its COPC copy if it
+        is more recent than the tile (None if the tile is not indexed, or if its copy is out of date)"""
+        if is_copc(filename):
+            return filename
+        copc_path = self.get_path(filename)
+        if os.path.isfile(copc_path) and os.path.getmtime(copc_path) >= os.path.getmtime(filename):
+            return copc_path
+
+        return None
+
+    def build(self, filename: str, spatial_ref: str = "EPSG:2154"):
+        """Convert a tile to a COPC copy in the index folder (the copy is written to a temporary file first, so that
+        the other workers never read a partial copy). Nothing is done for COPC tiles.
+
+        Args:
+            filename (str): path to the las/laz tile
+            spatial_ref (str, optional): spatial reference to use to override the one from the tile.
+            Defaults to "EPSG:2154".
+        """
+        if is_copc(filename):
+            return
+        copc_path = self.get_path(filename)
+        tmp_path = f"{copc_path}.{os.getpid()}.tmp{COPC_SUFFIX}"
+        os.makedirs(self.index_dir, exist_ok=True)
+        with metrics.span("build_spatial_index", tile=os.path.basename(filename)) as index_span:
+            pipeline = pdal.Reader.las(filename=filename, override_srs=spatial_ref, nosrs=True)
+            pipeline |= pdal.Writer.copc(filename=tmp_path, a_srs=spatial_ref)
+            pipeline.execute()
+            os.replace(tmp_path, copc_path)
+            index_span.add(bytes_read=metrics.get_file_size(filename), bytes_written=metrics.get_file_size(copc_path))
+
+
+def get_indexed_file(filename: str, spatial_index: Optional[SpatialIndex] = None) -> Optional[str]:
+    """Get the COPC file to read instead of a tile (cf. SpatialIndex.get_indexed_file): the tile itself if it is a
+    COPC file, or its copy in spatial_index. None if the tile has to be read entirely."""
+    if spatial_index is not None:
+        return spatial_index.get_indexed_file(filename)
+
+    return filename if is_copc(filename) else None
+
+
+def get_las_reader(
+    filename: str,
+    spatial_ref: str,
+    bounds: Optional[Tuple[List[float], List[float]]] = None,
+    spatial_index: Optional[SpatialIndex] = None,
+) -> "pdal.Stage":
+    """Get a pdal reader for the points of a tile in some bounds: a COPC reader limited to the bounds if the tile is
+    indexed (cf. get_indexed_file), else a las reader of the whole tile (the points still need to be cropped)
+
+    Args:
+        filename (str): path to the las/laz tile
+        spatial_ref (str): spatial reference to use to override the one from the tile
+        bounds (Optional[Tuple[List[float], List[float]]], optional): 2D bounds as ([xmin, xmax], [ymin, ymax]).
+        Defaults to None (the whole tile is read).
+        spatial_index (Optional[SpatialIndex], optional): COPC copies of the tiles. Defaults to None.
+
+    Returns:
+        pdal.Stage: reader
+    """
+    indexed_file = get_indexed_file(filename, spatial_index) if bounds is not None else None
+    if indexed_file is None:
+        return pdal.Reader.las(filename=filename, override_srs=spatial_ref, nosrs=True)
+
+    logging.debug(f"Read {bounds} from {indexed_file}")
+
+    return pdal.Reader.copc(filename=indexed_file, bounds=str(bounds), override_srs=spatial_ref)
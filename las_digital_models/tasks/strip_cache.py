@@ -0,0 +1,227 @@
+"""Cache of the border strips of the tiles, used to build the buffer of a tile from its neighbors without
+decompressing each neighbor again (with a 3x3 neighborhood, each tile would otherwise be decompressed up to 9 times)
+
+When a tile is read, the parts of its points that fall in the buffer of each of its 8 neighbors (4 edge strips and
+4 corner blocks, with a width of buffer.size) are extracted once and stored in the cache.
+"""
+
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from pdaltools.las_info import parse_filename
+
+NEIGHBOR_OFFSETS = [(dx, dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1) if (dx, dy) != (0, 0)]
+# Number of strips written to disk by a cache between two scans of the on-disk cache (cf. StripCache), so that the
+# strips written by the other processes that share the folder are counted at least this often
+DISK_SCAN_INTERVAL = 100
+
+
+def get_buffered_bounds(
+    coord_x: int, coord_y: int, buffer_width: int, tile_width: int, tile_coord_scale: int
+) -> Tuple[List[float], List[float]]:
+    """Get the bounds of a tile with its buffer from the coordinates in its filename
+    (same as pdaltools.las_info.get_buffered_bounds_from_filename)
+
+    Returns:
+        Tuple[List[float], List[float]]: bounds as ([xmin, xmax], [ymin, ymax])
+    """
+    xmin = coord_x * tile_coord_scale
+    ymax = coord_y * tile_coord_scale
+
+    return (
+        [xmin - buffer_width, xmin + tile_width + buffer_width],
+        [ymax - tile_width - buffer_width, ymax + buffer_width],
+    )
+
+
+def crop_points(points: np.ndarray, bounds: Tuple[List[float], List[float]]) -> np.ndarray:
+    """Keep the points inside 2D bounds (bounds included, as in pdal filters.crop)
+
+    Args:
+        points (np.ndarray): points read by pdal
+        bounds (Tuple[List[float], List[float]]): bounds as ([xmin, xmax], [ymin, ymax])
+
+    Returns:
+        np.ndarray: cropped points
+    """
+    (xmin, xmax), (ymin, ymax) = bounds
+    x = points["X"]
+    y = points["Y"]
+
+    return points[(x >= xmin) & (x <= xmax) & (y >= ymin) & (y <= ymax)]
+
+
+def extract_strips(
+    points: np.ndarray, tile_filename: str, buffer_width: int, tile_width: int, tile_coord_scale: int
+) -> Dict[Tuple[int, int], np.ndarray]:
+    """Extract the points of a tile that are in the buffer of each of its 8 neighbors
+
+    Args:
+        points (np.ndarray): points of the tile
+        tile_filename (str): filename of the tile (used to get its coordinates)
+        buffer_width (int): width of the buffer (in meters)
+        tile_width (int): width of the tiles (in meters)
+        tile_coord_scale (int): scale used in the filename to describe coordinates in meters
+
+    Returns:
+        Dict[Tuple[int, int], np.ndarray]: points in the buffer of each neighbor, with the neighbor filename
+        coordinates as key
+    """
+    _, coord_x, coord_y, _ = parse_filename(tile_filename)
+    offset = int(tile_width / tile_coord_scale)
+    strips = {}
+    for dx, dy in NEIGHBOR_OFFSETS:
+        neighbor_coords = (coord_x + dx * offset, coord_y + dy * offset)
+        bounds = get_buffered_bounds(*neighbor_coords, buffer_width, tile_width, tile_coord_scale)
+        strips[neighbor_coords] = crop_points(points, bounds)
+
+    return strips
+
+
+class StripCache:
+    """Bounded LRU cache for the border strips of the tiles
+
+    Strips are kept in memory (bounded to memory_size_mb) and optionally on disk, in a folder that can be shared
+    between processes (bounded to disk_size_mb). In both cases, the least recently used strips are evicted first.
+
+    The size of the on-disk cache is tracked from the strips written by this cache: the folder is scanned (and the
+    strips evicted) only when this size exceeds disk_size_mb, or every DISK_SCAN_INTERVAL writes to count the strips
+    written by the other processes.
+
+    Args:
+        memory_size_mb (int, optional): size of the in-memory cache (in MB). Defaults to 512.
+        cache_dir (str, optional): folder for the on-disk cache (None: no on-disk cache). Defaults to None.
+        disk_size_mb (int, optional): size of the on-disk cache (in MB). Defaults to 8192.
+    """
+
+    def __init__(self, memory_size_mb: int = 512, cache_dir: str = None, disk_size_mb: int = 8192):
+        self.memory_size = memory_size_mb * 1024 * 1024
+        self.cache_dir = cache_dir
+        self.disk_size = disk_size_mb * 1024 * 1024
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._disk_bytes = 0
+        self._writes_since_scan = 0
+        # The cache can be shared by the threads that prefetch the tiles (cf. batch.prefetch)
+        self._lock = threading.RLock()
+
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            self._evict_from_disk()
+
+    @staticmethod
+    def get_key(filename: str, target_coords: Tuple[int, int], buffer_width: int, tile_width: int) -> str:
+        """Get the cache key for the strip of a file that is in the buffer of the tile at target_coords.
+        The key changes when the file is modified.
+        """
+        stat = os.stat(filename)
+        identity = (os.path.abspath(filename), stat.st_size, stat.st_mtime_ns, target_coords, buffer_width, tile_width)
+
+        return hashlib.sha1(repr(identity).encode()).hexdigest()
+
+    def get(self, key: str, filename: str) -> Optional[np.ndarray]:
+        """Get a strip from the cache (None if it is not cached)
+
+        Args:
+            key (str): key of the strip (cf. get_key)
+            filename (str): path to the file that contains the strip (used for statistics only)
+
+        Returns:
+            Optional[np.ndarray]: points of the strip
+        """
+        with self._lock:
+            strip = self._memory.get(key)
+            if strip is not None:
+                self._memory.move_to_end(key)
+            elif self.cache_dir:
+                strip = self._read_from_disk(key)
+                if strip is not None:
+                    self._put_in_memory(key, strip)
+
+            if strip is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self.bytes_saved += os.path.getsize(filename)
+
+        return strip
+
+    def put(self, key: str, strip: np.ndarray):
+        """Add a strip to the cache"""
+        with self._lock:
+            self._put_in_memory(key, strip)
+            if self.cache_dir:
+                self._write_to_disk(key, strip)
+
+    def stats(self) -> Dict[str, int]:
+        """Get cache statistics: number of hits and misses, and bytes of input files that were not read again"""
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "bytes_saved": self.bytes_saved}
+
+    def _put_in_memory(self, key: str, strip: np.ndarray):
+        if strip.nbytes > self.memory_size:
+            return
+        if key in self._memory:
+            self._memory_bytes -= self._memory.pop(key).nbytes
+        self._memory[key] = strip
+        self._memory_bytes += strip.nbytes
+        while self._memory_bytes > self.memory_size:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= evicted.nbytes
+
+    def _get_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.npy")
+
+    def _read_from_disk(self, key: str) -> Optional[np.ndarray]:
+        path = self._get_path(key)
+        try:
+            strip = np.load(path)
+            os.utime(path)  # mark as recently used
+        except (FileNotFoundError, ValueError, OSError):
+            # missing file, or file removed/being written by another process
+            return None
+
+        return strip
+
+    def _write_to_disk(self, key: str, strip: np.ndarray):
+        path = self._get_path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.save(f, strip)
+            self._disk_bytes += f.tell()
+        os.replace(tmp_path, path)  # atomic, so that other processes never read partial files
+        self._writes_since_scan += 1
+        if self._disk_bytes > self.disk_size or self._writes_since_scan >= DISK_SCAN_INTERVAL:
+            self._evict_from_disk()
+
+    def _evict_from_disk(self):
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith(".npy"):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total_size <= self.disk_size:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass  # already evicted by another process
+            total_size -= size
+            logging.debug(f"Evicted {path} from strip cache")
+        self._disk_bytes = total_size
+        self._writes_since_scan = 0
@@ -0,0 +1,154 @@
+"""Memory-bounded interpolation of very dense tiles: the tile is split into square sub-tiles, each sub-tile is
+triangulated with the points of its core and of a margin around it, and only the pixels of its core are written in
+the grid of the tile (cf. las_interpolation.rasterize_sub_tile_rasters). The peak memory of the triangulation is then
+bounded by the number of points of a sub-tile and its margin, instead of the number of points of the whole tile.
+
+As long as the margin is wider than the triangles that cross the border of the core (a few times the distance between
+points), the triangles that contain the pixel centers of the core are the same as in the triangulation of the whole
+tile, so the values of the rasters are the same as with a single triangulation.
+"""
+
+import math
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from las_digital_models.commons import commons
+
+
+class SubTile:
+    """Square part of a tile, with the margin of points that is read around it"""
+
+    def __init__(self, col: int, row: int, core_bounds: Tuple[float, float, float, float], margin: float):
+        """
+        Args:
+            col (int): column of the sub-tile in the tile (from the west)
+            row (int): row of the sub-tile in the tile (from the north)
+            core_bounds (Tuple[float, float, float, float]): xmin, ymin, xmax, ymax of the core of the sub-tile (the
+            area whose pixels are rasterized from this sub-tile)
+            margin (float): width of the margin around the core, in meters
+        """
+        self.col = col
+        self.row = row
+        self.core_bounds = core_bounds
+        self.margin = margin
+
+    @property
+    def bounds(self) -> Tuple[float, float, float, float]:
+        """xmin, ymin, xmax, ymax of the points used to triangulate the sub-tile (core and margin)"""
+        xmin, ymin, xmax, ymax = self.core_bounds
+        return (xmin - self.margin, ymin - self.margin, xmax + self.margin, ymax + self.margin)
+
+    def contains(self, x: np.ndarray, y: np.ndarray) -> np.ndarray:
+        """Mask of the points that are in the core or the margin of the sub-tile"""
+        xmin, ymin, xmax, ymax = self.bounds
+        return (x >= xmin) & (x <= xmax) & (y >= ymin) & (y <= ymax)
+
+
+class SubTiling:
+    """Split of the tiles into sub-tiles that are triangulated and rasterized one at a time"""
+
+    def __init__(self, block_size: float = 250, margin: float = 20, chunk_size: int = 1_000_000):
+        """
+        Args:
+            block_size (float, optional): width of the sub-tiles in meters (must be a multiple of the pixel sizes).
+            Defaults to 250.
+            margin (float, optional): width of the margin of points read around each sub-tile, in meters.
+            Defaults to 20.
+            chunk_size (int, optional): number of points read at once when the points of the sub-tiles are read
+            from a file. Defaults to 1_000_000.
+
+        Raises:
+            ValueError: if block_size is not positive or margin is negative
+        """
+        if block_size <= 0:
+            raise ValueError(f"The size of the sub-tiles must be positive, got {block_size}")
+        if margin < 0:
+            raise ValueError(f"The margin of the sub-tiles must not be negative, got {margin}")
+        self.block_size = block_size
+        self.margin = margin
+        self.chunk_size = chunk_size
+
+    def get_sub_tiles(self, origin: Tuple[float, float], tile_width: int) -> List[SubTile]:
+        """Split a tile into sub-tiles, row by row from the north-west corner (the sub-tiles of the last row and
+        column are smaller if tile_width is not a multiple of block_size)
+
+        Args:
+            origin (Tuple[float, float]): upper-left corner of the tile
+            tile_width (int): width of the tile in meters
+
+        Returns:
+            List[SubTile]: sub-tiles of the tile
+        """
+        nb_blocks = math.ceil(tile_width / self.block_size)
+        sub_tiles = []
+        for row in range(nb_blocks):
+            for col in range(nb_blocks):
+                core_bounds = (
+                    origin[0] + col * self.block_size,
+                    origin[1] - min((row + 1) * self.block_size, tile_width),
+                    origin[0] + min((col + 1) * self.block_size, tile_width),
+                    origin[1] - row * self.block_size,
+                )
+                sub_tiles.append(SubTile(col, row, core_bounds, self.margin))
+
+        return sub_tiles
+
+    def get_block_pixels(self, pixel_size: float) -> int:
+        """Get the width of the sub-tiles in pixels
+
+        Raises:
+            ValueError: if block_size is not a multiple of pixel_size
+        """
+        nb_pixels = round(self.block_size / pixel_size)
+        if not math.isclose(nb_pixels * pixel_size, self.block_size):
+            raise ValueError(f"The size of the sub-tiles ({self.block_size}) must be a multiple of {pixel_size}")
+
+        return nb_pixels
+
+    def get_sub_tile_grid(
+        self, sub_tile: SubTile, lower_left: Tuple[float, float], nb_pixels: Tuple[int, int], pixel_size: float
+    ) -> Tuple[Tuple[slice, slice], Tuple[float, float], Tuple[int, int]]:
+        """Get the part of the grid of a tile (cf. tin_raster.get_tile_grid) whose pixel centers are in the core of a
+        sub-tile
+
+        Args:
+            sub_tile (SubTile): sub-tile
+            lower_left (Tuple[float, float]): lower-left corner of the grid of the tile
+            nb_pixels (Tuple[int, int]): number of pixels of the grid of the tile (width, height)
+            pixel_size (float): pixel size in meters
+
+        Returns:
+            Tuple[Tuple[slice, slice], Tuple[float, float], Tuple[int, int]]: window (rows, columns) of the sub-tile
+            in the north-up raster of the tile, lower-left corner and number of pixels (width, height) of the grid of
+            the sub-tile
+        """
+        block_pixels = self.get_block_pixels(pixel_size)
+        col_start = sub_tile.col * block_pixels
+        col_end = min(col_start + block_pixels, nb_pixels[0])
+        row_start = sub_tile.row * block_pixels
+        row_end = min(row_start + block_pixels, nb_pixels[1])
+        sub_tile_lower_left = (
+            lower_left[0] + col_start * pixel_size,
+            lower_left[1] + (nb_pixels[1] - row_end) * pixel_size,
+        )
+
+        return (
+            (slice(row_start, row_end), slice(col_start, col_end)),
+            sub_tile_lower_left,
+            (col_end - col_start, row_end - row_start),
+        )
+
+    def check_pixel_sizes(self, pixel_size: Union[float, Sequence[float]]):
+        """Check that the sub-tiles are aligned on the grids of all the pixel sizes (cf. get_block_pixels)"""
+        for size in commons.get_pixel_sizes(pixel_size):
+            self.get_block_pixels(size)
+
+
+def get_sub_tiling_from_config(config: Dict) -> Optional[SubTiling]:
+    """Get the sub-tiling defined in config["sub_tiles"] (None if it is not set or not enabled)"""
+    sub_tiles = dict(config.get("sub_tiles") or {})
+    if not sub_tiles.pop("enabled", False):
+        return None
+
+    return SubTiling(**sub_tiles)
@@ -0,0 +1,142 @@
+"""Rasterization of a TIN (triangulated irregular network) with numpy, with the same semantics as pdal's
+filters.faceraster: the value of a pixel is the linear (barycentric) interpolation of the Z values of the vertices of
+the triangle that contains its center, and pixels whose center is in no triangle are set to no-data.
+
+It is used to rasterize a single Delaunay triangulation at several resolutions (pdal builds the triangulation again
+in each pipeline), and by the "scipy" interpolation backend, that triangulates the points with scipy instead of pdal's
+filters.delaunay (cf. las_interpolation.BACKENDS).
+"""
+
+from typing import Tuple
+
+import numpy as np
+from affine import Affine
+from scipy.spatial import Delaunay, QhullError
+
+
+def get_tile_grid(
+    origin: Tuple[float, float], tile_width: int, pixel_size: float
+) -> Tuple[Tuple[float, float], Tuple[int, int]]:
+    """Get the grid of the raster of a tile, as in the faceraster filters of las_interpolation: pixel centers are on
+    multiples of pixel_size, starting from the upper-left corner of the tile.
+
+    Args:
+        origin (Tuple[float, float]): upper-left corner of the tile (x, y)
+        tile_width (int): width of the tile in meters
+        pixel_size (float): pixel size in meters
+
+    Returns:
+        Tuple[Tuple[float, float], Tuple[int, int]]: lower-left corner of the raster (x, y), and its number of
+        pixels (width, height)
+    """
+    nb_pixels = int(tile_width / pixel_size)
+
+    return (origin[0] - pixel_size / 2, origin[1] + pixel_size / 2 - tile_width), (nb_pixels, nb_pixels)
+
+
+def get_grid_transform(lower_left: Tuple[float, float], pixel_size: float, height: int) -> Affine:
+    """Get the (north-up) transform of a raster grid from its lower-left corner"""
+    return Affine(pixel_size, 0, lower_left[0], 0, -pixel_size, lower_left[1] + height * pixel_size)
+
+
+def triangulate(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """Delaunay triangulation of points in the XY plane (with scipy/Qhull, as filters.delaunay)
+
+    Args:
+        x (np.ndarray): X coordinates of the points
+        y (np.ndarray): Y coordinates of the points
+
+    Returns:
+        np.ndarray: indices of the 3 vertices of each triangle, shape (nb_triangles, 3) (no triangle if there are
+        less than 3 points or if they are all aligned)
+    """
+    if len(x) < 3:
+        return np.empty((0, 3), dtype=np.int64)
+    # Coordinates relative to the first point, for the precision of Qhull on projected coordinates
+    coords = np.column_stack([x - x[0], y - y[0]]).astype(np.float64)
+    try:
+        return Delaunay(coords).simplices
+    except QhullError:
+        return np.empty((0, 3), dtype=np.int64)
+
+
+def rasterize_tin(
+    x: np.ndarray,
+    y: np.ndarray,
+    z: np.ndarray,
+    triangles: np.ndarray,
+    lower_left: Tuple[float, float],
+    pixel_size: float,
+    shape: Tuple[int, int],
+    no_data_value: float,
+    chunk_size: int = 2_000_000,
+) -> np.ndarray:
+    """Interpolate the Z values of a TIN at the center of the pixels of a raster grid (as filters.faceraster)
+
+    Each triangle is expanded into the pixels of its bounding box (the candidate pixels), whose centers are kept if
+    their barycentric coordinates are all in [0, 1]. The candidate pixels are processed by chunks of a fixed size, so
+    that the memory does not depend on the size of the triangles (the triangles along the border of a triangulation
+    or thin triangles can have millions of candidate pixels). As in pdal, a pixel on the edge of several triangles
+    takes the value of the last one.
+
+    Args:
+        x (np.ndarray): X coordinates of the vertices
+        y (np.ndarray): Y coordinates of the vertices
+        z (np.ndarray): Z values of the vertices
+        triangles (np.ndarray): indices of the 3 vertices of each triangle, shape (nb_triangles, 3)
+        lower_left (Tuple[float, float]): lower-left corner of the raster grid (x, y)
+        pixel_size (float): pixel size in meters
+        shape (Tuple[int, int]): number of pixels of the raster (width, height)
+        no_data_value (float): value of the pixels whose center is in no triangle
+        chunk_size (int, optional): number of candidate pixels processed at once. Defaults to 2_000_000.
+
+    Returns:
+        np.ndarray: float64 raster of shape (height, width), with the first row at the top (north-up)
+    """
+    width, height = shape
+    raster = np.full(width * height, no_data_value, dtype=np.float64)
+    triangles = np.asarray(triangles)
+    if not len(triangles):
+        return raster.reshape(height, width)
+
+    # Pixels of the bounding box of each triangle (clipped to the raster)
+    vertices_x, vertices_y = x[triangles].astype(np.float64), y[triangles].astype(np.float64)
+    ixmin = np.maximum(np.floor((vertices_x.min(axis=1) - lower_left[0]) / pixel_size), 0).astype(np.int64)
+    ixmax = np.minimum(np.floor((vertices_x.max(axis=1) - lower_left[0]) / pixel_size), width - 1).astype(np.int64)
+    iymin = np.maximum(np.floor((vertices_y.min(axis=1) - lower_left[1]) / pixel_size), 0).astype(np.int64)
+    iymax = np.minimum(np.floor((vertices_y.max(axis=1) - lower_left[1]) / pixel_size), height - 1).astype(np.int64)
+    del vertices_x, vertices_y
+    nx = np.maximum(ixmax - ixmin + 1, 0)
+    nb_candidates = nx * np.maximum(iymax - iymin + 1, 0)
+    candidates_end = np.cumsum(nb_candidates)
+    candidates_start = candidates_end - nb_candidates
+
+    # Candidate pixels of all the triangles, in the order of the triangles, split into chunks of chunk_size pixels
+    for start in range(0, int(candidates_end[-1]), chunk_size):
+        candidates = np.arange(start, min(start + chunk_size, candidates_end[-1]))
+        index = np.searchsorted(candidates_end, candidates, side="right")
+        offsets = candidates - candidates_start[index]
+        ix = ixmin[index] + offsets % nx[index]
+        iy = iymin[index] + offsets // nx[index]
+        center_x = lower_left[0] + (ix + 0.5) * pixel_size
+        center_y = lower_left[1] + (iy + 0.5) * pixel_size
+
+        # Barycentric interpolation (same formula as pdal's math::barycentricInterpolation)
+        chunk = triangles[index]
+        tx1, tx2, tx3 = (x[chunk[:, i]].astype(np.float64) for i in range(3))
+        ty1, ty2, ty3 = (y[chunk[:, i]].astype(np.float64) for i in range(3))
+        det = (ty2 - ty3) * (tx1 - tx3) + (tx3 - tx2) * (ty1 - ty3)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            lambda1 = ((ty2 - ty3) * (center_x - tx3) + (tx3 - tx2) * (center_y - ty3)) / det
+            lambda2 = ((ty3 - ty1) * (center_x - tx3) + (tx1 - tx3) * (center_y - ty3)) / det
+        inside = (
+            (det != 0) & (lambda1 >= 0) & (lambda1 <= 1) & (lambda2 >= 0) & (lambda2 <= 1) & (lambda1 + lambda2 <= 1)
+        )
+        chunk, lambda1, lambda2 = chunk[inside], lambda1[inside], lambda2[inside]
+        z1, z2, z3 = (z[chunk[:, i]].astype(np.float64) for i in range(3))
+        values = lambda1 * z1 + lambda2 * z2 + (1 - (lambda1 + lambda2)) * z3
+
+        # Rows of the raster are north-up (iy is counted from the bottom)
+        raster[(height - 1 - iy[inside]) * width + ix[inside]] = values
+
+    return raster.reshape(height, width)
@@ -9,17 +9,20 @@ PIXEL_SIZE=0.5
 PARALLEL_JOBS=0
 CPU_LIMIT=-1
 SHAPEFILE=""
+MEMORY_BUDGET=null
 
 SOURCE_DIR=$(dirname ${BASH_SOURCE[0]})
 CONFIG_NAME="config"
 
 USAGE="""
-Usage ./run.sh -i INPUT_DIR -o OUTPUT_DIR -p PIXEL_SIZE -j PARALLEL_JOBS -s SHAPEFILE -c CONFIG_NAME\n
-For PARALLEL_JOBS, 0 is : use as many as possible (cf. parallel command)\n
+Usage ./run.sh -i INPUT_DIR -o OUTPUT_DIR -p PIXEL_SIZE -j PARALLEL_JOBS -l CPU_LIMIT -s SHAPEFILE -m MEMORY_BUDGET -c CONFIG_NAME\n
+For PARALLEL_JOBS, 0 is : use as many as possible\n
+For CPU_LIMIT, -1 is : no limit on the number of cores used\n
+For MEMORY_BUDGET (in MB), null is : no limit on the estimated memory of the tiles running at once\n
 CONFIG_NAME (for test use only: override default hydra config)
 """
 # Parse arguments in order to possibly overwrite paths
-while getopts "h?i:o:p:j:s:c:" opt; do
+while getopts "h?i:o:p:j:l:s:m:c:" opt; do
   case "$opt" in
     h|\?)
       echo -e ${USAGE}
@@ -33,95 +36,31 @@ while getopts "h?i:o:p:j:s:c:" opt; do
       ;;
     j)  PARALLEL_JOBS=${OPTARG}
       ;;
+    l)  CPU_LIMIT=${OPTARG}
+      ;;
     s) SHAPEFILE=${OPTARG}
       ;;
+    m) MEMORY_BUDGET=${OPTARG}
+      ;;
     c) CONFIG_NAME=${OPTARG}
       ;;
   esac
 done
 
-# Get all filenames for las or laz files in input folder
-#    sed 's/^\.\///g' : remove ./ at beginning of file
-FILENAMES=($(cd ${INPUT} && find .  -maxdepth 1 -type f \( -iname \*.las -o -iname \*.laz \) | sed 's/^\.\///g' ))
-
-
-echo "GENERATE DSM/DTM/DHM ON ${#FILENAMES[@]} FILES"
+echo "GENERATE DSM/DTM/DHM ON FILES FROM ${INPUT}"
 echo ""
 
-# Step 0: Create las with buffer from its neighbors tiles
-# /!\ rasters generated from these las tiles will need to be cropped to match the input las area
-BUFFERED_DIR=${OUTPUT}/las_with_buffer
-
-echo "------------------"
-echo "add buffer"
-echo "------------------"
-parallel --jobs ${PARALLEL_JOBS} \
-    python -m las_digital_models.add_buffer_one_tile \
-        --config-name=${CONFIG_NAME} \
-        io.input_dir=${INPUT} \
-        io.input_filename={} \
-        io.output_dir=${BUFFERED_DIR} \
-        ::: "${FILENAMES[@]}"
-
-
-
-echo "------------------"
-echo "RUN DTM GENERATION"
-echo "------------------"
-
-# Output filenames for each step
-DTM_DIR=${OUTPUT}/DTM
-
-
-# Step 1 ; create DTM
-echo "------------------"
-echo "interpolation"
-echo "------------------"
-
-parallel --jobs ${PARALLEL_JOBS} \
-    python -m las_digital_models.ip_one_tile \
-        --config-name=${CONFIG_NAME} \
-        io.input_dir=${BUFFERED_DIR} \
-        io.input_filename={} \
-        filter=dtm \
-        io.output_dir=${DTM_DIR} \
-        tile_geometry.pixel_size=${PIXEL_SIZE} \
-        io.no_data_mask_shapefile=${SHAPEFILE} \
-        ::: "${FILENAMES[@]}"
-
-
-echo "------------------"
-echo "RUN DSM GENERATION"
-echo "------------------"
-
-DSM_DIR=${OUTPUT}/DSM
-
-# Step 2; create DSM
-parallel --jobs ${PARALLEL_JOBS} \
-    python -m las_digital_models.ip_one_tile \
-        --config-name=${CONFIG_NAME} \
-        io.input_dir=${BUFFERED_DIR} \
-        io.input_filename={} \
-        filter=dsm \
-        io.output_dir=${DSM_DIR} \
-        tile_geometry.pixel_size=${PIXEL_SIZE} \
-        io.no_data_mask_shapefile=${SHAPEFILE} \
-        ::: "${FILENAMES[@]}"
-
-echo "------------------"
-echo "RUN DHM GENERATION"
-echo "------------------"
-
-# Step 3 ; create DHM with each of the methods
-# Output filenames for each step
-DHM_DIR=${OUTPUT}/DHM
-
-parallel --jobs ${PARALLEL_JOBS} \
-  python -m las_digital_models.dhm_one_tile \
-      --config-name=${CONFIG_NAME} \
-      dhm.input_dsm_dir=${DSM_DIR} \
-      dhm.input_dtm_dir=${DTM_DIR} \
-      io.input_filename={} \
-      io.output_dir=${DHM_DIR} \
-      tile_geometry.pixel_size=${PIXEL_SIZE} \
-      ::: "${FILENAMES[@]}"
+# Run all steps (buffer, DTM, DSM, DHM) in a single python process that uses a pool of workers:
+# - ${OUTPUT}/las_with_buffer: las with buffer from its neighbors tiles
+# - ${OUTPUT}/DTM
+# - ${OUTPUT}/DSM
+# - ${OUTPUT}/DHM
+python -m las_digital_models.run_batch \
+    --config-name=${CONFIG_NAME} \
+    io.input_dir=${INPUT} \
+    io.output_dir=${OUTPUT} \
+    tile_geometry.pixel_size=${PIXEL_SIZE} \
+    io.no_data_mask_shapefile=${SHAPEFILE} \
+    batch.jobs=${PARALLEL_JOBS} \
+    batch.cpu_limit=${CPU_LIMIT} \
+    batch.scheduling.memory_budget_mb=${MEMORY_BUDGET}
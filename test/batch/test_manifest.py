@@ -0,0 +1,89 @@
+import os
+
+from omegaconf import OmegaConf
+
+from las_digital_models.batch.manifest import (
+    Manifest,
+    get_config_subtrees,
+    get_file_signature,
+    get_neighbor_tiles,
+)
+
+CONFIG = OmegaConf.create(
+    {"buffer": {"size": 10}, "io": {"spatial_reference": "EPSG:2154", "other": "${buffer.size}"}}
+)
+
+
+def test_get_neighbor_tiles():
+    tiles = [f"test_data_{x:04d}_{y:04d}_LA93_IGN69.laz" for x in range(0, 15, 5) for y in range(0, 10, 5)]
+
+    neighbors = get_neighbor_tiles(tiles, tile_width=50, tile_coord_scale=10)
+
+    assert sorted(neighbors["test_data_0000_0000_LA93_IGN69.laz"]) == [
+        "test_data_0000_0005_LA93_IGN69.laz",
+        "test_data_0005_0000_LA93_IGN69.laz",
+        "test_data_0005_0005_LA93_IGN69.laz",
+    ]
+    assert len(neighbors["test_data_0005_0000_LA93_IGN69.laz"]) == 5
+
+
+def test_get_neighbor_tiles_most_recent():
+    tiles = [
+        "Semis_2020_0000_0001_LA93_IGN69.laz",
+        "Semis_2021_0000_0001_LA93_IGN69.laz",
+        "Semis_2021_0000_0000_LA93_IGN69.laz",
+    ]
+
+    neighbors = get_neighbor_tiles(tiles)
+
+    assert neighbors["Semis_2021_0000_0000_LA93_IGN69.laz"] == ["Semis_2021_0000_0001_LA93_IGN69.laz"]
+
+
+def test_get_file_signature(tmp_path):
+    filename = tmp_path / "file.txt"
+    filename.write_text("content")
+
+    assert get_file_signature(filename)["size"] == 7
+    assert "mtime_ns" in get_file_signature(filename)
+    assert get_file_signature(filename, use_hash=True)["sha256"] == (
+        "ed7002b439e9ac845f22357d822bac1444730fbdb6016d3ec9432297b9ec9f73"
+    )
+
+
+def test_get_config_subtrees():
+    assert get_config_subtrees(CONFIG, ["buffer", "io.other", "missing.key"]) == {
+        "buffer": {"size": 10},
+        "io.other": 10,
+        "missing.key": None,
+    }
+
+
+def test_manifest(tmp_path):
+    input_file = tmp_path / "input.laz"
+    input_file.write_text("points")
+    output_file = tmp_path / "output.tif"
+    manifest = Manifest(str(tmp_path), "stage")
+    record = manifest.get_record([str(input_file)], CONFIG, ["buffer"])
+
+    # No record yet
+    assert not manifest.is_up_to_date("input.laz", record, [])
+
+    manifest.write("input.laz", record)
+    assert manifest.is_up_to_date("input.laz", record, [])
+    # Missing output
+    assert not manifest.is_up_to_date("input.laz", record, [str(output_file)])
+
+    # Config changed
+    other_config = OmegaConf.merge(CONFIG, {"buffer": {"size": 20}})
+    assert not manifest.is_up_to_date(
+        "input.laz", manifest.get_record([str(input_file)], other_config, ["buffer"]), []
+    )
+
+    # Input changed
+    os.utime(input_file, ns=(0, 0))
+    assert not manifest.is_up_to_date(
+        "input.laz", Manifest(str(tmp_path), "stage").get_record([str(input_file)], CONFIG, ["buffer"]), []
+    )
+
+    manifest.remove("input.laz")
+    assert not manifest.is_up_to_date("input.laz", record, [])
@@ -0,0 +1,107 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from las_digital_models.batch.prefetch import Prefetcher, get_nbytes
+from las_digital_models.commons import metrics
+
+TILES = [f"tile_{i}.laz" for i in range(5)]
+
+
+class FakeReader:
+    """Read function that records the reads, and returns 1 MB of points per tile"""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.reads = []
+        self.lock = threading.Lock()
+
+    def __call__(self, tile):
+        time.sleep(self.delay)
+        if tile == "corrupted.laz":
+            raise RuntimeError(f"Cannot read {tile}")
+        with self.lock:
+            self.reads.append(tile)
+        return np.zeros(1024 * 1024, dtype=np.uint8), "srs"
+
+
+def test_get_nbytes():
+    points = np.zeros(10, dtype=[("X", "f8"), ("Y", "f8")])
+
+    assert get_nbytes((points, "srs")) == 160
+    assert get_nbytes([points, points]) == 320
+    assert get_nbytes("srs") == 0
+
+
+def test_prefetcher_reads_tiles_in_advance():
+    reader = FakeReader()
+    with Prefetcher(reader, depth=2) as prefetcher:
+        prefetcher.prefetch(TILES)
+        time.sleep(0.1)
+        # Only depth tiles are read in advance
+        assert reader.reads == TILES[:2]
+
+        for tile in TILES:
+            points, srs_wkt = prefetcher.get(tile)
+            assert len(points) == 1024 * 1024 and srs_wkt == "srs"
+
+    # Each tile is read once, in order
+    assert reader.reads == TILES
+
+
+def test_prefetcher_memory_budget():
+    reader = FakeReader()
+    with Prefetcher(reader, depth=4, memory_mb=2.5) as prefetcher:
+        prefetcher.prefetch(TILES)
+        time.sleep(0.1)
+        # 1 MB per tile: only 2 tiles fit in the budget
+        assert reader.reads == TILES[:2]
+
+        prefetcher.get(TILES[0])
+        time.sleep(0.1)
+        assert reader.reads == TILES[:3]
+
+
+def test_prefetcher_without_prefetch():
+    reader = FakeReader()
+    with Prefetcher(reader, depth=0) as prefetcher:
+        prefetcher.prefetch(TILES)
+        time.sleep(0.1)
+        assert reader.reads == []
+
+        # Tiles are read when they are requested, even if they were not announced
+        prefetcher.get(TILES[1])
+        prefetcher.get("other.laz")
+        assert reader.reads == [TILES[1], "other.laz"]
+
+
+def test_prefetcher_attaches_reads_in_advance_to_the_parent_span():
+    parents = {}
+
+    def read(tile):
+        parents[tile] = metrics.get_current_span()
+
+    with metrics.span("interpolation_chunk") as chunk_span:
+        with Prefetcher(read, depth=1, parent_span=chunk_span) as prefetcher:
+            prefetcher.prefetch(TILES[:1])
+            prefetcher.get(TILES[0])
+            with metrics.span("interpolation", tile="other.laz") as tile_span:
+                prefetcher.get("other.laz")
+
+    assert parents[TILES[0]].name == "prefetch"
+    assert parents[TILES[0]].tile == TILES[0]
+    assert parents[TILES[0]].parent_id == chunk_span.span_id
+    # Tiles read when they are requested are read in the span of the caller
+    assert parents["other.laz"] is tile_span
+
+
+def test_prefetcher_raises_read_errors():
+    reader = FakeReader(delay=0.01)
+    with Prefetcher(reader, depth=2, nb_threads=2) as prefetcher:
+        prefetcher.prefetch(["corrupted.laz"] + TILES)
+
+        with pytest.raises(RuntimeError, match="Cannot read corrupted.laz"):
+            prefetcher.get("corrupted.laz")
+        prefetcher.get(TILES[0])
@@ -0,0 +1,67 @@
+import os
+
+import pytest
+from omegaconf import OmegaConf
+
+from las_digital_models.batch.preflight import (
+    TileHeader,
+    can_admit,
+    estimate_memory_mb,
+    read_tile_headers,
+    sort_largest_first,
+)
+
+TEST_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+INPUT_DIR = os.path.join(TEST_PATH, "data")
+TILE = "test_data_77055_627760_LA93_IGN69.laz"
+
+CONFIG = OmegaConf.create(
+    {
+        "buffer": {"size": 10},
+        "tile_geometry": {"tile_width": 50, "pixel_size": 0.5},
+        "batch": {"scheduling": {"bytes_per_point": 1024 * 1024, "base_memory_mb": 100, "memory_budget_mb": None}},
+    }
+)
+
+
+def test_read_tile_headers():
+    headers = read_tile_headers(INPUT_DIR, [TILE])
+
+    header = headers[TILE]
+    assert header.filename == TILE
+    assert header.nb_points > 0
+    xmin, ymin, xmax, ymax = header.bounds
+    assert 770550 <= xmin < xmax <= 770600
+    assert 6277550 <= ymin < ymax <= 6277600
+    assert header.density > 0
+
+
+def test_estimate_memory_mb():
+    header = TileHeader(TILE, 1000, (0, 0, 50, 50))
+    # 1MB per point of the tile and its buffer ((50 + 2 * 10)² / 50² = 1.96 times the points of the tile),
+    # and 12 bytes per pixel
+    expected = 100 + 1000 * 1.96 + 100 * 100 * 12 / 1024 / 1024
+    assert estimate_memory_mb(header, CONFIG) == pytest.approx(expected)
+
+    # several pixel sizes: the pixels of all the rasters are counted
+    config = OmegaConf.merge(CONFIG, {"tile_geometry": {"pixel_size": [0.5, 1]}})
+    assert estimate_memory_mb(header, config) == pytest.approx(expected + 50 * 50 * 12 / 1024 / 1024)
+
+
+def test_sort_largest_first():
+    estimates = {"a": 10, "b": 30, "c": 20, "d": 30}
+
+    assert sort_largest_first(["a", "b", "c", "d"], estimates) == ["b", "d", "c", "a"]
+
+
+@pytest.mark.parametrize(
+    "estimate, running_estimates, memory_budget_mb, expected",
+    [
+        (100, [200, 300], None, True),  # no budget
+        (100, [200, 300], 600, True),  # fits in the budget
+        (200, [200, 300], 600, False),  # does not fit
+        (1000, [], 600, True),  # larger than the budget, but nothing is running
+    ],
+)
+def test_can_admit(estimate, running_estimates, memory_budget_mb, expected):
+    assert can_admit(estimate, running_estimates, memory_budget_mb) == expected
@@ -0,0 +1,192 @@
+import os
+import threading
+import time
+
+import pytest
+
+from las_digital_models.batch.work_queue import (
+    FileWorkQueue,
+    SQLiteWorkQueue,
+    compute_progress,
+    get_pipeline_tasks,
+    open_work_queue,
+)
+
+TILES = ["tile_a.laz", "tile_b.laz"]
+
+
+@pytest.fixture(params=["files", "sqlite"])
+def make_queue(request, tmp_path):
+    path = os.path.join(tmp_path, "queue") if request.param == "files" else os.path.join(tmp_path, "queue.sqlite")
+    queues = []
+
+    def make(**kwargs):
+        # A new queue object for each worker, as for workers in different processes or hosts
+        queue = open_work_queue(request.param, path, **kwargs)
+        queues.append(queue)
+        return queue
+
+    yield make
+    for queue in queues:
+        queue.close()
+
+
+def test_get_pipeline_tasks():
+    tasks, dependencies = get_pipeline_tasks(TILES, write_buffered_las=True, run_dhm=True)
+
+    assert tasks == [(stage, tile) for stage in ["buffer", "interpolation", "DHM"] for tile in TILES]
+    assert dependencies[("interpolation", "tile_a.laz")] == [("buffer", "tile_a.laz")]
+    assert dependencies[("DHM", "tile_b.laz")] == [("interpolation", "tile_b.laz")]
+    assert ("buffer", "tile_a.laz") not in dependencies
+
+    tasks, dependencies = get_pipeline_tasks(TILES, write_buffered_las=False, run_dhm=False)
+    assert tasks == [("interpolation", tile) for tile in TILES]
+    assert dependencies == {}
+
+
+def test_get_pipeline_tasks_with_index_stage():
+    neighbors = {"tile_a.laz": ["tile_b.laz"], "tile_b.laz": ["tile_a.laz"]}
+
+    tasks, dependencies = get_pipeline_tasks(TILES, write_buffered_las=False, run_dhm=True, neighbors=neighbors)
+
+    assert tasks[:2] == [("index", tile) for tile in TILES]
+    # The buffer of a tile is read from the index of its neighbors
+    assert dependencies[("interpolation", "tile_a.laz")] == [("index", "tile_a.laz"), ("index", "tile_b.laz")]
+    assert dependencies[("DHM", "tile_a.laz")] == [("interpolation", "tile_a.laz")]
+
+
+def test_claim_is_exclusive_and_respects_dependencies(make_queue):
+    queue_1, queue_2 = make_queue(), make_queue()
+    queue_1.add_tasks(*get_pipeline_tasks(TILES, write_buffered_las=False, run_dhm=True))
+    queue_2.add_tasks(*get_pipeline_tasks(TILES, write_buffered_las=False, run_dhm=True))
+
+    assert queue_1.claim("worker_1") == ("interpolation", "tile_a.laz")
+    assert queue_2.claim("worker_2") == ("interpolation", "tile_b.laz")
+    # The DHM tasks wait for the interpolation of their tile
+    assert queue_1.claim("worker_1") is None
+
+    queue_2.complete(("interpolation", "tile_b.laz"), "worker_2", time.time())
+    assert queue_1.claim("worker_1") == ("DHM", "tile_b.laz")
+    assert queue_2.claim("worker_2") is None
+    assert not queue_2.is_finished()
+
+
+def test_expired_lease_is_claimed_again(make_queue):
+    queue_1, queue_2 = make_queue(lease_s=0.2), make_queue(lease_s=0.2)
+    queue_1.add_tasks([("interpolation", "tile_a.laz")], {})
+    queue_2.add_tasks([("interpolation", "tile_a.laz")], {})
+
+    task = queue_1.claim("worker_1")
+    assert queue_1.renew(task, "worker_1")
+    assert queue_2.claim("worker_2") is None
+
+    # worker_1 crashed: its lease expires
+    time.sleep(0.3)
+    assert queue_2.claim("worker_2") == task
+    assert not queue_1.renew(task, "worker_1")
+    assert queue_2.renew(task, "worker_2")
+
+    queue_2.complete(task, "worker_2", time.time())
+    assert queue_1.claim("worker_1") is None
+    assert queue_1.is_finished()
+
+
+def test_failed_tasks_are_retried_then_given_up(make_queue):
+    queue = make_queue(max_attempts=2)
+    queue.add_tasks(*get_pipeline_tasks(["tile_a.laz"], write_buffered_las=False, run_dhm=True))
+
+    for _ in range(2):
+        task = queue.claim("worker_1")
+        assert task == ("interpolation", "tile_a.laz")
+        queue.fail(task, "worker_1", "RuntimeError('corrupted tile')")
+
+    # The DHM of the tile is never run, and the run is finished
+    assert queue.claim("worker_1") is None
+    assert queue.is_finished()
+    progress = queue.get_progress()
+    assert progress["stages"]["interpolation"]["failed"] == 1
+    assert progress["stages"]["DHM"]["pending"] == 1
+
+
+def test_get_progress(make_queue):
+    queue = make_queue()
+    queue.add_tasks(*get_pipeline_tasks(TILES, write_buffered_las=True, run_dhm=False))
+
+    task = queue.claim("worker_1")
+    queue.complete(task, "worker_1", time.time() - 60)
+    queue.claim("worker_1")
+
+    progress = make_queue().get_progress()  # from another process
+    assert progress["stages"] == {
+        "buffer": {"pending": 0, "running": 1, "done": 1, "failed": 0},
+        "interpolation": {"pending": 2, "running": 0, "done": 0, "failed": 0},
+    }
+    assert progress["workers"] == {"worker_1": 1}
+    assert progress["tasks_per_minute"] == pytest.approx(1, rel=0.1)
+    assert progress["eta_s"] == pytest.approx(3 * 60, rel=0.1)
+
+
+def test_workers_drain_the_queue_concurrently(make_queue):
+    tiles = [f"tile_{i}.laz" for i in range(20)]
+    tasks, dependencies = get_pipeline_tasks(tiles, write_buffered_las=True, run_dhm=True)
+    make_queue().add_tasks(tasks, dependencies)
+    processed = []
+    lock = threading.Lock()
+
+    def run_worker(worker_id):
+        queue = make_queue()
+        while not queue.is_finished():
+            task = queue.claim(worker_id)
+            if task is None:
+                time.sleep(0.01)
+                continue
+            with lock:
+                # dependencies are processed before
+                assert all(dep in processed for dep in dependencies.get(task, []))
+                processed.append(task)
+            queue.complete(task, worker_id, time.time())
+
+    threads = [threading.Thread(target=run_worker, args=(f"worker_{i}",)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # Each task is processed exactly once
+    assert sorted(processed) == sorted(tasks)
+
+
+def test_compute_progress_without_done_task():
+    progress = compute_progress([("DHM", "tile_a.laz")], {}, [], now=time.time())
+
+    assert progress["stages"] == {"DHM": {"pending": 1, "running": 0, "done": 0, "failed": 0}}
+    assert progress["tasks_per_minute"] == 0
+    assert progress["eta_s"] is None
+
+
+def test_open_work_queue_unknown_backend(tmp_path):
+    with pytest.raises(ValueError, match="Unknown work queue backend"):
+        open_work_queue("redis", str(tmp_path))
+
+
+def test_file_work_queue_files(tmp_path):
+    queue = FileWorkQueue(str(tmp_path))
+    queue.add_tasks([("interpolation", "tile_a.laz")], {})
+
+    task = queue.claim("worker_1")
+    assert os.path.isfile(os.path.join(tmp_path, "interpolation", "tile_a.laz.lease"))
+    queue.complete(task, "worker_1", time.time())
+    assert os.listdir(os.path.join(tmp_path, "interpolation")) == ["tile_a.laz.done"]
+    assert FileWorkQueue.open(str(tmp_path)).tasks == [task]
+
+
+def test_sqlite_work_queue_add_tasks_twice(tmp_path):
+    queue = SQLiteWorkQueue(os.path.join(tmp_path, "queue.sqlite"))
+    queue.add_tasks([("interpolation", "tile_a.laz")], {})
+    task = queue.claim("worker_1")
+    queue.complete(task, "worker_1", time.time())
+
+    # A worker started later does not reset the done tasks
+    queue.add_tasks([("interpolation", "tile_a.laz"), ("interpolation", "tile_b.laz")], {})
+    assert queue.claim("worker_2") == ("interpolation", "tile_b.laz")
+    queue.close()
@@ -0,0 +1,20 @@
+from benchmark import compare
+
+
+def get_report(points_per_s, peak_rss_mb):
+    return {
+        "params": {"density": 10},
+        "stages": {"buffer": {"throughput": {"points_per_s": points_per_s}, "peak_rss_mb": peak_rss_mb}},
+    }
+
+
+def test_compare_reports():
+    reference = get_report(1000, 100)
+
+    assert compare.compare_reports(reference, get_report(950, 105), tolerance=0.1) == []
+    assert compare.compare_reports(reference, get_report(800, 100), tolerance=0.1) == [
+        "buffer: points_per_s decreased by 20.0%"
+    ]
+    assert compare.compare_reports(reference, get_report(1000, 150), tolerance=0.1) == [
+        "buffer: peak RSS increased by 50.0%"
+    ]
@@ -0,0 +1,68 @@
+import os
+import shutil
+
+import numpy as np
+import pytest
+from pdaltools.las_info import parse_filename
+
+from benchmark import synthetic_data
+
+TEST_PATH = os.path.dirname(os.path.abspath(__file__))
+TMP_PATH = os.path.join(TEST_PATH, "..", "tmp", "benchmark")
+
+
+def setup_module(module):
+    try:
+        shutil.rmtree(TMP_PATH)
+
+    except FileNotFoundError:
+        pass
+    os.makedirs(TMP_PATH)
+
+
+def test_parse_class_mix():
+    assert synthetic_data.parse_class_mix("2:3,6:1") == {2: 0.75, 6: 0.25}
+    with pytest.raises(ValueError):
+        synthetic_data.parse_class_mix("2:0")
+
+
+def test_generate_tile_points():
+    class_mix = {2: 0.5, 5: 0.3, 6: 0.2}
+    points = synthetic_data.generate_tile_points(1000, 2000, 50, 4, class_mix, seed=1)
+
+    assert len(points) == 50 * 50 * 4
+    assert points["X"].min() >= 1000 and points["X"].max() <= 1050
+    assert points["Y"].min() >= 2000 and points["Y"].max() <= 2050
+    assert set(np.unique(points["Classification"])) == set(class_mix)
+    assert np.all(points["ReturnNumber"] <= points["NumberOfReturns"])
+    ground = points["Classification"] == 2
+    terrain = synthetic_data.get_terrain_height(points["X"][ground], points["Y"][ground])
+    np.testing.assert_allclose(points["Z"][ground], terrain, atol=0.01)
+    # Same seed, same points
+    np.testing.assert_array_equal(points, synthetic_data.generate_tile_points(1000, 2000, 50, 4, class_mix, seed=1))
+
+
+def test_generate_tiles():
+    tiles = synthetic_data.generate_tiles(
+        TMP_PATH, 2, 1, origin=(770000, 6278000), tile_width=50, tile_coord_scale=10, density=1
+    )
+
+    assert sorted(tiles) == [
+        "synthetic_tile_77000_627800_LA93_IGN69.laz",
+        "synthetic_tile_77005_627800_LA93_IGN69.laz",
+    ]
+    for tile, nb_points in tiles.items():
+        assert os.path.isfile(os.path.join(TMP_PATH, tile))
+        assert nb_points == 2500
+        _, coord_x, coord_y, _ = parse_filename(tile)
+        assert coord_y == 627800
+
+
+def test_generate_lines_and_polygons():
+    bounds = (770000, 6277500, 770500, 6278000)
+    lines = synthetic_data.generate_lines(bounds, 20, seed=2)
+    polygons = synthetic_data.generate_polygons(bounds, 10, seed=2)
+
+    assert len(lines) == 20 and (lines.geom_type == "LineString").all()
+    assert len(polygons) == 10 and (polygons.geom_type == "Polygon").all()
+    assert lines.crs == polygons.crs == "EPSG:2154"
@@ -0,0 +1,145 @@
+import json
+import logging
+import os
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from las_digital_models.commons import commons, metrics
+
+TEST_PATH = os.path.dirname(os.path.abspath(__file__))
+TMP_PATH = os.path.join(TEST_PATH, "..", "tmp", "metrics")
+
+
+def setup_module(module):
+    try:
+        shutil.rmtree(TMP_PATH)
+
+    except FileNotFoundError:
+        pass
+    os.makedirs(TMP_PATH)
+
+
+def read_spans(output_dir):
+    spans = []
+    for filename in os.listdir(output_dir):
+        with open(os.path.join(output_dir, filename), "r") as f:
+            spans += [json.loads(line) for line in f]
+
+    return spans
+
+
+def test_span_records_nested_spans():
+    output_dir = os.path.join(TMP_PATH, "nested")
+    metrics.configure_metrics(output_dir)
+    try:
+        with metrics.span("interpolation", tile="/data/tile_0001_0002_LA93_IGN69.laz") as root:
+            with metrics.span("read", tile="/data/neighbor.laz") as read_span:
+                read_span.add(input_points=10, bytes_read=100)
+                read_span.add(input_points=5)
+            with metrics.span("interpolate", output="tile_50CM.tif"):
+                pass
+            assert metrics.get_current_span() is root
+        assert metrics.get_current_span() is None
+    finally:
+        metrics.configure_metrics(None)
+
+    spans = {span["name"]: span for span in read_spans(output_dir)}
+    assert set(spans) == {"interpolation", "read", "interpolate"}
+    assert spans["interpolation"]["parent_id"] is None
+    assert spans["read"]["parent_id"] == spans["interpolation"]["span_id"]
+    # Nested spans belong to the tile of the root span
+    assert {span["tile"] for span in spans.values()} == {"tile_0001_0002_LA93_IGN69.laz"}
+    assert spans["read"]["counters"] == {"input_points": 15, "bytes_read": 100}
+    assert spans["interpolate"]["attributes"] == {"output": "tile_50CM.tif"}
+    for span in spans.values():
+        assert span["wall_s"] >= 0 and span["cpu_s"] >= 0 and span["peak_rss_mb"] > 0
+        assert span["pid"] == os.getpid()
+    assert spans["interpolation"]["wall_s"] >= spans["read"]["wall_s"]
+
+
+def test_span_with_parent_from_another_thread():
+    output_dir = os.path.join(TMP_PATH, "parent")
+    metrics.configure_metrics(output_dir)
+    try:
+        with metrics.span("interpolation_chunk") as chunk_span:
+            with ThreadPoolExecutor(1) as executor:
+
+                def read():
+                    with metrics.span("prefetch", tile="tile_1.laz", parent=chunk_span):
+                        with metrics.span("read"):
+                            pass
+
+                executor.submit(read).result()
+            with metrics.span("interpolation", tile="tile_0.laz"):
+                pass
+    finally:
+        metrics.configure_metrics(None)
+
+    spans = {span["name"]: span for span in read_spans(output_dir)}
+    assert spans["prefetch"]["parent_id"] == spans["interpolation_chunk"]["span_id"]
+    assert spans["read"]["parent_id"] == spans["prefetch"]["span_id"]
+    assert spans["interpolation"]["parent_id"] == spans["interpolation_chunk"]["span_id"]
+    # Spans whose parent has no tile keep their own tile
+    assert spans["interpolation_chunk"]["tile"] is None
+    assert spans["prefetch"]["tile"] == spans["read"]["tile"] == "tile_1.laz"
+    assert spans["interpolation"]["tile"] == "tile_0.laz"
+
+
+def test_span_peak_rss_is_the_peak_of_the_span():
+    with metrics.span("large") as large_span:
+        points = np.ones(64 * 1024 * 1024, dtype=np.uint8)
+        time.sleep(3 * metrics.RSS_SAMPLING_INTERVAL_S)
+        del points
+    with metrics.span("small") as small_span:
+        with metrics.span("nested") as nested_span:
+            time.sleep(3 * metrics.RSS_SAMPLING_INTERVAL_S)
+
+    # The peak RSS of the process lifetime would be the same for all the spans
+    assert large_span.peak_rss_mb > small_span.peak_rss_mb + 32
+    assert small_span.peak_rss_mb >= nested_span.peak_rss_mb > 0
+
+
+def test_span_records_errors():
+    output_dir = os.path.join(TMP_PATH, "errors")
+    metrics.configure_metrics(output_dir)
+    try:
+        with pytest.raises(ValueError):
+            with metrics.span("read", tile="tile.laz"):
+                raise ValueError("corrupted file")
+    finally:
+        metrics.configure_metrics(None)
+
+    (span,) = read_spans(output_dir)
+    assert span["error"] == "ValueError('corrupted file')"
+
+
+def test_span_without_recorder_is_only_logged(caplog):
+    with caplog.at_level(logging.INFO):
+        with metrics.span("dhm", tile="tile.laz") as dhm_span:
+            dhm_span.add(output_pixels=4)
+
+    assert "dhm (tile.laz)" in caplog.text
+    assert "output_pixels=4" in caplog.text
+
+
+def test_eval_time_opens_a_span(caplog):
+    @commons.eval_time
+    def add(a, b):
+        return a + b
+
+    with caplog.at_level(logging.INFO):
+        assert add(1, 2) == 3
+    assert add.__name__ == "add"
+    assert "add with PID" in caplog.text
+
+
+def test_get_logger_adds_a_single_handler():
+    log = commons.get_logger("test_get_logger_adds_a_single_handler")
+    nb_handlers = len(log.handlers)
+    log = commons.get_logger("test_get_logger_adds_a_single_handler")
+
+    assert len(log.handlers) == nb_handlers == 1
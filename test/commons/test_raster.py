@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+import rasterio
+from affine import Affine
+from rasterio.crs import CRS
+
+from las_digital_models.commons.raster import Raster
+from las_digital_models.commons.raster_output import RasterOutputProfile
+
+TRANSFORM = Affine(0.5, 0, 770000, 0, -0.5, 6278000)
+SRS_WKT = CRS.from_epsg(2154).to_wkt()
+
+
+def get_raster():
+    rows, cols = np.mgrid[0:60, 0:100]
+    return Raster((100 + 0.01 * rows + 0.02 * cols), TRANSFORM, SRS_WKT, -9999)
+
+
+def test_raster():
+    raster = get_raster()
+
+    assert raster.data.dtype == np.float32
+    assert raster.shape == (60, 100)
+    assert raster.pixel_size == 0.5
+    assert raster.bounds == (770000, 6277970, 770050, 6278000)
+    assert raster.is_aligned(Raster(np.zeros((60, 100)), TRANSFORM))
+    assert not raster.is_aligned(Raster(np.zeros((60, 100)), TRANSFORM * Affine.translation(1, 0)))
+
+    with pytest.raises(ValueError):
+        Raster(np.zeros((1, 60, 100)), TRANSFORM)
+
+
+@pytest.mark.parametrize("output_file", ["raster.tif", "/vsimem/raster.tif"])
+def test_write_read(tmp_path, output_file):
+    if not output_file.startswith("/vsimem/"):
+        output_file = str(tmp_path / output_file)
+    raster = get_raster()
+
+    raster.write(output_file, RasterOutputProfile(compress="DEFLATE", block_size=256))
+    read_raster = Raster.read(output_file)
+
+    assert np.array_equal(read_raster.data, raster.data)
+    assert read_raster.transform == TRANSFORM
+    assert CRS.from_wkt(read_raster.srs_wkt).to_epsg() == 2154
+    assert read_raster.no_data_value == -9999
+    with rasterio.open(output_file) as src:
+        assert src.profile["compress"] == "deflate"
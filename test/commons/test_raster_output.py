@@ -0,0 +1,94 @@
+import numpy as np
+import pytest
+import rasterio
+from affine import Affine
+
+from las_digital_models.commons.raster_output import (
+    RasterOutputProfile,
+    get_output_profile_from_config,
+)
+
+WIDTH = 1000
+HEIGHT = 600
+PROFILE = {
+    "driver": "GTiff",
+    "width": WIDTH,
+    "height": HEIGHT,
+    "count": 1,
+    "dtype": "float32",
+    "crs": "EPSG:2154",
+    "transform": Affine(0.5, 0, 770000, 0, -0.5, 6278000),
+    "nodata": -9999,
+}
+
+
+def get_data():
+    rows, cols = np.mgrid[0:HEIGHT, 0:WIDTH]
+    return (100 + 0.01 * rows + 0.02 * cols).astype(np.float32)
+
+
+def write(output_profile, output_file):
+    data = get_data()
+    with output_profile.open_rasterio(output_file, **PROFILE) as dst:
+        dst.write(data, 1)
+
+    return data
+
+
+def test_default_profile():
+    output_profile = get_output_profile_from_config({})
+
+    assert output_profile.is_default()
+    assert output_profile.get_creation_options() == {}
+
+
+def test_get_creation_options():
+    options = RasterOutputProfile(compress="zstd", level=9, block_size=256).get_creation_options()
+    assert options["COMPRESS"] == "ZSTD"
+    assert options["PREDICTOR"] == "3"
+    assert options["ZSTD_LEVEL"] == "9"
+    assert (options["TILED"], options["BLOCKXSIZE"], options["BLOCKYSIZE"]) == ("YES", "256", "256")
+
+    options = RasterOutputProfile(driver="COG", compress="LERC_ZSTD", max_z_error=0.01).get_creation_options()
+    assert options["MAX_Z_ERROR"] == "0.01"
+    assert options["OVERVIEWS"] == "NONE"
+    assert "PREDICTOR" not in options
+
+    with pytest.raises(ValueError):
+        RasterOutputProfile(driver="PNG")
+
+
+def test_get_overview_factors():
+    assert RasterOutputProfile(block_size=512).get_overview_factors(2000, 1000) == [2, 4]
+    assert RasterOutputProfile(block_size=512).get_overview_factors(500, 500) == []
+
+
+@pytest.mark.parametrize(
+    "output_profile, expected_compression, expected_overviews",
+    [
+        (RasterOutputProfile(), None, []),
+        (RasterOutputProfile(compress="DEFLATE", block_size=256), "deflate", []),
+        (RasterOutputProfile(compress="ZSTD", block_size=256, overviews=True), "zstd", [2, 4]),
+        (RasterOutputProfile(driver="COG", compress="DEFLATE", block_size=256, overviews=True), "deflate", [2, 4]),
+    ],
+)
+def test_open_rasterio(tmp_path, output_profile, expected_compression, expected_overviews):
+    output_file = tmp_path / "raster.tif"
+    data = write(output_profile, output_file)
+
+    with rasterio.open(output_file) as src:
+        assert np.array_equal(src.read(1), data)
+        assert src.nodata == -9999
+        assert src.crs.to_epsg() == 2154
+        assert src.profile.get("compress") == expected_compression
+        assert src.overviews(1) == expected_overviews
+        if output_profile.block_size:
+            assert src.block_shapes[0] == (256, 256)
+
+
+def test_open_rasterio_lerc(tmp_path):
+    output_file = tmp_path / "raster.tif"
+    data = write(RasterOutputProfile(driver="COG", compress="LERC_ZSTD", max_z_error=0.01), output_file)
+
+    with rasterio.open(output_file) as src:
+        assert np.abs(src.read(1) - data).max() <= 0.01 + 1e-4  # float32 rounding
@@ -0,0 +1,62 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+from affine import Affine
+
+from las_digital_models.commons.raster import Raster
+from las_digital_models.commons.raster_output import RasterOutputProfile
+from las_digital_models.commons.raster_writer import AsyncRasterWriter
+
+TRANSFORM = Affine(0.5, 0, 770000, 0, -0.5, 6278000)
+
+
+def test_async_raster_writer(tmp_path):
+    rasters = [Raster(np.full((60, 100), i, dtype=np.float32), TRANSFORM) for i in range(3)]
+    output_files = [str(tmp_path / f"raster_{i}.tif") for i in range(3)]
+
+    with AsyncRasterWriter(max_pending=2) as writer:
+        for raster, output_file in zip(rasters, output_files):
+            writer.write(raster, output_file, RasterOutputProfile(compress="DEFLATE"))
+
+    # All the rasters are written when the writer is closed
+    for i, output_file in enumerate(output_files):
+        assert np.all(Raster.read(output_file).data == i)
+
+
+def test_async_raster_writer_max_pending(tmp_path):
+    lock = threading.Lock()
+    pending = []
+    max_pending = []
+
+    class SlowRaster:
+        def write(self, output_file, output_profile):
+            time.sleep(0.05)
+            with lock:
+                pending.remove(output_file)
+
+    with AsyncRasterWriter(max_pending=2) as writer:
+        for i in range(6):
+            with lock:
+                pending.append(f"raster_{i}.tif")
+                max_pending.append(len(pending))
+            writer.write(SlowRaster(), f"raster_{i}.tif")
+
+    assert pending == []
+    # The raster being submitted is counted with the ones waiting to be written
+    assert max(max_pending) <= 3
+
+
+def test_async_raster_writer_raises_write_errors(tmp_path):
+    raster = Raster(np.zeros((60, 100), dtype=np.float32), TRANSFORM)
+    writer = AsyncRasterWriter()
+    writer.write(raster, str(tmp_path / "missing_dir" / "raster.tif"))
+
+    with pytest.raises(Exception):
+        writer.flush()
+
+    # Errors are raised only once, the writer can still be used
+    writer.write(raster, str(tmp_path / "raster.tif"))
+    writer.flush()
+    assert Raster.read(str(tmp_path / "raster.tif")).shape == (60, 100)
@@ -1,8 +1,11 @@
 from pathlib import Path
 
 import geopandas as gpd
+import numpy as np
+import pytest
+from geopandas.testing import assert_geodataframe_equal
 from pyproj import CRS
-from shapely.geometry import LineString
+from shapely.geometry import LineString, Polygon, box
 
 from las_digital_models.extract_stat_from_raster.vectors.clip_geometry import (
     clip_lines_by_polygons,
@@ -63,3 +66,31 @@ def test_create_hydro_vector_mask_outside():
     gdf = clip_lines_by_polygons(lines_outsides_gdf, bridges_gdf)
 
     assert gdf.empty  # GeoDataFrame should empty
+
+
+@pytest.mark.parametrize("chunk_size", [100000, 7])
+def test_clip_lines_by_polygons_same_as_overlay(chunk_size):
+    rng = np.random.default_rng(0)
+    lines = [LineString(rng.uniform(0, 100, (rng.integers(2, 5), 2))) for _ in range(500)]
+    polygons = [box(x, y, x + rng.uniform(1, 10), y + rng.uniform(1, 10)) for x, y in rng.uniform(0, 100, (50, 2))]
+    polygons.append(Polygon([(0, 0), (10, 10), (10, 0), (0, 10)]))  # invalid polygon (bowtie)
+    lines_gdf = gpd.GeoDataFrame({"id": range(500), "name": ["line"] * 500}, geometry=lines, crs="EPSG:2154")
+    polygons_gdf = gpd.GeoDataFrame(
+        {"name": [f"polygon_{i}" for i in range(51)], "height": np.arange(51.0)}, geometry=polygons, crs="EPSG:2154"
+    )
+
+    expected = gpd.overlay(lines_gdf, polygons_gdf, how="intersection")
+    gdf = clip_lines_by_polygons(lines_gdf, polygons_gdf, chunk_size=chunk_size)
+
+    assert not gdf.empty
+    assert_geodataframe_equal(gdf, expected)
+
+
+@pytest.mark.parametrize("lines_file", [DATA_LINES, DATA_LINES_OUTSIDE])
+def test_clip_lines_by_polygons_same_as_overlay_on_data(lines_file):
+    lines_gdf = gpd.read_file(lines_file)
+    bridges_gdf = gpd.read_file(DATA_BRIDGES)
+
+    assert_geodataframe_equal(
+        clip_lines_by_polygons(lines_gdf, bridges_gdf), gpd.overlay(lines_gdf, bridges_gdf, how="intersection")
+    )
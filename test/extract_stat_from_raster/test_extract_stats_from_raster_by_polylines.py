@@ -0,0 +1,77 @@
+import os
+from pathlib import Path
+
+import geopandas as gpd
+import numpy as np
+import pytest
+from shapely.geometry import LineString, Point
+
+from las_digital_models.extract_stat_from_raster.rasters.extract_stats_from_raster_by_polylines import (
+    extract_polylines_stats_from_dsm,
+)
+from las_digital_models.extract_stat_from_raster.rasters.extract_z_min_from_raster_by_polylines import (
+    extract_polylines_min_z_from_dsm,
+)
+
+TEST_PATH = Path(__file__).resolve().parent.parent
+DATA_RASTER_PATH = os.path.join(TEST_PATH, "data/bridge/mns_hydro_postfiltre")
+INPUT_RASTER = os.path.join(DATA_RASTER_PATH, "test_mns_hydro_2023_0299_6802_LA93_IGN69_5m.tif")
+
+
+def get_lines_gdf():
+    lines = [
+        LineString([(299934.06, 6801817.96), (300007.48, 6801822.18)]),
+        LineString([(299922.47, 6801805.18), (299993.08, 6801808.32)]),
+        LineString([(0, 0), (1, 1)]),  # outside of the raster
+        Point(299934.06, 6801817.96),  # not a LineString
+    ]
+    return gpd.GeoDataFrame({"name": ["a", "b", "c", "d"]}, geometry=lines, crs="EPSG:2154")
+
+
+def test_extract_polylines_stats_same_as_min_z():
+    expected = extract_polylines_min_z_from_dsm(get_lines_gdf(), INPUT_RASTER)
+
+    result = extract_polylines_stats_from_dsm(get_lines_gdf(), INPUT_RASTER)
+
+    assert list(result["name"]) == ["a", "b"]
+    assert list(result.columns) == list(expected.columns)
+    assert all(geom.equals_exact(expected_geom, 0) for geom, expected_geom in zip(result.geometry, expected.geometry))
+
+
+def test_extract_polylines_stats_attributes():
+    result = extract_polylines_stats_from_dsm(
+        get_lines_gdf(), INPUT_RASTER, stats=["min", "max", "percentile_90"], z_statistic=None
+    )
+
+    assert list(result["name"]) == ["a", "b"]
+    assert list(result["z_min"].round(2)) == [140.91, 140.45]
+    assert (result["z_min"] <= result["z_percentile_90"]).all()
+    assert (result["z_percentile_90"] <= result["z_max"]).all()
+    assert not any(geom.has_z for geom in result.geometry)
+
+
+def test_extract_polylines_stats_z_statistic():
+    result = extract_polylines_stats_from_dsm(get_lines_gdf(), INPUT_RASTER, stats=["max"], z_statistic="max")
+
+    for geom, z_max in zip(result.geometry, result["z_max"]):
+        assert all(z == round(z_max, 2) for _, _, z in geom.coords)
+
+
+def test_extract_polylines_stats_profile():
+    lines_gdf = get_lines_gdf()
+
+    result = extract_polylines_stats_from_dsm(lines_gdf, INPUT_RASTER, stats=["min", "max"], profile_step=5)
+
+    assert list(result["name"]) == ["a", "b"]
+    for geom, line, z_min, z_max in zip(result.geometry, lines_gdf.geometry, result["z_min"], result["z_max"]):
+        assert geom.has_z
+        # samples outside of the raster are dropped (the lines end in the next tile)
+        assert 2 <= len(geom.coords) <= int(np.ceil(line.length / 5)) + 1
+        assert geom.coords[0][:2] == pytest.approx(line.coords[0])
+        z = np.array(geom.coords)[:, 2]
+        assert round(z_min, 2) <= z.min() and z.max() <= round(z_max, 2)
+
+
+def test_extract_polylines_stats_unknown_statistic():
+    with pytest.raises(ValueError, match="Unknown statistic"):
+        extract_polylines_stats_from_dsm(get_lines_gdf(), INPUT_RASTER, stats=["maximum"])
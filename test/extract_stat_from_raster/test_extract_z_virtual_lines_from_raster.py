@@ -89,6 +89,65 @@ def test_extract_z_virtual_lines_from_raster_default(input_raster_dir, input_geo
         assert all_z_coords_equal(geom)  # this lines have the same Z value"
 
 
+def test_extract_z_virtual_lines_from_raster_with_cache():
+    output_dir = TMP_PATH / "main_extract_z_virtual_lines_from_raster_cache"
+    output_geometry_filename = "constraint_lines.GeoJSON"
+
+    with initialize(version_base="1.2", config_path="../../configs"):
+        # config is relative to a module
+        cfg = compose(
+            config_name="config",
+            overrides=[
+                f"extract_stat.input_raster_dir={INPUT_RASTER_DIR}",
+                f"extract_stat.input_geometry_dir={INPUT_GEOMETRY_DIR}",
+                f"extract_stat.input_clip_geometry_dir={INPUT_CLIP_GEOMETRY_DIR}",
+                "extract_stat.input_geometry_filename=NUALHD_1-0_DF_lignes_contrainte.geojson",
+                "extract_stat.input_clip_geometry_filename=NUALHD_1-0_DF_tabliers_pont.geojson",
+                f"extract_stat.output_vrt_filename={OUTPUT_VRT_FILENAME}",
+                f"extract_stat.output_dir={output_dir}",
+                f"extract_stat.output_geometry_filename={output_geometry_filename}",
+                "extract_stat.cache.enabled=true",
+            ],
+        )
+
+    # The second run reads all the minimums from the cache, and gives the same result
+    extract_z_virtual_lines_from_raster.run_extract_z_virtual_lines_from_raster(cfg)
+    first = gpd.read_file(output_dir / output_geometry_filename)
+    assert (output_dir / ".cache" / "lines_min_z.sqlite").is_file()
+    extract_z_virtual_lines_from_raster.run_extract_z_virtual_lines_from_raster(cfg)
+    second = gpd.read_file(output_dir / output_geometry_filename)
+
+    assert first.geom_equals(second).all()
+
+
+@pytest.mark.parametrize("output_geometry_filename", ["constraint_lines.fgb", "constraint_lines.parquet"])
+def test_extract_z_virtual_lines_from_raster_output_format(output_geometry_filename):
+    output_dir = TMP_PATH / "main_extract_z_virtual_lines_from_raster_format"
+
+    with initialize(version_base="1.2", config_path="../../configs"):
+        # config is relative to a module
+        cfg = compose(
+            config_name="config",
+            overrides=[
+                f"extract_stat.input_raster_dir={INPUT_RASTER_DIR}",
+                f"extract_stat.input_geometry_dir={INPUT_GEOMETRY_DIR}",
+                f"extract_stat.input_clip_geometry_dir={INPUT_CLIP_GEOMETRY_DIR}",
+                "extract_stat.input_geometry_filename=NUALHD_1-0_DF_lignes_contrainte.geojson",
+                "extract_stat.input_clip_geometry_filename=NUALHD_1-0_DF_tabliers_pont.geojson",
+                f"extract_stat.output_vrt_filename={OUTPUT_VRT_FILENAME}",
+                f"extract_stat.output_dir={output_dir}",
+                f"extract_stat.output_geometry_filename={output_geometry_filename}",
+                "extract_stat.chunk_size=1",
+            ],
+        )
+    extract_z_virtual_lines_from_raster.run_extract_z_virtual_lines_from_raster(cfg)
+
+    output_geometry = output_dir / output_geometry_filename
+    gdf = gpd.read_parquet(output_geometry) if output_geometry.suffix == ".parquet" else gpd.read_file(output_geometry)
+    assert not gdf.empty
+    assert all(isinstance(geom, LineString) and geom.has_z for geom in gdf.geometry)
+
+
 def test_extract_z_virtual_lines_from_raster_no_input_raster():
     input_geometry_dir = INPUT_GEOMETRY_DIR
     input_clip_geometry_dir = INPUT_CLIP_GEOMETRY_DIR
@@ -0,0 +1,86 @@
+import os
+import shutil
+from pathlib import Path
+from test.extract_stat_from_raster.test_lines_zonal_stats import generate_lines
+
+import rasterio
+
+from las_digital_models.extract_stat_from_raster.rasters.lines_cache import (
+    LinesMinZCache,
+    RasterIndex,
+    compute_lines_min_with_cache,
+)
+from las_digital_models.extract_stat_from_raster.rasters.lines_zonal_stats import (
+    compute_lines_min,
+)
+
+TEST_PATH = Path(__file__).resolve().parent.parent
+TMP_PATH = TEST_PATH / "tmp" / "lines_cache"
+DATA_RASTER_PATH = os.path.join(TEST_PATH, "data/bridge/mns_hydro_postfiltre")
+INPUT_RASTER = os.path.join(DATA_RASTER_PATH, "test_mns_hydro_2023_0299_6802_LA93_IGN69_5m.tif")
+
+
+def setup_function():
+    shutil.rmtree(TMP_PATH, ignore_errors=True)
+    os.makedirs(TMP_PATH)
+
+
+def get_raster_copy():
+    raster = str(TMP_PATH / os.path.basename(INPUT_RASTER))
+    shutil.copy(INPUT_RASTER, raster)
+
+    return raster
+
+
+def test_compute_lines_min_with_cache():
+    raster = get_raster_copy()
+    with rasterio.open(raster) as src:
+        lines = generate_lines(src.bounds, 100)
+    expected = compute_lines_min(lines, raster, 9999)
+
+    with LinesMinZCache(str(TMP_PATH / "cache.sqlite")) as cache:
+        raster_index = RasterIndex([raster])
+        result, nb_hits = compute_lines_min_with_cache(lines, raster, 9999, cache, raster_index)
+        assert (result, nb_hits) == (expected, 0)
+
+        # Only the new lines are computed
+        new_lines = generate_lines(src.bounds, 20, seed=1)
+        result, nb_hits = compute_lines_min_with_cache(lines + new_lines, raster, 9999, cache, raster_index)
+        assert result == expected + compute_lines_min(new_lines, raster, 9999)
+        assert nb_hits == 100
+        assert len(cache) == 120
+
+
+def test_cache_invalidated_by_raster_update():
+    raster = get_raster_copy()
+    with rasterio.open(raster) as src:
+        lines = generate_lines(src.bounds, 50)
+    cache_path = str(TMP_PATH / "cache.sqlite")
+
+    with LinesMinZCache(cache_path) as cache:
+        compute_lines_min_with_cache(lines, raster, 9999, cache, RasterIndex([raster]))
+
+    # Same raster in a new run: all the lines are hits
+    with LinesMinZCache(cache_path) as cache:
+        _, nb_hits = compute_lines_min_with_cache(lines, raster, 9999, cache, RasterIndex([raster]))
+        assert nb_hits == 50
+
+    # Updated raster: only the lines that are outside of the raster are still hits
+    stat = os.stat(raster)
+    os.utime(raster, (stat.st_atime, stat.st_mtime + 10))
+    raster_index = RasterIndex([raster])
+    nb_outside = sum(signatures == [] for signatures in raster_index.get_raster_signatures(lines))
+    assert 0 < nb_outside < 50
+    with LinesMinZCache(cache_path) as cache:
+        _, nb_hits = compute_lines_min_with_cache(lines, raster, 9999, cache, raster_index)
+        assert nb_hits == nb_outside
+
+
+def test_cache_eviction():
+    with LinesMinZCache(str(TMP_PATH / "cache.sqlite"), max_size_mb=0.1) as cache:
+        cache.put({f"{i:064d}": float(i) for i in range(1000)})
+        assert 0 < len(cache) < 1000
+        assert cache.get_size_mb() <= 0.1
+        # The most recent lines are kept
+        assert cache.get([f"{999:064d}"]) == {f"{999:064d}": 999.0}
+        assert cache.get([f"{0:064d}"]) == {}
@@ -0,0 +1,202 @@
+import os
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+import pytest
+import rasterio
+from rasterstats import zonal_stats
+from shapely.geometry import LineString
+
+from las_digital_models.extract_stat_from_raster.rasters.lines_zonal_stats import (
+    check_statistics,
+    compute_lines_min,
+    compute_lines_stats,
+    compute_min_by_label,
+    compute_stats_by_label,
+    get_geometry_window,
+    sample_profiles,
+    split_in_layers,
+)
+
+TEST_PATH = Path(__file__).resolve().parent.parent
+DATA_RASTER_PATH = os.path.join(TEST_PATH, "data/bridge/mns_hydro_postfiltre")
+INPUT_RASTER = os.path.join(DATA_RASTER_PATH, "test_mns_hydro_2023_0299_6802_LA93_IGN69_5m.tif")
+
+
+def generate_lines(bounds, nb_lines, seed=0):
+    """Generate random lines around the raster, some of them with vertices on the edges of the pixels"""
+    rng = np.random.default_rng(seed)
+    lines = []
+    for i in range(nb_lines):
+        x0 = rng.uniform(bounds.left - 100, bounds.right + 100)
+        y0 = rng.uniform(bounds.bottom - 100, bounds.top + 100)
+        if i % 5 == 0:
+            x0, y0 = round(x0 / 5) * 5 + 1, round(y0 / 5) * 5  # vertex on a pixel edge
+        length = rng.uniform(0, 200)
+        angle = rng.uniform(0, 2 * np.pi)
+        x1, y1 = x0 + length * np.cos(angle), y0 + length * np.sin(angle)
+        lines.append(LineString([(x0, y0), (x1, y1), (x1 + rng.uniform(-30, 30), y1 + rng.uniform(-30, 30))]))
+
+    return lines
+
+
+@pytest.mark.parametrize("block_size, nb_workers", [(512, 1), (16, 1), (64, 2)])
+def test_compute_lines_min_same_as_zonal_stats(block_size, nb_workers):
+    with rasterio.open(INPUT_RASTER) as src:
+        lines = generate_lines(src.bounds, 300)
+
+    expected = [
+        zonal_stats(vectors=[line], raster=INPUT_RASTER, stats=["min"], all_touched=True, nodata=9999)[0]["min"]
+        for line in lines
+    ]
+    result = compute_lines_min(lines, INPUT_RASTER, 9999, block_size=block_size, nb_workers=nb_workers)
+
+    assert result == expected
+    assert any(value is None for value in result)  # some lines are outside the raster
+
+
+def test_compute_lines_min_empty():
+    assert compute_lines_min([], INPUT_RASTER, 9999) == []
+
+
+def test_compute_lines_min_empty_window():
+    # Horizontal line on the edge of a row of pixels: no pixel in its window
+    with rasterio.open(INPUT_RASTER) as src:
+        bounds = src.bounds
+    line = LineString([(bounds.left + 12, bounds.bottom + 50), (bounds.left + 200, bounds.bottom + 50)])
+
+    assert compute_lines_min([line], INPUT_RASTER, 9999) == [None]
+
+
+def test_get_geometry_window():
+    transform = rasterio.transform.from_origin(100, 200, 5, 5)
+
+    assert get_geometry_window((101, 150, 111, 199), transform) == ((0, 10), (0, 3))
+
+
+def test_split_in_layers():
+    windows = [((0, 2), (0, 2)), ((1, 3), (1, 3)), ((2, 4), (2, 4)), ((5, 6), (5, 6))]
+
+    assert split_in_layers(windows) == [[0, 2, 3], [1]]
+    assert split_in_layers([]) == []
+
+
+def test_compute_lines_min_many_overlapping_long_lines():
+    # Long lines that cross the whole raster in the same block: all their windows overlap, one layer per line
+    with rasterio.open(INPUT_RASTER) as src:
+        bounds = src.bounds
+    rng = np.random.default_rng(0)
+    lines = [
+        LineString(
+            [
+                (bounds.left - 10 + rng.uniform(0, 5), bounds.bottom + rng.uniform(1, 999)),
+                (bounds.right + 10 - rng.uniform(0, 5), bounds.bottom + rng.uniform(1, 999)),
+            ]
+        )
+        for _ in range(200)
+    ]
+    with rasterio.open(INPUT_RASTER) as src:
+        windows = [get_geometry_window(line.bounds, src.transform) for line in lines]
+    assert len(split_in_layers(windows)) > 100
+
+    expected = [
+        zonal_stats(vectors=[line], raster=INPUT_RASTER, stats=["min"], all_touched=True, nodata=9999)[0]["min"]
+        for line in lines
+    ]
+    tracemalloc.start()
+    try:
+        result = compute_lines_min(lines, INPUT_RASTER, 9999)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert result == expected
+    # The memory does not grow with the number of layers (a few arrays of the size of the raster at most)
+    assert peak < 10 * 200 * 200 * 4
+
+
+def test_compute_min_by_label():
+    labels = np.array([3, 1, 3, 2, 1])
+    values = np.array([5.0, 2.0, 1.0, 4.0, 3.0])
+
+    assert compute_min_by_label(labels, values) == {1: 2.0, 2: 4.0, 3: 1.0}
+    assert compute_min_by_label(np.array([]), np.array([])) == {}
+
+
+STATS = ["min", "max", "mean", "median", "sum", "count", "std", "range", "percentile_90", "percentile_12.5"]
+
+
+@pytest.mark.parametrize("block_size, nb_workers", [(512, 1), (16, 1), (64, 2)])
+def test_compute_lines_stats_same_as_zonal_stats(block_size, nb_workers):
+    with rasterio.open(INPUT_RASTER) as src:
+        lines = generate_lines(src.bounds, 300)
+
+    expected = [
+        zonal_stats(vectors=[line], raster=INPUT_RASTER, stats=STATS, all_touched=True, nodata=9999)[0]
+        for line in lines
+    ]
+    result = compute_lines_stats(lines, INPUT_RASTER, 9999, STATS, block_size=block_size, nb_workers=nb_workers)
+
+    assert [r["min"] for r in result] == [e["min"] for e in expected]
+    assert [r["count"] for r in result] == [e["count"] for e in expected]
+    for r, e in zip(result, expected):
+        for stat in STATS:
+            assert r[stat] == pytest.approx(e[stat], rel=1e-6), stat
+
+
+def test_compute_lines_stats_profile():
+    with rasterio.open(INPUT_RASTER) as src:
+        lines = generate_lines(src.bounds, 50)
+        result = compute_lines_stats(lines, INPUT_RASTER, 9999, ["max"], profile_step=2.5, block_size=16)
+
+        for line, line_result in zip(lines, result):
+            profile = line_result["profile"]
+            # first and last samples are the ends of the line, the others are every 2.5 m
+            assert len(profile) == int(np.ceil(line.length / 2.5)) + 1
+            assert profile[0, :2] == pytest.approx(line.coords[0])
+            assert profile[-1, :2] == pytest.approx(line.coords[-1])
+            # same values as rasterio's sample, nan outside of the raster
+            expected = np.array([value[0] for value in src.sample(profile[:, :2])], dtype=float)
+            inside = (
+                (profile[:, 0] >= src.bounds.left)
+                & (profile[:, 0] < src.bounds.right)
+                & (profile[:, 1] > src.bounds.bottom)
+                & (profile[:, 1] <= src.bounds.top)
+            )
+            expected[~inside | (expected == 9999)] = np.nan
+            np.testing.assert_array_equal(profile[:, 2], expected)
+            if line_result["max"] is not None:
+                assert np.nanmax(profile[:, 2]) <= line_result["max"]
+
+
+def test_compute_stats_by_label():
+    labels = np.array([3, 1, 3, 2, 1, 3])
+    values = np.array([5.0, 2.0, 1.0, 4.0, 3.0, 3.0])
+
+    result = compute_stats_by_label(labels, values, ["min", "max", "mean", "count", "median", "percentile_25"])
+
+    assert result[1] == {"min": 2.0, "max": 3.0, "mean": 2.5, "count": 2, "median": 2.5, "percentile_25": 2.25}
+    assert result[2] == {"min": 4.0, "max": 4.0, "mean": 4.0, "count": 1, "median": 4.0, "percentile_25": 4.0}
+    assert result[3]["median"] == 3.0
+    assert compute_stats_by_label(np.array([]), np.array([]), ["min"]) == {}
+
+
+def test_check_statistics():
+    check_statistics(["min", "percentile_99.5"])
+    for stat in ["minimum", "percentile_101", "percentile_x"]:
+        with pytest.raises(ValueError, match="Unknown statistic"):
+            check_statistics([stat])
+
+
+def test_sample_profiles():
+    data = np.ma.MaskedArray(np.arange(16, dtype=float).reshape(4, 4), mask=np.zeros((4, 4), dtype=bool))
+    data.mask[0, 0] = True
+    transform = rasterio.transform.from_origin(0, 4, 1, 1)
+    lines = [LineString([(0.5, 3.5), (3.5, 3.5)]), LineString([(1.5, 0.5), (1.5, 0.5)])]
+
+    profiles = sample_profiles(lines, data, transform, 1.2)
+
+    np.testing.assert_allclose(profiles[0][:, 0], [0.5, 1.7, 2.9, 3.5])
+    np.testing.assert_array_equal(profiles[0][:, 2], [np.nan, 1, 2, 3])
+    np.testing.assert_array_equal(profiles[1], [[1.5, 0.5, 13]])
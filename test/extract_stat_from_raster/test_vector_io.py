@@ -0,0 +1,73 @@
+import os
+from pathlib import Path
+
+import geopandas as gpd
+import pandas as pd
+import pytest
+from shapely.geometry import LineString, box
+
+from las_digital_models.extract_stat_from_raster.vectors.vector_io import (
+    get_file_bbox,
+    get_output_format,
+    get_raster_bounds,
+    read_vector,
+    read_vector_chunks,
+    write_vector,
+)
+
+TEST_PATH = Path(__file__).resolve().parent.parent
+DATA_DIR = TEST_PATH / "data" / "bridge"
+INPUT_RASTER = DATA_DIR / "mns_hydro_postfiltre" / "test_mns_hydro_2023_0299_6802_LA93_IGN69_5m.tif"
+INPUT_LINES = DATA_DIR / "input_operators" / "lignes_contraintes" / "NUALHD_1-0_DF_lignes_contrainte.geojson"
+
+
+def test_read_vector_chunks_in_raster_bounds():
+    bounds, crs = get_raster_bounds(str(INPUT_RASTER), "EPSG:2154")
+    bbox = get_file_bbox(str(INPUT_LINES), bounds, crs)
+
+    chunks = list(read_vector_chunks(str(INPUT_LINES), bbox, chunk_size=2))
+    assert all(0 < len(chunk) <= 2 for chunk in chunks)
+    lines = pd.concat(chunks, ignore_index=True)
+
+    # Same features as a full read filtered by the bbox
+    expected = gpd.read_file(INPUT_LINES)
+    expected = expected[expected.intersects(box(*bbox))].reset_index(drop=True)
+    assert 0 < len(lines) < len(gpd.read_file(INPUT_LINES))
+    assert lines.geometry.name == "geometry"
+    assert lines.crs == expected.crs
+    assert lines.geom_equals(expected.geometry).all()
+
+
+def test_read_vector_outside_bbox():
+    assert read_vector(str(INPUT_LINES), bbox=(0, 0, 1, 1)).empty
+    assert list(read_vector_chunks(str(INPUT_LINES), bbox=(0, 0, 1, 1))) == []
+
+
+def test_get_output_format():
+    assert get_output_format("lines.GeoJSON") == "GeoJSON"
+    assert get_output_format("lines.fgb") == "FlatGeobuf"
+    assert get_output_format("lines.parquet") == "GeoParquet"
+    assert get_output_format("lines.txt") == "GeoJSON"
+    assert get_output_format("lines.geojson", "FlatGeobuf") == "FlatGeobuf"
+    with pytest.raises(ValueError):
+        get_output_format("lines.shp", "ESRI Shapefile")
+
+
+@pytest.mark.parametrize("filename", ["lines.geojson", "lines.fgb", "lines.parquet"])
+def test_write_vector(tmp_path, filename):
+    gdf = gpd.GeoDataFrame(
+        {"name": ["a", "b"]},
+        geometry=[LineString([(0, 0, 10.5), (1, 1, 10.5)]), LineString([(2, 2, 3.25), (3, 2, 3.25)])],
+        crs="EPSG:2154",
+    )
+    output_file = os.path.join(tmp_path, filename)
+
+    write_vector(gdf, output_file)
+
+    result = gpd.read_parquet(output_file) if filename.endswith(".parquet") else gpd.read_file(output_file)
+    # the features of a FlatGeobuf file are sorted by its spatial index
+    result = result.sort_values("name").reset_index(drop=True)
+    assert list(result["name"]) == ["a", "b"]
+    assert result.crs == gdf.crs
+    assert all(geom.has_z for geom in result.geometry)
+    assert result.geom_equals(gdf.geometry).all()
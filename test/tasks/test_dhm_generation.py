@@ -0,0 +1,143 @@
+import os
+import shutil
+import test.utils.raster_utils as ru
+from pathlib import Path
+
+import numpy as np
+import pytest
+import rasterio
+
+from las_digital_models.commons.raster import Raster
+from las_digital_models.commons.raster_output import RasterOutputProfile
+from las_digital_models.tasks.dhm_generation import (
+    calculate_dhm,
+    calculate_dhm_from_arrays,
+    calculate_dhm_raster,
+    compute_dhm,
+)
+
+TEST_PATH = Path(__file__).resolve().parent.parent
+TMP_PATH = TEST_PATH / "tmp" / "tasks" / "dhm_generation"
+DATA_PATH = TEST_PATH / "data"
+RASTER_FILENAME = "test_data_77055_627760_LA93_IGN69_50CM.tif"
+INPUT_DSM = DATA_PATH / "DSM" / RASTER_FILENAME
+INPUT_DTM = DATA_PATH / "DTM" / RASTER_FILENAME
+NO_DATA_VALUE = -9999
+
+
+def setup_module():
+    try:
+        shutil.rmtree(TMP_PATH)
+
+    except FileNotFoundError:
+        pass
+    os.makedirs(TMP_PATH)
+
+
+def read_expected_dhm():
+    with rasterio.open(INPUT_DSM) as dsm_src, rasterio.open(INPUT_DTM) as dtm_src:
+        dsm = dsm_src.read(1)
+        dtm = dtm_src.read(1)
+
+    return np.where((dsm != NO_DATA_VALUE) & (dtm != NO_DATA_VALUE), dsm - dtm, NO_DATA_VALUE)
+
+
+def test_compute_dhm():
+    dsm = np.array([[10, 12, NO_DATA_VALUE], [5, 6, 7]], dtype=np.float32)
+    dtm = np.array([[1, NO_DATA_VALUE, 1], [5, 4, 3]], dtype=np.float32)
+
+    dhm = compute_dhm(dsm, dtm, NO_DATA_VALUE)
+
+    assert np.array_equal(dhm, [[9, NO_DATA_VALUE, NO_DATA_VALUE], [0, 2, 4]])
+    assert dhm is dsm  # computed in place
+
+
+def test_calculate_dhm_from_arrays():
+    dsm = np.array([[10, NO_DATA_VALUE]], dtype=np.float64)
+    dtm = np.array([[1, 1]], dtype=np.float32)
+
+    dhm = calculate_dhm_from_arrays(dsm, dtm, NO_DATA_VALUE)
+
+    assert dhm.dtype == np.float32
+    assert np.array_equal(dhm, [[9, NO_DATA_VALUE]])
+    assert np.array_equal(dsm, [[10, NO_DATA_VALUE]])  # input is not modified
+
+
+def test_calculate_dhm_from_arrays_different_shapes():
+    with pytest.raises(ValueError):
+        calculate_dhm_from_arrays(np.zeros((2, 2)), np.zeros((2, 3)))
+
+
+@pytest.mark.parametrize(
+    "block_size, nb_threads",
+    [
+        (512, 4),  # whole raster in a single block
+        (7, 1),  # several blocks, last block is smaller
+        (7, 3),  # several blocks in parallel
+    ],
+)
+def test_calculate_dhm(block_size, nb_threads):
+    output_file = TMP_PATH / f"dhm_{block_size}_{nb_threads}.tif"
+
+    calculate_dhm(INPUT_DSM, INPUT_DTM, output_file, NO_DATA_VALUE, block_size=block_size, nb_threads=nb_threads)
+
+    assert os.path.isfile(output_file)
+    assert ru.allclose_mm(ru.get_tif_extent(str(output_file)), ru.get_tif_extent(str(INPUT_DSM)))
+    with rasterio.open(output_file) as src:
+        assert src.nodata == NO_DATA_VALUE
+        assert src.dtypes[0] == "float32"
+        assert np.array_equal(src.read(1), read_expected_dhm())
+
+
+def test_calculate_dhm_cog():
+    output_file = TMP_PATH / "dhm_cog.tif"
+    output_profile = RasterOutputProfile(driver="COG", compress="DEFLATE", block_size=32, overviews=True)
+
+    calculate_dhm(INPUT_DSM, INPUT_DTM, output_file, NO_DATA_VALUE, block_size=7, output_profile=output_profile)
+
+    with rasterio.open(output_file) as src:
+        assert src.profile["compress"] == "deflate"
+        assert src.block_shapes[0] == (32, 32)
+        assert src.overviews(1)
+        assert np.array_equal(src.read(1), read_expected_dhm())
+
+
+def test_calculate_dhm_not_aligned():
+    other_dtm = DATA_PATH / "interpolation" / "test_data_77055_627760_LA93_IGN69_50CM.tif"
+    with rasterio.open(other_dtm) as src:
+        profile = src.profile
+        data = src.read()
+    shifted_dtm = TMP_PATH / "shifted_dtm.tif"
+    profile.update(transform=profile["transform"] * profile["transform"].translation(1, 0))
+    with rasterio.open(shifted_dtm, "w", **profile) as dst:
+        dst.write(data)
+
+    with pytest.raises(ValueError, match="not aligned"):
+        calculate_dhm(INPUT_DSM, shifted_dtm, TMP_PATH / "not_aligned.tif", NO_DATA_VALUE)
+
+
+def test_calculate_dhm_raster():
+    dsm = Raster.read(str(INPUT_DSM))
+    dtm = Raster.read(str(INPUT_DTM))
+
+    dhm = calculate_dhm_raster(dsm, dtm, NO_DATA_VALUE)
+
+    assert np.array_equal(dhm.data, read_expected_dhm())
+    assert dhm.transform == dsm.transform
+    assert dhm.srs_wkt == dsm.srs_wkt
+
+    shifted_dtm = Raster(dtm.data, dtm.transform * dtm.transform.translation(1, 0))
+    with pytest.raises(ValueError, match="not aligned"):
+        calculate_dhm_raster(dsm, shifted_dtm, NO_DATA_VALUE)
+
+
+def test_calculate_dhm_with_rasters_in_memory():
+    # DSM in memory and DTM file
+    output_file = TMP_PATH / "dhm_from_raster.tif"
+
+    calculate_dhm(Raster.read(str(INPUT_DSM)), INPUT_DTM, output_file, NO_DATA_VALUE)
+
+    with rasterio.open(output_file) as src, rasterio.open(INPUT_DSM) as dsm_src:
+        assert np.array_equal(src.read(1), read_expected_dhm())
+        assert src.transform == dsm_src.transform
+        assert src.crs == dsm_src.crs
@@ -0,0 +1,95 @@
+import test.utils.point_cloud_utils as pcu
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from las_digital_models.tasks.las_buffer import merge_point_arrays, read_las_with_buffer
+from las_digital_models.tasks.strip_cache import StripCache
+
+TEST_PATH = Path(__file__).resolve().parent.parent
+INPUT_DIR = TEST_PATH / "data"
+INPUT_FILE = INPUT_DIR / "test_data_77055_627760_LA93_IGN69.laz"
+
+TILE_COORD_SCALE = 10
+TILE_WIDTH = 50
+BUFFER_WIDTH = 10
+
+
+def test_read_las_with_buffer():
+    points, srs_wkt = read_las_with_buffer(
+        str(INPUT_DIR),
+        str(INPUT_FILE),
+        buffer_width=BUFFER_WIDTH,
+        spatial_ref="EPSG:2154",
+        tile_width=TILE_WIDTH,
+        tile_coord_scale=TILE_COORD_SCALE,
+    )
+
+    # Same number of points as the las written by create_las_with_buffer (cf. test_add_buffer_one_tile)
+    assert len(points) == 103359
+    assert len(points) > pcu.get_nb_points(INPUT_FILE)
+    assert set(np.unique(points["Classification"])) == {1, 2, 3, 4, 5, 6, 64}
+    assert "2154" in srs_wkt
+
+    xmin = 77055 * TILE_COORD_SCALE - BUFFER_WIDTH
+    ymax = 627760 * TILE_COORD_SCALE + BUFFER_WIDTH
+    assert np.all(points["X"] >= xmin) and np.all(points["X"] <= xmin + TILE_WIDTH + 2 * BUFFER_WIDTH)
+    assert np.all(points["Y"] <= ymax) and np.all(points["Y"] >= ymax - TILE_WIDTH - 2 * BUFFER_WIDTH)
+
+
+def test_read_las_with_buffer_with_strip_cache():
+    strip_cache = StripCache()
+    kwargs = dict(
+        buffer_width=BUFFER_WIDTH, spatial_ref="EPSG:2154", tile_width=TILE_WIDTH, tile_coord_scale=TILE_COORD_SCALE
+    )
+    expected_points, _ = read_las_with_buffer(str(INPUT_DIR), str(INPUT_FILE), **kwargs)
+
+    # neighbors are not in the cache yet
+    points, _ = read_las_with_buffer(str(INPUT_DIR), str(INPUT_FILE), strip_cache=strip_cache, **kwargs)
+    assert np.array_equal(np.sort(points, order=["X", "Y", "Z"]), np.sort(expected_points, order=["X", "Y", "Z"]))
+    assert strip_cache.stats()["hits"] == 0
+    nb_neighbors = strip_cache.stats()["misses"]
+    assert nb_neighbors > 0
+
+    # neighbors strips are in the cache: only the central tile is read
+    points, _ = read_las_with_buffer(str(INPUT_DIR), str(INPUT_FILE), strip_cache=strip_cache, **kwargs)
+    assert np.array_equal(np.sort(points, order=["X", "Y", "Z"]), np.sort(expected_points, order=["X", "Y", "Z"]))
+    assert strip_cache.stats()["hits"] == nb_neighbors
+
+
+def test_read_las_with_buffer_with_laspy():
+    # Same points as with pdal, with only X, Y, Z and the given dimensions, with or without strip cache
+    kwargs = dict(
+        buffer_width=BUFFER_WIDTH, spatial_ref="EPSG:2154", tile_width=TILE_WIDTH, tile_coord_scale=TILE_COORD_SCALE
+    )
+    expected_points, _ = read_las_with_buffer(str(INPUT_DIR), str(INPUT_FILE), **kwargs)
+    expected_points = np.sort(expected_points[["X", "Y", "Z", "Classification"]], order=["X", "Y", "Z"])
+
+    cache = StripCache()
+    # without cache, then neighbors not in the cache yet, then neighbors strips in the cache
+    for strip_cache in [None, cache, cache]:
+        points, srs_wkt = read_las_with_buffer(
+            str(INPUT_DIR), str(INPUT_FILE), strip_cache=strip_cache, dimensions=["Classification"], **kwargs
+        )
+        assert points.dtype.names == ("X", "Y", "Z", "Classification")
+        assert "2154" in srs_wkt
+        for name in points.dtype.names:
+            assert np.array_equal(np.sort(points, order=["X", "Y", "Z"])[name], expected_points[name])
+
+
+@pytest.mark.parametrize(
+    "dtypes, expected_names",
+    [
+        ([[("X", "f8"), ("Y", "f8")], [("X", "f8"), ("Y", "f8")]], ("X", "Y")),  # same dimensions
+        ([[("X", "f8"), ("Y", "f8"), ("A", "u1")], [("X", "f8"), ("B", "u1"), ("Y", "f8")]], ("X", "Y")),
+    ],
+)
+def test_merge_point_arrays(dtypes, expected_names):
+    arrays = [np.zeros(3, dtype=dtypes[0]), np.ones(2, dtype=dtypes[1])]
+
+    merged = merge_point_arrays(arrays)
+
+    assert merged.dtype.names == expected_names
+    assert len(merged) == 5
+    assert np.all(merged["X"] == [0, 0, 0, 1, 1])
@@ -1,20 +1,56 @@
 import os
+import resource
 import shutil
 import test.utils.raster_utils as ru
 from pathlib import Path
 
+import laspy
+import numpy as np
 import pytest
+import rasterio
 
-from las_digital_models.tasks.las_interpolation import interpolate
+from las_digital_models.commons.raster_output import RasterOutputProfile
+from las_digital_models.tasks.dhm_generation import calculate_dhm_raster
+from las_digital_models.tasks.las_interpolation import (
+    filter_points,
+    get_decompression_selection,
+    get_output_rasters,
+    interpolate,
+    interpolate_points_to_rasters,
+    interpolate_products,
+    interpolate_products_to_rasters,
+    interpolate_to_rasters,
+    iter_las_chunks,
+    iter_sub_tile_points,
+    rasterize_triangles,
+    rasterize_with_faceraster,
+    read_las,
+    read_las_with_laspy,
+    read_sub_tile_points,
+    remove_duplicate_xy,
+    triangulate_points,
+)
+from las_digital_models.tasks.postprocessing import (
+    get_no_data_mask,
+    mask_with_no_data_shapefile,
+)
+from las_digital_models.tasks.sub_tiles import SubTiling
 
 TILE_COORD_SCALE = 10
 TILE_WIDTH = 50
 PIXEL_SIZE = 0.5
+SUB_TILES_MARGIN = 10
+# Pixels near the edges of the test tile (that has no buffer), where the triangles along the border of the
+# triangulation of the whole tile can be larger than the margin of the sub-tiles
+SUB_TILES_BORDER = int(SUB_TILES_MARGIN / PIXEL_SIZE)
 
 TEST_PATH = Path(__file__).resolve().parent.parent
 TMP_PATH = TEST_PATH / "tmp" / "tasks" / "las_interpolation"
 INPUT_FILE = TEST_PATH / "data" / "test_data_77055_627760_LA93_IGN69.laz"
 GROUND_TRUTH_FOLDER = TEST_PATH / "data" / "interpolation"
+SHAPEFILE = TEST_PATH / "data" / "mask_shapefile" / "test_multipolygon_shapefile.shp"
+# LAZ 1.4 file with point format 6 (fields can be decompressed separately)
+LAZ_14_FILE = TEST_PATH / "data" / "bridge" / "pointcloud" / "test_semis_2023_0299_6802_LA93_IGN69.laz"
 
 COORD_X = 77055
 COORD_Y = 627760
@@ -77,3 +113,424 @@ def test_interpolate(filter_dimension, filter_values, output_file, ground_truth_
     assert ru.allclose_mm(raster_bounds, EXPECTED_RASTER_BOUNDS)
 
     assert ru.tif_values_all_close(output_file, ground_truth_file)
+
+
+def test_interpolate_products():
+    products = {
+        TMP_PATH / "products_default.tif": {"dimension": "", "keep_values": []},
+        TMP_PATH / "products_classif.tif": {"dimension": "Classification", "keep_values": [2, 9, 66]},
+        TMP_PATH / "products_returnnumber.tif": {"dimension": "ReturnNumber", "keep_values": [2, 3, 4, 5]},
+    }
+    ground_truth_files = [
+        os.path.join(GROUND_TRUTH_FOLDER, "test_data_77055_627760_LA93_IGN69_50CM.tif"),
+        os.path.join(GROUND_TRUTH_FOLDER, "test_data_77055_627760_LA93_IGN69_50CM_dtm_classes.tif"),
+        os.path.join(GROUND_TRUTH_FOLDER, "test_data_77055_627760_LA93_IGN69_50CM_filter_returnnumber.tif"),
+    ]
+    interpolate_products(
+        INPUT_FILE,
+        {str(output_file): product_filter for output_file, product_filter in products.items()},
+        pixel_size=PIXEL_SIZE,
+        tile_width=TILE_WIDTH,
+        tile_coord_scale=TILE_COORD_SCALE,
+        spatial_ref="EPSG:2154",
+        no_data_value=-9999,
+    )
+
+    for output_file, ground_truth_file in zip(products.keys(), ground_truth_files):
+        assert os.path.isfile(output_file)
+
+        raster_bounds = ru.get_tif_extent(str(output_file))
+        assert ru.allclose_mm(raster_bounds, EXPECTED_RASTER_BOUNDS)
+
+        assert ru.tif_values_all_close(output_file, ground_truth_file)
+        with rasterio.open(output_file) as src:
+            assert src.crs.to_epsg() == 2154
+
+
+def test_interpolate_with_no_data_mask():
+    # Masking in memory gives the same result as writing the raster then masking it
+    output_file = TMP_PATH / "interpolate_masked.tif"
+    raw_file = TMP_PATH / "interpolate_raw.tif"
+    expected_file = TMP_PATH / "interpolate_masked_expected.tif"
+    kwargs = dict(
+        pixel_size=PIXEL_SIZE,
+        tile_width=TILE_WIDTH,
+        tile_coord_scale=TILE_COORD_SCALE,
+        spatial_ref="EPSG:2154",
+        no_data_value=-9999,
+        filter_dimension="",
+        filter_values=[],
+    )
+    interpolate(INPUT_FILE, output_file, **kwargs, no_data_mask=get_no_data_mask(str(SHAPEFILE)))
+    interpolate(INPUT_FILE, raw_file, **kwargs)
+    mask_with_no_data_shapefile(str(SHAPEFILE), str(raw_file), str(expected_file), -9999)
+
+    with rasterio.open(output_file) as src, rasterio.open(expected_file) as expected:
+        assert src.transform == expected.transform
+        assert src.nodata == expected.nodata
+        assert np.array_equal(src.read(), expected.read())
+        assert np.any(src.read() == -9999)
+
+
+def test_interpolate_multi_resolution():
+    # Rasters interpolated from a single triangulation are the same as rasters interpolated at each resolution
+    pixel_sizes = [0.5, 1, 5]
+    output_files = [TMP_PATH / f"multi_resolution_{pixel_size}.tif" for pixel_size in pixel_sizes]
+    kwargs = dict(
+        tile_width=TILE_WIDTH,
+        tile_coord_scale=TILE_COORD_SCALE,
+        spatial_ref="EPSG:2154",
+        no_data_value=-9999,
+        filter_dimension="Classification",
+        filter_values=[2, 9, 66],
+    )
+    interpolate(INPUT_FILE, output_files, pixel_size=pixel_sizes, **kwargs)
+
+    for pixel_size, output_file in zip(pixel_sizes, output_files):
+        expected_file = TMP_PATH / f"single_resolution_{pixel_size}.tif"
+        interpolate(INPUT_FILE, expected_file, pixel_size=pixel_size, **kwargs)
+        with rasterio.open(output_file) as src, rasterio.open(expected_file) as expected:
+            assert src.transform == expected.transform
+            assert src.nodata == expected.nodata
+            assert src.crs.to_epsg() == 2154
+            assert np.allclose(src.read(), expected.read())
+
+    assert ru.tif_values_all_close(
+        output_files[0], os.path.join(GROUND_TRUTH_FOLDER, "test_data_77055_627760_LA93_IGN69_50CM_dtm_classes.tif")
+    )
+
+
+def test_rasterize_triangles_same_as_faceraster():
+    # The triangulation interpolated with numpy (for several pixel sizes, sub-tiles, and the scipy backend) gives the
+    # same raster as pdal's faceraster, and as the reference raster
+    points, srs_wkt = read_las(INPUT_FILE, "EPSG:2154")
+    origin = (COORD_X * TILE_COORD_SCALE, COORD_Y * TILE_COORD_SCALE)
+
+    raster = rasterize_with_faceraster(points, origin, TILE_WIDTH, PIXEL_SIZE, -9999, srs_wkt)
+    vertices, triangles = triangulate_points(points)
+    expected = rasterize_triangles(vertices, triangles, origin, TILE_WIDTH, PIXEL_SIZE, -9999, srs_wkt)
+
+    assert raster.transform == expected.transform
+    assert ru.allclose_mm(raster.data, expected.data)
+    with rasterio.open(GROUND_TRUTH_FOLDER / "test_data_77055_627760_LA93_IGN69_50CM.tif") as src:
+        assert raster.transform == src.transform
+        assert ru.allclose_mm(raster.data, src.read(1))
+
+
+def test_get_output_rasters():
+    assert get_output_rasters("a.tif", 0.5) == [(0.5, "a.tif")]
+    assert get_output_rasters(("a.tif", "b.tif"), [0.5, 1]) == [(0.5, "a.tif"), (1, "b.tif")]
+    with pytest.raises(ValueError):
+        get_output_rasters("a.tif", [0.5, 1])
+
+
+@pytest.mark.parametrize("pixel_size", [PIXEL_SIZE, [PIXEL_SIZE, 1]])
+def test_interpolate_cog(pixel_size):
+    output_files = [TMP_PATH / "cog_50CM.tif", TMP_PATH / "cog_1M.tif"][: len(np.atleast_1d(pixel_size))]
+    interpolate(
+        INPUT_FILE,
+        output_files,
+        pixel_size=pixel_size,
+        tile_width=TILE_WIDTH,
+        tile_coord_scale=TILE_COORD_SCALE,
+        spatial_ref="EPSG:2154",
+        no_data_value=-9999,
+        filter_dimension="",
+        filter_values=[],
+        output_profile=RasterOutputProfile(driver="COG", compress="DEFLATE", block_size=32, overviews=True),
+    )
+
+    with rasterio.open(output_files[0]) as src:
+        assert src.profile["compress"] == "deflate"
+        assert src.overviews(1)
+        assert src.crs.to_epsg() == 2154
+    assert ru.tif_values_all_close(
+        output_files[0], os.path.join(GROUND_TRUTH_FOLDER, "test_data_77055_627760_LA93_IGN69_50CM.tif")
+    )
+
+
+def get_share_of_different_pixels(output_file, expected_file, border=0):
+    """Share of the pixels whose values differ by more than 1 mm (or that are no-data in only one raster), without
+    the pixels at less than `border` pixels from the edges of the rasters"""
+    window = slice(border, -border or None)
+    with rasterio.open(output_file) as src, rasterio.open(expected_file) as expected:
+        return np.mean(np.abs(src.read(1)[window, window] - expected.read(1)[window, window]) > 1e-3)
+
+
+@pytest.mark.parametrize("pixel_size", [PIXEL_SIZE, [PIXEL_SIZE, 1]])
+def test_interpolate_sub_tiles(pixel_size):
+    # Sub-tiles triangulated one at a time (read by chunks of points) give the same raster as the whole tile inside
+    # the tile, except for a few pixels next to points with the same X and Y (only the highest one is kept in the
+    # sub-tiles). The test tile has no buffer: near its edges (at less than the margin), the triangles along the border
+    # of the triangulation of the whole tile can be larger than the margin of the sub-tiles
+    output_files = [TMP_PATH / "sub_tiles_50CM.tif", TMP_PATH / "sub_tiles_1M.tif"][: len(np.atleast_1d(pixel_size))]
+    interpolate(
+        INPUT_FILE,
+        output_files,
+        pixel_size=pixel_size,
+        tile_width=TILE_WIDTH,
+        tile_coord_scale=TILE_COORD_SCALE,
+        spatial_ref="EPSG:2154",
+        no_data_value=-9999,
+        filter_dimension="Classification",
+        filter_values=[2, 9, 66],
+        sub_tiling=SubTiling(block_size=20, margin=SUB_TILES_MARGIN, chunk_size=10_000),
+    )
+
+    assert ru.allclose_mm(ru.get_tif_extent(output_files[0]), EXPECTED_RASTER_BOUNDS)
+    with rasterio.open(output_files[0]) as src:
+        assert src.crs.to_epsg() == 2154
+    expected_file = GROUND_TRUTH_FOLDER / "test_data_77055_627760_LA93_IGN69_50CM_dtm_classes.tif"
+    assert get_share_of_different_pixels(output_files[0], expected_file, border=SUB_TILES_BORDER) < 0.01
+
+
+def test_interpolate_sub_tiles_without_filter():
+    # The points are streamed by chunks from a pdal pipeline that has no filter
+    output_file = TMP_PATH / "sub_tiles_no_filter_50CM.tif"
+    interpolate(
+        INPUT_FILE,
+        output_file,
+        pixel_size=PIXEL_SIZE,
+        tile_width=TILE_WIDTH,
+        tile_coord_scale=TILE_COORD_SCALE,
+        spatial_ref="EPSG:2154",
+        no_data_value=-9999,
+        filter_dimension="",
+        filter_values=[],
+        sub_tiling=SubTiling(block_size=20, margin=SUB_TILES_MARGIN, chunk_size=10_000),
+    )
+
+    expected_file = GROUND_TRUTH_FOLDER / "test_data_77055_627760_LA93_IGN69_50CM.tif"
+    assert get_share_of_different_pixels(output_file, expected_file, border=SUB_TILES_BORDER) < 0.01
+
+
+def test_interpolate_products_sub_tiles():
+    products = {
+        str(TMP_PATH / "products_sub_tiles_dtm.tif"): {"dimension": "Classification", "keep_values": [2, 9, 66]},
+        str(TMP_PATH / "products_sub_tiles_all.tif"): {"dimension": "", "keep_values": []},
+    }
+    args = (PIXEL_SIZE, TILE_WIDTH, TILE_COORD_SCALE, "EPSG:2154", -9999)
+    interpolate_products(INPUT_FILE, products, *args, sub_tiling=SubTiling(block_size=25, margin=SUB_TILES_MARGIN))
+
+    expected_products = {output.replace(".tif", "_expected.tif"): value for output, value in products.items()}
+    interpolate_products(INPUT_FILE, expected_products, *args)
+    for output_file, expected_file in zip(products, expected_products):
+        assert get_share_of_different_pixels(output_file, expected_file, border=SUB_TILES_BORDER) < 0.01
+
+
+@pytest.mark.parametrize(
+    "filter_dimension, filter_values, ground_truth_file",
+    [
+        ("", [], "test_data_77055_627760_LA93_IGN69_50CM.tif"),
+        ("Classification", [2, 9, 66], "test_data_77055_627760_LA93_IGN69_50CM_dtm_classes.tif"),
+        ("ReturnNumber", [2, 3, 4, 5], "test_data_77055_627760_LA93_IGN69_50CM_filter_returnnumber.tif"),
+    ],
+)
+def test_interpolate_scipy_backend(filter_dimension, filter_values, ground_truth_file):
+    # Same raster as the pdal backend, except for a few pixels next to points with the same X and Y (pdal and scipy
+    # do not keep the same duplicate point in the triangulation) or on the border of the triangulation
+    output_file = TMP_PATH / f"scipy_{ground_truth_file}"
+    interpolate(
+        INPUT_FILE,
+        output_file,
+        pixel_size=PIXEL_SIZE,
+        tile_width=TILE_WIDTH,
+        tile_coord_scale=TILE_COORD_SCALE,
+        spatial_ref="EPSG:2154",
+        no_data_value=-9999,
+        filter_dimension=filter_dimension,
+        filter_values=filter_values,
+        backend="scipy",
+    )
+
+    assert ru.allclose_mm(ru.get_tif_extent(output_file), EXPECTED_RASTER_BOUNDS)
+    with rasterio.open(output_file) as src:
+        assert src.crs.to_epsg() == 2154
+    assert get_share_of_different_pixels(output_file, GROUND_TRUTH_FOLDER / ground_truth_file) < 0.01
+
+
+def test_interpolate_products_scipy_backend():
+    products = {
+        str(TMP_PATH / "products_scipy_dtm.tif"): {"dimension": "Classification", "keep_values": [2, 9, 66]},
+        str(TMP_PATH / "products_scipy_all.tif"): {"dimension": "", "keep_values": []},
+    }
+    args = (PIXEL_SIZE, TILE_WIDTH, TILE_COORD_SCALE, "EPSG:2154", -9999)
+    interpolate_products(INPUT_FILE, products, *args, backend="scipy")
+
+    for output_file, ground_truth_file in zip(
+        products,
+        ["test_data_77055_627760_LA93_IGN69_50CM_dtm_classes.tif", "test_data_77055_627760_LA93_IGN69_50CM.tif"],
+    ):
+        assert get_share_of_different_pixels(output_file, GROUND_TRUTH_FOLDER / ground_truth_file) < 0.01
+
+    # sub-tiles with the scipy backend
+    sub_tiles_output = str(TMP_PATH / "products_scipy_sub_tiles_dtm.tif")
+    interpolate(
+        INPUT_FILE,
+        sub_tiles_output,
+        *args,
+        filter_dimension="Classification",
+        filter_values=[2, 9, 66],
+        sub_tiling=SubTiling(block_size=25, margin=SUB_TILES_MARGIN, chunk_size=10_000),
+        backend="scipy",
+    )
+    assert get_share_of_different_pixels(sub_tiles_output, list(products)[0], border=SUB_TILES_BORDER) < 0.01
+
+
+def test_remove_duplicate_xy():
+    points = np.array(
+        [(1, 2, 5), (0, 0, 1), (1, 2, 7), (1, 3, 0), (1, 2, 6)], dtype=[("X", float), ("Y", float), ("Z", float)]
+    )
+
+    assert remove_duplicate_xy(points).tolist() == [(0, 0, 1), (1, 2, 7), (1, 3, 0)]
+
+
+def test_interpolate_sub_tiles_duplicate_points():
+    # Sub-tiles give exactly the raster of the whole tile triangulated without the points with the same X and Y,
+    # except near the edges of the tile
+    product_filter = {"dimension": "Classification", "keep_values": [2, 9, 66]}
+    points = read_las_with_laspy(INPUT_FILE, ["Classification"])
+    unique_points = remove_duplicate_xy(filter_points(points, "Classification", product_filter["keep_values"]))
+    args = (str(INPUT_FILE), product_filter, PIXEL_SIZE, TILE_WIDTH, TILE_COORD_SCALE, -9999)
+    sub_tiling = SubTiling(block_size=20, margin=SUB_TILES_MARGIN)
+
+    raster = interpolate_points_to_rasters(points, "", *args, sub_tiling=sub_tiling, backend="scipy")[0]
+    expected = interpolate_points_to_rasters(unique_points, "", *args, backend="scipy")[0]
+
+    window = slice(SUB_TILES_BORDER, -SUB_TILES_BORDER)
+    assert ru.allclose_mm(raster.data[window, window], expected.data[window, window])
+
+
+def test_interpolate_unknown_backend():
+    with pytest.raises(ValueError):
+        interpolate(
+            INPUT_FILE,
+            TMP_PATH / "unknown.tif",
+            PIXEL_SIZE,
+            TILE_WIDTH,
+            TILE_COORD_SCALE,
+            "EPSG:2154",
+            -9999,
+            "",
+            [],
+            backend="cgal",
+        )
+
+
+def test_read_las_with_laspy():
+    points = read_las_with_laspy(INPUT_FILE, ["Classification", "ReturnNumber"])
+
+    assert points.dtype.names == ("X", "Y", "Z", "Classification", "ReturnNumber")
+    assert 770550 <= points["X"].min() < points["X"].max() <= 770600
+    assert set(np.unique(points["ReturnNumber"])) <= set(range(1, 16))
+
+
+def test_iter_las_chunks():
+    # LAZ files are decompressed by laspy with lazrs (cf. environment.yml)
+    assert laspy.LazBackend.Lazrs.is_available()
+    points = read_las_with_laspy(INPUT_FILE, ["Classification"])
+
+    chunks = list(iter_las_chunks(INPUT_FILE, ["Classification"], 10_000))
+
+    assert len(chunks) == -(-len(points) // 10_000)
+    assert all(chunk.dtype == points.dtype for chunk in chunks)
+    assert np.array_equal(np.concatenate(chunks), points)
+
+
+def test_read_sub_tile_points(tmp_path):
+    # 2500 sub-tiles: more than the limit of open files, the file of a sub-tile is opened only while it is written
+    points = read_las_with_laspy(INPUT_FILE)
+    chunks = np.split(points, range(10_000, len(points), 10_000))
+    sub_tiles = SubTiling(block_size=1, margin=0.5).get_sub_tiles((COORD_X * 10, COORD_Y * 10), TILE_WIDTH)
+    soft_limit, hard_limit = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (256, hard_limit))
+    try:
+        sub_tile_points = list(read_sub_tile_points(chunks, sub_tiles, str(tmp_path)))
+    finally:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (soft_limit, hard_limit))
+
+    expected = list(iter_sub_tile_points(points, sub_tiles))
+    assert len(sub_tile_points) == len(expected) == 2500
+    for (sub_tile, sub_points), (expected_sub_tile, expected_points) in zip(sub_tile_points, expected):
+        assert sub_tile is expected_sub_tile
+        assert np.array_equal(sub_points, expected_points)
+    assert os.listdir(tmp_path) == []
+
+
+def test_get_decompression_selection():
+    selection = laspy.DecompressionSelection
+
+    assert get_decompression_selection([]) == selection.XY_RETURNS_CHANNEL | selection.Z
+    assert get_decompression_selection(["Classification", "ReturnNumber"]) == (
+        selection.XY_RETURNS_CHANNEL | selection.Z | selection.CLASSIFICATION
+    )
+    # Other dimensions are extra bytes
+    assert get_decompression_selection(["Infrared", "ClassFlags", "Reflectance"]) == (
+        selection.XY_RETURNS_CHANNEL | selection.Z | selection.NIR | selection.FLAGS | selection.ALL_EXTRA_BYTES
+    )
+
+
+def test_read_las_with_laspy_selective_decompression():
+    las = laspy.read(LAZ_14_FILE)
+
+    points = read_las_with_laspy(LAZ_14_FILE, ["Classification"])
+
+    assert points.dtype.names == ("X", "Y", "Z", "Classification")
+    for name, expected in [("X", las.x), ("Y", las.y), ("Z", las.z), ("Classification", las.classification)]:
+        assert np.array_equal(points[name], np.asarray(expected))
+
+
+@pytest.mark.parametrize("backend", ["pdal", "scipy"])
+def test_interpolate_to_rasters(backend):
+    # Same rasters as the ones written by interpolate, without writing them
+    args = (INPUT_FILE, [PIXEL_SIZE, 1], TILE_WIDTH, TILE_COORD_SCALE, "EPSG:2154", -9999, "Classification", [2, 66])
+    output_files = [TMP_PATH / f"to_rasters_{backend}_50CM.tif", TMP_PATH / f"to_rasters_{backend}_1M.tif"]
+    no_data_mask = get_no_data_mask(str(SHAPEFILE))
+    interpolate(args[0], output_files, *args[1:], no_data_mask=no_data_mask, backend=backend)
+
+    rasters = interpolate_to_rasters(*args, no_data_mask=no_data_mask, backend=backend)
+
+    assert [raster.pixel_size for raster in rasters] == [PIXEL_SIZE, 1]
+    for raster, output_file in zip(rasters, output_files):
+        with rasterio.open(output_file) as src:
+            assert np.array_equal(raster.data, src.read(1))
+            assert raster.transform == src.transform
+            assert rasterio.crs.CRS.from_wkt(raster.srs_wkt).to_epsg() == 2154
+
+
+def test_interpolate_to_rasters_sub_tiles():
+    # The points streamed by chunks give the same sub-tiles as the points in memory (cf. interpolate_products)
+    args = (INPUT_FILE, PIXEL_SIZE, TILE_WIDTH, TILE_COORD_SCALE, "EPSG:2154", -9999)
+    sub_tiling = SubTiling(block_size=20, margin=SUB_TILES_MARGIN, chunk_size=10_000)
+    product_filter = {"dimension": "Classification", "keep_values": [2, 9, 66]}
+
+    rasters = interpolate_to_rasters(*args, "Classification", [2, 9, 66], sub_tiling=sub_tiling, backend="scipy")
+    expected = interpolate_products_to_rasters(
+        args[0], {"DTM": product_filter}, *args[1:], sub_tiling=sub_tiling, backend="scipy"
+    )["DTM"]
+
+    assert np.array_equal(rasters[0].data, expected[0].data)
+    assert rasters[0].transform == expected[0].transform
+
+
+def test_interpolate_products_to_rasters_dhm():
+    # DTM, DSM and DHM of a tile without intermediate files
+    products = {
+        "DTM": {"dimension": "Classification", "keep_values": [2, 9, 66]},
+        "DSM": {"dimension": "", "keep_values": []},
+    }
+    args = (PIXEL_SIZE, TILE_WIDTH, TILE_COORD_SCALE, "EPSG:2154", -9999)
+
+    rasters = interpolate_products_to_rasters(INPUT_FILE, products, *args, backend="scipy")
+    dhm = calculate_dhm_raster(rasters["DSM"][0], rasters["DTM"][0], -9999)
+
+    output_files = {product: str(TMP_PATH / f"to_rasters_{product}.tif") for product in products}
+    interpolate_products(
+        INPUT_FILE, {output_files[product]: products[product] for product in products}, *args, backend="scipy"
+    )
+    for product, output_file in output_files.items():
+        with rasterio.open(output_file) as src:
+            assert np.array_equal(rasters[product][0].data, src.read(1))
+    valid = dhm.data != -9999
+    assert valid.any()
+    assert np.allclose(dhm.data[valid], rasters["DSM"][0].data[valid] - rasters["DTM"][0].data[valid])
@@ -0,0 +1,133 @@
+import os
+import shutil
+from pathlib import Path
+
+import fiona
+import numpy as np
+import rasterio
+import rasterio.mask
+
+from las_digital_models.commons.raster import Raster
+from las_digital_models.commons.raster_output import RasterOutputProfile
+from las_digital_models.tasks.postprocessing import (
+    NoDataMask,
+    get_no_data_mask,
+    mask_raster,
+    mask_with_no_data_shapefile,
+)
+
+TEST_PATH = Path(__file__).resolve().parent.parent
+TMP_PATH = TEST_PATH / "tmp" / "postprocessing"
+SHAPEFILE = TEST_PATH / "data" / "mask_shapefile" / "test_multipolygon_shapefile.shp"
+INPUT_RASTER = TEST_PATH / "data" / "DSM" / "test_data_77055_627760_LA93_IGN69_50CM.tif"
+
+
+def setup_module():
+    if os.path.isdir(TMP_PATH):
+        shutil.rmtree(TMP_PATH)
+    os.makedirs(TMP_PATH)
+
+
+def test_no_data_mask_query():
+    no_data_mask = NoDataMask(str(SHAPEFILE))
+    assert len(no_data_mask.query((770550, 6277550, 770650, 6277600))) == 3
+    assert no_data_mask.query((0, 0, 10, 10)) == []
+
+
+def test_no_data_mask_rasterize_cache():
+    no_data_mask = NoDataMask(str(SHAPEFILE))
+    transform = rasterio.transform.from_origin(770550, 6277600, 0.5, 0.5)
+    mask = no_data_mask.rasterize(transform, (100, 100))
+    assert mask.dtype == bool
+    assert mask.any()
+    assert no_data_mask.rasterize(transform, (100, 100)) is mask
+
+    empty_transform = rasterio.transform.from_origin(0, 10, 0.5, 0.5)
+    assert no_data_mask.rasterize(empty_transform, (10, 10)) is None
+
+
+def test_get_no_data_mask_is_shared():
+    assert get_no_data_mask(str(SHAPEFILE)) is get_no_data_mask(str(SHAPEFILE))
+
+
+def test_mask_with_no_data_shapefile_matches_rasterio_mask():
+    output_raster = TMP_PATH / "masked.tif"
+    mask_with_no_data_shapefile(str(SHAPEFILE), str(INPUT_RASTER), str(output_raster), -9999)
+
+    with fiona.open(SHAPEFILE, "r") as fhandle:
+        shapes = [feature["geometry"] for feature in fhandle]
+    with rasterio.open(INPUT_RASTER) as src:
+        expected, _ = rasterio.mask.mask(src, shapes, crop=False, all_touched=True, invert=True)
+
+    with rasterio.open(output_raster) as out:
+        masked = out.read()
+    assert np.array_equal(masked, expected)
+    with rasterio.open(INPUT_RASTER) as src:
+        assert not np.array_equal(masked, src.read())
+
+
+def test_mask_with_no_data_shapefile_no_intersection(tmp_path):
+    input_raster = tmp_path / "input.tif"
+    output_raster = tmp_path / "output.tif"
+    data = np.arange(100, dtype=np.float32).reshape(1, 10, 10)
+    with rasterio.open(
+        input_raster,
+        "w",
+        driver="GTiff",
+        height=10,
+        width=10,
+        count=1,
+        dtype="float32",
+        nodata=-9999,
+        transform=rasterio.transform.from_origin(0, 10, 1, 1),
+    ) as dst:
+        dst.write(data)
+
+    mask_with_no_data_shapefile(str(SHAPEFILE), str(input_raster), str(output_raster), -9999)
+
+    with rasterio.open(output_raster) as out:
+        assert np.array_equal(out.read(), data)
+
+
+def test_mask_with_no_data_shapefile_output_profile():
+    output_raster = TMP_PATH / "masked_zstd.tif"
+    expected_raster = TMP_PATH / "masked_default.tif"
+    output_profile = RasterOutputProfile(compress="ZSTD", block_size=128)
+
+    mask_with_no_data_shapefile(str(SHAPEFILE), str(INPUT_RASTER), str(output_raster), -9999, output_profile)
+    mask_with_no_data_shapefile(str(SHAPEFILE), str(INPUT_RASTER), str(expected_raster), -9999)
+
+    with rasterio.open(output_raster) as out, rasterio.open(expected_raster) as expected:
+        assert out.profile["compress"] == "zstd"
+        assert out.profile["tiled"]
+        assert np.array_equal(out.read(), expected.read())
+
+
+def test_mask_raster():
+    # Same values as masking the raster file
+    output_raster = TMP_PATH / "masked_file.tif"
+    mask_with_no_data_shapefile(str(SHAPEFILE), str(INPUT_RASTER), str(output_raster), -9999)
+    raster = Raster.read(str(INPUT_RASTER))
+
+    assert mask_raster(raster, get_no_data_mask(str(SHAPEFILE)))
+
+    with rasterio.open(output_raster) as out:
+        assert np.array_equal(raster.data, out.read(1))
+
+
+def test_mask_with_no_data_shapefile_without_input_no_data(tmp_path):
+    # The no_data argument is burnt (and set as the no-data value) when the input raster has no no-data value
+    input_raster = tmp_path / "without_no_data.tif"
+    with rasterio.open(INPUT_RASTER) as src:
+        profile = {**src.profile, "nodata": None}
+        with rasterio.open(input_raster, "w", **profile) as dst:
+            dst.write(src.read())
+    output_raster = tmp_path / "masked.tif"
+
+    mask_with_no_data_shapefile(str(SHAPEFILE), str(input_raster), str(output_raster), -9999)
+
+    expected_raster = tmp_path / "expected.tif"
+    mask_with_no_data_shapefile(str(SHAPEFILE), str(INPUT_RASTER), str(expected_raster), -9999)
+    with rasterio.open(output_raster) as out, rasterio.open(expected_raster) as expected:
+        assert out.nodata == -9999
+        assert np.array_equal(out.read(), expected.read())
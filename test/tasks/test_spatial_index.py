@@ -0,0 +1,100 @@
+import os
+import shutil
+import test.utils.point_cloud_utils as pcu
+from pathlib import Path
+
+import numpy as np
+
+from las_digital_models.tasks.las_buffer import (
+    read_las_with_buffer,
+    write_las_with_buffer,
+)
+from las_digital_models.tasks.spatial_index import (
+    SpatialIndex,
+    get_indexed_file,
+    is_copc,
+)
+
+TEST_PATH = Path(__file__).resolve().parent.parent
+INPUT_DIR = TEST_PATH / "data"
+INPUT_FILE = INPUT_DIR / "test_data_77055_627760_LA93_IGN69.laz"
+
+KWARGS = dict(buffer_width=10, spatial_ref="EPSG:2154", tile_width=50, tile_coord_scale=10)
+
+
+def build_index(index_dir):
+    spatial_index = SpatialIndex(str(index_dir))
+    for filename in os.listdir(INPUT_DIR):
+        if filename.endswith(".laz"):
+            spatial_index.build(str(INPUT_DIR / filename), "EPSG:2154")
+
+    return spatial_index
+
+
+def sort_points(points):
+    return np.sort(points[["X", "Y", "Z", "Classification"]], order=["X", "Y", "Z"])
+
+
+def test_is_copc():
+    assert is_copc("tile_0770_6278.copc.laz")
+    assert is_copc("/data/tile_0770_6278.COPC.LAZ")
+    assert not is_copc("tile_0770_6278.laz")
+
+
+def test_get_indexed_file(tmp_path):
+    tile = os.path.join(tmp_path, "tile_0770_6278.laz")
+    Path(tile).touch()
+    spatial_index = SpatialIndex(os.path.join(tmp_path, "index"))
+    assert spatial_index.get_path(tile) == os.path.join(tmp_path, "index", "tile_0770_6278.copc.laz")
+
+    # not indexed yet
+    assert spatial_index.get_indexed_file(tile) is None
+    assert get_indexed_file(tile) is None
+
+    os.makedirs(spatial_index.index_dir)
+    Path(spatial_index.get_path(tile)).touch()
+    assert spatial_index.get_indexed_file(tile) == spatial_index.get_path(tile)
+    assert get_indexed_file(tile) is None
+
+    # the tile was delivered again after its copy: the copy is not used anymore
+    mtime = os.path.getmtime(spatial_index.get_path(tile))
+    os.utime(tile, (mtime + 10, mtime + 10))
+    assert spatial_index.get_indexed_file(tile) is None
+
+    # COPC tiles are read directly
+    assert spatial_index.get_indexed_file("tile_0770_6278.copc.laz") == "tile_0770_6278.copc.laz"
+    assert get_indexed_file("tile_0770_6278.copc.laz") == "tile_0770_6278.copc.laz"
+
+
+def test_read_las_with_buffer_with_spatial_index(tmp_path):
+    spatial_index = build_index(tmp_path)
+    assert len(os.listdir(tmp_path)) == len([f for f in os.listdir(INPUT_DIR) if f.endswith(".laz")])
+    expected_points, _ = read_las_with_buffer(str(INPUT_DIR), str(INPUT_FILE), **KWARGS)
+
+    points, srs_wkt = read_las_with_buffer(str(INPUT_DIR), str(INPUT_FILE), spatial_index=spatial_index, **KWARGS)
+
+    assert np.array_equal(sort_points(points), sort_points(expected_points))
+    assert "2154" in srs_wkt
+
+
+def test_read_las_with_buffer_copc_inputs(tmp_path):
+    # Input folder with COPC tiles only
+    input_dir = os.path.join(tmp_path, "input")
+    shutil.copytree(build_index(os.path.join(tmp_path, "index")).index_dir, input_dir)
+    expected_points, _ = read_las_with_buffer(str(INPUT_DIR), str(INPUT_FILE), **KWARGS)
+
+    tile = os.path.join(input_dir, "test_data_77055_627760_LA93_IGN69.copc.laz")
+    points, _ = read_las_with_buffer(input_dir, tile, **KWARGS)
+
+    assert np.array_equal(sort_points(points), sort_points(expected_points))
+
+
+def test_write_las_with_buffer_with_spatial_index(tmp_path):
+    spatial_index = build_index(os.path.join(tmp_path, "index"))
+    output_file = os.path.join(tmp_path, "buffered.laz")
+
+    write_las_with_buffer(str(INPUT_DIR), str(INPUT_FILE), output_file, spatial_index=spatial_index, **KWARGS)
+
+    # Same number of points as the las written by create_las_with_buffer (cf. test_add_buffer_one_tile)
+    assert pcu.get_nb_points(output_file) == 103359
+    assert pcu.get_classification_values(output_file) == {1, 2, 3, 4, 5, 6, 64}
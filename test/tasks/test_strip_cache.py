@@ -0,0 +1,144 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from las_digital_models.tasks.strip_cache import (
+    StripCache,
+    crop_points,
+    extract_strips,
+    get_buffered_bounds,
+)
+
+TEST_PATH = Path(__file__).resolve().parent.parent
+TMP_PATH = TEST_PATH / "tmp" / "tasks" / "strip_cache"
+INPUT_FILE = TEST_PATH / "data" / "test_data_77055_627760_LA93_IGN69.laz"
+
+TILE_COORD_SCALE = 10
+TILE_WIDTH = 50
+BUFFER_WIDTH = 10
+
+
+def get_points_grid(xmin, ymin, width, step=1):
+    xx, yy = np.meshgrid(np.arange(xmin, xmin + width + step, step), np.arange(ymin, ymin + width + step, step))
+    points = np.zeros(xx.size, dtype=[("X", "f8"), ("Y", "f8"), ("Z", "f8")])
+    points["X"] = xx.ravel()
+    points["Y"] = yy.ravel()
+
+    return points
+
+
+def test_crop_points_includes_bounds():
+    points = get_points_grid(0, 0, 10)
+
+    cropped = crop_points(points, ([2, 4], [3, 5]))
+
+    assert len(cropped) == 9
+    assert cropped["X"].min() == 2 and cropped["X"].max() == 4
+    assert cropped["Y"].min() == 3 and cropped["Y"].max() == 5
+
+
+def test_extract_strips():
+    # points covering the whole tile 77055_627760
+    points = get_points_grid(770550, 6277550, TILE_WIDTH)
+
+    strips = extract_strips(
+        points, "test_data_77055_627760_LA93_IGN69.laz", BUFFER_WIDTH, TILE_WIDTH, TILE_COORD_SCALE
+    )
+
+    assert len(strips) == 8
+    assert (77055, 627760) not in strips
+    for (coord_x, coord_y), strip in strips.items():
+        bounds = get_buffered_bounds(coord_x, coord_y, BUFFER_WIDTH, TILE_WIDTH, TILE_COORD_SCALE)
+        assert np.array_equal(strip, crop_points(points, bounds))
+
+    # edge strips: 11 points wide (bounds are included), corner blocks: 11 x 11 points
+    assert len(strips[(77050, 627760)]) == 11 * 51
+    assert len(strips[(77060, 627765)]) == 11 * 11
+
+
+def test_strip_cache_memory_lru():
+    strip = np.zeros(1000)  # 8000 bytes
+    cache = StripCache(memory_size_mb=1)
+    cache.memory_size = 2 * strip.nbytes
+
+    cache.put("a", strip)
+    cache.put("b", strip)
+    assert cache.get("a", INPUT_FILE) is not None  # "a" is now the most recently used
+    cache.put("c", strip)  # evicts "b"
+
+    assert cache.get("b", INPUT_FILE) is None
+    assert cache.get("c", INPUT_FILE) is not None
+    assert cache.stats() == {"hits": 2, "misses": 1, "bytes_saved": 2 * os.path.getsize(INPUT_FILE)}
+
+
+def test_strip_cache_shared_by_threads():
+    strip = np.zeros(1000)  # 8000 bytes
+    cache = StripCache(memory_size_mb=1)
+    cache.memory_size = 10 * strip.nbytes
+
+    def put_and_get(i):
+        for j in range(50):
+            cache.put(f"{i}_{j}", strip)
+            cache.get(f"{i}_{j // 2}", INPUT_FILE)
+
+    with ThreadPoolExecutor(8) as executor:
+        list(executor.map(put_and_get, range(8)))
+
+    stats = cache.stats()
+    assert stats["hits"] + stats["misses"] == 8 * 50
+    assert cache._memory_bytes == sum(s.nbytes for s in cache._memory.values()) <= cache.memory_size
+
+
+def test_strip_cache_shared_on_disk():
+    cache_dir = TMP_PATH / "test_strip_cache_shared_on_disk"
+    strip = get_points_grid(0, 0, 10)
+    cache1 = StripCache(cache_dir=str(cache_dir))
+    cache2 = StripCache(cache_dir=str(cache_dir))
+
+    cache1.put("a", strip)
+
+    assert np.array_equal(cache2.get("a", INPUT_FILE), strip)
+    assert cache2.get("b", INPUT_FILE) is None
+
+
+def test_strip_cache_disk_eviction():
+    cache_dir = TMP_PATH / "test_strip_cache_disk_eviction"
+    strip = np.zeros(1000)
+    cache = StripCache(memory_size_mb=0, cache_dir=str(cache_dir))
+    cache.disk_size = 2.5 * strip.nbytes
+
+    for key in ["a", "b", "c"]:
+        cache.put(key, strip)
+
+    assert sorted(os.listdir(cache_dir)) == ["b.npy", "c.npy"]
+
+
+@pytest.mark.parametrize("buffer_width, tile_width", [(10, 50), (20, 50), (10, 100)])
+def test_strip_cache_key_depends_on_geometry(buffer_width, tile_width):
+    key = StripCache.get_key(INPUT_FILE, (77050, 627760), buffer_width, tile_width)
+
+    assert key == StripCache.get_key(INPUT_FILE, (77050, 627760), buffer_width, tile_width)
+    assert key != StripCache.get_key(INPUT_FILE, (77055, 627760), buffer_width, tile_width)
+    assert key != StripCache.get_key(INPUT_FILE, (77050, 627760), buffer_width + 1, tile_width)
+
+
+def test_strip_cache_disk_scans(monkeypatch):
+    # The on-disk cache is scanned only when its size exceeds disk_size (or every DISK_SCAN_INTERVAL writes)
+    cache_dir = TMP_PATH / "test_strip_cache_disk_scans"
+    strip = np.zeros(1000)
+    cache = StripCache(memory_size_mb=0, cache_dir=str(cache_dir))
+    cache.disk_size = 5.5 * strip.nbytes
+    scans = []
+    scandir = os.scandir
+    monkeypatch.setattr(os, "scandir", lambda path: scans.append(path) or scandir(path))
+
+    for key in "abcde":
+        cache.put(key, strip)
+    assert scans == []
+
+    cache.put("f", strip)
+    assert len(scans) == 1
+    assert sorted(os.listdir(cache_dir)) == ["b.npy", "c.npy", "d.npy", "e.npy", "f.npy"]
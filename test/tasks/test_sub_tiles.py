@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+from scipy.spatial import Delaunay
+
+from las_digital_models.tasks.sub_tiles import SubTiling, get_sub_tiling_from_config
+from las_digital_models.tasks.tin_raster import get_tile_grid, rasterize_tin
+
+NO_DATA_VALUE = -9999
+ORIGIN = (1000, 2050)
+TILE_WIDTH = 50
+
+
+def test_get_sub_tiles():
+    sub_tiles = SubTiling(block_size=20, margin=5).get_sub_tiles(ORIGIN, TILE_WIDTH)
+
+    assert len(sub_tiles) == 9
+    assert [(sub_tile.col, sub_tile.row) for sub_tile in sub_tiles[:4]] == [(0, 0), (1, 0), (2, 0), (0, 1)]
+    assert sub_tiles[0].core_bounds == (1000, 2030, 1020, 2050)
+    assert sub_tiles[0].bounds == (995, 2025, 1025, 2055)
+    # last sub-tile is cut at the border of the tile
+    assert sub_tiles[-1].core_bounds == (1040, 2000, 1050, 2010)
+    assert list(sub_tiles[0].contains(np.array([995, 1030]), np.array([2040, 2040]))) == [True, False]
+
+
+def test_get_sub_tile_grid():
+    sub_tiling = SubTiling(block_size=20, margin=5)
+    lower_left, nb_pixels = get_tile_grid(ORIGIN, TILE_WIDTH, 0.5)
+    sub_tile = sub_tiling.get_sub_tiles(ORIGIN, TILE_WIDTH)[-1]
+
+    window, sub_tile_lower_left, sub_tile_pixels = sub_tiling.get_sub_tile_grid(sub_tile, lower_left, nb_pixels, 0.5)
+
+    assert window == (slice(80, 100), slice(80, 100))
+    assert sub_tile_lower_left == (lower_left[0] + 40, lower_left[1])
+    assert sub_tile_pixels == (20, 20)
+
+
+def test_check_pixel_sizes():
+    SubTiling(block_size=20).check_pixel_sizes([0.5, 1, 5])
+    with pytest.raises(ValueError):
+        SubTiling(block_size=20).check_pixel_sizes([0.5, 3])
+    with pytest.raises(ValueError):
+        SubTiling(block_size=0)
+
+
+def test_get_sub_tiling_from_config():
+    assert get_sub_tiling_from_config({}) is None
+    assert get_sub_tiling_from_config({"sub_tiles": {"enabled": False, "block_size": 20, "margin": 5}}) is None
+
+    sub_tiling = get_sub_tiling_from_config({"sub_tiles": {"enabled": True, "block_size": 20, "margin": 5}})
+    assert (sub_tiling.block_size, sub_tiling.margin) == (20, 5)
+
+
+@pytest.mark.parametrize("pixel_size", [0.5, 1, 2.5])
+def test_sub_tiles_same_as_whole_tile(pixel_size):
+    # Rasterizing the core of each sub-tile from the triangulation of its points gives the same raster as the
+    # triangulation of the whole tile
+    rng = np.random.default_rng(0)
+    x = rng.uniform(ORIGIN[0] - 5, ORIGIN[0] + TILE_WIDTH + 5, 5000)
+    y = rng.uniform(ORIGIN[1] - TILE_WIDTH - 5, ORIGIN[1] + 5, 5000)
+    z = np.sin(x / 5) + np.cos(y / 7)
+    lower_left, nb_pixels = get_tile_grid(ORIGIN, TILE_WIDTH, pixel_size)
+    expected = rasterize_tin(
+        x, y, z, Delaunay(np.column_stack([x, y])).simplices, lower_left, pixel_size, nb_pixels, NO_DATA_VALUE
+    )
+
+    sub_tiling = SubTiling(block_size=10, margin=3)
+    raster = np.full((nb_pixels[1], nb_pixels[0]), np.nan)
+    for sub_tile in sub_tiling.get_sub_tiles(ORIGIN, TILE_WIDTH):
+        inside = sub_tile.contains(x, y)
+        triangles = Delaunay(np.column_stack([x[inside], y[inside]])).simplices
+        window, sub_tile_lower_left, sub_tile_pixels = sub_tiling.get_sub_tile_grid(
+            sub_tile, lower_left, nb_pixels, pixel_size
+        )
+        raster[window] = rasterize_tin(
+            x[inside], y[inside], z[inside], triangles, sub_tile_lower_left, pixel_size, sub_tile_pixels, NO_DATA_VALUE
+        )
+
+    np.testing.assert_allclose(raster, expected)
@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+
+from las_digital_models.tasks.tin_raster import (
+    get_grid_transform,
+    get_tile_grid,
+    rasterize_tin,
+)
+
+NO_DATA_VALUE = -9999
+
+
+def get_plane_tin(xmin, ymin, size, nb_vertices):
+    """Regular grid of vertices on the plane z = 2x - y + 10, split into 2 triangles per cell"""
+    coords = np.linspace(0, size, nb_vertices)
+    x, y = (v.ravel() for v in np.meshgrid(xmin + coords, ymin + coords))
+    z = 2 * (x - xmin) - (y - ymin) + 10
+    triangles = []
+    for row in range(nb_vertices - 1):
+        for col in range(nb_vertices - 1):
+            a = row * nb_vertices + col
+            b, c, d = a + 1, a + nb_vertices, a + nb_vertices + 1
+            triangles += [(a, b, d), (a, d, c)]
+
+    return x, y, z, np.array(triangles)
+
+
+def test_get_tile_grid():
+    lower_left, shape = get_tile_grid((770000, 6278000), 1000, 0.5)
+    assert lower_left == (769999.75, 6277000.25)
+    assert shape == (2000, 2000)
+    transform = get_grid_transform(lower_left, 0.5, shape[1])
+    # upper-left corner is half a pixel from the corner of the tile
+    assert (transform.c, transform.f) == (769999.75, 6278000.25)
+
+
+@pytest.mark.parametrize("pixel_size", [0.5, 1, 2.5])
+def test_rasterize_tin_plane(pixel_size):
+    xmin, ymin = 1000, 2000
+    x, y, z, triangles = get_plane_tin(xmin, ymin, 10, 6)
+    shape = (int(20 / pixel_size), int(20 / pixel_size))
+    lower_left = (xmin - 5, ymin - 5)
+
+    raster = rasterize_tin(x, y, z, triangles, lower_left, pixel_size, shape, NO_DATA_VALUE)
+
+    assert raster.shape == (shape[1], shape[0])
+    cols, rows = np.meshgrid(np.arange(shape[0]), np.arange(shape[1]))
+    center_x = lower_left[0] + (cols + 0.5) * pixel_size
+    center_y = lower_left[1] + (shape[1] - rows - 0.5) * pixel_size
+    inside = (center_x >= xmin) & (center_x <= xmin + 10) & (center_y >= ymin) & (center_y <= ymin + 10)
+    # pixels whose center is in the TIN are on the plane, the others are no-data
+    expected = 2 * (center_x - xmin) - (center_y - ymin) + 10
+    np.testing.assert_allclose(raster[inside], expected[inside])
+    assert np.all(raster[~inside] == NO_DATA_VALUE)
+
+
+def test_rasterize_tin_chunks():
+    x, y, z, triangles = get_plane_tin(0, 0, 10, 11)
+    args = (x, y, z, triangles, (0, 0), 0.3, (34, 34), NO_DATA_VALUE)
+
+    np.testing.assert_array_equal(rasterize_tin(*args), rasterize_tin(*args, chunk_size=7))
+
+
+def test_rasterize_tin_large_triangles():
+    # Triangles along the border of a triangulation can span the whole raster: their candidate pixels are split
+    # between several chunks
+    x = np.array([0, 100, 100, 0, 50, 50.5])
+    y = np.array([0, 0, 100, 100, 0.5, 99.5])
+    z = np.array([0, 100, 200, 100, 50.5, 150])
+    triangles = np.array([(0, 1, 2), (0, 2, 3), (4, 1, 5)])
+    args = (x, y, z, triangles, (0, 0), 1, (100, 100), NO_DATA_VALUE)
+
+    raster = rasterize_tin(*args, chunk_size=1000)
+
+    # every pixel is in a triangle of the plane z = x + y
+    cols, rows = np.meshgrid(np.arange(100), np.arange(100))
+    np.testing.assert_allclose(raster, (cols + 0.5) + (100 - rows - 0.5))
+    np.testing.assert_array_equal(raster, rasterize_tin(*args))
+
+
+def test_rasterize_tin_outside():
+    x, y, z, triangles = get_plane_tin(100, 100, 10, 3)
+
+    raster = rasterize_tin(x, y, z, triangles, (0, 0), 1, (10, 10), NO_DATA_VALUE)
+
+    assert np.all(raster == NO_DATA_VALUE)
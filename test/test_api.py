@@ -0,0 +1,119 @@
+import json
+import logging
+import os
+import shutil
+import subprocess as sp
+import sys
+from pathlib import Path
+
+import pytest
+import rasterio
+from hydra import compose, initialize
+
+from las_digital_models.api import (
+    Config,
+    ExtractStatCacheConfig,
+    FilterConfig,
+    InterpolationConfig,
+    IoConfig,
+    TileGeometryConfig,
+    interpolate_tile,
+)
+
+TEST_PATH = Path(__file__).resolve().parent
+TMP_PATH = TEST_PATH / "tmp" / "api"
+INPUT_DIR = TEST_PATH / "data"
+TILE = "test_data_77055_627760_LA93_IGN69.laz"
+
+# Geospatial libraries that must not be imported by the api and the hydra scripts before they are run
+HEAVY_MODULES = [
+    "pdal",
+    "pdaltools",
+    "osgeo",
+    "rasterio",
+    "geopandas",
+    "fiona",
+    "pyogrio",
+    "pyarrow",
+    "shapely",
+    "laspy",
+    "scipy",
+]
+# Print the import time of a module (in seconds) and the heavy modules that it imported, as json
+IMPORT_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+duration = time.perf_counter() - start
+heavy_modules = {heavy_modules}
+print(json.dumps({{"duration": duration, "imported": [m for m in heavy_modules if m in sys.modules]}}))
+"""
+
+
+def setup_module():
+    shutil.rmtree(TMP_PATH, ignore_errors=True)
+    os.makedirs(TMP_PATH)
+
+
+@pytest.mark.parametrize(
+    "module",
+    [
+        "las_digital_models.api",
+        "las_digital_models.ip_one_tile",
+        "las_digital_models.dhm_one_tile",
+        "las_digital_models.add_buffer_one_tile",
+        "las_digital_models.extract_stat_from_raster.extract_z_virtual_lines_from_raster",
+    ],
+)
+def test_import_time(module):
+    # in a new interpreter, so that the modules that are already imported by the tests are not counted
+    script = IMPORT_SCRIPT.format(module=module, heavy_modules=HEAVY_MODULES)
+    r = sp.run([sys.executable, "-c", script], capture_output=True, check=True, cwd=TEST_PATH.parent)
+    result = json.loads(r.stdout.decode().strip().splitlines()[-1])
+    logging.info(f"Import time of {module}: {result['duration'] * 1000:.0f} ms")
+
+    assert result["imported"] == []
+
+
+def test_config_from_dict():
+    with initialize(version_base="1.2", config_path="../configs"):
+        cfg = compose(config_name="config", overrides=["io=test", "tile_geometry=test", "filter=dtm"])
+
+    config = Config.from_dict(cfg)
+    assert config.io.input_filename == TILE
+    assert config.tile_geometry == TileGeometryConfig(tile_coord_scale=10, tile_width=50, pixel_size=0.5)
+    assert config.filter.keep_values == [2, 9, 66]
+    assert isinstance(config.filter.keep_values, list)
+    assert config.to_dict()["interpolation"] == {"backend": "pdal"}
+
+    # missing groups get their default values
+    assert Config.from_dict({"io": {"output_dir": "out"}}).dhm.block_size == 512
+
+    with pytest.raises(ValueError, match="Unknown keys for IoConfig"):
+        Config.from_dict({"io": {"output_folder": "out"}})
+
+    # nested config groups
+    assert config.extract_stat.cache == ExtractStatCacheConfig()
+    assert Config.from_dict({"extract_stat": {"cache": {"enabled": True}}}).extract_stat.cache.enabled
+    with pytest.raises(ValueError, match="Unknown keys for ExtractStatCacheConfig"):
+        Config.from_dict({"extract_stat": {"cache": {"size": 1}}})
+
+
+def test_interpolate_tile():
+    output_dir = TMP_PATH / "interpolate_tile"
+    config = Config(
+        io=IoConfig(input_dir=str(INPUT_DIR), input_filename=TILE, output_dir=str(output_dir)),
+        tile_geometry=TileGeometryConfig(tile_coord_scale=10, tile_width=50, pixel_size=[0.5, 1]),
+        filter=FilterConfig(dimension="Classification", keep_values=[2, 66]),
+        interpolation=InterpolationConfig(backend="scipy"),
+    )
+
+    output_files = interpolate_tile(config)
+
+    assert [os.path.basename(f) for f in output_files] == [
+        "test_data_77055_627760_LA93_IGN69_50CM.tif",
+        "test_data_77055_627760_LA93_IGN69_1M.tif",
+    ]
+    for output_file, size in zip(output_files, [100, 50]):
+        with rasterio.open(output_file) as src:
+            assert (src.width, src.height) == (size, size)
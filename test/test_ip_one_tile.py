@@ -132,3 +132,28 @@ if __name__ == "__main__":
     logging.basicConfig(level=logging.DEBUG)
     test_ip_one_tile()
     test_ip_with_no_data_mask()
+
+
+def test_ip_multi_resolution():
+    output_dir = os.path.join(TMP_PATH, "test_ip_multi_resolution")
+    os.makedirs(output_dir, exist_ok=True)
+    with initialize(version_base="1.2", config_path="../configs"):
+        # config is relative to a module
+        cfg = compose(
+            config_name="config",
+            overrides=[
+                "io=test",
+                "tile_geometry=test",
+                "tile_geometry.pixel_size=[0.5,1]",
+                "filter=dtm",
+                f"io.output_dir={output_dir}",
+            ],
+        )
+
+        ip_one_tile.run_ip_on_tile(cfg)
+
+        output_file = get_expected_output_file(base_dir=output_dir)
+        assert ru.tif_values_all_close(
+            output_file, GROUND_TRUTH_FOLDER / "test_data_77055_627760_LA93_IGN69_50CM_dtm_classes.tif"
+        )
+        assert os.path.isfile(os.path.join(output_dir, f"test_data_{COORD_X}_{COORD_Y}_LA93_IGN69_1M.tif"))
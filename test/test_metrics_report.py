@@ -0,0 +1,106 @@
+import json
+import os
+import shutil
+
+from las_digital_models import metrics_report
+from las_digital_models.commons import metrics
+
+TEST_PATH = os.path.dirname(os.path.abspath(__file__))
+TMP_PATH = os.path.join(TEST_PATH, "tmp", "metrics_report")
+
+
+def setup_module(module):
+    try:
+        shutil.rmtree(TMP_PATH)
+
+    except FileNotFoundError:
+        pass
+    os.makedirs(TMP_PATH)
+
+
+def get_span(name, tile, wall_s, parent_id=None, **counters):
+    return {
+        "name": name,
+        "tile": tile,
+        "span_id": f"{name}_{tile}",
+        "parent_id": parent_id,
+        "wall_s": wall_s,
+        "cpu_s": wall_s / 2,
+        "peak_rss_mb": 100 * wall_s,
+        "counters": counters,
+        "error": None,
+    }
+
+
+SPANS = [
+    get_span("interpolation", "tile_a.laz", 3),
+    get_span("read", "tile_a.laz", 1, parent_id="interpolation_tile_a.laz", input_points=100),
+    get_span("DHM", "tile_a.laz", 1),
+    get_span("interpolation", "tile_b.laz", 5),
+    get_span("read", "tile_b.laz", 4, parent_id="interpolation_tile_b.laz", input_points=50),
+]
+
+
+def test_summarize_steps():
+    steps = metrics_report.summarize_steps(SPANS)
+
+    assert list(steps) == ["interpolation", "read", "DHM"]
+    assert steps["read"]["count"] == 2
+    assert steps["read"]["wall_s"] == 5
+    assert steps["read"]["cpu_s"] == 2.5
+    assert steps["read"]["peak_rss_mb"] == 400
+    assert steps["read"]["counters"] == {"input_points": 150}
+
+
+def test_get_slowest_tiles():
+    slowest_tiles = metrics_report.get_slowest_tiles(SPANS, top=1)
+
+    assert slowest_tiles == [
+        {"tile": "tile_b.laz", "wall_s": 5, "stages": {"interpolation": 5}, "steps": {"read": 4}},
+    ]
+
+
+def test_get_slowest_tiles_of_a_chunk():
+    spans = [
+        get_span("interpolation_chunk", None, 9),
+        get_span("prefetch", "tile_a.laz", 2, parent_id="interpolation_chunk_None"),
+        get_span("read", "tile_a.laz", 2, parent_id="prefetch_tile_a.laz"),
+        get_span("interpolation", "tile_a.laz", 3, parent_id="interpolation_chunk_None"),
+    ]
+
+    slowest_tiles = metrics_report.get_slowest_tiles(spans)
+
+    assert slowest_tiles == [
+        {"tile": "tile_a.laz", "wall_s": 5, "stages": {"prefetch": 2, "interpolation": 3}, "steps": {"read": 2}},
+    ]
+
+
+def test_to_prometheus():
+    prometheus = metrics_report.to_prometheus(metrics_report.summarize_steps(SPANS))
+
+    assert "# TYPE las_digital_models_step_seconds_total counter" in prometheus
+    assert 'las_digital_models_step_seconds_total{step="interpolation"} 8' in prometheus
+    assert 'las_digital_models_step_input_points_total{step="read"} 150' in prometheus
+
+
+def test_main_on_recorded_spans(capsys):
+    metrics_dir = os.path.join(TMP_PATH, "spans")
+    metrics.configure_metrics(metrics_dir)
+    try:
+        for tile in ["tile_a.laz", "tile_b.laz"]:
+            with metrics.span("interpolation", tile=tile):
+                with metrics.span("read") as read_span:
+                    read_span.add(input_points=10)
+    finally:
+        metrics.configure_metrics(None)
+
+    prometheus_file = os.path.join(TMP_PATH, "metrics.prom")
+    json_file = os.path.join(TMP_PATH, "report.json")
+    metrics_report.main([metrics_dir, "--prometheus", prometheus_file, "--json", json_file])
+
+    assert "Slowest tiles:" in capsys.readouterr().out
+    assert os.path.isfile(prometheus_file)
+    with open(json_file, "r") as f:
+        report = json.load(f)
+    assert report["steps"]["read"]["counters"] == {"input_points": 20}
+    assert {tile["tile"] for tile in report["slowest_tiles"]} == {"tile_a.laz", "tile_b.laz"}
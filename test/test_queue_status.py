@@ -0,0 +1,23 @@
+import json
+import time
+
+from las_digital_models import queue_status
+from las_digital_models.batch.work_queue import FileWorkQueue, get_pipeline_tasks
+
+
+def test_queue_status(tmp_path, capsys):
+    queue = FileWorkQueue(str(tmp_path))
+    queue.add_tasks(*get_pipeline_tasks(["tile_a.laz", "tile_b.laz"], write_buffered_las=False, run_dhm=True))
+    task = queue.claim("host_1-1234")
+    queue.complete(task, "host_1-1234", time.time() - 30)
+
+    queue_status.main([str(tmp_path)])
+    report = capsys.readouterr().out
+    assert "interpolation: 1/2 done (50.0%), 0 running, 1 pending, 0 failed" in report
+    assert "DHM: 0/2 done (0.0%)" in report
+    assert "host_1-1234: 1" in report
+    assert "Throughput: 2.00 tasks/min, remaining time: 1.5 min" in report
+
+    queue_status.main([str(tmp_path), "--json"])
+    progress = json.loads(capsys.readouterr().out)
+    assert progress["workers"] == {"host_1-1234": 1}
@@ -0,0 +1,325 @@
+import logging
+import os
+import shutil
+import test.utils.raster_utils as ru
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from hydra import compose, initialize
+from omegaconf import OmegaConf
+
+from las_digital_models import run_batch
+from las_digital_models.batch import orchestrator
+from las_digital_models.commons import commons
+
+TEST_PATH = os.path.dirname(os.path.abspath(__file__))
+TMP_PATH = os.path.join(TEST_PATH, "tmp", "run_batch")
+INPUT_DIR = os.path.join(TEST_PATH, "data")
+PIXEL_SIZE = 0.5
+
+
+def setup_module(module):
+    try:
+        shutil.rmtree(TMP_PATH)
+
+    except FileNotFoundError:
+        pass
+    os.makedirs(TMP_PATH)
+
+
+@pytest.mark.parametrize(
+    "jobs, cpu_limit, expected_nb_workers",
+    [
+        (3, -1, 3),  # no cpu limit
+        (3, 2, 2),  # cpu limit lower than the number of jobs
+        (3, 4, 3),  # cpu limit higher than the number of jobs
+        (0, 1, 1),  # as many jobs as possible
+    ],
+)
+def test_get_nb_workers(jobs, cpu_limit, expected_nb_workers):
+    assert orchestrator.get_nb_workers(jobs, cpu_limit) == expected_nb_workers
+
+
+def test_sort_tiles_in_morton_order():
+    tiles = [f"test_data_{x:04d}_{y:04d}_LA93_IGN69.laz" for x in range(4) for y in range(4)]
+
+    sorted_tiles = orchestrator.sort_tiles_in_morton_order(tiles)
+
+    assert sorted_tiles[:4] == [
+        "test_data_0000_0000_LA93_IGN69.laz",
+        "test_data_0001_0000_LA93_IGN69.laz",
+        "test_data_0000_0001_LA93_IGN69.laz",
+        "test_data_0001_0001_LA93_IGN69.laz",
+    ]
+    assert sorted(sorted_tiles) == sorted(tiles)
+
+
+def test_get_raster_paths_multi_resolution():
+    with initialize(version_base="1.2", config_path="../configs"):
+        cfg = compose(config_name="config", overrides=["io.output_dir=out", "tile_geometry.pixel_size=[0.5,1,5]"])
+
+    raster_paths = orchestrator.get_raster_paths("tile_0770_6278.laz", cfg, ["DSM", "DTM"])
+
+    assert raster_paths == [
+        os.path.join("out", dirname, f"tile_0770_6278{size}.tif")
+        for dirname in ["DSM", "DTM"]
+        for size in ["_50CM", "_1M", "_5M"]
+    ]
+
+
+@pytest.mark.parametrize("write_buffered_las", [False, True])
+def test_run_batch(write_buffered_las):
+    output_dir = os.path.join(TMP_PATH, f"test_run_batch_{write_buffered_las}")
+    with initialize(version_base="1.2", config_path="../configs"):
+        # config is relative to a module
+        cfg = compose(
+            config_name="test",
+            overrides=[
+                f"io.input_dir={INPUT_DIR}",
+                f"io.output_dir={output_dir}",
+                f"tile_geometry.pixel_size={PIXEL_SIZE}",
+                "batch.jobs=2",
+                f"batch.write_buffered_las={write_buffered_las}",
+            ],
+        )
+
+    run_batch.run_batch(cfg)
+
+    input_files = orchestrator.list_input_tiles(INPUT_DIR)
+    assert len(input_files) == 6
+    assert os.path.isdir(os.path.join(output_dir, orchestrator.BUFFER_DIRNAME)) == write_buffered_las
+    for input_file in input_files:
+        if write_buffered_las:
+            assert os.path.isfile(os.path.join(output_dir, orchestrator.BUFFER_DIRNAME, input_file))
+        tilename = os.path.splitext(input_file)[0]
+        _size = commons.give_name_resolution_raster(PIXEL_SIZE)
+        for od in ["DTM", "DSM", "DHM"]:
+            out_path = os.path.join(output_dir, od, f"{tilename}{_size}.tif")
+            assert os.path.isfile(out_path), f"Output for {od} was not generated"
+
+
+def test_run_batch_same_output_with_and_without_buffered_las():
+    _size = commons.give_name_resolution_raster(PIXEL_SIZE)
+    for input_file in orchestrator.list_input_tiles(INPUT_DIR):
+        tilename = os.path.splitext(input_file)[0]
+        for od in ["DTM", "DSM", "DHM"]:
+            raster_in_memory = os.path.join(TMP_PATH, "test_run_batch_False", od, f"{tilename}{_size}.tif")
+            raster_from_file = os.path.join(TMP_PATH, "test_run_batch_True", od, f"{tilename}{_size}.tif")
+            assert ru.tif_values_all_close(raster_in_memory, raster_from_file)
+
+
+def test_run_batch_incremental():
+    input_dir = os.path.join(TMP_PATH, "incremental_input")
+    output_dir = os.path.join(TMP_PATH, "incremental_output")
+    os.makedirs(input_dir)
+    for input_file in orchestrator.list_input_tiles(INPUT_DIR):
+        shutil.copy2(os.path.join(INPUT_DIR, input_file), input_dir)
+
+    with initialize(version_base="1.2", config_path="../configs"):
+        cfg = compose(
+            config_name="test",
+            overrides=[
+                f"io.input_dir={input_dir}",
+                f"io.output_dir={output_dir}",
+                f"tile_geometry.pixel_size={PIXEL_SIZE}",
+                "batch.jobs=2",
+            ],
+        )
+    _size = commons.give_name_resolution_raster(PIXEL_SIZE)
+
+    def get_mtimes():
+        return {
+            (od, tile): os.stat(os.path.join(output_dir, od, f"{os.path.splitext(tile)[0]}{_size}.tif")).st_mtime_ns
+            for tile in orchestrator.list_input_tiles(input_dir)
+            for od in ["DTM", "DSM", "DHM"]
+        }
+
+    run_batch.run_batch(cfg)
+    first_mtimes = get_mtimes()
+
+    # Nothing changed: all tiles are skipped
+    run_batch.run_batch(cfg)
+    assert get_mtimes() == first_mtimes
+
+    # One tile is delivered again: only this tile and its neighbors are processed again
+    updated_tile = "test_data_77050_627755_LA93_IGN69.laz"
+    os.utime(os.path.join(input_dir, updated_tile))
+    run_batch.run_batch(cfg)
+    new_mtimes = get_mtimes()
+    rebuilt_tiles = {tile for (od, tile), mtime in new_mtimes.items() if mtime != first_mtimes[(od, tile)]}
+    assert rebuilt_tiles == {
+        updated_tile,
+        "test_data_77055_627755_LA93_IGN69.laz",
+        "test_data_77050_627760_LA93_IGN69.laz",
+        "test_data_77055_627760_LA93_IGN69.laz",
+    }
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.DEBUG)
+    test_run_batch(False)
+
+
+def test_run_stage_memory_admission():
+    estimates = {"a": 500, "b": 400, "c": 300, "d": 200, "e": 100}
+    cfg = OmegaConf.create({"batch": {"incremental": False, "scheduling": {"memory_budget_mb": 700}}})
+    lock = threading.Lock()
+    running = set()
+    started = []
+    max_running_memory = []
+
+    def process(tile, config):
+        with lock:
+            running.add(tile)
+            started.append(tile)
+            max_running_memory.append(sum(estimates[t] for t in running))
+        time.sleep(0.05)
+        with lock:
+            running.remove(tile)
+        return tile
+
+    with ThreadPoolExecutor(4) as executor:
+        results, summary = orchestrator.run_stage(
+            executor, process, list(estimates), cfg, "test", None, None, [], estimates, 3
+        )
+
+    assert sorted(results) == sorted(estimates)
+    assert summary == (5, 0)
+    # tiles are started in order, and the estimated memory of the running tiles never exceeds the budget
+    assert started == list(estimates)
+    assert max(max_running_memory) <= 700
+
+
+def test_split_in_chunks():
+    assert orchestrator.split_in_chunks(list("abcde"), 2) == [["a", "b"], ["c", "d"], ["e"]]
+    assert orchestrator.split_in_chunks([], 2) == []
+
+
+def test_run_stage_chunks():
+    estimates = {"a": 500, "b": 400, "c": 300, "d": 200, "e": 100}
+    cfg = OmegaConf.create({"batch": {"incremental": False, "scheduling": {"memory_budget_mb": 1300}}})
+    lock = threading.Lock()
+    running = []
+
+    def process(tiles, config):
+        with lock:
+            running.append(tiles)
+            # chunk estimate: largest tile + chunk_memory_mb
+            assert sum(estimates[chunk[0]] + 200 for chunk in running) <= 1300
+        time.sleep(0.05)
+        with lock:
+            running.remove(tiles)
+        return tiles
+
+    with ThreadPoolExecutor(4) as executor:
+        results, summary = orchestrator.run_stage(
+            executor, process, list(estimates), cfg, "test", None, None, [], estimates, 3, 2, 200
+        )
+
+    assert sorted(results) == [["a", "b"], ["c", "d"], ["e"]]
+    assert summary == (5, 0)
+
+
+@pytest.mark.parametrize(
+    "write_buffered_las, reader", [(False, "pdal"), (True, "pdal"), (False, "laspy"), (True, "laspy")]
+)
+def test_run_batch_with_prefetch(write_buffered_las, reader):
+    output_dir = os.path.join(TMP_PATH, f"test_run_batch_prefetch_{write_buffered_las}_{reader}")
+    with initialize(version_base="1.2", config_path="../configs"):
+        cfg = compose(
+            config_name="test",
+            overrides=[
+                f"io.input_dir={INPUT_DIR}",
+                f"io.output_dir={output_dir}",
+                f"tile_geometry.pixel_size={PIXEL_SIZE}",
+                "batch.jobs=2",
+                f"batch.write_buffered_las={write_buffered_las}",
+                "batch.prefetch.enabled=true",
+                "batch.prefetch.nb_threads=2",
+                f"batch.prefetch.reader={reader}",
+            ],
+        )
+
+    run_batch.run_batch(cfg)
+
+    _size = commons.give_name_resolution_raster(PIXEL_SIZE)
+    for input_file in orchestrator.list_input_tiles(INPUT_DIR):
+        tilename = os.path.splitext(input_file)[0]
+        for od in ["DTM", "DSM", "DHM"]:
+            raster = os.path.join(output_dir, od, f"{tilename}{_size}.tif")
+            expected_raster = os.path.join(TMP_PATH, "test_run_batch_False", od, f"{tilename}{_size}.tif")
+            assert ru.tif_values_all_close(raster, expected_raster)
+
+
+@pytest.mark.parametrize("backend", ["files", "sqlite"])
+def test_run_batch_with_work_queue(backend):
+    output_dir = os.path.join(TMP_PATH, f"test_run_batch_queue_{backend}")
+    configs = []
+    for worker_id in ["host_1", "host_2"]:
+        with initialize(version_base="1.2", config_path="../configs"):
+            configs.append(
+                compose(
+                    config_name="test",
+                    overrides=[
+                        f"io.input_dir={INPUT_DIR}",
+                        f"io.output_dir={output_dir}",
+                        f"tile_geometry.pixel_size={PIXEL_SIZE}",
+                        "batch.jobs=1",
+                        "batch.write_buffered_las=true",
+                        "batch.queue.enabled=true",
+                        f"batch.queue.backend={backend}",
+                        "batch.queue.poll_interval_s=0.1",
+                        f"batch.queue.worker_id={worker_id}",
+                    ],
+                )
+            )
+
+    # Two workers share the run, as if they were started on two hosts
+    with ThreadPoolExecutor(2) as executor:
+        progresses = list(executor.map(orchestrator.run_queue_worker, configs))
+
+    nb_tiles = len(orchestrator.list_input_tiles(INPUT_DIR))
+    for progress in progresses:
+        assert progress["stages"] == {
+            stage: {"pending": 0, "running": 0, "done": nb_tiles, "failed": 0}
+            for stage in ["buffer", "interpolation", "DHM"]
+        }
+    assert sum(progresses[0]["workers"].values()) == 3 * nb_tiles
+
+    _size = commons.give_name_resolution_raster(PIXEL_SIZE)
+    for input_file in orchestrator.list_input_tiles(INPUT_DIR):
+        tilename = os.path.splitext(input_file)[0]
+        for od in ["DTM", "DSM", "DHM"]:
+            raster = os.path.join(output_dir, od, f"{tilename}{_size}.tif")
+            expected_raster = os.path.join(TMP_PATH, "test_run_batch_True", od, f"{tilename}{_size}.tif")
+            assert ru.tif_values_all_close(raster, expected_raster)
+
+
+@pytest.mark.parametrize("write_buffered_las", [False, True])
+def test_run_batch_with_spatial_index(write_buffered_las):
+    output_dir = os.path.join(TMP_PATH, f"test_run_batch_spatial_index_{write_buffered_las}")
+    with initialize(version_base="1.2", config_path="../configs"):
+        cfg = compose(
+            config_name="test",
+            overrides=[
+                f"io.input_dir={INPUT_DIR}",
+                f"io.output_dir={output_dir}",
+                f"tile_geometry.pixel_size={PIXEL_SIZE}",
+                "batch.jobs=2",
+                f"batch.write_buffered_las={write_buffered_las}",
+                "batch.spatial_index.enabled=true",
+            ],
+        )
+
+    run_batch.run_batch(cfg)
+
+    _size = commons.give_name_resolution_raster(PIXEL_SIZE)
+    for input_file in orchestrator.list_input_tiles(INPUT_DIR):
+        tilename = os.path.splitext(input_file)[0]
+        assert os.path.isfile(os.path.join(output_dir, orchestrator.SPATIAL_INDEX_DIRNAME, f"{tilename}.copc.laz"))
+        for od in ["DTM", "DSM", "DHM"]:
+            raster = os.path.join(output_dir, od, f"{tilename}{_size}.tif")
+            expected_raster = os.path.join(TMP_PATH, "test_run_batch_False", od, f"{tilename}{_size}.tif")
+            assert ru.tif_values_all_close(raster, expected_raster)